@@ -27,7 +27,7 @@ def main():
     parser.add_argument("--task-test-selection", help="Comma-separated list of TaskID:TestIndex pairs (e.g. 'de809cff:1,faa9f03d:1').")
     parser.add_argument("--test", type=int, default=1, help="Test case index (1-based, default: 1). Ignored if --task-directory is used.")
     parser.add_argument("--task-workers", type=int, default=60, help="Number of tasks to run in parallel (default: 60). CAUTION: Divides global rate limits by this factor.")
-    parser.add_argument("--startup-delay", type=float, default=90.0, help="Delay in seconds between starting parallel tasks in batch mode to avoid rate limits (default: 90.0).")
+    parser.add_argument("--startup-delay", type=float, default=90.0, help="Delay in seconds between starting parallel tasks in batch mode to avoid rate limits (default: 90.0). Only used with ARC_AGI_ADAPTIVE_ADMISSION=false; otherwise tasks start as provider headroom allows.")
     parser.add_argument("--task-limit", type=int, default=None, help="Limit the number of tasks to run (useful for testing batch mode).")
     parser.add_argument("--objects", action="store_true", help="Run a 3-step pipeline: Extraction -> Transformation -> Solution.")
     parser.add_argument("--step-5-only", action="store_true", help="Run only Step 5 (Full Search) of the solver.")
@@ -41,6 +41,9 @@ def main():
     parser.add_argument("--image", action="store_true", help="Generate an image for the task and include it in the prompt.")
     parser.add_argument("--codegen-params", type=str, default=None, help="Comma-separated list of model=prompt_version pairs for codegen (default depends on mode).")
     parser.add_argument("--disable-retries", action="store_true", help="Disable all retries for LLM calls.")
+    parser.add_argument("--parallel-verification", action="store_true", default=os.getenv("ARC_AGI_PARALLEL_VERIFICATION", "false").lower() == "true", help="Verify codegen solvers on all train examples concurrently (bounded by CPU cores) instead of one after another.")
+    parser.add_argument("--async-providers", action="store_true", default=os.getenv("ARC_AGI_ASYNC_PROVIDERS", "false").lower() == "true", help="Run model calls, and the parallel searches of each step, as coroutines on one event loop per task process (async OpenAI/Anthropic/Gemini clients) instead of one blocked thread per call and per search.")
+    parser.add_argument("--prompt-caching", action="store_true", default=os.getenv("ARC_AGI_PROMPT_CACHING", "false").lower() == "true", help="Mark each prompt's shared task prefix for provider prompt caching (OpenAI prompt_cache_key, Anthropic cache_control).")
     parser.add_argument("--disable-step-1-standard-models", action="store_true", help="Disable standard (non-codegen) models in Step 1.")
     parser.add_argument("--trigger-deep-thinking", action="store_true", help="Append a deep thinking procedure to the prompt.")
     parser.add_argument("--generate-hint", action="store_true", help="Generate a hint for the task using a separate model call.")
@@ -54,6 +57,10 @@ def main():
     parser.add_argument("--logs-directory", type=str, default="logs/", help="Directory to save log files (default: logs/).")
     parser.add_argument("--submissions-directory", type=str, default="submissions/", help="Directory to save submission files (default: submissions/).")
     parser.add_argument("--answers-directory", type=str, help="Optional directory containing answer files (with 'output' for test cases).")
+    parser.add_argument("--llm-transport", choices=["live", "record", "replay", "synthetic"], default=os.getenv("ARC_AGI_LLM_TRANSPORT", "live").lower(), help="How model calls are answered: live providers (default), live with every response recorded, replayed recordings, or synthetic responses with modelled latency (no keys needed offline).")
+    parser.add_argument("--replay-dir", type=str, default=os.getenv("ARC_AGI_LLM_TRANSPORT_DIR", "llm_recordings/"), help="Directory of the recordings written by --llm-transport record and read by replay/synthetic (default: llm_recordings/).")
+    parser.add_argument("--replay-speed", type=float, default=float(os.getenv("ARC_AGI_REPLAY_SPEED", "0")), help="Offline responses wait their recorded/modelled latency divided by this factor (e.g. 100); 0 answers at once (default: 0).")
+    parser.add_argument("--resume", type=str, default=None, metavar="RUN_TIMESTAMP", help="Resume an interrupted run (its timestamp, e.g. 2025-12-27_12-00-11) from the checkpoints in --logs-directory: finished task:test units are skipped and partial ones continue with their missing model runs.")
 
     mode_group = parser.add_mutually_exclusive_group()
     mode_group.add_argument("--solver", action="store_true", help="Enable solver mode.")
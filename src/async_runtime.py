@@ -0,0 +1,82 @@
+import os
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic, AsyncAnthropic
+
+from src.config import get_async_http_client
+
+# When enabled, model calls run as coroutines on one process-wide event loop with the async
+# OpenAI/Anthropic/genai clients, instead of one blocked OS thread per in-flight call.
+_ASYNC_PROVIDERS_ENABLED = os.getenv("ARC_AGI_ASYNC_PROVIDERS", "false").lower() == "true"
+
+_LOOP = None
+_LOOP_THREAD = None
+_LOOP_LOCK = threading.Lock()
+
+# Async clients are bound to the loop they are used on, so they are cached per process.
+_ASYNC_CLIENTS = {}
+
+def set_async_providers_enabled(enabled: bool):
+    global _ASYNC_PROVIDERS_ENABLED
+    _ASYNC_PROVIDERS_ENABLED = enabled
+
+def get_async_providers_enabled() -> bool:
+    return _ASYNC_PROVIDERS_ENABLED
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the process-wide event loop, starting its thread on first use."""
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-providers", daemon=True)
+            thread.start()
+            _LOOP, _LOOP_THREAD = loop, thread
+        return _LOOP
+
+def run_coroutine(coro: Coroutine) -> Any:
+    """Runs a coroutine on the process-wide loop and blocks the calling thread for its result."""
+    loop = get_event_loop()
+    if threading.current_thread() is _LOOP_THREAD:
+        coro.close()
+        raise RuntimeError("run_coroutine() called from the event loop thread; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+def _reset_after_fork():
+    global _LOOP, _LOOP_THREAD, _LOOP_LOCK
+    # The loop thread does not survive a fork; clients hold connections of the parent
+    _LOOP = None
+    _LOOP_THREAD = None
+    _LOOP_LOCK = threading.Lock()
+    _ASYNC_CLIENTS.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _shared_async_http_client():
+    client = _ASYNC_CLIENTS.get("http")
+    if client is None:
+        client = get_async_http_client(timeout=3300.0)
+        _ASYNC_CLIENTS["http"] = client
+    return client
+
+def get_async_openai_client(client: Optional[OpenAI]) -> Optional[AsyncOpenAI]:
+    """Async twin of a configured sync OpenAI client (same key and base URL). Call on the loop."""
+    if client is None:
+        return None
+    key = ("openai", client.api_key, str(client.base_url))
+    if key not in _ASYNC_CLIENTS:
+        _ASYNC_CLIENTS[key] = AsyncOpenAI(api_key=client.api_key, base_url=client.base_url, http_client=_shared_async_http_client())
+    return _ASYNC_CLIENTS[key]
+
+def get_async_anthropic_client(client: Optional[Anthropic]) -> Optional[AsyncAnthropic]:
+    """Async twin of a configured sync Anthropic client (same key and base URL). Call on the loop."""
+    if client is None:
+        return None
+    key = ("anthropic", client.api_key, str(client.base_url))
+    if key not in _ASYNC_CLIENTS:
+        _ASYNC_CLIENTS[key] = AsyncAnthropic(api_key=client.api_key, base_url=client.base_url, http_client=_shared_async_http_client())
+    return _ASYNC_CLIENTS[key]
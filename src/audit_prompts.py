@@ -11,9 +11,10 @@ from src.audit_templates_consistency import (
     PROMPT_CONSISTENCY_OUTPUT_FORMAT
 )
 
-def build_duo_pick_prompt(train_examples, test_input, candidates_list, reasoning_store, total_attempts):
+def build_duo_pick_prompt(train_examples, test_input, candidates_list, reasoning_store, total_attempts, base_prompt: str = None):
     """
     Constructs the prompt for the "Duo Pick Judge" (Meta-Conclusion).
+    base_prompt is the already-built standard prompt of this test input, if the caller has it.
     """
     parts = []
     
@@ -22,11 +23,14 @@ def build_duo_pick_prompt(train_examples, test_input, candidates_list, reasoning
     
     # 2. Base Prompt
     # We build a standard prompt (non-codegen) to provide context
-    from src.tasks import build_prompt
-    from types import SimpleNamespace
-    
-    test_example_wrapper = SimpleNamespace(input=test_input) if test_input is not None else None
-    base_prompt_text = build_prompt(train_examples, test_example_wrapper)
+    if base_prompt is not None:
+        base_prompt_text = base_prompt
+    else:
+        from src.tasks import build_prompt
+        from types import SimpleNamespace
+
+        test_example_wrapper = SimpleNamespace(input=test_input) if test_input is not None else None
+        base_prompt_text = build_prompt(train_examples, test_example_wrapper)
     parts.append("\n<PROMPT START>")
     parts.append(base_prompt_text)
     parts.append("<PROMPT STOP>\n")
@@ -1,51 +1,79 @@
 from typing import List
-import copy
+import numpy as np
 
 Grid = List[List[int]]
 
+# Lookup tables for color shifts: _SHIFT_LUTS[s][c] == (c + s) % 10
+_SHIFT_LUTS = [(np.arange(10) + s) % 10 for s in range(10)]
+
+def _as_array(grid) -> np.ndarray:
+    return np.asarray(grid)
+
 def rotate_grid_90(grid: Grid) -> Grid:
     """Rotates the grid 90 degrees clockwise."""
-    if not grid:
+    if len(grid) == 0:
         return []
-    rows = len(grid)
-    cols = len(grid[0])
-    new_grid = [[0 for _ in range(rows)] for _ in range(cols)]
-    for r in range(rows):
-        for c in range(cols):
-            new_grid[c][rows - 1 - r] = grid[r][c]
-    return new_grid
+    return np.rot90(_as_array(grid), k=-1).tolist()
 
 def rotate_grid_180(grid: Grid) -> Grid:
     """Rotates the grid 180 degrees."""
-    # Rotate 90 twice
-    return rotate_grid_90(rotate_grid_90(grid))
+    if len(grid) == 0:
+        return []
+    return np.rot90(_as_array(grid), k=2).tolist()
 
 def rotate_grid_270(grid: Grid) -> Grid:
     """Rotates the grid 270 degrees clockwise (or 90 counter-clockwise)."""
-    # Rotate 90 three times
-    return rotate_grid_90(rotate_grid_90(rotate_grid_90(grid)))
+    if len(grid) == 0:
+        return []
+    return np.rot90(_as_array(grid), k=1).tolist()
 
 def flip_grid_horizontal(grid: Grid) -> Grid:
     """Flips the grid horizontally (left <-> right)."""
-    if not grid:
+    if len(grid) == 0:
         return []
-    return [row[::-1] for row in grid]
+    return np.flip(_as_array(grid), axis=1).tolist()
 
 def flip_grid_vertical(grid: Grid) -> Grid:
     """Flips the grid vertically (up <-> down)."""
-    if not grid:
+    if len(grid) == 0:
         return []
-    return grid[::-1]
+    return np.flip(_as_array(grid), axis=0).tolist()
 
 def flip_grid_both(grid: Grid) -> Grid:
     """Flips both horizontally and vertically (equivalent to 180 rotation)."""
-    return flip_grid_vertical(flip_grid_horizontal(grid))
+    if len(grid) == 0:
+        return []
+    return np.flip(_as_array(grid)).tolist()
+
+def _shift_colors(arr: np.ndarray, shift: int) -> np.ndarray:
+    # mode="wrap" makes out-of-palette values behave exactly like (cell + shift) % 10
+    return np.take(_SHIFT_LUTS[shift % 10], arr, mode="wrap")
 
 def shift_grid_colors(grid: Grid, shift: int) -> Grid:
     """Shifts all colors in the grid by 'shift' amount (modulo 10)."""
-    if not grid:
+    if len(grid) == 0:
         return []
-    return [[(cell + shift) % 10 for cell in row] for row in grid]
+    return _shift_colors(_as_array(grid), shift).tolist()
+
+def _augment(arr: np.ndarray) -> List[tuple]:
+    """All augmentations of one grid as (type, grid) pairs, in get_augmented_pairs order."""
+    if arr.size == 0:
+        return [(t, []) for t in _AUGMENTATION_TYPES]
+    variants = [
+        np.rot90(arr, k=-1),
+        np.rot90(arr, k=2),
+        np.rot90(arr, k=1),
+        np.flip(arr, axis=1),
+        np.flip(arr, axis=0),
+        np.flip(arr),
+    ] + [_shift_colors(arr, s) for s in (1, 2, 3)]
+    return [(t, v.tolist()) for t, v in zip(_AUGMENTATION_TYPES, variants)]
+
+_AUGMENTATION_TYPES = [
+    "rotation_90", "rotation_180", "rotation_270",
+    "reflection_h", "reflection_v", "reflection_both",
+    "color_shift_1", "color_shift_2", "color_shift_3",
+]
 
 def get_augmented_pairs(input_grid: Grid, output_grid: Grid) -> List[dict]:
     """
@@ -54,48 +82,9 @@ def get_augmented_pairs(input_grid: Grid, output_grid: Grid) -> List[dict]:
            reflection_h, reflection_v, reflection_both,
            color_shift_1, color_shift_2, color_shift_3
     """
-    augmented = []
-
-    # Rotations
-    augmented.append({
-        "type": "rotation_90",
-        "input": rotate_grid_90(input_grid),
-        "output": rotate_grid_90(output_grid)
-    })
-    augmented.append({
-        "type": "rotation_180",
-        "input": rotate_grid_180(input_grid),
-        "output": rotate_grid_180(output_grid)
-    })
-    augmented.append({
-        "type": "rotation_270",
-        "input": rotate_grid_270(input_grid),
-        "output": rotate_grid_270(output_grid)
-    })
-
-    # Reflections
-    augmented.append({
-        "type": "reflection_h",
-        "input": flip_grid_horizontal(input_grid),
-        "output": flip_grid_horizontal(output_grid)
-    })
-    augmented.append({
-        "type": "reflection_v",
-        "input": flip_grid_vertical(input_grid),
-        "output": flip_grid_vertical(output_grid)
-    })
-    augmented.append({
-        "type": "reflection_both",
-        "input": flip_grid_both(input_grid),
-        "output": flip_grid_both(output_grid)
-    })
-
-    # Color Shifts
-    for s in [1, 2, 3]:
-        augmented.append({
-            "type": f"color_shift_{s}",
-            "input": shift_grid_colors(input_grid, s),
-            "output": shift_grid_colors(output_grid, s)
-        })
-
-    return augmented
+    inputs = _augment(_as_array(input_grid))
+    outputs = _augment(_as_array(output_grid))
+    return [
+        {"type": t, "input": inp, "output": out}
+        for (t, inp), (_, out) in zip(inputs, outputs)
+    ]
@@ -5,17 +5,29 @@ import time
 import threading
 import os
 import signal
+from collections import deque
 from pathlib import Path
 
-from src.execution import execute_task
+from src.execution import execute_task, HARD_KILL_GRACE_S
+from src.deadline import Deadline
+from src.solver.state import JUDGE_RESERVE_S, MIN_STEP_TIME_S
+from src.parallel.limiter import (
+    get_shared_rate_limiter_enabled, start_rate_limit_manager, start_shared_rate_limiters, format_rate_limit_wait_stats,
+    start_shared_circuit_breakers, start_shared_provider_health,
+)
+from src.parallel.admission import AdmissionController, get_adaptive_admission_enabled, ADMISSION_MIN_GAP_S, ADMISSION_TICK_S
+from src.circuit_breaker import get_circuit_breaker_enabled, format_circuit_breaker_stats
 
 # 11 hours 45 minutes = 42300 seconds
 GLOBAL_TIMEOUT_SECONDS = 42300
+# A unit is only started with time for at least one search step and finalize
+MIN_UNIT_TIME_S = JUDGE_RESERVE_S + MIN_STEP_TIME_S
 
 def _monitor_timeout(start_time, executor_processes_func):
     """
     Background daemon that monitors total execution time.
     If GLOBAL_TIMEOUT_SECONDS is exceeded, it terminates all worker processes.
+    Units finalize by the run's deadline, HARD_KILL_GRACE_S earlier; this only stops those that overran it.
     """
     while True:
         elapsed = time.time() - start_time
@@ -39,6 +51,8 @@ def _monitor_timeout(start_time, executor_processes_func):
 def run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, answers_directory=None, startup_delay=0.0):
     final_results = []
     start_time = time.time()
+    # Every unit finalizes by this deadline, so the submission gets its candidates before the monitor kills workers
+    run_deadline = Deadline(start_time + GLOBAL_TIMEOUT_SECONDS - HARD_KILL_GRACE_S)
 
     # Standard logging (interleaved)
     manager = multiprocessing.Manager()
@@ -48,6 +62,24 @@ def run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, ans
     lock = manager.Lock()
     status_counters = (running, remaining, finished, lock)
 
+    # One token bucket per provider for all workers, so idle capacity of one process is usable by the others
+    limiter_manager, shared_limiters = None, None
+    if get_shared_rate_limiter_enabled() and args.task_workers > 1:
+        limiter_manager, shared_limiters = start_shared_rate_limiters()
+    elif get_adaptive_admission_enabled() and args.task_workers > 1:
+        limiter_manager = start_rate_limit_manager()
+
+    # One circuit per provider/model for all workers, so an outage is discovered once, not per process
+    shared_breakers = None
+    if limiter_manager is not None and get_circuit_breaker_enabled():
+        shared_breakers = start_shared_circuit_breakers(limiter_manager)
+
+    # Start units as the providers have headroom for them, instead of one every startup_delay seconds
+    shared_health, admission = None, None
+    if limiter_manager is not None and get_adaptive_admission_enabled():
+        shared_health = start_shared_provider_health(limiter_manager)
+        admission = AdmissionController(args.task_workers, shared_health, shared_limiters, shared_breakers)
+
     # Print Table Header
     print("Legend: ⚡ Running   ⏳ Queued   ✅ Done")
     print()
@@ -64,16 +96,7 @@ def run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, ans
             )
             monitor_thread.start()
 
-            future_to_task = {}
-            for i, item in enumerate(tasks_to_run):
-                # Check timeout before submitting next task (avoids starting new ones if close to limit)
-                if time.time() - start_time > GLOBAL_TIMEOUT_SECONDS:
-                    print("Global timeout reached during submission. Stopping new tasks.", file=sys.stderr)
-                    break
-
-                if i > 0 and startup_delay > 0:
-                    time.sleep(startup_delay)
-
+            def submit(item):
                 if len(item) == 3:
                     task_id_str, test_idx, task_data = item
                     # Create a dummy Path that looks like a filename so .stem works and answers check works (maybe)
@@ -85,21 +108,49 @@ def run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, ans
                     task_data = None
 
                 answer_path = answers_directory / task_path.name if answers_directory else None
-                future = executor.submit(execute_task, args, task_path, test_idx, run_timestamp, rate_limit_scale, answer_path, status_counters, task_data)
+                future = executor.submit(execute_task, args, task_path, test_idx, run_timestamp, rate_limit_scale, answer_path, status_counters, task_data, shared_limiters, shared_breakers, shared_health, run_deadline)
                 future_to_task[future] = (task_path, test_idx)
-            
-            # Process results
+
+            # Without admission control every unit is queued up front, startup_delay apart;
+            # with it, a unit is only submitted while fewer than the controller's target are running
+            gap = ADMISSION_MIN_GAP_S if admission is not None else startup_delay
+            future_to_task = {}
+            queue = deque(tasks_to_run)
+            next_submit = 0.0
+
+            # Process results as they come, submitting more units in between
             # We wrap this in a try/except to catch the BrokenProcessPool if workers are killed
             try:
-                for future in concurrent.futures.as_completed(future_to_task):
-                    try:
-                        res = future.result()
-                        final_results.append(res)
-                    except concurrent.futures.process.BrokenProcessPool:
-                        # This happens when we kill the workers
-                        print("Worker process terminated (Global Timeout). Task incomplete.", file=sys.stderr)
-                    except Exception as e:
-                        print(f"Task failed: {e}", file=sys.stderr)
+                while queue or future_to_task:
+                    # Check timeout before submitting next task (avoids starting new ones if close to limit)
+                    if queue and run_deadline.remaining() < MIN_UNIT_TIME_S:
+                        print(f"Run deadline near ({run_deadline.remaining():.0f}s left) during submission. Stopping new tasks.", file=sys.stderr)
+                        queue.clear()
+
+                    wait_s = ADMISSION_TICK_S
+                    if queue:
+                        target = admission.update(len(future_to_task)) if admission is not None else len(tasks_to_run)
+                        if len(future_to_task) < target:
+                            wait_s = next_submit - time.monotonic()
+                            if wait_s <= 0:
+                                submit(queue.popleft())
+                                next_submit = time.monotonic() + gap
+                                continue
+
+                    if not future_to_task:
+                        time.sleep(max(0.0, wait_s))
+                        continue
+                    done, _ = concurrent.futures.wait(future_to_task, timeout=max(0.0, wait_s), return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        future_to_task.pop(future)
+                        try:
+                            res = future.result()
+                            final_results.append(res)
+                        except concurrent.futures.process.BrokenProcessPool:
+                            # This happens when we kill the workers
+                            print("Worker process terminated (Global Timeout). Task incomplete.", file=sys.stderr)
+                        except Exception as e:
+                            print(f"Task failed: {e}", file=sys.stderr)
             except concurrent.futures.process.BrokenProcessPool:
                 print("\nBatch execution interrupted: Process pool broken due to global timeout kill.", file=sys.stderr)
             except Exception as e:
@@ -107,5 +158,21 @@ def run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, ans
 
     except Exception as e:
         print(f"Global execution handler error: {e}", file=sys.stderr)
+    finally:
+        if limiter_manager is not None:
+            if shared_limiters is not None:
+                try:
+                    stats = {name: proxy.wait_stats() for name, proxy in shared_limiters.items()}
+                    print(f"Rate limit queue waits: {format_rate_limit_wait_stats(stats)}", file=sys.stderr)
+                except Exception as e:
+                    print(f"Could not read rate limit wait stats: {e}", file=sys.stderr)
+            if shared_breakers is not None:
+                try:
+                    print(f"Circuit breakers: {format_circuit_breaker_stats(shared_breakers.snapshot())}", file=sys.stderr)
+                except Exception as e:
+                    print(f"Could not read circuit breaker stats: {e}", file=sys.stderr)
+            if admission is not None:
+                print(f"Admission: {admission.summary()}", file=sys.stderr)
+            limiter_manager.shutdown()
 
     return final_results
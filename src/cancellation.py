@@ -0,0 +1,137 @@
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from src.errors import RunCancelledError
+
+# A step hands one token to all of its model runs; cancelling it stops the runs that are still
+# queued or in flight. Providers hook their cleanup (cancelling a background job, closing a stream,
+# abandoning a Gemini send) onto the token of the run they serve, found through cancel_scope.
+
+class CancellationToken:
+    """Cancels the model runs that share it. Thread-safe; cancel() is idempotent."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            _run_callback(callback)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks up to timeout seconds; True once the token is cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RunCancelledError(f"Run cancelled: {self.reason}")
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Calls callback (on the cancelling thread) if the token is cancelled while enclosed; at once if it already is."""
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            _run_callback(callback)
+        try:
+            yield
+        finally:
+            if registered:
+                with self._lock:
+                    if callback in self._callbacks:
+                        self._callbacks.remove(callback)
+
+def _run_callback(callback: Callable[[], None]):
+    try:
+        callback()
+    except Exception as e:
+        # Cleanup is best effort; the cancelled run still stops at its next check
+        print(f"DEBUG: cancellation cleanup failed: {e}", file=sys.stderr)
+
+# Token of the model run executing in this context
+_TOKEN: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+@contextmanager
+def cancel_scope(token: Optional[CancellationToken]) -> Iterator[None]:
+    """Runs the enclosed model calls under token. None keeps the enclosing scope's token."""
+    if token is None:
+        yield
+        return
+    ctx = _TOKEN.set(token)
+    try:
+        yield
+    finally:
+        _TOKEN.reset(ctx)
+
+def current_cancel_token() -> Optional[CancellationToken]:
+    return _TOKEN.get()
+
+def is_cancelled() -> bool:
+    token = _TOKEN.get()
+    return token is not None and token.cancelled
+
+def check_cancelled():
+    """Raises RunCancelledError if the current run was cancelled."""
+    token = _TOKEN.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+@contextmanager
+def on_cancel(callback: Callable[[], None]) -> Iterator[None]:
+    """token.on_cancel for the current run's token; a no-op outside a cancel_scope."""
+    token = _TOKEN.get()
+    if token is None:
+        yield
+        return
+    with token.on_cancel(callback):
+        yield
+
+def cancellable_sleep(seconds: float):
+    """time.sleep that returns early, raising RunCancelledError, when the current run is cancelled."""
+    token = _TOKEN.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    token.wait(seconds)
+    token.raise_if_cancelled()
+
+@contextmanager
+def cancel_current_task() -> Iterator[None]:
+    """While enclosed, cancelling the current run's token also cancels the running asyncio task."""
+    token = _TOKEN.get()
+    if token is None:
+        yield
+        return
+    task = asyncio.current_task()
+    loop = task.get_loop()
+    active = [True]
+
+    def _cancel():
+        # Runs on the loop thread, so it cannot race the scope's exit
+        if active[0]:
+            task.cancel()
+
+    with token.on_cancel(lambda: loop.call_soon_threadsafe(_cancel)):
+        try:
+            yield
+        finally:
+            active[0] = False
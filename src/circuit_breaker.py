@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from src.errors import RetryableProviderError, RateLimitProviderError, CircuitOpenError
+from src.retry_policy import retries_exhausted, mark_retries_exhausted
+from src.cancellation import cancellable_sleep, check_cancelled
+from src.deadline import current_deadline
+
+# When enabled, model calls of a provider/model wait while its circuit is open
+_CIRCUIT_BREAKER_ENABLED = os.getenv("ARC_AGI_CIRCUIT_BREAKER", "true").lower() == "true"
+
+# Open after FAILURE_THRESHOLD failed attempts within WINDOW_S
+FAILURE_THRESHOLD = 5
+WINDOW_S = 60.0
+# Time open before a half-open probe; doubles after each failed probe up to MAX_OPEN_S
+OPEN_S = 60.0
+MAX_OPEN_S = 600.0
+# How often callers waiting on a probe ask again
+PROBE_POLL_S = 5.0
+# A call gives up (CircuitOpenError) rather than wait longer than this for a circuit; 0 fails fast
+MAX_CIRCUIT_WAIT_S = float(os.getenv("ARC_AGI_CIRCUIT_MAX_WAIT_S", "900"))
+
+def set_circuit_breaker_enabled(enabled: bool):
+    global _CIRCUIT_BREAKER_ENABLED
+    _CIRCUIT_BREAKER_ENABLED = enabled
+
+def get_circuit_breaker_enabled() -> bool:
+    return _CIRCUIT_BREAKER_ENABLED
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit of one provider/model.
+    closed: calls pass; failures are counted. open: calls wait until open_s has passed.
+    half_open: one probe call passes; its success closes the circuit, its failure reopens it.
+    """
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, window_s: float = WINDOW_S, open_s: float = OPEN_S, max_open_s: float = MAX_OPEN_S):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.base_open_s = open_s
+        self.max_open_s = max_open_s
+        self.state = "closed"
+        self.open_s = open_s
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.failures = deque()
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def before_call(self) -> float:
+        """Returns 0.0 if a call may go ahead now, else the seconds to wait before asking again."""
+        with self.lock:
+            if self.state == "closed":
+                return 0.0
+            now = time.monotonic()
+            if self.state == "open":
+                remaining = self.opened_at + self.open_s - now
+                if remaining > 0:
+                    return remaining
+                self.state = "half_open"
+                self.probe_started = None
+            # half_open: one probe at a time; a probe that never reported back expires
+            if self.probe_started is None or now - self.probe_started > self.open_s:
+                self.probe_started = now
+                return 0.0
+            return PROBE_POLL_S
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                self.state = "closed"
+                self.open_s = self.base_open_s
+                self.failures.clear()
+                self.probe_started = None
+
+    def record_failure(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == "half_open":
+                self.open_s = min(self.max_open_s, self.open_s * 2)
+                self._open(now)
+                return
+            if self.state == "open":
+                return
+            self.failures.append(now)
+            while self.failures and now - self.failures[0] > self.window_s:
+                self.failures.popleft()
+            if len(self.failures) >= self.failure_threshold:
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = "open"
+        self.opened_at = now
+        self.probe_started = None
+        self.trips += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"state": self.state, "recent_failures": len(self.failures), "trips": self.trips}
+
+class CircuitBreakerRegistry:
+    """Circuit breakers by provider/model key, created on first use. Served to all task workers by RateLimitManager."""
+    def __init__(self, **breaker_kwargs):
+        self.breaker_kwargs = breaker_kwargs
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = CircuitBreaker(**self.breaker_kwargs)
+            return breaker
+
+    def before_call(self, key: str) -> float:
+        return self._breaker(key).before_call()
+
+    def record_success(self, key: str):
+        self._breaker(key).record_success()
+
+    def record_failure(self, key: str):
+        self._breaker(key).record_failure()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {key: breaker.snapshot() for key, breaker in breakers.items()}
+
+# This process's circuits; replaced by the batch-wide registry in task workers
+_REGISTRY = CircuitBreakerRegistry()
+
+def set_circuit_breaker_registry(registry):
+    global _REGISTRY
+    _REGISTRY = registry
+
+def get_circuit_breaker_registry():
+    return _REGISTRY
+
+def format_circuit_breaker_stats(stats: dict) -> str:
+    tripped = [f"{key}: {s['trips']} trips ({s['state']})" for key, s in sorted(stats.items()) if s["trips"]]
+    return "; ".join(tripped) if tripped else "no circuit trips"
+
+# Circuit of the model call running in this context, and whether an enclosing retry loop already passed it
+_CIRCUIT: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("circuit", default=None)
+_ADMITTED: contextvars.ContextVar[bool] = contextvars.ContextVar("circuit_admitted", default=False)
+
+@contextmanager
+def circuit_scope(key: str) -> Iterator[None]:
+    """Marks the enclosed provider calls as belonging to the circuit key (e.g. "openai:gpt-5.2")."""
+    token = _CIRCUIT.set(key)
+    try:
+        yield
+    finally:
+        _CIRCUIT.reset(token)
+
+def _gated_key() -> Optional[str]:
+    if not _CIRCUIT_BREAKER_ENABLED or _ADMITTED.get():
+        return None
+    return _CIRCUIT.get()
+
+def _before_call(key: str) -> float:
+    try:
+        return _REGISTRY.before_call(key)
+    except Exception as e:
+        # The batch-wide registry is gone (manager shut down); fail open
+        print(f"DEBUG: circuit breaker unavailable for {key}: {e}", file=sys.stderr)
+        return 0.0
+
+def _next_wait(key: str, waited: float) -> float:
+    wait = _before_call(key)
+    if wait <= 0:
+        return wait
+    # No use waiting for a circuit that opens after the run's deadline
+    deadline = current_deadline()
+    if waited + wait > MAX_CIRCUIT_WAIT_S or (deadline is not None and wait >= deadline.remaining()):
+        e = CircuitOpenError(f"Circuit open for {key}: gave up after waiting {waited:.0f}s")
+        mark_retries_exhausted(e)
+        raise e
+    return wait
+
+def _record_wait(key: str, waited: float, timing_tracker: list[dict]):
+    if waited > 0:
+        print(f"DEBUG: waited {waited:.1f}s for open circuit {key}", file=sys.stderr)
+        if timing_tracker is not None:
+            timing_tracker.append({"type": "wait", "duration": waited, "reason": "circuit_open", "circuit": key})
+
+def circuit_wait(timing_tracker: list[dict] = None) -> Optional[str]:
+    """
+    Blocks while the current call's circuit is open, until the run is cancelled or its deadline
+    would pass. Returns the key if this attempt was gated; attempts nested in an already admitted
+    one (inner retry loops) pass straight through.
+    """
+    key = _gated_key()
+    if key is None:
+        return None
+    start = time.monotonic()
+    held = False
+    while (wait := _next_wait(key, time.monotonic() - start)) > 0:
+        held = True
+        cancellable_sleep(wait)
+    if held:
+        _record_wait(key, time.monotonic() - start, timing_tracker)
+    return key
+
+async def circuit_wait_async(timing_tracker: list[dict] = None) -> Optional[str]:
+    """Coroutine version of circuit_wait."""
+    key = _gated_key()
+    if key is None:
+        return None
+    start = time.monotonic()
+    held = False
+    while (wait := _next_wait(key, time.monotonic() - start)) > 0:
+        held = True
+        await asyncio.sleep(wait)
+        check_cancelled()
+    if held:
+        _record_wait(key, time.monotonic() - start, timing_tracker)
+    return key
+
+@contextmanager
+def circuit_admitted(key: Optional[str]) -> Iterator[None]:
+    if key is None:
+        yield
+        return
+    token = _ADMITTED.set(True)
+    try:
+        yield
+    finally:
+        _ADMITTED.reset(token)
+
+def record_circuit_outcome(error: Optional[BaseException] = None):
+    """
+    Reports an attempt of the current call. Server-side failures (retryable, not rate limits) count
+    against the circuit; anything else shows the provider is answering. Errors an inner retry loop
+    already reported are skipped.
+    """
+    key = _CIRCUIT.get()
+    if key is None or not _CIRCUIT_BREAKER_ENABLED or (error is not None and retries_exhausted(error)):
+        return
+    try:
+        if isinstance(error, RetryableProviderError) and not isinstance(error, (RateLimitProviderError, CircuitOpenError)):
+            _REGISTRY.record_failure(key)
+        else:
+            _REGISTRY.record_success(key)
+    except Exception as e:
+        print(f"DEBUG: circuit breaker unavailable for {key}: {e}", file=sys.stderr)
@@ -15,48 +15,61 @@ PROVIDER_RATE_LIMITS = {
     "google": {"rate": 15, "period": 60}
 }
 
+def _keepalive_socket_options(existing) -> list:
+    # Get existing options or start empty
+    # Note: socket_options can be None in kwargs if not provided, handle that.
+    options = list(existing or [])
+
+    # Enable TCP Keep-Alive
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+    # Linux specific constants (Kaggle runs on Linux)
+    # TCP_KEEPIDLE: Start sending keep-alives after 30 seconds of silence
+    # TCP_KEEPINTVL: Send subsequent probes every 15 seconds
+    # TCP_KEEPCNT: Allow 5 failed probes before killing
+    try:
+         # Depending on python version/OS, these constants might be in socket module
+         TCP_KEEPIDLE = getattr(socket, 'TCP_KEEPIDLE', 4)
+         TCP_KEEPINTVL = getattr(socket, 'TCP_KEEPINTVL', 5)
+         TCP_KEEPCNT = getattr(socket, 'TCP_KEEPCNT', 6)
+
+         options.append((socket.IPPROTO_TCP, TCP_KEEPIDLE, 30))
+         options.append((socket.IPPROTO_TCP, TCP_KEEPINTVL, 15))
+         options.append((socket.IPPROTO_TCP, TCP_KEEPCNT, 5))
+    except AttributeError:
+         pass # Fallback for non-Linux if testing locally
+    return options
+
 class KeepAliveTransport(httpx.HTTPTransport):
     def __init__(self, *args, **kwargs):
-        # Get existing options or start empty
-        # Note: socket_options can be None in kwargs if not provided, handle that.
-        options = list(kwargs.get("socket_options") or [])
-        
-        # Enable TCP Keep-Alive
-        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
-        
-        # Linux specific constants (Kaggle runs on Linux)
-        # TCP_KEEPIDLE: Start sending keep-alives after 30 seconds of silence
-        # TCP_KEEPINTVL: Send subsequent probes every 15 seconds
-        # TCP_KEEPCNT: Allow 5 failed probes before killing
-        try:
-             # Depending on python version/OS, these constants might be in socket module
-             TCP_KEEPIDLE = getattr(socket, 'TCP_KEEPIDLE', 4)
-             TCP_KEEPINTVL = getattr(socket, 'TCP_KEEPINTVL', 5)
-             TCP_KEEPCNT = getattr(socket, 'TCP_KEEPCNT', 6)
-             
-             options.append((socket.IPPROTO_TCP, TCP_KEEPIDLE, 30))
-             options.append((socket.IPPROTO_TCP, TCP_KEEPINTVL, 15))
-             options.append((socket.IPPROTO_TCP, TCP_KEEPCNT, 5))
-        except AttributeError:
-             pass # Fallback for non-Linux if testing locally
+        kwargs["socket_options"] = _keepalive_socket_options(kwargs.get("socket_options"))
+        super().__init__(*args, **kwargs)
 
-        kwargs["socket_options"] = options
+class AsyncKeepAliveTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, *args, **kwargs):
+        kwargs["socket_options"] = _keepalive_socket_options(kwargs.get("socket_options"))
         super().__init__(*args, **kwargs)
 
-def get_http_client(**kwargs) -> httpx.Client:
-    """Returns a shared httpx client, potentially with insecure SSL if configured."""
+def _prepare_http_client_kwargs(kwargs: dict, transport_cls) -> dict:
     insecure = os.getenv("ARC_AGI_INSECURE_SSL", "").lower() == "true"
     if insecure:
         kwargs["verify"] = False
     
     # Use our custom transport if not explicitly overridden
     if "transport" not in kwargs:
-        kwargs["transport"] = KeepAliveTransport(verify=kwargs.get("verify", True))
+        kwargs["transport"] = transport_cls(verify=kwargs.get("verify", True))
         # Remove verify from kwargs as it is now passed to transport
         if "verify" in kwargs:
             del kwargs["verify"]
+    return kwargs
+
+def get_http_client(**kwargs) -> httpx.Client:
+    """Returns a shared httpx client, potentially with insecure SSL if configured."""
+    return httpx.Client(**_prepare_http_client_kwargs(kwargs, KeepAliveTransport))
 
-    return httpx.Client(**kwargs)
+def get_async_http_client(**kwargs) -> httpx.AsyncClient:
+    """Async counterpart of get_http_client for the asyncio provider path."""
+    return httpx.AsyncClient(**_prepare_http_client_kwargs(kwargs, AsyncKeepAliveTransport))
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Send ARC-AGI tasks to OpenAI.")
@@ -0,0 +1,100 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from src.cancellation import CancellationToken
+
+# Time limits of a batch run and of each task:test unit. A Deadline is an absolute wall-clock time,
+# so the run's deadline is handed to worker processes as is. Steps cancel their model runs when
+# their deadline passes (see cancel_at); provider calls size their own timeouts to what is left
+# of the deadline of the run they serve, found through deadline_scope.
+
+# Shortest timeout given to a provider call, however little time is left
+MIN_CALL_TIMEOUT_S = 1.0
+
+class Deadline:
+    """A wall-clock time (time.time) by which work has to finish; at=None is no limit."""
+
+    def __init__(self, at: Optional[float] = None):
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds: float, within: Optional["Deadline"] = None) -> "Deadline":
+        """seconds from now, or the earlier deadline within."""
+        at = time.time() + seconds
+        if within is not None and within.at is not None:
+            at = min(at, within.at)
+        return cls(at)
+
+    @property
+    def bounded(self) -> bool:
+        return self.at is not None
+
+    def remaining(self) -> float:
+        if self.at is None:
+            return float("inf")
+        return max(0.0, self.at - time.time())
+
+    def expired(self) -> bool:
+        return self.at is not None and time.time() >= self.at
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """The deadline seconds earlier, keeping that much time back for the work that follows."""
+        if self.at is None:
+            return self
+        return Deadline(self.at - seconds)
+
+    def cap(self, timeout: float) -> float:
+        """timeout, shortened to the time left (but at least MIN_CALL_TIMEOUT_S)."""
+        return max(MIN_CALL_TIMEOUT_S, min(timeout, self.remaining()))
+
+    def __repr__(self) -> str:
+        if self.at is None:
+            return "Deadline(unlimited)"
+        return f"Deadline({self.remaining():.0f}s left)"
+
+# Deadline of the model run executing in this context
+_DEADLINE: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[None]:
+    """Runs the enclosed model calls under deadline. None keeps the enclosing scope's deadline."""
+    if deadline is None:
+        yield
+        return
+    ctx = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(ctx)
+
+def current_deadline() -> Optional[Deadline]:
+    return _DEADLINE.get()
+
+def call_timeout(seconds: float) -> float:
+    """A provider call's timeout of seconds, capped by the current run's deadline."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return seconds
+    return deadline.cap(seconds)
+
+@contextmanager
+def cancel_at(token: Optional[CancellationToken], deadline: Optional[Deadline]) -> Iterator[Optional[CancellationToken]]:
+    """
+    Cancels token when deadline passes while enclosed; yields the token to use.
+    A bounded deadline without a token gets a new one, so the enclosed runs can still be stopped.
+    """
+    if deadline is None or not deadline.bounded:
+        yield token
+        return
+    if token is None:
+        token = CancellationToken()
+    timer = threading.Timer(deadline.remaining(), token.cancel, args=("deadline reached",))
+    timer.daemon = True
+    timer.start()
+    try:
+        yield token
+    finally:
+        timer.cancel()
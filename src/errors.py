@@ -15,6 +15,12 @@ class RateLimitProviderError(RetryableProviderError):
     Specific error for 429 Rate Limits, allowing for higher retry counts.
     """
 
+class CircuitOpenError(RetryableProviderError):
+    """
+    The provider/model circuit stayed open longer than the caller was willing to wait.
+    Not retried: the circuit already represents the provider's recent failures.
+    """
+
 class NonRetryableProviderError(ProviderError):
     """
     Terminal errors that should not be retried.
@@ -26,3 +32,9 @@ class UnknownProviderError(RetryableProviderError):
     The catch-all for unclassified exceptions.
     Action: RETRY, but log prominently.
     """
+
+class RunCancelledError(ARCError):
+    """
+    The model run was cancelled by its step (e.g. the step's consensus was already decided).
+    Not a provider failure: never retried, and not counted against circuits or keys.
+    """
@@ -0,0 +1,185 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from src.logging import get_log_dir
+from src.sandbox import _SANDBOX_DRIVER, is_batch_failure, run_untrusted_code_batch
+
+# Persistent cache of sandbox results, keyed by (AST-normalized code, input grid).
+# Lives next to the step logs so reruns of the same task reuse earlier executions.
+CACHE_FILENAME = "sandbox_cache.sqlite"
+
+# Results that depend on machine load or sandbox health rather than on the code itself.
+_UNCACHEABLE_PREFIXES = (
+    "TIMEOUT_EXPIRED",
+    "System Error in Sandbox",
+    "Subprocess crashed",
+    "Invalid JSON output",
+    "Empty output",
+)
+
+# Bump the cache key whenever the execution environment changes.
+_DRIVER_HASH = hashlib.sha256(_SANDBOX_DRIVER.encode("utf-8")).hexdigest()[:16]
+
+_EXEC_CACHE_ENABLED = os.getenv("ARC_AGI_EXEC_CACHE", "true").lower() == "true"
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED_PATHS = set()
+
+def set_exec_cache_enabled(enabled: bool):
+    global _EXEC_CACHE_ENABLED
+    _EXEC_CACHE_ENABLED = enabled
+
+def get_exec_cache_enabled() -> bool:
+    return _EXEC_CACHE_ENABLED
+
+def normalize_code_hash(code: str) -> str:
+    """
+    Hashes the code's AST so whitespace, comments and formatting differences share one entry.
+    Code that does not parse is hashed verbatim (it still fails the same way every time).
+    """
+    try:
+        normalized = ast.dump(ast.parse(code))
+    except (SyntaxError, ValueError):
+        normalized = "RAW:" + code
+    return hashlib.sha256(f"{_DRIVER_HASH}:{normalized}".encode("utf-8")).hexdigest()
+
+def input_hash(input_data: Any) -> str:
+    data = json.dumps(input_data, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def _cache_path(log_dir: str = None) -> Path:
+    return Path(log_dir if log_dir is not None else get_log_dir()) / CACHE_FILENAME
+
+def _connect(path: Path) -> sqlite3.Connection:
+    key = str(path)
+    if key not in _INITIALIZED_PATHS:
+        path.parent.mkdir(exist_ok=True, parents=True)
+    conn = sqlite3.connect(key, timeout=30)
+    if key not in _INITIALIZED_PATHS:
+        with _INIT_LOCK:
+            if key not in _INITIALIZED_PATHS:
+                # WAL lets the task processes read while another one writes
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS exec_cache ("
+                    "key TEXT PRIMARY KEY, success INTEGER NOT NULL, result TEXT NOT NULL, "
+                    "logs TEXT, created_at REAL NOT NULL)"
+                )
+                conn.commit()
+                _INITIALIZED_PATHS.add(key)
+    return conn
+
+def _is_cacheable(result: Tuple[bool, Any, str]) -> bool:
+    success, value, _ = result
+    if success:
+        return True
+    return not str(value).startswith(_UNCACHEABLE_PREFIXES)
+
+def _lookup(path: Path, keys: List[str]) -> dict:
+    found = {}
+    if not keys:
+        return found
+    conn = _connect(path)
+    try:
+        placeholders = ",".join("?" for _ in keys)
+        rows = conn.execute(
+            f"SELECT key, success, result, logs FROM exec_cache WHERE key IN ({placeholders})", keys
+        ).fetchall()
+    finally:
+        conn.close()
+    for key, success, result, logs in rows:
+        found[key] = (bool(success), json.loads(result), logs or "")
+    return found
+
+def _store(path: Path, entries: List[Tuple[str, Tuple[bool, Any, str]]]):
+    if not entries:
+        return
+    now = time.time()
+    rows = [
+        (key, int(success), json.dumps(value), logs, now)
+        for key, (success, value, logs) in entries
+    ]
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO exec_cache (key, success, result, logs, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    finally:
+        conn.close()
+
+def run_cached_batch(code: str, inputs: List[Any], expected: Optional[List[Any]] = None,
+                     timeout_s: float = 10.0, fail_fast: bool = False,
+                     log_dir: str = None) -> Tuple[List[Tuple[bool, Any, str]], dict]:
+    """
+    Drop-in for run_untrusted_code_batch that skips sandbox work for (code, input) pairs
+    already executed in this log directory.
+    Returns: (results, {"hits": int, "misses": int})
+    """
+    inputs = [x.tolist() if isinstance(x, np.ndarray) else x for x in inputs]
+    if expected is not None:
+        expected = [x.tolist() if isinstance(x, np.ndarray) else x for x in expected]
+
+    if not _EXEC_CACHE_ENABLED or not inputs:
+        results = run_untrusted_code_batch(code, inputs, expected=expected, timeout_s=timeout_s, fail_fast=fail_fast)
+        return results, {"hits": 0, "misses": len(results)}
+
+    path = _cache_path(log_dir)
+    code_hash = normalize_code_hash(code)
+    keys = [f"{code_hash}:{input_hash(x)}" for x in inputs]
+
+    try:
+        cached = _lookup(path, keys)
+    except Exception as e:
+        print(f"DEBUG: Exec cache lookup failed ({path}): {e}", file=sys.stderr)
+        cached = {}
+
+    # With fail_fast, nothing after a cached failure needs to run
+    limit = len(inputs)
+    if fail_fast:
+        for i, key in enumerate(keys):
+            if key in cached and is_batch_failure(cached[key], expected, i):
+                limit = i + 1
+                break
+
+    miss_indices = [i for i in range(limit) if keys[i] not in cached]
+    fresh = {}
+    if miss_indices:
+        miss_results = run_untrusted_code_batch(
+            code,
+            [inputs[i] for i in miss_indices],
+            expected=[expected[i] for i in miss_indices] if expected is not None else None,
+            timeout_s=timeout_s,
+            fail_fast=fail_fast
+        )
+        fresh = dict(zip(miss_indices, miss_results))
+        try:
+            _store(path, [(keys[i], r) for i, r in fresh.items() if _is_cacheable(r)])
+        except Exception as e:
+            print(f"DEBUG: Exec cache store failed ({path}): {e}", file=sys.stderr)
+
+    results = []
+    hits = 0
+    for i in range(limit):
+        if keys[i] in cached:
+            results.append(cached[keys[i]])
+            hits += 1
+        elif i in fresh:
+            results.append(fresh[i])
+        else:
+            # The sandbox batch stopped early on an earlier failure
+            break
+        if fail_fast and is_batch_failure(results[-1], expected, i):
+            break
+
+    return results, {"hits": hits, "misses": len(fresh)}
@@ -5,32 +5,64 @@ import os
 from pathlib import Path
 from src.solver_engine import run_solver_mode
 from src.logging import PrefixedStdout
-from src.parallel import set_rate_limit_scaling
+from src.parallel import set_rate_limit_scaling, set_shared_rate_limiters, set_shared_circuit_breakers, set_shared_provider_health
 from src.llm_utils import set_retries_enabled
+from src.sandbox import set_parallel_batch_enabled
+from src.async_runtime import set_async_providers_enabled
+from src.providers.prompt_caching import set_prompt_caching_enabled
+from src.llm_transport import set_llm_transport
+from src.deadline import Deadline
+
+# Per task:test unit; when it runs out the unit stops searching and submits what it has
+TASK_TIMEOUT_S = 28800
+# How long after a deadline the hard kills (the watchdog here, the batch monitor) step in
+HARD_KILL_GRACE_S = 600
 
 def _hard_timeout_handler(signum, frame):
     print(f"\n!!! CRITICAL WATCHDOG TIMEOUT !!!\nProcess {os.getpid()} exceeded global time limit. Killing.", file=sys.stderr)
     os._exit(1) # Hard kill process, skipping cleanup handlers
 
-def execute_task(args, task_path: Path, test_index: int, run_timestamp: str, rate_limit_scale: float = 1.0, answer_path: Path = None, status_counters=None, task_data: dict = None):
+def execute_task(args, task_path: Path, test_index: int, run_timestamp: str, rate_limit_scale: float = 1.0, answer_path: Path = None, status_counters=None, task_data: dict = None, shared_limiters: dict = None, shared_breakers=None, shared_health=None, run_deadline: Deadline = None):
     if status_counters:
         running, remaining, finished, lock = status_counters
         with lock:
             running.value += 1
             remaining.value -= 1
 
-    # Install Watchdog (8 hours hard limit per task)
+    # The unit finalizes by its deadline (8 hours, or the end of the run if sooner);
+    # the watchdog only kills a unit that overruns it by HARD_KILL_GRACE_S
+    deadline = Deadline.after(TASK_TIMEOUT_S, within=run_deadline)
     old_handler = signal.signal(signal.SIGALRM, _hard_timeout_handler)
-    signal.alarm(28800) 
+    signal.alarm(int(deadline.remaining()) + HARD_KILL_GRACE_S)
 
     try:
         # Propagate settings to worker process
         if args.disable_retries:
             set_retries_enabled(False)
 
-        # Apply rate limit scaling (only affects this process)
-        if rate_limit_scale != 1.0:
+        if args.parallel_verification:
+            set_parallel_batch_enabled(True)
+
+        if args.async_providers:
+            set_async_providers_enabled(True)
+
+        if args.prompt_caching:
+            set_prompt_caching_enabled(True)
+
+        if args.llm_transport != "live":
+            set_llm_transport(args.llm_transport, args.replay_dir, args.replay_speed)
+
+        # Use the batch-wide token buckets, or fall back to scaling this process's own limiters
+        if shared_limiters:
+            set_shared_rate_limiters(shared_limiters)
+        elif rate_limit_scale != 1.0:
             set_rate_limit_scaling(rate_limit_scale)
+
+        if shared_breakers is not None:
+            set_shared_circuit_breakers(shared_breakers)
+
+        if shared_health is not None:
+            set_shared_provider_health(shared_health)
             
         task_id = task_path.stem if task_path else "unknown"
         
@@ -107,7 +139,9 @@ def execute_task(args, task_path: Path, test_index: int, run_timestamp: str, rat
                     step1_models=args.step1_models,
                     disable_step_1_standard_models=args.disable_step_1_standard_models,
                     logs_directory=args.logs_directory,
-                    task_data=task_data
+                    task_data=task_data,
+                    resume=bool(args.resume),
+                    deadline=deadline
                 )
             except Exception as e:
                 raise e
@@ -1,8 +1,68 @@
-from typing import List, Optional
-import re
+from typing import Any, List, Optional
+import numpy as np
+from src.grid_parsing import iter_grid_blocks
 
 Grid = List[List[int]]
 
+def _freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class FrozenGrid:
+    """
+    Immutable, hashable grid value used as a dict key for candidate deduplication.
+
+    Rectangular grids of integers in 0..255 are packed into uint8 bytes with a cached hash,
+    so hashing and comparison never walk nested Python lists. Anything else (ragged,
+    out-of-range, non-numeric) falls back to a nested-tuple key. Equality follows
+    tuple(tuple(row) for row in grid) semantics, and repr() matches that tuple's repr
+    so logs keyed by str(key) look the same as before.
+    """
+    __slots__ = ("shape", "_data", "_key", "_hash")
+
+    def __init__(self, grid: Any):
+        self.shape = None
+        self._data = None
+        arr = None
+        try:
+            arr = np.asarray(grid)
+        except (ValueError, TypeError):
+            pass
+
+        if arr is not None and arr.ndim == 2 and arr.dtype.kind in "biuf":
+            packed = arr.astype(np.uint8)
+            if np.array_equal(packed, arr):
+                self.shape = arr.shape
+                self._data = packed.tobytes()
+
+        if self._data is not None:
+            self._key = (self.shape, self._data)
+        else:
+            self._key = _freeze(grid)
+        self._hash = hash(self._key)
+
+    @classmethod
+    def from_json(cls, grid: Grid) -> "FrozenGrid":
+        return cls(grid)
+
+    def to_list(self) -> Grid:
+        """Plain List[List[int]] for JSON / prompts."""
+        if self._data is None:
+            return [list(row) for row in self._key]
+        return np.frombuffer(self._data, dtype=np.uint8).reshape(self.shape).tolist()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, FrozenGrid):
+            return NotImplemented
+        return self._hash == other._hash and self._key == other._key
+
+    def __repr__(self) -> str:
+        return repr(tuple(tuple(row) for row in self.to_list()))
+
 def format_grid(grid: Grid) -> str:
     """Formats a grid as CSV."""
     if grid is None:
@@ -18,140 +78,18 @@ def parse_grid_from_text(text: str) -> Grid:
     3.  Treat markdown code fences (```) as HARD separators that break blocks.
     4.  Allow small gaps (blank lines/text) within a block ONLY if no hard separators are encountered.
     5.  Return the LAST valid block found, assuming it is the final answer.
-    """
-    text = text.strip()
-    lines = text.splitlines()
-    
-    candidate_rows = []
-    hard_separators = [] # Track indices of lines that are hard separators
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # Hard Separator Detection
-        if stripped.startswith("```"):
-            candidate_rows.append(None)
-            hard_separators.append(i)
-            continue
-            
-        if not stripped: 
-            candidate_rows.append(None)
-            continue
-
-        # Ignore explicit row labels which confuse the parser (e.g. "Row 1:", "Row 10")
-        # if they stand alone on a line.
-        if re.match(r'^Row\s+\d+:?$', stripped, re.IGNORECASE):
-            candidate_rows.append(None)
-            continue
-
-        # Ignore markdown list items (bullet points) as they are usually descriptions, not raw data
-        if stripped.startswith(("-", "*", "+")):
-            candidate_rows.append(None)
-            continue
-            
-        row = None
-        # CSV parsing
-        try:
-            # Pre-clean: remove ` [ ] and spaces to handle conversational formatting
-            # Replace with space to prevent merging (e.g. "10.`8" -> "10. 8")
-            clean_line = stripped.replace("`", " ").replace("[", " ").replace("]", " ").strip()
-            
-            # Handle numbered lists (e.g. "1. 8,8,8" or "1) 8,8,8")
-            numbered_list_match = re.match(r'^\d+[\.\)]\s+', clean_line)
-            if numbered_list_match:
-                clean_line = clean_line[numbered_list_match.end():]
-
-            tokens = clean_line.split(",")
-            # Allow for spaces around numbers just in case
-            if len(tokens) > 0 and all(t.strip().isdigit() for t in tokens):
-                row = [int(t.strip()) for t in tokens]
-            else:
-                # Fallback: Parsing lines like "Row 1: 8,8,8..." or "Output: 1,2,3"
-                # 1. Try splitting by colon and taking the last part
-                if ":" in clean_line:
-                    clean_line = clean_line.split(":")[-1].strip()
-                
-                # 2. Fallback: Try to find the first digit and parse from there
-                match = re.search(r'\d', clean_line)
-                if match:
-                    sub = clean_line[match.start():]
-                    
-                    # Simple approach: Slice from first digit to last digit
-                    last_digit_idx = -1
-                    for idx, char in enumerate(clean_line):
-                        if char.isdigit():
-                            last_digit_idx = idx
-                    
-                    if last_digit_idx != -1 and last_digit_idx >= match.start():
-                        candidate_sub = clean_line[match.start() : last_digit_idx + 1]
-                        sub_tokens = candidate_sub.split(",")
-                        if len(sub_tokens) > 1 and all(t.strip().isdigit() for t in sub_tokens):
-                             # Ensure the rest of the line doesn't contain alphabetic chars (noise)
-                             remainder = clean_line[last_digit_idx + 1:].strip()
-                             if not any(c.isalpha() for c in remainder):
-                                 row = [int(t.strip()) for t in sub_tokens]
-
-        except ValueError:
-            pass
-
-        candidate_rows.append(row)
 
-    # Block reconstruction
-    blocks = []
-    current_block = []
-    
-    # State tracking for the current block
-    current_block_start_index = -1
-    last_row_index = -1
-    
-    MAX_GAP = 2 # Allow a small gap of text/newlines within a grid (e.g. noise) 
-    
-    for i, row in enumerate(candidate_rows):
-        if row is not None:
-            # We have a grid row
-            if not current_block:
-                # Start new block
-                current_block = [row]
-                current_block_start_index = i
-                last_row_index = i
-            else:
-                # Existing block. Check compatibility.
-                
-                # 1. Check for Hard Separators between last row and this row
-                has_hard_sep = any(last_row_index < sep_idx < i for sep_idx in hard_separators)
-                
-                # 2. Check for Gap Size
-                gap_size = i - last_row_index - 1
-                
-                # 3. Check Width Compatibility
-                # Allow significant variation (up to 5 columns) to handle model typos (extra commas, ragged rows).
-                # We rely on gaps/separators to distinguish distinct grids.
-                width_diff = abs(len(row) - len(current_block[0]))
-                width_match = width_diff <= 5
-                
-                if has_hard_sep or gap_size > MAX_GAP or not width_match:
-                    # Check for Exact Duplication before finalizing
-                    # If the NEW block we are about to start is identical to the CURRENT block,
-                    # we might be seeing a repetition.
-                    # However, we can't see the future rows yet.
-                    # Instead, let's look at the gap logic:
-                    # If we are here, we are SPLITTING.
-                    # So blocks.append(current_block) happens.
-                    blocks.append(current_block)
-                    current_block = [row]
-                    current_block_start_index = i
-                    last_row_index = i
-                else:
-                    # Extend current block
-                    current_block.append(row)
-                    last_row_index = i                    
-    if current_block: blocks.append(current_block)
+    See src.grid_parsing.iter_grid_blocks for the shared single-pass tokenizer.
+    """
+    last_block = None
+    for block in iter_grid_blocks(text):
+        last_block = block
     
-    if not blocks:
+    if last_block is None:
         raise ValueError("Could not parse grid")
     
     # Return the last block found
-    return blocks[-1]
+    return last_block
 
 def verify_prediction(predicted: Grid, expected: Optional[Grid]) -> Optional[bool]:
     if expected is None:
@@ -0,0 +1,117 @@
+import re
+from typing import Iterator, List, Optional
+
+Grid = List[List[int]]
+
+# Precompiled patterns shared by every parse
+_ROW_LABEL_RE = re.compile(r'^Row\s+\d+:?$', re.IGNORECASE)
+_NUMBERED_LIST_RE = re.compile(r'^\d+[\.\)]\s+')
+_DIGIT_RE = re.compile(r'\d')
+# Plain CSV row ("8, 8,8"): the common case, accepted without per-token checks
+_CSV_ROW_RE = re.compile(r'\s*\d+\s*(?:,\s*\d+\s*)*')
+_CLEAN_TABLE = str.maketrans({"`": " ", "[": " ", "]": " "})
+
+MAX_GAP = 2 # Allow a small gap of text/newlines within a grid (e.g. noise)
+MAX_WIDTH_DIFF = 5 # Allow ragged rows from model typos; gaps/separators split distinct grids
+
+def _all_digit_tokens(tokens: List[str]) -> bool:
+    for t in tokens:
+        if not t.strip().isdigit():
+            return False
+    return True
+
+def parse_row(stripped: str) -> Optional[List[int]]:
+    """
+    Parses one stripped, non-empty, non-label line into a grid row, or None if it is not a row.
+    Accepts "8,8,8", "1. 8,8,8", "`[8, 8, 8]`", and "Row 1: 8,8,8" style lines.
+    """
+    if _CSV_ROW_RE.fullmatch(stripped):
+        return list(map(int, stripped.split(",")))
+
+    # A row always contains a decimal digit; skip prose lines without any work
+    if _DIGIT_RE.search(stripped) is None:
+        return None
+
+    try:
+        # Pre-clean: remove ` [ ] to handle conversational formatting.
+        # Replace with space to prevent merging (e.g. "10.`8" -> "10. 8")
+        clean_line = stripped.translate(_CLEAN_TABLE).strip()
+
+        # Handle numbered lists (e.g. "1. 8,8,8" or "1) 8,8,8")
+        numbered_list_match = _NUMBERED_LIST_RE.match(clean_line)
+        if numbered_list_match:
+            clean_line = clean_line[numbered_list_match.end():]
+
+        tokens = clean_line.split(",")
+        if _all_digit_tokens(tokens):
+            return [int(t.strip()) for t in tokens]
+
+        # Fallback: lines like "Row 1: 8,8,8..." or "Output: 1,2,3"
+        if ":" in clean_line:
+            clean_line = clean_line.split(":")[-1].strip()
+
+        match = _DIGIT_RE.search(clean_line)
+        if match is None:
+            return None
+        start = match.start()
+
+        # Slice from first digit to last digit
+        last_digit_idx = len(clean_line) - 1
+        while last_digit_idx >= start and not clean_line[last_digit_idx].isdigit():
+            last_digit_idx -= 1
+
+        sub_tokens = clean_line[start:last_digit_idx + 1].split(",")
+        if len(sub_tokens) > 1 and _all_digit_tokens(sub_tokens):
+            # Ensure the rest of the line doesn't contain alphabetic chars (noise)
+            remainder = clean_line[last_digit_idx + 1:]
+            if not any(c.isalpha() for c in remainder):
+                return [int(t.strip()) for t in sub_tokens]
+    except ValueError:
+        pass
+    return None
+
+def iter_grid_blocks(text: str) -> Iterator[Grid]:
+    """
+    Single pass over the text yielding every CSV-like grid block, in order, as soon as it closes.
+
+    - Candidate rows are lines containing only comma-separated numbers (see parse_row).
+    - Consecutive rows are grouped into blocks.
+    - Markdown code fences (```) are HARD separators that break blocks.
+    - Small gaps (up to MAX_GAP lines of blank/text) are allowed within a block.
+    - A row whose width differs by more than MAX_WIDTH_DIFF from the block's first row starts a new block.
+    """
+    current_block = []
+    last_row_index = -1
+    separator_since_last_row = False
+
+    for i, line in enumerate(text.strip().splitlines()):
+        stripped = line.strip()
+
+        if stripped.startswith("```"):
+            separator_since_last_row = True
+            continue
+        if not stripped:
+            continue
+        # Ignore explicit row labels which confuse the parser (e.g. "Row 1:", "Row 10")
+        if stripped[0] in "rR" and _ROW_LABEL_RE.match(stripped):
+            continue
+        # Ignore markdown list items (bullet points) as they are usually descriptions, not raw data
+        if stripped.startswith(("-", "*", "+")):
+            continue
+
+        row = parse_row(stripped)
+        if row is None:
+            continue
+
+        if current_block:
+            gap_size = i - last_row_index - 1
+            width_match = abs(len(row) - len(current_block[0])) <= MAX_WIDTH_DIFF
+            if separator_since_last_row or gap_size > MAX_GAP or not width_match:
+                yield current_block
+                current_block = []
+        current_block.append(row)
+        last_row_index = i
+        separator_since_last_row = False
+
+    if current_block:
+        yield current_block
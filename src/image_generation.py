@@ -1,9 +1,11 @@
-import matplotlib.pyplot as plt
-from matplotlib import colors
 import numpy as np
 import json
 import os
-import matplotlib.patheffects as path_effects
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
 from src.tasks import Task
 from typing import List, Tuple
 import logging
@@ -11,56 +13,173 @@ import logging
 logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
 
 # Define a consistent color map for ARC tasks
-CMAP = colors.ListedColormap([
+PALETTE_HEX = [
     '#000000', '#0074D9', '#FF4136', '#2ECC40', '#FFDC00',
     '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25'
-])
-NORM = colors.BoundaryNorm(list(range(11)), CMAP.N)
+]
+PALETTE = np.array([[int(h[i:i + 2], 16) for i in (1, 3, 5)] for h in PALETTE_HEX], dtype=np.uint8)
+BACKGROUND = (0xF8, 0xF8, 0xF4)
 CELL_PIXELS = 15
 DPI = 100
 PADDING_FACTOR = 1.2
 
-def _draw_cartoon_grid(ax, grid, title):
-    rows, cols = grid.shape
-    ax.imshow(grid, cmap=CMAP, norm=NORM, interpolation='nearest', zorder=0, aspect='equal')
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_title(title, fontsize=24, fontweight='bold', pad=20)
-
-    # Custom path effects for borders
-    border_width = 1
-    border_color = 'black'
-    effects = [path_effects.withStroke(linewidth=1.5, foreground='w')]
-
-    for r in range(rows + 1):
-        for c in range(cols):
-            if r == 0 or r == rows or (r < rows and grid[r-1, c] != grid[r, c]):
-                ax.plot([c - 0.5, c + 0.5], [r - 0.5, r - 0.5], 
-                        color=border_color, lw=border_width, zorder=10, path_effects=effects)
-    for c in range(cols + 1):
-        for r in range(rows):
-            if c == 0 or c == cols or (c < cols and grid[r, c-1] != grid[r, c]):
-                ax.plot([c - 0.5, c - 0.5], [r - 0.5, r + 0.5], 
-                        color=border_color, lw=border_width, zorder=10, path_effects=effects)
+# Raster layout (pixels)
+MARGIN = 30
+TITLE_HEIGHT = 40
+ROW_GAP = 40
+ARROW_GAP = 90
+FONT_SIZE = 24
 
-def generate_and_save_image(task: Task, output_path: str) -> str:
+# When enabled, images are rasterized directly with NumPy/PIL instead of a matplotlib xkcd figure
+_FAST_IMAGES_ENABLED = os.getenv("ARC_AGI_FAST_IMAGES", "true").lower() == "true"
+
+# Bump when the rendering changes so cached PNGs of an older layout are not reused
+RENDER_VERSION = 1
+# Rendered PNGs kept in memory, keyed by task content hash
+MAX_CACHED_IMAGES = 64
+
+_IMAGE_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_IMAGE_CACHE_LOCK = threading.Lock()
+
+def set_fast_images_enabled(enabled: bool):
+    global _FAST_IMAGES_ENABLED
+    _FAST_IMAGES_ENABLED = enabled
+
+def get_fast_images_enabled() -> bool:
+    return _FAST_IMAGES_ENABLED
+
+def _train_pairs(task: Task) -> List[Tuple[np.ndarray, np.ndarray]]:
+    return [(np.array(ex.input), np.array(ex.output)) for ex in task.train]
+
+def task_image_key(task: Task) -> str:
+    """Content hash of everything the image shows (train pairs) plus the renderer in use."""
+    payload = json.dumps({
+        "renderer": f"raster-{RENDER_VERSION}" if _FAST_IMAGES_ENABLED else "matplotlib",
+        "train": [[np.asarray(ex.input).tolist(), np.asarray(ex.output).tolist()] for ex in task.train],
+    }, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _load_font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+def rasterize_grid(grid: np.ndarray, cell: int = CELL_PIXELS) -> np.ndarray:
     """
-    Generates and saves a cartoon-style visualization of the training pairs for a given ARC task.
+    Renders one grid into an RGB buffer: palette colors upscaled to cell x cell blocks, with
+    black borders (and a white halo) around the grid and wherever neighbouring colors differ.
     """
-    output_dir = os.path.dirname(output_path)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    grid = np.clip(np.asarray(grid, dtype=np.int64), 0, len(PALETTE) - 1)
+    rows, cols = grid.shape
+    img = PALETTE[grid].repeat(cell, axis=0).repeat(cell, axis=1)
+    if rows == 0 or cols == 0:
+        return img
+    height, width = rows * cell, cols * cell
+
+    # Horizontal boundaries: row r sits above cell row r (r == rows is the bottom edge)
+    h_edges = np.ones((rows + 1, cols), dtype=bool)
+    h_edges[1:rows] = grid[1:] != grid[:-1]
+    # Vertical boundaries: column c sits left of cell column c
+    v_edges = np.ones((rows, cols + 1), dtype=bool)
+    v_edges[:, 1:cols] = grid[:, 1:] != grid[:, :-1]
+
+    h_r, h_c = np.nonzero(h_edges.repeat(cell, axis=1))
+    h_y = np.minimum(h_r * cell, height - 1)
+    v_r, v_c = np.nonzero(v_edges.repeat(cell, axis=0))
+    v_x = np.minimum(v_c * cell, width - 1)
+
+    for offset in (-1, 1):
+        img[np.clip(h_y + offset, 0, height - 1), h_c] = 255
+        img[v_r, np.clip(v_x + offset, 0, width - 1)] = 255
+    img[h_y, h_c] = 0
+    img[v_r, v_x] = 0
+    return img
+
+def _draw_arrow(draw: ImageDraw.ImageDraw, x0: int, x1: int, y: int):
+    head = 22
+    draw.rectangle([x0, y - 6, x1 - head, y + 6], fill="black")
+    draw.polygon([(x1 - head, y - 16), (x1, y), (x1 - head, y + 16)], fill="black")
+
+def render_task_image(task: Task) -> Image.Image:
+    """Lays out every train pair as 'Input i -> Output i' rows on one canvas."""
+    pairs = _train_pairs(task)
+    cell = CELL_PIXELS
+    row_heights = [max(i.shape[0], o.shape[0]) * cell for i, o in pairs]
+    row_widths = [(i.shape[1] + o.shape[1]) * cell + ARROW_GAP for i, o in pairs]
+
+    width = 2 * MARGIN + max(row_widths, default=0)
+    height = 2 * MARGIN + sum(TITLE_HEIGHT + h for h in row_heights) + ROW_GAP * max(len(pairs) - 1, 0)
+    canvas = np.empty((height, width, 3), dtype=np.uint8)
+    canvas[:] = BACKGROUND
+
+    placements = []
+    y = MARGIN
+    for idx, ((input_grid, output_grid), row_h) in enumerate(zip(pairs, row_heights)):
+        top = y + TITLE_HEIGHT
+        x_in = MARGIN
+        x_out = MARGIN + input_grid.shape[1] * cell + ARROW_GAP
+        for grid, x, title in ((input_grid, x_in, f"Input {idx + 1}"), (output_grid, x_out, f"Output {idx + 1}")):
+            tile = rasterize_grid(grid, cell)
+            g_top = top + (row_h - tile.shape[0]) // 2
+            canvas[g_top:g_top + tile.shape[0], x:x + tile.shape[1]] = tile
+            placements.append((title, x, tile.shape[1], top))
+        placements.append(("arrow", x_in + input_grid.shape[1] * cell, x_out, top + row_h // 2))
+        y = top + row_h + ROW_GAP
 
-    train_tasks = [(np.array(ex.input), np.array(ex.output)) for ex in task.train]
+    image = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(image)
+    font = _load_font(FONT_SIZE)
+    for label, x, extent, top in placements:
+        if label == "arrow":
+            _draw_arrow(draw, x + 12, extent - 12, top)
+            continue
+        text_w = draw.textlength(label, font=font)
+        draw.text((x + (extent - text_w) / 2, top - TITLE_HEIGHT + 4), label, fill="black", font=font)
+    return image
+
+def _render_matplotlib(task: Task, output_path: str):
+    """Original cartoon-style rendering (matplotlib xkcd mode). Slow; kept as a fallback."""
+    import matplotlib.pyplot as plt
+    from matplotlib import colors
+    import matplotlib.patheffects as path_effects
+
+    cmap = colors.ListedColormap(PALETTE_HEX)
+    norm = colors.BoundaryNorm(list(range(11)), cmap.N)
+
+    def _draw_cartoon_grid(ax, grid, title):
+        rows, cols = grid.shape
+        ax.imshow(grid, cmap=cmap, norm=norm, interpolation='nearest', zorder=0, aspect='equal')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_title(title, fontsize=24, fontweight='bold', pad=20)
+
+        # Custom path effects for borders
+        border_width = 1
+        border_color = 'black'
+        effects = [path_effects.withStroke(linewidth=1.5, foreground='w')]
+
+        for r in range(rows + 1):
+            for c in range(cols):
+                if r == 0 or r == rows or (r < rows and grid[r-1, c] != grid[r, c]):
+                    ax.plot([c - 0.5, c + 0.5], [r - 0.5, r - 0.5],
+                            color=border_color, lw=border_width, zorder=10, path_effects=effects)
+        for c in range(cols + 1):
+            for r in range(rows):
+                if c == 0 or c == cols or (c < cols and grid[r, c-1] != grid[r, c]):
+                    ax.plot([c - 0.5, c - 0.5], [r - 0.5, r + 0.5],
+                            color=border_color, lw=border_width, zorder=10, path_effects=effects)
+
+    train_tasks = _train_pairs(task)
     num_pairs = len(train_tasks)
-    
+
     height_ratios = [max(i.shape[0], o.shape[0]) for i, o in train_tasks]
     total_height_cells = sum(height_ratios)
     max_width_cells = max([i.shape[1] + o.shape[1] for i, o in train_tasks])
 
     fig_height_px = total_height_cells * CELL_PIXELS * PADDING_FACTOR
     fig_width_px = max_width_cells * CELL_PIXELS * PADDING_FACTOR
-    
+
     with plt.xkcd():
         fig = plt.figure(figsize=(fig_width_px / DPI, fig_height_px / DPI))
         fig.patch.set_facecolor('#F8F8F4')
@@ -88,4 +207,61 @@ def generate_and_save_image(task: Task, output_path: str) -> str:
         plt.savefig(output_path, dpi=DPI)
         plt.close(fig)
 
+def _cache_dir(output_dir: str) -> str:
+    return os.path.join(output_dir, ".image_cache")
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _cached_png(key: str, cache_file: str):
+    with _IMAGE_CACHE_LOCK:
+        data = _IMAGE_CACHE.get(key)
+        if data is not None:
+            _IMAGE_CACHE.move_to_end(key)
+            return data
+    # Another task worker process may already have rendered this task
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            return f.read()
+    return None
+
+def _remember_png(key: str, data: bytes):
+    with _IMAGE_CACHE_LOCK:
+        _IMAGE_CACHE[key] = data
+        _IMAGE_CACHE.move_to_end(key)
+        while len(_IMAGE_CACHE) > MAX_CACHED_IMAGES:
+            _IMAGE_CACHE.popitem(last=False)
+
+def generate_and_save_image(task: Task, output_path: str) -> str:
+    """
+    Generates and saves a cartoon-style visualization of the training pairs for a given ARC task.
+    Each distinct task is rendered once; later calls (other test indices, other processes of the
+    run) copy the cached PNG to output_path.
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+    key = task_image_key(task)
+    cache_dir = _cache_dir(output_dir or ".")
+    cache_file = os.path.join(cache_dir, f"{key}.png")
+
+    data = _cached_png(key, cache_file)
+    if data is None:
+        if _FAST_IMAGES_ENABLED:
+            buffer = io.BytesIO()
+            render_task_image(task).save(buffer, format="PNG")
+            data = buffer.getvalue()
+        else:
+            _render_matplotlib(task, output_path)
+            with open(output_path, "rb") as f:
+                data = f.read()
+        os.makedirs(cache_dir, exist_ok=True)
+        _atomic_write(cache_file, data)
+
+    _remember_png(key, data)
+    _atomic_write(output_path, data)
     return output_path
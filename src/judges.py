@@ -3,6 +3,9 @@ import re
 import time
 import sys
 from src.models import call_model, calculate_cost, parse_model_arg
+from src.parallel.worker_utils.tokens import acquire_rate_limit_token
+from src.parallel.scheduler import JUDGE_STEP
+from src.grid_parsing import iter_grid_blocks
 
 def extract_json(text):
     """
@@ -40,6 +43,8 @@ def extract_json(text):
 def run_judge(judge_name, prompt, judge_model, openai_client, anthropic_client, google_keys, result_container, verbose: int = 0, use_background: bool = False):
     timings = []
     try:
+        # Judges share the provider buckets, behind search and step 5 calls
+        acquire_rate_limit_token(judge_model, step_name=JUDGE_STEP)
         start_ts = time.perf_counter()
         response_obj = call_model(openai_client, anthropic_client, google_keys, prompt, judge_model, use_background=use_background, timing_tracker=timings)
         duration = time.perf_counter() - start_ts
@@ -85,92 +90,16 @@ def run_judge(judge_name, prompt, judge_model, openai_client, anthropic_client,
 def extract_all_grids(text):
     """
     Robustly extract all CSV-like grid blocks from text.
-    Replicates logic from src.grid.parse_grid_from_text but returns ALL blocks.
+    Uses the same tokenizer as src.grid.parse_grid_from_text but returns ALL blocks.
     """
     if not text:
         return []
-        
-    text = text.strip()
-    lines = text.splitlines()
-    
-    candidate_rows = []
-    hard_separators = []
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        if stripped.startswith("```"):
-            candidate_rows.append(None)
-            hard_separators.append(i)
-            continue
-        if not stripped:
-            candidate_rows.append(None)
-            continue
-        if re.match(r'^Row\s+\d+:?$', stripped, re.IGNORECASE):
-            candidate_rows.append(None)
-            continue
-        if stripped.startswith(("-", "*", "+")):
-            candidate_rows.append(None)
-            continue
-            
-        row = None
-        try:
-            clean_line = stripped.replace("`", " ").replace("[", " ").replace("]", " ").strip()
-            numbered_list_match = re.match(r'^\d+[\.\)]\s+', clean_line)
-            if numbered_list_match:
-                clean_line = clean_line[numbered_list_match.end():]
-
-            tokens = clean_line.split(",")
-            if len(tokens) > 0 and all(t.strip().isdigit() for t in tokens):
-                row = [int(t.strip()) for t in tokens]
-            else:
-                if ":" in clean_line:
-                    clean_line = clean_line.split(":")[-1].strip()
-                match = re.search(r'\d', clean_line)
-                if match:
-                    last_digit_idx = -1
-                    for idx, char in enumerate(clean_line):
-                        if char.isdigit():
-                            last_digit_idx = idx
-                    if last_digit_idx != -1 and last_digit_idx >= match.start():
-                        candidate_sub = clean_line[match.start() : last_digit_idx + 1]
-                        sub_tokens = candidate_sub.split(",")
-                        if len(sub_tokens) > 1 and all(t.strip().isdigit() for t in sub_tokens):
-                             remainder = clean_line[last_digit_idx + 1:].strip()
-                             if not any(c.isalpha() for c in remainder):
-                                 row = [int(t.strip()) for t in sub_tokens]
-        except ValueError:
-            pass
-        candidate_rows.append(row)
-
-    blocks = []
-    current_block = []
-    last_row_index = -1
-    MAX_GAP = 2 
-    
-    for i, row in enumerate(candidate_rows):
-        if row is not None:
-            if not current_block:
-                current_block = [row]
-                last_row_index = i
-            else:
-                has_hard_sep = any(last_row_index < sep_idx < i for sep_idx in hard_separators)
-                gap_size = i - last_row_index - 1
-                width_diff = abs(len(row) - len(current_block[0]))
-                width_match = width_diff <= 5
-                
-                if has_hard_sep or gap_size > MAX_GAP or not width_match:
-                    blocks.append(current_block)
-                    current_block = [row]
-                    last_row_index = i
-                else:
-                    current_block.append(row)
-                    last_row_index = i                    
-    if current_block: blocks.append(current_block)
-    return blocks
+    return list(iter_grid_blocks(text))
 
 def run_duo_pick_judge(prompt, judge_model, openai_client, anthropic_client, google_keys, result_container, verbose: int = 0, use_background: bool = False):
     timings = []
     try:
+        acquire_rate_limit_token(judge_model, step_name=JUDGE_STEP)
         start_ts = time.perf_counter()
         response_obj = call_model(openai_client, anthropic_client, google_keys, prompt, judge_model, use_background=use_background, timing_tracker=timings)
         duration = time.perf_counter() - start_ts
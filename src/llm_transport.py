@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import math
+import fcntl
+import random
+import asyncio
+import hashlib
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from src.types import ModelResponse
+from src.errors import NonRetryableProviderError
+
+# live: call the providers. record: call them and store every response.
+# replay: serve stored responses. synthetic: placeholder responses with modelled latency.
+TRANSPORT_MODES = ("live", "record", "replay", "synthetic")
+_MODE = os.getenv("ARC_AGI_LLM_TRANSPORT", "live").lower()
+# Where recordings are written and read (every *.jsonl file in it)
+_DIRECTORY = os.getenv("ARC_AGI_LLM_TRANSPORT_DIR", "llm_recordings/")
+# Offline responses wait latency / speed (recorded or modelled); 0 answers at once
+_SPEED = float(os.getenv("ARC_AGI_REPLAY_SPEED", "0"))
+_SEED = int(os.getenv("ARC_AGI_SYNTHETIC_SEED", "0"))
+
+# Synthetic latency when no recordings of the model exist: lognormal around this median
+SYNTHETIC_MEDIAN_S = 60.0
+SYNTHETIC_SIGMA = 0.6
+# Parses as a one-cell grid, and as a solver (identity) for codegen runs, so synthetic runs exercise the sandbox too
+SYNTHETIC_TEXT = "Synthetic response.\n\n```python\ndef solver(input_grid):\n    return input_grid\n```\n\n```\n0\n```"
+
+def set_llm_transport(mode: str, directory: str = None, speed: float = None, seed: int = None):
+    global _MODE, _DIRECTORY, _SPEED, _SEED
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown LLM transport '{mode}'. Choose from {TRANSPORT_MODES}")
+    _MODE = mode
+    if directory is not None:
+        _DIRECTORY = directory
+    if speed is not None:
+        _SPEED = speed
+    if seed is not None:
+        _SEED = seed
+    _STORE.reset()
+
+def get_llm_transport() -> str:
+    return _MODE
+
+def is_offline() -> bool:
+    """No provider is called (replay or synthetic): keys and provider rate limits are not needed."""
+    return _MODE in ("replay", "synthetic")
+
+def prompt_hash(prompt: str, return_strategy: bool = False) -> str:
+    material = str(prompt) + ("\x00strategy" if return_strategy else "")
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class RecordingStore:
+    """
+    Recorded responses by (prompt hash, model): the n-th call of a pair in this process gets the n-th
+    recording (cycling when there are fewer). Loaded lazily from every *.jsonl file in the directory.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.entries = None
+        self.attempts = {}
+
+    def next_attempt(self, key: str, model: str) -> int:
+        with self.lock:
+            attempt = self.attempts.get((key, model), 0)
+            self.attempts[(key, model)] = attempt + 1
+            return attempt
+
+    def _load(self):
+        entries = {}
+        for path in sorted(Path(_DIRECTORY).glob("*.jsonl")):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entries.setdefault((entry["key"], entry["model"]), []).append(entry)
+        for recorded in entries.values():
+            recorded.sort(key=lambda e: e.get("attempt", 0))
+        return entries
+
+    def all_entries(self) -> dict:
+        with self.lock:
+            if self.entries is None:
+                self.entries = self._load()
+            return self.entries
+
+    def lookup(self, key: str, model: str, attempt: int) -> Optional[dict]:
+        recorded = self.all_entries().get((key, model))
+        return recorded[attempt % len(recorded)] if recorded else None
+
+    def by_model(self, model: str) -> list[dict]:
+        return [e for (_, m), recorded in self.all_entries().items() if m == model for e in recorded]
+
+    def append(self, entry: dict):
+        # One file per process; the lock guards against a second writer reusing the name
+        path = Path(_DIRECTORY) / f"recording_{os.getpid()}.jsonl"
+        path.parent.mkdir(exist_ok=True, parents=True)
+        line = json.dumps(entry, default=str)
+        with open(path, "a", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line + "\n")
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+_STORE = RecordingStore()
+
+def _reset_after_fork():
+    # Attempt counters belong to the parent's calls
+    _STORE.lock = threading.Lock()
+    _STORE.attempts = {}
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _response_from_entry(entry: dict) -> ModelResponse:
+    fields = {k: v for k, v in entry["response"].items() if k in ModelResponse.__dataclass_fields__}
+    fields["timing_breakdown"] = None
+    return ModelResponse(**fields)
+
+def _synthetic(key: str, model_arg: str, attempt: int) -> tuple[ModelResponse, float]:
+    """Latency from a lognormal fitted to the model's recordings (default SYNTHETIC_MEDIAN_S), deterministic per call and seed."""
+    rng = random.Random(f"{_SEED}:{key}:{model_arg}:{attempt}")
+    recorded = _STORE.by_model(model_arg)
+    latencies = [e["latency_s"] for e in recorded if e.get("latency_s")]
+    if len(latencies) >= 2:
+        logs = [math.log(max(l, 1e-3)) for l in latencies]
+        mu = sum(logs) / len(logs)
+        sigma = math.sqrt(sum((x - mu) ** 2 for x in logs) / (len(logs) - 1)) or SYNTHETIC_SIGMA
+    else:
+        mu, sigma = math.log(SYNTHETIC_MEDIAN_S), SYNTHETIC_SIGMA
+    latency = rng.lognormvariate(mu, sigma)
+
+    if recorded:
+        response = _response_from_entry(rng.choice(recorded))
+    else:
+        response = ModelResponse(text=SYNTHETIC_TEXT, prompt_tokens=0, cached_tokens=0, completion_tokens=0, model_name=model_arg)
+    return response, latency
+
+def offline_response(prompt: str, model_arg: str, return_strategy: bool = False) -> tuple[ModelResponse, float]:
+    """The replayed or synthetic response to a call, and the latency it stands for."""
+    key = prompt_hash(prompt, return_strategy)
+    attempt = _STORE.next_attempt(key, model_arg)
+    if _MODE == "synthetic":
+        return _synthetic(key, model_arg, attempt)
+    entry = _STORE.lookup(key, model_arg, attempt)
+    if entry is None:
+        raise NonRetryableProviderError(f"No recording for {model_arg} (prompt {key[:12]}) in {_DIRECTORY}")
+    return _response_from_entry(entry), entry.get("latency_s") or 0.0
+
+def _offline_wait(latency: float) -> float:
+    return latency / _SPEED if _SPEED > 0 else 0.0
+
+def _record_timing(timing_tracker: list[dict], model_arg: str, waited: float):
+    if timing_tracker is not None:
+        timing_tracker.append({"type": "attempt", "model": model_arg, "duration": waited, "status": "success", "transport": _MODE})
+
+def call_offline(prompt: str, model_arg: str, return_strategy: bool = False, timing_tracker: list[dict] = None) -> ModelResponse:
+    response, latency = offline_response(prompt, model_arg, return_strategy)
+    waited = _offline_wait(latency)
+    if waited > 0:
+        time.sleep(waited)
+    _record_timing(timing_tracker, model_arg, waited)
+    return response
+
+async def call_offline_async(prompt: str, model_arg: str, return_strategy: bool = False, timing_tracker: list[dict] = None) -> ModelResponse:
+    """Coroutine version of call_offline."""
+    response, latency = offline_response(prompt, model_arg, return_strategy)
+    waited = _offline_wait(latency)
+    if waited > 0:
+        await asyncio.sleep(waited)
+    _record_timing(timing_tracker, model_arg, waited)
+    return response
+
+def record_response(prompt: str, model_arg: str, return_strategy: bool, response: ModelResponse, latency: float):
+    """Stores a live response (record mode). A failed write only loses the recording."""
+    if _MODE != "record" or response is None:
+        return
+    key = prompt_hash(prompt, return_strategy)
+    entry = {
+        "key": key,
+        "model": model_arg,
+        "attempt": _STORE.next_attempt(key, model_arg),
+        "latency_s": latency,
+        "response": {k: v for k, v in asdict(response).items() if k != "timing_breakdown"},
+    }
+    try:
+        _STORE.append(entry)
+    except Exception as e:
+        print(f"DEBUG: could not record response of {model_arg}: {e}", file=sys.stderr)
+
+def _step_log_runs(node):
+    """Run entries (dicts with the raw LLM call and response) anywhere in a step log."""
+    if isinstance(node, dict):
+        if "Full raw LLM call" in node and "Full raw LLM response" in node:
+            yield node
+            return
+        for value in node.values():
+            yield from _step_log_runs(value)
+
+def _recorded_latency(run: dict) -> float:
+    attempts = [t["duration"] for t in run.get("timing_breakdown") or [] if t.get("type") == "attempt" and t.get("status") == "success"]
+    return attempts[-1] if attempts else run.get("duration_seconds", 0.0)
+
+def seed_from_step_logs(log_paths: list, out_path: Path) -> int:
+    """Converts the runs in step logs (e.g. tests/codegen_test_logs/*.json) into a recording file. Returns the run count."""
+    attempts = {}
+    entries = []
+    for log_path in log_paths:
+        with open(log_path, "r", encoding="utf-8") as f:
+            log = json.load(f)
+        for run in _step_log_runs(log):
+            model = run.get("requested_model") or run.get("actual_model")
+            if not model or not isinstance(run["Full raw LLM call"], str):
+                continue
+            key = prompt_hash(run["Full raw LLM call"])
+            attempt = attempts.get((key, model), 0)
+            attempts[(key, model)] = attempt + 1
+            output_tokens = run.get("output_tokens") or 0
+            reasoning_tokens = run.get("reasoning_tokens") or 0
+            entries.append({
+                "key": key,
+                "model": model,
+                "attempt": attempt,
+                "latency_s": _recorded_latency(run),
+                "response": {
+                    "text": run["Full raw LLM response"] or "",
+                    "prompt_tokens": run.get("input_tokens") or 0,
+                    "cached_tokens": run.get("cached_tokens") or 0,
+                    # Step logs count reasoning inside output_tokens
+                    "completion_tokens": max(0, output_tokens - reasoning_tokens),
+                    "thought_tokens": reasoning_tokens,
+                    "model_name": run.get("actual_model"),
+                },
+            })
+    out_path = Path(out_path)
+    out_path.parent.mkdir(exist_ok=True, parents=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return len(entries)
@@ -1,11 +1,18 @@
 import sys
 import time
-import random
-from typing import Callable, Any, Optional
+import asyncio
+from typing import Callable, Any, Awaitable, Optional
 
 from src.types import ModelResponse
 from src.logging import get_logger, log_failure
-from src.errors import RetryableProviderError, UnknownProviderError, NonRetryableProviderError, RateLimitProviderError
+from src.errors import RetryableProviderError, UnknownProviderError, NonRetryableProviderError, RateLimitProviderError, RunCancelledError
+from src.retry_policy import (
+    RetryBudget, retry_budget, policy_for, retry_delay, retry_after_seconds, error_class,
+    mark_retries_exhausted, retries_exhausted,
+)
+from src.circuit_breaker import circuit_wait, circuit_wait_async, circuit_admitted, record_circuit_outcome
+from src.provider_health import record_attempt_error
+from src.cancellation import check_cancelled, current_cancel_token, cancellable_sleep
 
 logger = get_logger("llm_utils")
 
@@ -18,158 +25,279 @@ def set_retries_enabled(enabled: bool):
 def get_retries_enabled() -> bool:
     return _RETRIES_ENABLED
 
+def _retry_log_prefix(task_id: str, test_index: int) -> str:
+    log_prefix = ""
+    if task_id:
+        log_prefix += f"[Task: {task_id}"
+        if test_index is not None:
+            log_prefix += f":{test_index}"
+        log_prefix += "] "
+    return log_prefix
+
+def _record_success(timing_tracker: list[dict], model_name: str, duration: float, log_success: bool):
+    if log_success and timing_tracker is not None:
+        timing_tracker.append({
+            "type": "attempt",
+            "model": model_name,
+            "duration": duration,
+            "status": "success"
+        })
+
+def _handle_failed_attempt(
+    e: Exception,
+    attempt: int,
+    max_retries: Optional[int],
+    kind: str,
+    budget: RetryBudget,
+    duration: float,
+    log_prefix: str,
+    task_id: str,
+    test_index: int,
+    run_timestamp: str,
+    model_name: str,
+    timing_tracker: list[dict],
+) -> float:
+    """
+    Logs a failed attempt. Re-raises when it must not be retried (non-retryable, out of attempts,
+    already given up on by an inner retry loop, or over the call's retry budget); otherwise
+    returns the delay before the next attempt.
+    """
+    if isinstance(e, NonRetryableProviderError) or retries_exhausted(e):
+        if timing_tracker is not None:
+            timing_tracker.append({
+                "type": "attempt",
+                "model": model_name,
+                "duration": duration,
+                "status": "failed",
+                "error": str(e)
+            })
+        if isinstance(e, NonRetryableProviderError):
+            # Log terminal errors with context before re-raising
+            logger.error(f"{log_prefix}Non-retryable error: {e}")
+        raise e
+
+    # Attempts and backoff come from the error class; rate limits always get their own (higher) count
+    policy = policy_for(e, kind)
+    current_max_retries = policy.max_attempts
+    if max_retries is not None and not isinstance(e, RateLimitProviderError):
+        current_max_retries = max_retries
+    if not _RETRIES_ENABLED:
+        current_max_retries = 1
+    sleep_time = retry_delay(e, policy, attempt)
+
+    if timing_tracker is not None:
+        timing_tracker.append({
+            "type": "attempt",
+            "model": model_name,
+            "duration": duration,
+            "status": "failed",
+            "error": str(e)
+        })
+
+    # Log the retryable failure
+    if run_timestamp:
+        log_failure(
+            run_timestamp=run_timestamp,
+            task_id=task_id if task_id else "UNKNOWN",
+            run_id="RETRY_LOOP",
+            error=e,
+            model=model_name if model_name else "UNKNOWN",
+            step="RETRY",
+            test_index=test_index,
+            is_retryable=True
+        )
+
+    # Custom concise handling for OpenAI background errors (Timeout or Token Limit)
+    error_str = str(e)
+    is_concise = False
+    
+    # Identify concise errors
+    concise_msg = None
+    retry_tag = f"Retry {attempt + 1}/{current_max_retries}:"
+    if "OpenAI Background Job" in error_str:
+        if "timed out after" in error_str:
+            concise_msg = f"Err: {retry_tag} OpenAI Timeout 3300s"
+            is_concise = True
+        elif "hit token limit" in error_str or "max_output_tokens" in error_str:
+            concise_msg = f"Err: {retry_tag} OpenAI Max Tokens"
+            is_concise = True
+        elif "violating our usage policy" in error_str:
+            concise_msg = f"Err: {retry_tag} OpenAI Policy Violation"
+            is_concise = True
+        elif "server_error" in error_str:
+            concise_msg = f"Err: {retry_tag} OpenAI Server Error"
+            is_concise = True
+    elif "claude-opus" in error_str and ("peer closed connection" in error_str or "incomplete chunked read" in error_str):
+        concise_msg = f"Err: {retry_tag} Claude Connection Closed"
+        is_concise = True
+    elif "gemini" in error_str.lower() and ("499" in error_str or "cancelled" in error_str.lower()):
+        concise_msg = f"Err: {retry_tag} Gemini Cancelled (499)"
+        is_concise = True
+    elif isinstance(e, RateLimitProviderError):
+        concise_msg = f"Err: {retry_tag} Rate Limit (Wait {sleep_time:.0f}s)"
+        is_concise = True
+
+    # Only print if NOT the final attempt
+    if is_concise and attempt < current_max_retries - 1:
+        print(concise_msg, file=sys.stdout)
+
+    if attempt >= current_max_retries - 1:
+        if not is_concise:
+            logger.error(f"{log_prefix}Max retries ({current_max_retries}) exceeded. Final error: {e}")
+        mark_retries_exhausted(e)
+        raise e
+
+    counted = kind != "poll"
+    if not budget.allows(sleep_time, counted):
+        logger.error(
+            f"{log_prefix}Retry budget exhausted ({budget.retries} retries, {budget.slept_s:.0f}s slept; "
+            f"next wait {sleep_time:.0f}s). Final error: {e}"
+        )
+        if timing_tracker is not None:
+            timing_tracker.append({
+                "type": "retry_budget_exhausted",
+                "model": model_name,
+                "retries": budget.retries,
+                "slept": budget.slept_s,
+            })
+        mark_retries_exhausted(e)
+        raise e
+    budget.spend(sleep_time, counted)
+
+    if isinstance(e, UnknownProviderError):
+        logger.error(f"{log_prefix}!!! UNKNOWN ERROR (after {duration:.2f}s) - RETRYING (Attempt {attempt + 1}/{current_max_retries}) !!!")
+        logger.error(f"{log_prefix}Error details: {e}")
+    elif not is_concise:
+        logger.warning(f"{log_prefix}Retryable error (after {duration:.2f}s): {e}. Retrying in {sleep_time:.1f}s (Attempt {attempt + 1}/{current_max_retries})...")
+    
+    if timing_tracker is not None:
+        wait = {
+            "type": "wait",
+            "duration": sleep_time,
+            "reason": "retry_delay",
+            "error_class": error_class(e),
+            "budget_remaining": budget.remaining_s,
+        }
+        retry_after = retry_after_seconds(e)
+        if retry_after is not None:
+            wait["retry_after"] = retry_after
+        timing_tracker.append(wait)
+    return sleep_time
+
+def _raise_if_cancelled(e: Exception):
+    # A closed stream or abandoned call of a cancelled run surfaces as a provider error; it is not one
+    token = current_cancel_token()
+    if token is not None and token.cancelled:
+        raise RunCancelledError(f"Run cancelled: {token.reason}") from e
+
 def run_with_retry(
     func: Callable[[], Any],
-    max_retries: int = 2,
+    max_retries: Optional[int] = None,
     task_id: str = None,
     test_index: int = None,
     run_timestamp: str = None,
     model_name: str = None,
     timing_tracker: list[dict] = None,
-    log_success: bool = True
+    log_success: bool = True,
+    kind: str = "call"
 ) -> Any:
     """
     Generic retry loop helper using RetryableProviderError.
-    Retries: 1 time (2 total attempts).
-    Sleeps: 300s.
+    Attempts and delays follow the error's RetryPolicy (honoring Retry-After); max_retries overrides
+    the attempt count of non-rate-limit errors. Nested loops of one logical call share its RetryBudget.
     """
-    if not _RETRIES_ENABLED:
-        max_retries = 1
+    log_prefix = _retry_log_prefix(task_id, test_index)
+    attempt = 0
 
-    # Fixed delays for the 2 retries
-    retry_delays = [300]
-    
-    # Construct log prefix
-    log_prefix = ""
-    if task_id:
-        log_prefix += f"[Task: {task_id}"
-        if test_index is not None:
-            log_prefix += f":{test_index}"
-        log_prefix += "] "
+    with retry_budget() as budget:
+        while True:
+            check_cancelled()
+            # Wait while the provider/model circuit is open (outermost loop of a call only)
+            circuit = circuit_wait(timing_tracker)
+            start_ts = time.perf_counter()
+            try:
+                with circuit_admitted(circuit):
+                    result = func()
+            except (NonRetryableProviderError, RetryableProviderError) as e:
+                _raise_if_cancelled(e)
+                record_circuit_outcome(e)
+                record_attempt_error(e)
+                sleep_time = _handle_failed_attempt(
+                    e, attempt, max_retries, kind, budget, time.perf_counter() - start_ts, log_prefix,
+                    task_id, test_index, run_timestamp, model_name, timing_tracker
+                )
+                cancellable_sleep(sleep_time)
+                attempt += 1
+                continue
+            record_circuit_outcome()
+            _record_success(timing_tracker, model_name, time.perf_counter() - start_ts, log_success)
+            return result
 
+async def run_with_retry_async(
+    func: Callable[[], Awaitable[Any]],
+    max_retries: Optional[int] = None,
+    task_id: str = None,
+    test_index: int = None,
+    run_timestamp: str = None,
+    model_name: str = None,
+    timing_tracker: list[dict] = None,
+    log_success: bool = True,
+    kind: str = "call"
+) -> Any:
+    """Coroutine version of run_with_retry; func returns an awaitable and retry delays do not block a thread."""
+    log_prefix = _retry_log_prefix(task_id, test_index)
     attempt = 0
-    current_max_retries = max_retries
-
-    while attempt < current_max_retries:
-        start_ts = time.perf_counter()
-        try:
-            result = func()
-            duration = time.perf_counter() - start_ts
-            if log_success and timing_tracker is not None:
-                timing_tracker.append({
-                    "type": "attempt",
-                    "model": model_name,
-                    "duration": duration,
-                    "status": "success"
-                })
-            return result
-        except NonRetryableProviderError as e:
-            duration = time.perf_counter() - start_ts
-            if timing_tracker is not None:
-                timing_tracker.append({
-                    "type": "attempt",
-                    "model": model_name,
-                    "duration": duration,
-                    "status": "failed",
-                    "error": str(e)
-                })
-            # Log terminal errors with context before re-raising
-            logger.error(f"{log_prefix}Non-retryable error: {e}")
-            raise e
-            
-        except RetryableProviderError as e:
-            # DYNAMIC RETRY ADJUSTMENT FOR RATE LIMITS
-            if isinstance(e, RateLimitProviderError) and _RETRIES_ENABLED:
-                current_max_retries = max(current_max_retries, 10)
-
-            duration = time.perf_counter() - start_ts
-            
-            if timing_tracker is not None:
-                timing_tracker.append({
-                    "type": "attempt",
-                    "model": model_name,
-                    "duration": duration,
-                    "status": "failed",
-                    "error": str(e)
-                })
-
-            # Log the retryable failure
-            if run_timestamp:
-                log_failure(
-                    run_timestamp=run_timestamp,
-                    task_id=task_id if task_id else "UNKNOWN",
-                    run_id="RETRY_LOOP",
-                    error=e,
-                    model=model_name if model_name else "UNKNOWN",
-                    step="RETRY",
-                    test_index=test_index,
-                    is_retryable=True
+
+    with retry_budget() as budget:
+        while True:
+            check_cancelled()
+            circuit = await circuit_wait_async(timing_tracker)
+            start_ts = time.perf_counter()
+            try:
+                with circuit_admitted(circuit):
+                    result = await func()
+            except (NonRetryableProviderError, RetryableProviderError) as e:
+                _raise_if_cancelled(e)
+                record_circuit_outcome(e)
+                record_attempt_error(e)
+                sleep_time = _handle_failed_attempt(
+                    e, attempt, max_retries, kind, budget, time.perf_counter() - start_ts, log_prefix,
+                    task_id, test_index, run_timestamp, model_name, timing_tracker
                 )
+                await asyncio.sleep(sleep_time)
+                attempt += 1
+                continue
+            record_circuit_outcome()
+            _record_success(timing_tracker, model_name, time.perf_counter() - start_ts, log_success)
+            return result
+
+STEP2_EXPLAIN_PROMPT = "Explain the strategy you used in broad terms such that it can be applied on other similar examples and other input data. Do not use any of the example or other actual data in your explanation."
+
+def _log_step1_prompt(prompt: str, verbose: bool, image_path: str = None):
+    if verbose:
+        # We use DEBUG level for prompt dumps, requiring verbose=True in main setup
+        logger.debug(f"--- REAL PROMPT STEP 1 (Solve) ---\n{prompt}\n--- END REAL PROMPT STEP 1 ---")
+        if image_path:
+            logger.debug(f"--- IMAGE PROMPT STEP 1 (Solve) ---\n{image_path}\n--- END IMAGE PROMPT STEP 1 ---")
+
+def _log_step2_prompt(verbose: bool):
+    if verbose:
+        logger.debug(f"--- REAL PROMPT STEP 2 (Explain) ---\n{STEP2_EXPLAIN_PROMPT}\n--- END REAL PROMPT STEP 2 ---")
 
-            # Custom concise handling for OpenAI background errors (Timeout or Token Limit)
-            error_str = str(e)
-            is_concise = False
-            
-            # Identify concise errors
-            concise_msg = None
-            retry_tag = f"Retry {attempt + 1}/{current_max_retries}:"
-            if "OpenAI Background Job" in error_str:
-                if "timed out after" in error_str:
-                    concise_msg = f"Err: {retry_tag} OpenAI Timeout 3300s"
-                    is_concise = True
-                elif "hit token limit" in error_str or "max_output_tokens" in error_str:
-                    concise_msg = f"Err: {retry_tag} OpenAI Max Tokens"
-                    is_concise = True
-                elif "violating our usage policy" in error_str:
-                    concise_msg = f"Err: {retry_tag} OpenAI Policy Violation"
-                    is_concise = True
-                elif "server_error" in error_str:
-                    concise_msg = f"Err: {retry_tag} OpenAI Server Error"
-                    is_concise = True
-            elif "claude-opus" in error_str and ("peer closed connection" in error_str or "incomplete chunked read" in error_str):
-                concise_msg = f"Err: {retry_tag} Claude Connection Closed"
-                is_concise = True
-            elif "gemini" in error_str.lower() and ("499" in error_str or "cancelled" in error_str.lower()):
-                concise_msg = f"Err: {retry_tag} Gemini Cancelled (499)"
-                is_concise = True
-            elif isinstance(e, RateLimitProviderError):
-                concise_msg = f"Err: {retry_tag} Rate Limit (Wait {retry_delays[min(attempt, len(retry_delays)-1)]}s)"
-                is_concise = True
-
-            # Only print if NOT the final attempt
-            if is_concise and attempt < current_max_retries - 1:
-                print(concise_msg, file=sys.stdout)
-
-            if attempt == current_max_retries - 1:
-                if not is_concise:
-                    logger.error(f"{log_prefix}Max retries ({current_max_retries}) exceeded. Final error: {e}")
-                raise e
-            
-            if attempt < len(retry_delays):
-                sleep_time = retry_delays[attempt]
-            else:
-                sleep_time = retry_delays[-1]
-            
-            # Randomize delay (±50s) to prevent thundering herd
-            sleep_time = sleep_time + random.uniform(-50.0, 50.0)
-            
-            if isinstance(e, UnknownProviderError):
-                logger.error(f"{log_prefix}!!! UNKNOWN ERROR (after {duration:.2f}s) - RETRYING (Attempt {attempt + 1}/{current_max_retries}) !!!")
-                logger.error(f"{log_prefix}Error details: {e}")
-            elif not is_concise:
-                logger.warning(f"{log_prefix}Retryable error (after {duration:.2f}s): {e}. Retrying in {sleep_time}s (Attempt {attempt + 1}/{current_max_retries})...")
-            
-            if timing_tracker is not None:
-                timing_tracker.append({
-                    "type": "wait",
-                    "duration": sleep_time,
-                    "reason": "retry_delay"
-                })
-            time.sleep(sleep_time)
-            attempt += 1
-            
-    # Should not be reached if we raise in the loop
-    return None
+def _combine_two_stage(response1: ModelResponse, response2: Optional[ModelResponse]) -> ModelResponse:
+    if response2:
+        # Combine Usage
+        return ModelResponse(
+            text=response1.text,
+            prompt_tokens=response1.prompt_tokens + response2.prompt_tokens,
+            cached_tokens=response1.cached_tokens + response2.cached_tokens,
+            completion_tokens=response1.completion_tokens + response2.completion_tokens,
+            cache_write_tokens=response1.cache_write_tokens + response2.cache_write_tokens,
+            strategy=response2.text # Step 2 text IS the strategy
+        )
+    else:
+        # Step 2 failed, return Step 1 only
+        return response1
 
 def orchestrate_two_stage(
     solve_func: Callable[[str], ModelResponse],
@@ -183,33 +311,32 @@ def orchestrate_two_stage(
     Orchestrates the Solve -> Explain workflow.
     """
     # Step 1: Solve
-    if verbose:
-        # We use DEBUG level for prompt dumps, requiring verbose=True in main setup
-        logger.debug(f"--- REAL PROMPT STEP 1 (Solve) ---\n{prompt}\n--- END REAL PROMPT STEP 1 ---")
-        if image_path:
-            logger.debug(f"--- IMAGE PROMPT STEP 1 (Solve) ---\n{image_path}\n--- END IMAGE PROMPT STEP 1 ---")
-    
+    _log_step1_prompt(prompt, verbose, image_path)
     response1 = solve_func(prompt)
     
     if not return_strategy:
         return response1
 
     # Step 2: Explain
-    step2_input = "Explain the strategy you used in broad terms such that it can be applied on other similar examples and other input data. Do not use any of the example or other actual data in your explanation."
-    if verbose:
-        logger.debug(f"--- REAL PROMPT STEP 2 (Explain) ---\n{step2_input}\n--- END REAL PROMPT STEP 2 ---")
+    _log_step2_prompt(verbose)
+    response2 = explain_func(STEP2_EXPLAIN_PROMPT, response1)
+    return _combine_two_stage(response1, response2)
 
-    response2 = explain_func(step2_input, response1)
+async def orchestrate_two_stage_async(
+    solve_func: Callable[[str], Awaitable[ModelResponse]],
+    explain_func: Callable[[str, ModelResponse], Awaitable[Optional[ModelResponse]]],
+    prompt: str,
+    return_strategy: bool,
+    verbose: bool,
+    image_path: str = None,
+) -> ModelResponse:
+    """Coroutine version of orchestrate_two_stage."""
+    _log_step1_prompt(prompt, verbose, image_path)
+    response1 = await solve_func(prompt)
 
-    if response2:
-        # Combine Usage
-        return ModelResponse(
-            text=response1.text,
-            prompt_tokens=response1.prompt_tokens + response2.prompt_tokens,
-            cached_tokens=response1.cached_tokens + response2.cached_tokens,
-            completion_tokens=response1.completion_tokens + response2.completion_tokens,
-            strategy=response2.text # Step 2 text IS the strategy
-        )
-    else:
-        # Step 2 failed, return Step 1 only
-        return response1
\ No newline at end of file
+    if not return_strategy:
+        return response1
+
+    _log_step2_prompt(verbose)
+    response2 = await explain_func(STEP2_EXPLAIN_PROMPT, response1)
+    return _combine_two_stage(response1, response2)
@@ -138,6 +138,9 @@ def set_log_dir(path: str):
     global _CURRENT_LOG_DIR
     _CURRENT_LOG_DIR = path
 
+def get_log_dir() -> str:
+    return _CURRENT_LOG_DIR
+
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(f"arc_agi.{name}")
 
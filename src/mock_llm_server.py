@@ -0,0 +1,494 @@
+import sys
+import json
+import math
+import time
+import uuid
+import heapq
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.llm_transport import SYNTHETIC_TEXT
+
+# Local stand-in for the OpenAI, Anthropic and Gemini APIs, for load-testing the orchestrator offline.
+# It speaks enough of each protocol for the SDK clients used in src/providers:
+# - OpenAI Responses: streaming and plain create, background create + retrieve + cancel, file uploads
+# - Anthropic Messages: streaming (SSE) and plain create, beta file uploads
+# - Gemini generateContent
+# Every model call waits a lognormal latency, may be answered with an injected 429 or 500, and
+# otherwise returns one of the canned answers. The SDKs reach it through their base URL overrides
+# (see MockLLMServer.environment()).
+
+# Latency of a model call: lognormal around this median (per provider overrides via `latency`)
+DEFAULT_MEDIAN_S = 1.0
+DEFAULT_SIGMA = 0.5
+# Retry-After of injected 429s
+DEFAULT_RETRY_AFTER_S = 1.0
+# Streamed answers are sent in chunks of this many characters
+STREAM_CHUNK_CHARS = 64
+
+PROVIDERS = ("openai", "anthropic", "gemini")
+
+def _estimate_tokens(n_chars: int) -> int:
+    return max(1, n_chars // 4)
+
+class _Fault(Exception):
+    def __init__(self, status: int):
+        self.status = status
+
+class MockLLMServer:
+    """
+    The mock server and its knobs:
+    - latency: {provider: (median_s, sigma)} overriding median_s/sigma per provider
+    - rate_limit_rate / server_error_rate: fraction of model calls answered with 429 / 500
+    - answers: canned response texts, one picked per call (default: a one-cell grid and an identity solver)
+    Background jobs (OpenAI) finish once their latency has passed; retrieving them never sleeps.
+    """
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        median_s: float = DEFAULT_MEDIAN_S,
+        sigma: float = DEFAULT_SIGMA,
+        latency: dict = None,
+        rate_limit_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        retry_after_s: float = DEFAULT_RETRY_AFTER_S,
+        answers: list[str] = None,
+        seed: int = 0,
+    ):
+        self.median_s = median_s
+        self.sigma = sigma
+        self.latency = latency or {}
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after_s = retry_after_s
+        self.answers = answers or [SYNTHETIC_TEXT]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.jobs = {}
+        # Finish times of background jobs, which count as in flight until then
+        self.job_deadlines = []
+        self.counters = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.started_at = None
+
+        handler = type("_BoundHandler", (_Handler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self) -> dict:
+        """Environment variables that point the provider SDKs at this server."""
+        return {
+            "OPENAI_BASE_URL": f"{self.url}/openai/v1",
+            "ANTHROPIC_BASE_URL": f"{self.url}/anthropic",
+            "GOOGLE_GEMINI_BASE_URL": f"{self.url}/gemini/",
+        }
+
+    def start(self) -> "MockLLMServer":
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def _in_flight_locked(self) -> int:
+        now = time.monotonic()
+        while self.job_deadlines and self.job_deadlines[0] <= now:
+            heapq.heappop(self.job_deadlines)
+        return self.in_flight + len(self.job_deadlines)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "in_flight": self._in_flight_locked(),
+                "peak_in_flight": self.peak_in_flight,
+                "background_jobs": len(self.jobs),
+                "uptime_s": time.monotonic() - self.started_at if self.started_at else 0.0,
+            }
+
+    def sample_latency(self, provider: str) -> float:
+        median_s, sigma = self.latency.get(provider, (self.median_s, self.sigma))
+        with self.lock:
+            return self.rng.lognormvariate(math.log(max(median_s, 1e-6)), sigma) if median_s > 0 else 0.0
+
+    def answer(self) -> str:
+        with self.lock:
+            return self.rng.choice(self.answers)
+
+    def maybe_fault(self, provider: str):
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.count(f"{provider}.429")
+            raise _Fault(429)
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            self.count(f"{provider}.500")
+            raise _Fault(500)
+
+    def call_started(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight_locked())
+
+    def call_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def add_job(self, job: dict):
+        with self.lock:
+            self.jobs[job["id"]] = job
+            heapq.heappush(self.job_deadlines, job["done_at"])
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight_locked())
+
+    def cancel_job(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and not job.get("cancelled"):
+                job["cancelled"] = True
+                if job["done_at"] in self.job_deadlines:
+                    self.job_deadlines.remove(job["done_at"])
+                    heapq.heapify(self.job_deadlines)
+            return job
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+# --- Response bodies ---
+
+def _openai_usage(prompt_chars: int, text: str) -> dict:
+    input_tokens, output_tokens = _estimate_tokens(prompt_chars), _estimate_tokens(len(text))
+    return {
+        "input_tokens": input_tokens,
+        "input_tokens_details": {"cached_tokens": 0},
+        "output_tokens": output_tokens,
+        "output_tokens_details": {"reasoning_tokens": 0},
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+def _openai_response(response_id: str, model: str, status: str, text: str = None, prompt_chars: int = 0, background: bool = False) -> dict:
+    body = {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": status,
+        "background": background,
+        "model": model,
+        "output": [],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "error": None,
+        "incomplete_details": None,
+        "usage": None,
+    }
+    if text is not None:
+        body["output"] = [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }]
+        body["usage"] = _openai_usage(prompt_chars, text)
+    return body
+
+def _anthropic_message(model: str, text: str, prompt_chars: int) -> dict:
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": _estimate_tokens(prompt_chars),
+            "output_tokens": _estimate_tokens(len(text)),
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+        },
+    }
+
+def _gemini_response(model: str, text: str, prompt_chars: int) -> dict:
+    prompt_tokens, output_tokens = _estimate_tokens(prompt_chars), _estimate_tokens(len(text))
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "thoughtsTokenCount": 0,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+        "modelVersion": model,
+    }
+
+def _error_body(provider: str, status: int) -> dict:
+    rate_limited = status == 429
+    message = "Rate limit reached (mock)" if rate_limited else "Internal server error (mock)"
+    if provider == "anthropic":
+        return {"type": "error", "error": {"type": "rate_limit_error" if rate_limited else "api_error", "message": message}}
+    if provider == "gemini":
+        return {"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED" if rate_limited else "INTERNAL"}}
+    return {"error": {"message": message, "type": "requests" if rate_limited else "server_error", "param": None, "code": "rate_limit_exceeded" if rate_limited else None}}
+
+def _chunks(text: str):
+    for i in range(0, len(text), STREAM_CHUNK_CHARS):
+        yield text[i:i + STREAM_CHUNK_CHARS]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockLLMServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Plumbing ---
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_fault(self, provider: str, fault: _Fault):
+        headers = {"Retry-After": f"{self.mock.retry_after_s:g}"} if fault.status == 429 else None
+        self._send_json(fault.status, _error_body(provider, fault.status), headers)
+
+    def _start_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_event(self, event: str, data: dict):
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+
+    def _end_events(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _model_call(self, provider: str, kind: str, respond):
+        """Counts, fault-injects and delays a model call, then lets respond(text) write the answer."""
+        mock = self.mock
+        mock.count(f"{provider}.{kind}")
+        mock.call_started()
+        try:
+            try:
+                mock.maybe_fault(provider)
+            except _Fault as fault:
+                self._send_fault(provider, fault)
+                return
+            time.sleep(mock.sample_latency(provider))
+            respond(mock.answer())
+        finally:
+            mock.call_finished()
+
+    # --- Routing ---
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        raw = self._read_body()
+        if path.startswith("/openai/v1/files") or path.startswith("/anthropic/v1/files"):
+            return self._upload_file(path.split("/", 2)[1])
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "invalid JSON body"}})
+
+        if path == "/openai/v1/responses":
+            return self._openai_create(body, len(raw))
+        if path.startswith("/openai/v1/responses/") and path.endswith("/cancel"):
+            return self._openai_cancel(path.rsplit("/", 2)[-2])
+        if path == "/anthropic/v1/messages":
+            return self._anthropic_create(body, len(raw))
+        if path.startswith("/gemini/") and path.endswith(":generateContent"):
+            model = path.rsplit("/", 1)[-1].split(":", 1)[0]
+            return self._model_call("gemini", "generate", lambda text: self._send_json(200, _gemini_response(model, text, len(raw))))
+        self._send_json(404, {"error": {"message": f"mock server has no route for POST {path}"}})
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/openai/v1/responses/"):
+            return self._openai_retrieve(path.rsplit("/", 1)[-1])
+        if path == "/stats":
+            return self._send_json(200, self.mock.stats())
+        self._send_json(404, {"error": {"message": f"mock server has no route for GET {path}"}})
+
+    # --- Providers ---
+
+    def _upload_file(self, provider: str):
+        self.mock.count(f"{provider}.file")
+        if provider == "anthropic":
+            body = {"id": f"file_{uuid.uuid4().hex}", "type": "file", "filename": "image.png", "mime_type": "image/png",
+                    "size_bytes": 0, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        else:
+            body = {"id": f"file-{uuid.uuid4().hex}", "object": "file", "bytes": 0, "created_at": int(time.time()),
+                    "filename": "image.png", "purpose": "vision", "status": "processed"}
+        self._send_json(200, body)
+
+    def _openai_create(self, body: dict, prompt_chars: int):
+        model = body.get("model", "mock")
+        response_id = f"resp_{uuid.uuid4().hex}"
+
+        if body.get("background"):
+            mock = self.mock
+            mock.count("openai.background")
+            try:
+                mock.maybe_fault("openai")
+            except _Fault as fault:
+                return self._send_fault("openai", fault)
+            job = {"id": response_id, "model": model, "prompt_chars": prompt_chars,
+                   "done_at": time.monotonic() + mock.sample_latency("openai"), "text": mock.answer()}
+            mock.add_job(job)
+            return self._send_json(200, _openai_response(response_id, model, "queued", background=True))
+
+        if body.get("stream"):
+            def respond(text):
+                self._start_events()
+                seq = 0
+                self._send_event("response.created", {"type": "response.created", "sequence_number": seq,
+                                                       "response": _openai_response(response_id, model, "in_progress")})
+                for chunk in _chunks(text):
+                    seq += 1
+                    self._send_event("response.output_text.delta", {
+                        "type": "response.output_text.delta", "sequence_number": seq, "item_id": "msg_0",
+                        "output_index": 0, "content_index": 0, "delta": chunk, "logprobs": [],
+                    })
+                self._send_event("response.completed", {"type": "response.completed", "sequence_number": seq + 1,
+                                                         "response": _openai_response(response_id, model, "completed", text, prompt_chars)})
+                self._end_events()
+            return self._model_call("openai", "stream", respond)
+
+        self._model_call("openai", "create", lambda text: self._send_json(200, _openai_response(response_id, model, "completed", text, prompt_chars)))
+
+    def _openai_retrieve(self, response_id: str):
+        self.mock.count("openai.retrieve")
+        job = self.mock.get_job(response_id)
+        if job is None:
+            return self._send_json(404, {"error": {"message": f"No response found with id '{response_id}'.", "type": "invalid_request_error", "param": None, "code": None}})
+        if job.get("cancelled"):
+            return self._send_json(200, _openai_response(response_id, job["model"], "cancelled", background=True))
+        if time.monotonic() < job["done_at"]:
+            return self._send_json(200, _openai_response(response_id, job["model"], "in_progress", background=True))
+        self._send_json(200, _openai_response(response_id, job["model"], "completed", job["text"], job["prompt_chars"], background=True))
+
+    def _openai_cancel(self, response_id: str):
+        self.mock.count("openai.cancel")
+        job = self.mock.cancel_job(response_id)
+        if job is None:
+            return self._send_json(404, {"error": {"message": f"No response found with id '{response_id}'.", "type": "invalid_request_error", "param": None, "code": None}})
+        self._send_json(200, _openai_response(response_id, job["model"], "cancelled", background=True))
+
+    def _anthropic_create(self, body: dict, prompt_chars: int):
+        model = body.get("model", "mock")
+        if not body.get("stream"):
+            return self._model_call("anthropic", "create", lambda text: self._send_json(200, _anthropic_message(model, text, prompt_chars)))
+
+        def respond(text):
+            message = _anthropic_message(model, text, prompt_chars)
+            output_tokens = message["usage"]["output_tokens"]
+            self._start_events()
+            self._send_event("message_start", {"type": "message_start", "message": {
+                **message, "content": [], "stop_reason": None, "usage": {**message["usage"], "output_tokens": 1}}})
+            self._send_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+            for chunk in _chunks(text):
+                self._send_event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}})
+            self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            self._send_event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                               "usage": {"output_tokens": output_tokens}})
+            self._send_event("message_stop", {"type": "message_stop"})
+            self._end_events()
+        self._model_call("anthropic", "stream", respond)
+
+def parse_latency(specs: list[str]) -> dict:
+    """PROVIDER=MEDIAN_S[:SIGMA] options into the server's per-provider latency overrides."""
+    latency = {}
+    for spec in specs or []:
+        provider, _, value = spec.partition("=")
+        if provider not in PROVIDERS or not value:
+            raise ValueError(f"Invalid latency '{spec}'. Expected PROVIDER=MEDIAN_S[:SIGMA] with PROVIDER in {PROVIDERS}")
+        median_s, _, sigma = value.partition(":")
+        latency[provider] = (float(median_s), float(sigma) if sigma else DEFAULT_SIGMA)
+    return latency
+
+def add_server_arguments(parser):
+    parser.add_argument("--median-latency", type=float, default=DEFAULT_MEDIAN_S, help="Median seconds per model call (lognormal).")
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULT_SIGMA, help="Sigma of the lognormal call latency.")
+    parser.add_argument("--latency", action="append", metavar="PROVIDER=MEDIAN_S[:SIGMA]", help="Per-provider latency override (repeatable).")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of model calls answered with 429.")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Fraction of model calls answered with 500.")
+    parser.add_argument("--retry-after", type=float, default=DEFAULT_RETRY_AFTER_S, help="Retry-After seconds of injected 429s.")
+    parser.add_argument("--answer-file", action="append", help="Text file with a canned answer (repeatable; one is picked per call).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of latencies, faults and answer picks.")
+
+def server_from_args(args, host: str = "127.0.0.1", port: int = 0) -> MockLLMServer:
+    answers = []
+    for path in args.answer_file or []:
+        with open(path, "r", encoding="utf-8") as f:
+            answers.append(f.read())
+    return MockLLMServer(
+        host=host,
+        port=port,
+        median_s=args.median_latency,
+        sigma=args.latency_sigma,
+        latency=parse_latency(args.latency),
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after_s=args.retry_after,
+        answers=answers,
+        seed=args.seed,
+    )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Anthropic/Gemini server for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.host, args.port)
+    for name, value in server.environment().items():
+        print(f"export {name}={value}")
+    print(f"Serving on {server.url} (GET /stats for counters). Ctrl-C to stop.", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
@@ -1,5 +1,6 @@
-from openai import OpenAI
-from anthropic import Anthropic
+import time
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic, AsyncAnthropic
 from google import genai
 
 from src.types import (
@@ -13,9 +14,13 @@ from src.types import (
     CLAUDE_OPUS_BASE,
     GEMINI_3_BASE
 )
-from src.providers.openai import call_openai_internal
-from src.providers.anthropic import call_anthropic
-from src.providers.gemini import call_gemini
+from src.providers.openai import call_openai_internal, call_openai_internal_async
+from src.providers.anthropic import call_anthropic, call_anthropic_async
+from src.providers.gemini import call_gemini, call_gemini_async
+from src.retry_policy import retry_budget
+from src.circuit_breaker import circuit_scope
+from src.provider_health import track_call
+from src.llm_transport import is_offline, call_offline, call_offline_async, record_response
 
 def parse_model_arg(model_arg: str) -> ModelConfig:
     if model_arg not in SUPPORTED_MODELS:
@@ -85,7 +90,7 @@ def calculate_cost(model_config: ModelConfig, response: ModelResponse) -> float:
         pricing = {"input": 4.00, "cached_input": 0.40, "output": 18.00}
 
     non_cached_input = max(
-        0, response.prompt_tokens - response.cached_tokens
+        0, response.prompt_tokens - response.cached_tokens - response.cache_write_tokens
     )
 
     # Calculate total output tokens for billing.
@@ -99,6 +104,11 @@ def calculate_cost(model_config: ModelConfig, response: ModelResponse) -> float:
             / 1_000_000
             * pricing.get("cached_input", 0)
         )
+        + (
+            response.cache_write_tokens
+            / 1_000_000
+            * pricing.get("cache_write_input", pricing["input"])
+        )
         + (billed_output_tokens / 1_000_000 * pricing["output"])
     )
     return cost
@@ -123,62 +133,158 @@ def call_model(
     config = parse_model_arg(model_arg)
     timings = timing_tracker if timing_tracker is not None else []
 
-    if config.provider == "openai":
-        # OpenAI supports code interpreter tool
-        response = call_openai_internal(
-            openai_client,
-            prompt,
-            config,
-            image_path=image_path,
-            return_strategy=return_strategy,
-            verbose=verbose,
-            task_id=task_id,
-            test_index=test_index,
-            step_name=step_name,
-            use_background=use_background,
-            run_timestamp=run_timestamp,
-            anthropic_client=anthropic_client,
-            model_alias=model_arg,
-            timing_tracker=timings,
-            enable_code_execution=enable_code_execution
-        )
-    elif config.provider == "anthropic":
-        if not anthropic_client:
-            raise RuntimeError("Anthropic client not initialized.")
-        response = call_anthropic(
-            anthropic_client,
-            prompt,
-            config,
-            image_path=image_path,
-            return_strategy=return_strategy,
-            verbose=verbose,
-            task_id=task_id,
-            test_index=test_index,
-            run_timestamp=run_timestamp,
-            model_alias=model_arg,
-            timing_tracker=timings,
-        )
-    elif config.provider == "google":
-        if not google_keys:
-            raise RuntimeError("Google keys not initialized.")
-        response = call_gemini(
-            google_keys,
-            prompt,
-            config,
-            image_path=image_path,
-            return_strategy=return_strategy,
-            verbose=verbose,
-            task_id=task_id,
-            test_index=test_index,
-            run_timestamp=run_timestamp,
-            model_alias=model_arg,
-            timing_tracker=timings,
-            enable_code_execution=enable_code_execution
-        )
-    else:
-        raise ValueError(f"Unknown provider {config.provider}")
-        
+    # One retry budget per logical call: solve, explain and nested retry loops share it
+    provider_key = f"{config.provider}:{config.base_model}"
+    start_ts = time.perf_counter()
+    with retry_budget(), circuit_scope(provider_key), track_call(provider_key):
+        if is_offline():
+            # Replayed or synthetic response; no provider is called
+            response = call_offline(prompt, model_arg, return_strategy, timings)
+        elif config.provider == "openai":
+            # OpenAI supports code interpreter tool
+            response = call_openai_internal(
+                openai_client,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                step_name=step_name,
+                use_background=use_background,
+                run_timestamp=run_timestamp,
+                anthropic_client=anthropic_client,
+                model_alias=model_arg,
+                timing_tracker=timings,
+                enable_code_execution=enable_code_execution
+            )
+        elif config.provider == "anthropic":
+            if not anthropic_client:
+                raise RuntimeError("Anthropic client not initialized.")
+            response = call_anthropic(
+                anthropic_client,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_alias=model_arg,
+                timing_tracker=timings,
+            )
+        elif config.provider == "google":
+            if not google_keys:
+                raise RuntimeError("Google keys not initialized.")
+            response = call_gemini(
+                google_keys,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_alias=model_arg,
+                timing_tracker=timings,
+                enable_code_execution=enable_code_execution
+            )
+        else:
+            raise ValueError(f"Unknown provider {config.provider}")
+
+    record_response(prompt, model_arg, return_strategy, response, time.perf_counter() - start_ts)
     if response:
         response.timing_breakdown = timings
         
-    return response
\ No newline at end of file
+    return response
+
+async def call_model_async(
+    openai_client: AsyncOpenAI,
+    anthropic_client: AsyncAnthropic,
+    google_keys: list[str],
+    prompt: str,
+    model_arg: str,
+    image_path: str = None,
+    return_strategy: bool = False,
+    verbose: bool = False,
+    task_id: str = None,
+    test_index: int = None,
+    step_name: str = None,
+    use_background: bool = False,
+    run_timestamp: str = None,
+    timing_tracker: list[dict] = None,
+    enable_code_execution: bool = False,
+) -> ModelResponse:
+    """Coroutine version of call_model; takes the async OpenAI/Anthropic clients."""
+    config = parse_model_arg(model_arg)
+    timings = timing_tracker if timing_tracker is not None else []
+
+    # One retry budget per logical call: solve, explain and nested retry loops share it
+    provider_key = f"{config.provider}:{config.base_model}"
+    start_ts = time.perf_counter()
+    with retry_budget(), circuit_scope(provider_key), track_call(provider_key):
+        if is_offline():
+            # Replayed or synthetic response; no provider is called
+            response = await call_offline_async(prompt, model_arg, return_strategy, timings)
+        elif config.provider == "openai":
+            response = await call_openai_internal_async(
+                openai_client,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                step_name=step_name,
+                use_background=use_background,
+                run_timestamp=run_timestamp,
+                anthropic_client=anthropic_client,
+                model_alias=model_arg,
+                timing_tracker=timings,
+                enable_code_execution=enable_code_execution
+            )
+        elif config.provider == "anthropic":
+            if not anthropic_client:
+                raise RuntimeError("Anthropic client not initialized.")
+            response = await call_anthropic_async(
+                anthropic_client,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_alias=model_arg,
+                timing_tracker=timings,
+            )
+        elif config.provider == "google":
+            if not google_keys:
+                raise RuntimeError("Google keys not initialized.")
+            response = await call_gemini_async(
+                google_keys,
+                prompt,
+                config,
+                image_path=image_path,
+                return_strategy=return_strategy,
+                verbose=verbose,
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_alias=model_arg,
+                timing_tracker=timings,
+                enable_code_execution=enable_code_execution
+            )
+        else:
+            raise ValueError(f"Unknown provider {config.provider}")
+
+    record_response(prompt, model_arg, return_strategy, response, time.perf_counter() - start_ts)
+    if response:
+        response.timing_breakdown = timings
+
+    return response
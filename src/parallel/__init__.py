@@ -1,5 +1,5 @@
-from src.parallel.orchestrator import run_models_in_parallel
-from src.parallel.limiter import set_rate_limit_scaling
+from src.parallel.orchestrator import run_models_in_parallel, run_models_in_parallel_async
+from src.parallel.limiter import set_rate_limit_scaling, set_shared_rate_limiters, get_rate_limit_wait_stats, set_shared_circuit_breakers, set_shared_provider_health
 from src.parallel.utils import extract_tag_content
 from src.parallel.codegen import extract_and_run_solver
-from src.parallel.worker import run_single_model
+from src.parallel.worker import run_single_model, run_single_model_async
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+
+# When enabled, batch runs start task:test units as provider headroom allows instead of one per --startup-delay
+_ADAPTIVE_ADMISSION_ENABLED = os.getenv("ARC_AGI_ADAPTIVE_ADMISSION", "true").lower() == "true"
+
+# Units running at the start; the target then grows by ADMISSION_STEP per healthy tick up to --task-workers
+ADMISSION_INITIAL = int(os.getenv("ARC_AGI_ADMISSION_INITIAL", "4"))
+ADMISSION_STEP = 2
+# How often the signals are read, and the minimum gap between two unit starts
+ADMISSION_TICK_S = 5.0
+ADMISSION_MIN_GAP_S = 1.0
+# Congestion halves the target; the next backoff or growth waits this long so its effect shows in the stats
+ADMISSION_BACKOFF = 0.5
+ADMISSION_COOLDOWN_S = 60.0
+# Congestion: rate limits on more than this fraction of recent calls (and at least MIN_RATE_LIMITS of them) ...
+RATE_LIMIT_BACKOFF_FRACTION = 0.05
+MIN_RATE_LIMITS = 2
+# ... or p95 latency above this multiple of the best p95 seen for the provider/model (once MIN_LATENCY_SAMPLES finished) ...
+LATENCY_BACKOFF_FACTOR = 2.0
+MIN_LATENCY_SAMPLES = 5
+# ... or an open circuit. No growth while a provider's token bucket is below LOW_TOKEN_FRACTION
+# or it has MAX_IN_FLIGHT calls in flight (0: no cap).
+LOW_TOKEN_FRACTION = 0.2
+MAX_IN_FLIGHT = int(os.getenv("ARC_AGI_ADMISSION_MAX_IN_FLIGHT", "64"))
+
+def set_adaptive_admission_enabled(enabled: bool):
+    global _ADAPTIVE_ADMISSION_ENABLED
+    _ADAPTIVE_ADMISSION_ENABLED = enabled
+
+def get_adaptive_admission_enabled() -> bool:
+    return _ADAPTIVE_ADMISSION_ENABLED
+
+class AdmissionController:
+    """
+    Concurrency target of a batch (additive increase, multiplicative decrease) from the batch-wide
+    signals: call stats (ProviderHealth), token bucket levels and circuit states. Lowering the target
+    does not stop running units; new ones are only started while fewer than the target are running.
+    """
+    def __init__(self, max_workers: int, health=None, limiters: dict = None, breakers=None, initial: int = None):
+        self.max_workers = max(1, max_workers)
+        self.health = health
+        self.limiters = limiters or {}
+        self.breakers = breakers
+        initial = ADMISSION_INITIAL if initial is None else initial
+        self.target = max(1, min(self.max_workers, initial))
+        self.last_tick = None
+        self.last_change = None
+        self.last_backoff = None
+        self.best_p95 = {}
+        self.peak_target = self.target
+        self.backoffs = 0
+
+    def _read(self, name: str, read, default):
+        try:
+            return read()
+        except Exception as e:
+            print(f"DEBUG: admission signal {name} unavailable: {e}", file=sys.stderr)
+            return default
+
+    def _congestion(self, stats: dict) -> str:
+        """Why the providers look overloaded, or None."""
+        if self.breakers is not None:
+            circuits = self._read("circuits", self.breakers.snapshot, {})
+            tripped = sorted(key for key, s in circuits.items() if s["state"] != "closed")
+            if tripped:
+                return f"circuit open for {', '.join(tripped)}"
+        for key, s in sorted(stats.items()):
+            if s["rate_limits"] >= MIN_RATE_LIMITS and s["rate_limits"] > RATE_LIMIT_BACKOFF_FRACTION * s["calls"]:
+                return f"{key}: {s['rate_limits']} rate limits in {s['calls']} calls"
+            if s["p95_s"] is not None and s["calls"] >= MIN_LATENCY_SAMPLES:
+                best = self.best_p95.get(key)
+                if best is not None and s["p95_s"] > LATENCY_BACKOFF_FACTOR * best:
+                    return f"{key}: p95 latency {s['p95_s']:.0f}s vs best {best:.0f}s"
+                self.best_p95[key] = s["p95_s"] if best is None else min(best, s["p95_s"])
+        return None
+
+    def _saturation(self, stats: dict) -> str:
+        """Why the target should not grow right now, or None."""
+        for name, limiter in sorted(self.limiters.items()):
+            level = self._read(f"{name} tokens", limiter.level, 1.0)
+            if level < LOW_TOKEN_FRACTION:
+                return f"{name} token bucket at {level:.0%}"
+        for key, s in sorted(stats.items()):
+            if MAX_IN_FLIGHT and s["in_flight"] >= MAX_IN_FLIGHT:
+                return f"{key}: {s['in_flight']} calls in flight"
+        return None
+
+    def _set_target(self, target: int, reason: str, now: float):
+        print(f"Admission: concurrency target {self.target} -> {target} ({reason})", file=sys.stderr)
+        self.target = target
+        self.last_change = now
+        self.peak_target = max(self.peak_target, target)
+
+    def update(self, running: int, now: float = None) -> int:
+        """Re-reads the signals (once per ADMISSION_TICK_S) and returns the current target."""
+        now = time.monotonic() if now is None else now
+        if self.last_tick is not None and now - self.last_tick < ADMISSION_TICK_S:
+            return self.target
+        self.last_tick = now
+        # Calls finished before the last backoff do not reflect the current load
+        window = None if self.last_backoff is None else now - self.last_backoff
+        stats = self._read("call stats", lambda: self.health.snapshot(window), {}) if self.health is not None else {}
+        recently_backed_off = self.last_backoff is not None and now - self.last_backoff < ADMISSION_COOLDOWN_S
+
+        congestion = self._congestion(stats)
+        if congestion:
+            if not recently_backed_off and self.target > 1:
+                self.backoffs += 1
+                self.last_backoff = now
+                self._set_target(max(1, int(self.target * ADMISSION_BACKOFF)), congestion, now)
+            return self.target
+
+        # Grow only while the target is what holds units back, and not right after a backoff
+        if running >= self.target and self.target < self.max_workers and not recently_backed_off:
+            if self._saturation(stats) is None:
+                self._set_target(min(self.max_workers, self.target + ADMISSION_STEP), "headroom", now)
+        return self.target
+
+    def summary(self) -> str:
+        return f"final target {self.target}, peak {self.peak_target}, {self.backoffs} backoffs"
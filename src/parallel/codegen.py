@@ -1,10 +1,11 @@
+import os
 import re
 import sys
 import copy
 import traceback
 import time
 from src.augmentation import get_augmented_pairs
-from src.sandbox import run_untrusted_code
+from src.exec_cache import run_cached_batch
 
 def sanitize_output(obj):
     """Recursively converts numpy types to standard Python types."""
@@ -29,6 +30,67 @@ def sanitize_output(obj):
         
     return obj
 
+# Per-input budget for augmented train pairs. Kept short because this is only a soft signal
+# and a solver can be asked to run on 9 variants of every train example.
+AUGMENTATION_TIMEOUT_S = 2.0
+
+# Off by default: every passing solver costs up to 9 sandbox runs per train pair, and no selection reads the score yet
+_AUGMENTATION_CHECK_ENABLED = os.getenv("ARC_AGI_AUGMENTATION_CHECK", "false").lower() == "true"
+
+def set_augmentation_check_enabled(enabled: bool):
+    global _AUGMENTATION_CHECK_ENABLED
+    _AUGMENTATION_CHECK_ENABLED = enabled
+
+def get_augmentation_check_enabled() -> bool:
+    return _AUGMENTATION_CHECK_ENABLED
+
+def _score(by_type: dict, color_shift: bool):
+    stats = [v for t, v in by_type.items() if t.startswith("color_shift") == color_shift]
+    total = sum(v["total"] for v in stats)
+    return round(sum(v["passed"] for v in stats) / total, 4) if total else None
+
+def run_augmentation_check(code: str, train_examples: list, verification_log: dict, log_prefix: str = ""):
+    """
+    Runs a verified solver on the rotated / reflected / color-shifted variants of every
+    train pair in one sandbox batch. Records the fraction of geometric variants it still solves as
+    verification_log["augmentation_score"] and that of the color shifts, apart, as
+    verification_log["color_shift_score"] (many ARC rules are legitimately color-specific),
+    with a per-augmentation breakdown.
+    """
+    try:
+        pairs = []
+        for ex in train_examples:
+            pairs.extend(get_augmented_pairs(ex.input, ex.output))
+        if not pairs:
+            return
+
+        results, cache_stats = run_cached_batch(
+            code,
+            [pair["input"] for pair in pairs],
+            expected=[pair["output"] for pair in pairs],
+            timeout_s=AUGMENTATION_TIMEOUT_S,
+            fail_fast=False
+        )
+
+        by_type = {}
+        for i, pair in enumerate(pairs):
+            stats = by_type.setdefault(pair["type"], {"passed": 0, "total": 0})
+            stats["total"] += 1
+            if i < len(results):
+                success, result, _ = results[i]
+                if success and result == pair["output"]:
+                    stats["passed"] += 1
+
+        verification_log["augmentation_score"] = _score(by_type, color_shift=False)
+        verification_log["color_shift_score"] = _score(by_type, color_shift=True)
+        verification_log["augmentation_results"] = by_type
+        exec_cache = verification_log.setdefault("exec_cache", {"hits": 0, "misses": 0})
+        for key, value in cache_stats.items():
+            exec_cache[key] = exec_cache.get(key, 0) + value
+    except Exception as e:
+        print(f"DEBUG {log_prefix}: Augmentation check failed: {e}", file=sys.stderr)
+        verification_log["augmentation_error"] = f"{type(e).__name__}: {str(e)}"
+
 def extract_and_run_solver(llm_code: str, test_input_grid: list, train_examples: list = None, task_id: str = None, test_index: int = None) -> tuple[list | None, dict | None]:
     """
     Extracts Python code from LLM response, executes it using a robust sandbox (subprocess), 
@@ -93,13 +155,21 @@ def extract_and_run_solver(llm_code: str, test_input_grid: list, train_examples:
                 if start_idx != -1:
                     code = "\n".join(lines[start_idx:])
 
-        # Verification Step
+        # Verification + Test Execution in a single sandbox batch:
+        # the code is exec'd once, every input gets its own 10s budget, and the batch
+        # stops at the first train example that crashes, times out or mismatches.
+        # Inputs this exact (AST-normalized) code already ran on are served from the exec cache.
+        train_examples = train_examples or []
+        inputs = [ex.input for ex in train_examples] + [test_input_grid]
+        expected = [ex.output for ex in train_examples] + [None]
+        results, cache_stats = run_cached_batch(code, inputs, expected=expected, timeout_s=10.0, fail_fast=True)
+        verification_log["exec_cache"] = cache_stats
+
         if train_examples:
-            all_passed = True
             first_fail_status = None
             first_fail_index = -1
 
-            for i, ex in enumerate(train_examples):
+            for i, (ex, (success, result, logs)) in enumerate(zip(train_examples, results)):
                 entry = {
                     "index": i, 
                     "status": "UNKNOWN",
@@ -108,15 +178,6 @@ def extract_and_run_solver(llm_code: str, test_input_grid: list, train_examples:
                     "actual": None
                 }
                 
-                # Execute in Sandbox
-                exec_id = f"{task_id}:{test_index}:TRAIN:{i}:{time.time():.6f}"
-                # print(f"DEBUG_EXEC: START {exec_id}", file=sys.stderr)
-                try:
-                    success, result, logs = run_untrusted_code(code, ex.input, timeout_s=10.0)
-                finally:
-                    # print(f"DEBUG_EXEC: FINISH {exec_id}", file=sys.stderr)
-                    pass
-                
                 if not success:
                     print(f"DEBUG {log_prefix}: Solver FAILED on Train Example {i+1}: {result}\nDetails:\n{logs}", file=sys.stderr)
                     if result == "TIMEOUT_EXPIRED":
@@ -126,26 +187,24 @@ def extract_and_run_solver(llm_code: str, test_input_grid: list, train_examples:
                         entry["status"] = "CRASH"
                         entry["error"] = str(result) + "\n" + str(logs)
                     
-                    all_passed = False
-                    if first_fail_status is None:
-                        first_fail_status = "FAIL_CRASH"
-                        first_fail_index = i
+                    first_fail_status = "FAIL_CRASH"
+                    first_fail_index = i
                 else:
                     # Check Accuracy
                     # result is already sanitized by sandbox driver
                     entry["actual"] = result
                     if result != ex.output:
                         entry["status"] = "FAIL"
-                        all_passed = False
-                        if first_fail_status is None:
-                            first_fail_status = "FAIL_VERIFICATION"
-                            first_fail_index = i
+                        first_fail_status = "FAIL_VERIFICATION"
+                        first_fail_index = i
                     else:
                         entry["status"] = "PASS"
                 
                 verification_log["train_results"].append(entry)
+                if first_fail_status is not None:
+                    break
             
-            if not all_passed:
+            if first_fail_status is not None:
                 verification_log["status"] = first_fail_status
                 verification_log["failed_example_index"] = first_fail_index
                 return None, verification_log
@@ -153,17 +212,12 @@ def extract_and_run_solver(llm_code: str, test_input_grid: list, train_examples:
             verification_log["status"] = "PASS"
 
             # --- Augmentation Verification (Soft Check) ---
-            # Skipping implementation details for augmentation in this snippet to keep it focused on core replacement
-            # but in production you'd loop run_untrusted_code similarly.
+            # Never rejects a candidate; only scores how well it generalizes.
+            if _AUGMENTATION_CHECK_ENABLED:
+                run_augmentation_check(code, train_examples, verification_log, log_prefix)
             
-        # Test Execution
-        exec_id_test = f"{task_id}:{test_index}:TEST:{time.time():.6f}"
-        # print(f"DEBUG_EXEC: START {exec_id_test}", file=sys.stderr)
-        try:
-            success, result, logs = run_untrusted_code(code, test_input_grid, timeout_s=10.0)
-        finally:
-            # print(f"DEBUG_EXEC: FINISH {exec_id_test}", file=sys.stderr)
-            pass
+        # Test Execution (last entry of the batch)
+        success, result, logs = results[len(train_examples)]
         
         if success:
             if isinstance(result, list):
@@ -1,4 +1,9 @@
+import os
+from multiprocessing.managers import BaseManager
+
 from src.rate_limiter import RateLimiter
+from src.circuit_breaker import CircuitBreakerRegistry, set_circuit_breaker_registry
+from src.provider_health import ProviderHealth, set_provider_health
 from src.config import PROVIDER_RATE_LIMITS
 
 # Initialize global rate limiters per provider
@@ -9,6 +14,105 @@ LIMITERS = {
 
 _SCALED = False
 
+# When enabled, batch runs share one token bucket per provider across all worker processes
+# instead of giving each process a fixed 1/task_workers slice of the rate.
+_SHARED_ENABLED = os.getenv("ARC_AGI_SHARED_RATE_LIMITER", "true").lower() == "true"
+
+def set_shared_rate_limiter_enabled(enabled: bool):
+    global _SHARED_ENABLED
+    _SHARED_ENABLED = enabled
+
+def get_shared_rate_limiter_enabled() -> bool:
+    return _SHARED_ENABLED
+
+class RateLimitManager(BaseManager):
+    """
+    Server process holding the provider token buckets, circuit breakers and call stats shared by every task worker.
+    The buckets are also the run-wide model-run scheduler: each hands its tokens to the best-ranked
+    waiting call of any worker (see src/parallel/scheduler.py for the ranking).
+    """
+
+RateLimitManager.register("RateLimiter", RateLimiter, exposed=("try_acquire", "record_wait", "wait_stats", "level", "queued"))
+RateLimitManager.register("CircuitBreakerRegistry", CircuitBreakerRegistry, exposed=("before_call", "record_success", "record_failure", "snapshot"))
+RateLimitManager.register("ProviderHealth", ProviderHealth, exposed=("call_started", "call_finished", "snapshot"))
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Local handle on a bucket served by RateLimitManager.
+    Each attempt is one round trip to the server; waiting happens in the calling process.
+    """
+    is_remote = True
+
+    def __init__(self, remote):
+        self.remote = remote
+
+    def try_acquire(self, ticket: str = None, priority: tuple = None) -> float:
+        return self.remote.try_acquire(ticket, priority)
+
+    def record_wait(self, seconds: float):
+        self.remote.record_wait(seconds)
+
+    def wait_stats(self) -> dict:
+        return self.remote.wait_stats()
+
+    def level(self) -> float:
+        return self.remote.level()
+
+    def queued(self) -> int:
+        return self.remote.queued()
+
+def start_rate_limit_manager() -> RateLimitManager:
+    manager = RateLimitManager()
+    manager.start()
+    return manager
+
+def start_shared_rate_limiters():
+    """
+    Starts the manager process and creates one bucket per provider in it.
+    Returns (manager, proxies); the proxies can be passed to worker processes.
+    """
+    manager = start_rate_limit_manager()
+    proxies = {name: manager.RateLimiter(**config) for name, config in PROVIDER_RATE_LIMITS.items()}
+    return manager, proxies
+
+def set_shared_rate_limiters(proxies: dict):
+    """Routes this process's rate limiting through the shared buckets. Disables per-process scaling."""
+    global _SCALED
+    _SCALED = True
+    for name, proxy in proxies.items():
+        LIMITERS[name] = SharedRateLimiter(proxy)
+
+def start_shared_circuit_breakers(manager: RateLimitManager):
+    """Creates the batch-wide circuit breaker registry in the manager process; returns its proxy."""
+    return manager.CircuitBreakerRegistry()
+
+def set_shared_circuit_breakers(proxy):
+    """Routes this process's circuit breakers through the batch-wide registry, so one worker's
+    failures open the circuit for all of them."""
+    set_circuit_breaker_registry(proxy)
+
+def start_shared_provider_health(manager: RateLimitManager):
+    """Creates the batch-wide call stats in the manager process; returns their proxy."""
+    return manager.ProviderHealth()
+
+def set_shared_provider_health(proxy):
+    """Reports this process's model calls to the batch-wide stats read by the admission controller."""
+    set_provider_health(proxy)
+
+def get_rate_limit_wait_stats() -> dict:
+    """Queue wait stats per provider (global when the buckets are shared)."""
+    return {name: limiter.wait_stats() for name, limiter in LIMITERS.items()}
+
+def format_rate_limit_wait_stats(stats: dict) -> str:
+    parts = []
+    for name, s in stats.items():
+        if s["waited_calls"]:
+            avg = s["total_wait"] / s["waited_calls"]
+            parts.append(f"{name}: {s['waited_calls']} waited, total {s['total_wait']:.1f}s, avg {avg:.1f}s, max {s['max_wait']:.1f}s")
+        else:
+            parts.append(f"{name}: no waits")
+    return "; ".join(parts)
+
 def set_rate_limit_scaling(factor: float):
     """
     Scales the rate limits for all providers by a factor.
@@ -25,7 +129,7 @@ def set_rate_limit_scaling(factor: float):
     for name, limiter in LIMITERS.items():
         original_rate = limiter.rate
         new_rate = original_rate * factor
-        
+
         # Allow fractional rates (e.g. 0.04 RPM) for high worker counts
         if new_rate < 1e-6:
              new_rate = 1e-6 # Safety against zero
@@ -1,65 +1,182 @@
+import sys
 import time
+import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from src.parallel.worker import run_single_model
+from src.parallel.worker import run_single_model, run_single_model_async
+from src.async_runtime import get_async_providers_enabled, run_coroutine
+from src.parallel.scheduler import runs_queued, run_finished
+from src.deadline import cancel_at
+
+MAX_PARALLEL_MODELS = 20
+
+def _build_run_list(models_to_run, run_id_counts, step_name, prompt, train_examples, all_test_examples, codegen_version, prompt_key=None):
+    # Generate unique run IDs
+    run_list = []
+    for model_name in models_to_run:
+        count = run_id_counts.get(model_name, 0) + 1
+        run_id_counts[model_name] = count
+        run_id = f"{model_name}_{count}_{step_name}"
+
+        # Per-model prompt generation if codegen_version is provided
+        current_prompt = prompt
+        if codegen_version and prompt_key:
+            # Built once per (task, version, model) and shared with every run of that pair
+            from src.tasks.prompt_cache import cached_prompt_codegen
+            current_prompt = cached_prompt_codegen(prompt_key, train_examples, all_test_examples, codegen_version, model_name)
+        elif codegen_version:
+            from src.tasks import build_prompt_codegen
+            current_prompt = build_prompt_codegen(train_examples, test_examples=all_test_examples, version=codegen_version, model_name=model_name)
+            # Debug print for specific models if needed (we'll skip general printing to keep logs clean)
+
+        run_list.append({"name": model_name, "run_id": run_id, "prompt": current_prompt})
+    return run_list
+
+def _restore_runs(run_list, checkpoint, step_name):
+    """Splits run_list into runs still to execute and results restored from a checkpoint (under the new run ids)."""
+    if checkpoint is None:
+        return run_list, []
+    to_run, restored = [], []
+    for run in run_list:
+        res = checkpoint.take_run(step_name, run["name"])
+        if res is None:
+            to_run.append(run)
+        else:
+            restored.append({**res, "run_id": run["run_id"], "prompt": run["prompt"]})
+    return to_run, restored
+
+def _report_progress(total_tasks, completed_count, completion_message, on_task_complete):
+    # Handle progress updates
+    if on_task_complete:
+        on_task_complete()
+    elif completion_message:
+        remaining = total_tasks - completed_count
+        print(f"{completion_message}: {remaining} left")
+
+def _record_run(checkpoint, step_name, model_name, res, cancel_token):
+    # A run cut short by cancellation never finished, so a resume must not take it as done
+    if checkpoint is None or (cancel_token is not None and cancel_token.cancelled and res.get("grid") is None):
+        return
+    checkpoint.record_run(step_name, model_name, res)
+
+def _log_queue_wait(queue_time, run_id):
+    start_wait = time.time() - queue_time
+    if start_wait > 0.1:  # Only print if waiting more than 100ms
+        print(f"DEBUG: Task {run_id} waited in queue for {start_wait:.2f}s", file=sys.stderr)
+
+def run_models_in_parallel(models_to_run, run_id_counts, step_name, prompt, test_example, openai_client, anthropic_client, google_keys, verbose, image_path=None, run_timestamp=None, task_id=None, test_index=None, completion_message: str = None, on_task_complete=None, use_background=False, execution_mode="grid", train_examples=None, all_test_examples=None, codegen_version: str = None, prompt_key: str = None, checkpoint=None, cancel_token=None, on_result=None, deadline=None):
+    if get_async_providers_enabled():
+        # The calling thread only waits; every model call runs on the process-wide event loop
+        return run_coroutine(run_models_in_parallel_async(
+            models_to_run, run_id_counts, step_name, prompt, test_example, openai_client, anthropic_client, google_keys, verbose,
+            image_path=image_path, run_timestamp=run_timestamp, task_id=task_id, test_index=test_index,
+            completion_message=completion_message, on_task_complete=on_task_complete, use_background=use_background,
+            execution_mode=execution_mode, train_examples=train_examples, all_test_examples=all_test_examples,
+            codegen_version=codegen_version, prompt_key=prompt_key, checkpoint=checkpoint,
+            cancel_token=cancel_token, on_result=on_result, deadline=deadline
+        ))
 
-def run_models_in_parallel(models_to_run, run_id_counts, step_name, prompt, test_example, openai_client, anthropic_client, google_keys, verbose, image_path=None, run_timestamp=None, task_id=None, test_index=None, completion_message: str = None, on_task_complete=None, use_background=False, execution_mode="grid", train_examples=None, all_test_examples=None, codegen_version: str = None):
     all_results = []
-    
+
     # Wrapper for debugging queue times
     def debug_run_single_model(queue_time, *args, **kwargs):
-        start_wait = time.time() - queue_time
-        if start_wait > 0.1:  # Only print if waiting more than 100ms
-            import sys
-            run_id = args[1] if len(args) > 1 else kwargs.get('run_id', 'unknown')
-            print(f"DEBUG: Task {run_id} waited in queue for {start_wait:.2f}s", file=sys.stderr)
-        return run_single_model(*args, **kwargs)
-
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        
-        # Generate unique run IDs
-        run_list = []
-        for model_name in models_to_run:
-            count = run_id_counts.get(model_name, 0) + 1
-            run_id_counts[model_name] = count
-            run_id = f"{model_name}_{count}_{step_name}"
-            
-            # Per-model prompt generation if codegen_version is provided
-            current_prompt = prompt
-            if codegen_version:
-                from src.tasks import build_prompt_codegen
-                current_prompt = build_prompt_codegen(train_examples, test_examples=all_test_examples, version=codegen_version, model_name=model_name)
-                # Debug print for specific models if needed (we'll skip general printing to keep logs clean)
-
-            run_list.append({"name": model_name, "run_id": run_id, "prompt": current_prompt})
-
-        future_to_run_id = {
+        run_id = args[1] if len(args) > 1 else kwargs.get('run_id', 'unknown')
+        _log_queue_wait(queue_time, run_id)
+        try:
+            return run_single_model(*args, **kwargs)
+        finally:
+            run_finished()
+
+    # Runs still going when the deadline passes are cancelled like those of a decided consensus
+    with cancel_at(cancel_token, deadline) as cancel_token, ThreadPoolExecutor(max_workers=MAX_PARALLEL_MODELS) as executor:
+        run_list = _build_run_list(models_to_run, run_id_counts, step_name, prompt, train_examples, all_test_examples, codegen_version, prompt_key)
+        run_list, all_results = _restore_runs(run_list, checkpoint, step_name)
+        # Outstanding runs rank this task's calls in the run-wide scheduler
+        runs_queued(len(run_list))
+
+        future_to_run = {
             executor.submit(
                 debug_run_single_model,
                 time.time(), # Capture queue time
-                run["name"], run["run_id"], run["prompt"], test_example, openai_client, anthropic_client, google_keys, verbose, image_path, run_timestamp, task_id, test_index, step_name, use_background, execution_mode, train_examples, all_test_examples
-            ): run["run_id"]
+                run["name"], run["run_id"], run["prompt"], test_example, openai_client, anthropic_client, google_keys, verbose, image_path, run_timestamp, task_id, test_index, step_name, use_background, execution_mode, train_examples, all_test_examples,
+                cancel_token=cancel_token, deadline=deadline
+            ): run
             for run in run_list
         }
 
-        total_tasks = len(future_to_run_id)
+        total_tasks = len(future_to_run) + len(all_results)
         completed_count = 0
+        for res in all_results:
+            completed_count += 1
+            if on_result:
+                on_result(res)
+            _report_progress(total_tasks, completed_count, completion_message, on_task_complete)
 
-        for future in as_completed(future_to_run_id):
+        for future in as_completed(future_to_run):
             completed_count += 1
-            run_id = future_to_run_id[future]
+            run_id = future_to_run[future]["run_id"]
             try:
                 res = future.result()
                 if res:
                     all_results.append(res)
-                
-                # Handle progress updates
-                if on_task_complete:
-                    on_task_complete()
-                elif completion_message:
-                    remaining = total_tasks - completed_count
-                    print(f"{completion_message}: {remaining} left")
-                    
+                    _record_run(checkpoint, step_name, future_to_run[future]["name"], res, cancel_token)
+                if on_result:
+                    on_result(res)
+                _report_progress(total_tasks, completed_count, completion_message, on_task_complete)
+
             except Exception as e:
                 print(f"Model run {run_id} failed: {e}")
-                
+
+    return all_results
+
+async def run_models_in_parallel_async(models_to_run, run_id_counts, step_name, prompt, test_example, openai_client, anthropic_client, google_keys, verbose, image_path=None, run_timestamp=None, task_id=None, test_index=None, completion_message: str = None, on_task_complete=None, use_background=False, execution_mode="grid", train_examples=None, all_test_examples=None, codegen_version: str = None, prompt_key: str = None, checkpoint=None, cancel_token=None, on_result=None, deadline=None):
+    """
+    Coroutine version of run_models_in_parallel (same arguments and results).
+    Runs are coroutines on one event loop, at most MAX_PARALLEL_MODELS in flight, instead of pool threads.
+    """
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_MODELS)
+    run_list = _build_run_list(models_to_run, run_id_counts, step_name, prompt, train_examples, all_test_examples, codegen_version, prompt_key)
+    run_list, all_results = _restore_runs(run_list, checkpoint, step_name)
+    runs_queued(len(run_list))
+
+    async def _run(run, queue_time):
+        async with semaphore:
+            _log_queue_wait(queue_time, run["run_id"])
+            try:
+                return run, await run_single_model_async(
+                    run["name"], run["run_id"], run["prompt"], test_example, openai_client, anthropic_client, google_keys, verbose, image_path, run_timestamp, task_id, test_index, step_name, use_background, execution_mode, train_examples, all_test_examples,
+                    cancel_token=cancel_token, deadline=deadline
+                ), None
+            except Exception as e:
+                return run, None, e
+            finally:
+                run_finished()
+
+    with cancel_at(cancel_token, deadline) as cancel_token:
+        queue_time = time.time()
+        pending = [asyncio.ensure_future(_run(run, queue_time)) for run in run_list]
+        total_tasks = len(pending) + len(all_results)
+        completed_count = 0
+        for res in all_results:
+            completed_count += 1
+            if on_result:
+                on_result(res)
+            _report_progress(total_tasks, completed_count, completion_message, on_task_complete)
+
+        for next_done in asyncio.as_completed(pending):
+            run, res, error = await next_done
+            run_id = run["run_id"]
+            completed_count += 1
+            if error is not None:
+                print(f"Model run {run_id} failed: {error}")
+                continue
+            if res:
+                all_results.append(res)
+                _record_run(checkpoint, step_name, run["name"], res, cancel_token)
+            try:
+                if on_result:
+                    on_result(res)
+                _report_progress(total_tasks, completed_count, completion_message, on_task_complete)
+            except Exception as e:
+                print(f"Model run {run_id} failed: {e}")
+
     return all_results
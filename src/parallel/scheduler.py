@@ -0,0 +1,60 @@
+import os
+import threading
+from typing import Optional
+
+# When enabled, model calls wait for provider tokens in priority order instead of racing for them.
+# In batch runs the buckets are shared, so the order holds across all task workers.
+_RUN_SCHEDULER_ENABLED = os.getenv("ARC_AGI_RUN_SCHEDULER", "true").lower() == "true"
+
+# Priority classes (lower goes first): search before the deeper step 5 work, judges last.
+# A waiting call moves up one class per rate_limiter.PRIORITY_AGING_S, so no class starves.
+PRIORITY_STEP_1 = 0
+PRIORITY_STEPS_2_4 = 1
+PRIORITY_STEP_5 = 2
+PRIORITY_JUDGE = 3
+
+# step_name of judge calls
+JUDGE_STEP = "judge"
+
+def set_run_scheduler_enabled(enabled: bool):
+    global _RUN_SCHEDULER_ENABLED
+    _RUN_SCHEDULER_ENABLED = enabled
+
+def get_run_scheduler_enabled() -> bool:
+    return _RUN_SCHEDULER_ENABLED
+
+# Model runs of this process's task that are queued or running. A task worker runs one
+# task:test unit at a time, so fewer outstanding runs means the unit is closer to done.
+_OUTSTANDING_RUNS = 0
+_OUTSTANDING_LOCK = threading.Lock()
+
+def runs_queued(count: int):
+    global _OUTSTANDING_RUNS
+    with _OUTSTANDING_LOCK:
+        _OUTSTANDING_RUNS += count
+
+def run_finished():
+    global _OUTSTANDING_RUNS
+    with _OUTSTANDING_LOCK:
+        _OUTSTANDING_RUNS = max(0, _OUTSTANDING_RUNS - 1)
+
+def outstanding_runs() -> int:
+    return _OUTSTANDING_RUNS
+
+def priority_class(step_name: Optional[str]) -> int:
+    if step_name == JUDGE_STEP:
+        return PRIORITY_JUDGE
+    if step_name and step_name.startswith("step_1"):
+        return PRIORITY_STEP_1
+    if step_name and step_name.startswith(("step_2", "step_3", "step_4")):
+        return PRIORITY_STEPS_2_4
+    return PRIORITY_STEP_5
+
+def run_priority(step_name: Optional[str]) -> Optional[tuple]:
+    """
+    Rank of a model call waiting for a provider token: (class, outstanding runs of its task).
+    Within a class, calls of nearly finished tasks go first. None when the scheduler is disabled.
+    """
+    if not _RUN_SCHEDULER_ENABLED:
+        return None
+    return (priority_class(step_name), outstanding_runs())
@@ -1,17 +1,131 @@
 import sys
 import os
+import asyncio
 import traceback
 from typing import Optional, List, Dict
 
 from src.grid import parse_grid_from_text, verify_prediction
 from src.logging import log_failure
+from src.errors import RunCancelledError
+from src.cancellation import cancel_scope, check_cancelled, cancel_current_task
+from src.deadline import deadline_scope
 from src.parallel.codegen import extract_and_run_solver
 
 # Refactored modules
-from src.parallel.worker_utils.model_execution import execute_model_call, ExecutionContext
-from src.parallel.worker_utils.v3_pipeline import run_v3_pipeline
+from src.parallel.worker_utils.model_execution import execute_model_call, execute_model_call_async, ExecutionContext
+from src.parallel.worker_utils.v3_pipeline import run_v3_pipeline, run_v3_pipeline_async
 from src.parallel.worker_utils.results import format_worker_result
 
+def _run_prefix(run_id, task_id, test_index) -> str:
+    prefix = f"[{run_id}]"
+    if task_id is not None:
+         prefix = f"[{run_id}|{task_id}:{test_index}]"
+    return prefix
+
+def _extract_and_verify(grid_text, test_example, execution_mode, train_examples, task_id, test_index, verbose, prefix):
+    """Extraction & execution, then verification. Returns (predicted_grid, verification_details, is_correct)."""
+    predicted_grid = None
+    verification_details = None
+    
+    if execution_mode in ("code", "v3", "v4"):
+        try:
+            predicted_grid, verification_details = extract_and_run_solver(
+                grid_text, 
+                test_example.input, 
+                train_examples=train_examples, 
+                task_id=task_id, 
+                test_index=test_index
+            )
+        except Exception as e:
+            if verbose:
+                print(f"{prefix} Code Execution Failed: {e}")
+            if verification_details is None:
+                verification_details = {
+                    "status": "FAIL_EXTRACTOR_CRASH",
+                    "error": str(e),
+                    "traceback": traceback.format_exc()
+                }
+    else:
+        try:
+            predicted_grid = parse_grid_from_text(grid_text)
+        except ValueError as e:
+            if verbose:
+                print(f"{prefix} Result: FAIL (Parse Error: {e})")
+
+    # 4. Verification
+    is_correct = False
+    try:
+        is_correct = verify_prediction(predicted_grid, test_example.output)
+        
+        if verbose:
+            result_str = "PASS" if is_correct else ("FAIL" if is_correct is False else "UNKNOWN")
+            print(f"{prefix} Result: {result_str}")
+            
+    except ValueError:
+        is_correct = False
+
+    return predicted_grid, verification_details, is_correct
+
+def _failure_result(e, model_name, original_model_name, run_id, context, prompt, verification_details, v3_details, detailed_logs, run_timestamp, task_id, test_index):
+    # Check for concise error types
+    error_str = str(e)
+    error_lower = error_str.lower()
+    concise_msg = None
+    cancelled = isinstance(e, RunCancelledError)
+    
+    if "openai" in error_lower and ("max_output_tokens" in error_lower or "hit token limit" in error_lower):
+        concise_msg = "Err: FAIL: OpenAI Max Tokens"
+    elif "openai" in error_lower and "timed out after" in error_lower:
+        concise_msg = "Err: FAIL: OpenAI Timeout 3300s"
+    elif "violating our usage policy" in error_lower:
+        concise_msg = "Err: FAIL: OpenAI Policy Violation"
+    elif "server_error" in error_lower:
+        concise_msg = "Err: FAIL: OpenAI Server Error"
+    elif "claude-opus" in error_lower and ("peer closed connection" in error_lower or "incomplete chunked read" in error_lower):
+        concise_msg = "Err: FAIL: Claude Connection Closed"
+    elif "gemini" in error_lower and ("499" in error_lower or "cancelled" in error_lower):
+        concise_msg = "Err: FAIL: Gemini Cancelled (499)"
+
+    if cancelled:
+        # Not a failure: the step no longer needs this run and reports that once
+        pass
+    elif concise_msg:
+         # Brief summary to stdout
+         print(concise_msg)
+    else:
+        # Full critical error dump to stderr
+        error_msg = f"\n!!! CRITICAL ERROR in {model_name} ({run_id}) !!!\n{str(e)}\n{traceback.format_exc()}\n"
+        try:
+            os.write(2, error_msg.encode('utf-8', errors='replace'))
+        except OSError:
+            pass
+
+        print(f"Error during execution: {e}", file=sys.stderr)
+    
+    if run_timestamp and not cancelled:
+         log_failure(
+            run_timestamp=run_timestamp,
+            task_id=task_id if task_id else "UNKNOWN",
+            run_id=run_id,
+            error=e,
+            model=model_name,
+            test_index=test_index
+        )
+        
+    return format_worker_result(
+        model_name=model_name,
+        requested_model=original_model_name,
+        run_id=run_id,
+        grid=None,
+        is_correct=False,
+        context=context, # May be partial
+        prompt=prompt,
+        verification_details=verification_details,
+        v3_details=v3_details,
+        detailed_logs=detailed_logs,
+        error_message=str(e)
+    )
+
 def run_single_model(
     model_name, 
     run_id, 
@@ -29,12 +143,12 @@ def run_single_model(
     use_background=False, 
     execution_mode="grid", 
     train_examples=None, 
-    all_test_examples=None
+    all_test_examples=None,
+    cancel_token=None,
+    deadline=None
 ):
     original_model_name = model_name
-    prefix = f"[{run_id}]"
-    if task_id is not None:
-         prefix = f"[{run_id}|{task_id}:{test_index}]"
+    prefix = _run_prefix(run_id, task_id, test_index)
     
     if verbose:
         print(f"{prefix} Initiating call...")
@@ -52,44 +166,132 @@ def run_single_model(
     verification_details = None
     detailed_logs = None
 
-    try:
-        # 1. Execute Main Model Call
-        response = execute_model_call(
-            client_config=client_config,
-            prompt=prompt,
-            model_name=model_name,
-            context=context,
-            verbose=verbose,
-            prefix=prefix,
-            image_path=image_path,
-            task_id=task_id,
-            test_index=test_index,
-            step_name=step_name,
-            use_background=use_background,
-            run_timestamp=run_timestamp,
-            execution_mode=execution_mode
-        )
-        detailed_logs = getattr(response, "detailed_logs", None)
+    with cancel_scope(cancel_token), deadline_scope(deadline):
+        try:
+            # Runs still queued when the step is cancelled never start
+            check_cancelled()
+
+            # 1. Execute Main Model Call
+            response = execute_model_call(
+                client_config=client_config,
+                prompt=prompt,
+                model_name=model_name,
+                context=context,
+                verbose=verbose,
+                prefix=prefix,
+                image_path=image_path,
+                task_id=task_id,
+                test_index=test_index,
+                step_name=step_name,
+                use_background=use_background,
+                run_timestamp=run_timestamp,
+                execution_mode=execution_mode
+            )
+            detailed_logs = getattr(response, "detailed_logs", None)
+
+            # Handle fallback
+            if response.model_name and response.model_name != model_name:
+                if verbose:
+                    print(f"{prefix} Model fallback occurred: {model_name} -> {response.model_name}")
+                run_id = run_id.replace(model_name, response.model_name, 1)
+                model_name = response.model_name
 
-        # Handle fallback
-        if response.model_name and response.model_name != model_name:
             if verbose:
-                print(f"{prefix} Model fallback occurred: {model_name} -> {response.model_name}")
-            run_id = run_id.replace(model_name, response.model_name, 1)
-            model_name = response.model_name
+                print(f"{prefix} Response received.")
 
-        if verbose:
-            print(f"{prefix} Response received.")
+            grid_text = response.text
+
+            # 2. V3 Pipeline (Optional)
+            if execution_mode == "v3":
+                grid_text, v3_details = run_v3_pipeline(
+                    hypothesis_plan=grid_text,
+                    train_examples=train_examples,
+                    all_test_examples=all_test_examples,
+                    client_config=client_config,
+                    model_name=model_name,
+                    context=context,
+                    verbose=verbose,
+                    prefix=prefix,
+                    image_path=image_path,
+                    task_id=task_id,
+                    test_index=test_index,
+                    step_name=step_name,
+                    use_background=use_background,
+                    run_timestamp=run_timestamp,
+                    execution_mode=execution_mode
+                )
+
+            # 3. Extraction & Execution, 4. Verification
+            predicted_grid, verification_details, is_correct = _extract_and_verify(
+                grid_text, test_example, execution_mode, train_examples, task_id, test_index, verbose, prefix
+            )
+
+            return format_worker_result(
+                model_name=model_name,
+                requested_model=original_model_name,
+                run_id=run_id,
+                grid=predicted_grid,
+                is_correct=is_correct,
+                context=context,
+                prompt=prompt,
+                verification_details=verification_details,
+                v3_details=v3_details,
+                detailed_logs=detailed_logs
+            )
 
-        grid_text = response.text
+        except Exception as e:
+            return _failure_result(e, model_name, original_model_name, run_id, context, prompt, verification_details, v3_details, detailed_logs, run_timestamp, task_id, test_index)
 
-        # 2. V3 Pipeline (Optional)
-        if execution_mode == "v3":
-            grid_text, v3_details = run_v3_pipeline(
-                hypothesis_plan=grid_text,
-                train_examples=train_examples,
-                all_test_examples=all_test_examples,
+async def run_single_model_async(
+    model_name, 
+    run_id, 
+    prompt, 
+    test_example, 
+    openai_client, 
+    anthropic_client, 
+    google_keys, 
+    verbose, 
+    image_path=None, 
+    run_timestamp=None, 
+    task_id=None, 
+    test_index=None, 
+    step_name=None, 
+    use_background=False, 
+    execution_mode="grid", 
+    train_examples=None, 
+    all_test_examples=None,
+    cancel_token=None,
+    deadline=None
+):
+    """
+    Coroutine version of run_single_model (same arguments, sync clients).
+    Model calls are awaited on the event loop; sandbox execution runs in the loop's default executor.
+    """
+    original_model_name = model_name
+    prefix = _run_prefix(run_id, task_id, test_index)
+
+    if verbose:
+        print(f"{prefix} Initiating call...")
+        if image_path:
+            print(f"{prefix} Including image: {image_path}")
+
+    context = ExecutionContext()
+    client_config = {
+        'openai_client': openai_client,
+        'anthropic_client': anthropic_client,
+        'google_keys': google_keys
+    }
+
+    v3_details = None
+    verification_details = None
+    detailed_logs = None
+
+    with cancel_scope(cancel_token), deadline_scope(deadline), cancel_current_task():
+        try:
+            check_cancelled()
+            response = await execute_model_call_async(
                 client_config=client_config,
+                prompt=prompt,
                 model_name=model_name,
                 context=context,
                 verbose=verbose,
@@ -102,112 +304,62 @@ def run_single_model(
                 run_timestamp=run_timestamp,
                 execution_mode=execution_mode
             )
+            detailed_logs = getattr(response, "detailed_logs", None)
 
-        # 3. Extraction & Execution
-        predicted_grid = None
-        
-        if execution_mode in ("code", "v3", "v4"):
-            try:
-                predicted_grid, verification_details = extract_and_run_solver(
-                    grid_text, 
-                    test_example.input, 
-                    train_examples=train_examples, 
-                    task_id=task_id, 
-                    test_index=test_index
-                )
-            except Exception as e:
-                if verbose:
-                    print(f"{prefix} Code Execution Failed: {e}")
-                if verification_details is None:
-                    verification_details = {
-                        "status": "FAIL_EXTRACTOR_CRASH",
-                        "error": str(e),
-                        "traceback": traceback.format_exc()
-                    }
-        else:
-            try:
-                predicted_grid = parse_grid_from_text(grid_text)
-            except ValueError as e:
+            # Handle fallback
+            if response.model_name and response.model_name != model_name:
                 if verbose:
-                    print(f"{prefix} Result: FAIL (Parse Error: {e})")
+                    print(f"{prefix} Model fallback occurred: {model_name} -> {response.model_name}")
+                run_id = run_id.replace(model_name, response.model_name, 1)
+                model_name = response.model_name
 
-        # 4. Verification
-        is_correct = False
-        try:
-            is_correct = verify_prediction(predicted_grid, test_example.output)
-            
             if verbose:
-                result_str = "PASS" if is_correct else ("FAIL" if is_correct is False else "UNKNOWN")
-                print(f"{prefix} Result: {result_str}")
-                
-        except ValueError:
-            is_correct = False
-
-        return format_worker_result(
-            model_name=model_name,
-            requested_model=original_model_name,
-            run_id=run_id,
-            grid=predicted_grid,
-            is_correct=is_correct,
-            context=context,
-            prompt=prompt,
-            verification_details=verification_details,
-            v3_details=v3_details,
-            detailed_logs=detailed_logs
-        )
+                print(f"{prefix} Response received.")
 
-    except Exception as e:
-        # Check for concise error types
-        error_str = str(e)
-        error_lower = error_str.lower()
-        concise_msg = None
-        
-        if "openai" in error_lower and ("max_output_tokens" in error_lower or "hit token limit" in error_lower):
-            concise_msg = "Err: FAIL: OpenAI Max Tokens"
-        elif "openai" in error_lower and "timed out after" in error_lower:
-            concise_msg = "Err: FAIL: OpenAI Timeout 3300s"
-        elif "violating our usage policy" in error_lower:
-            concise_msg = "Err: FAIL: OpenAI Policy Violation"
-        elif "server_error" in error_lower:
-            concise_msg = "Err: FAIL: OpenAI Server Error"
-        elif "claude-opus" in error_lower and ("peer closed connection" in error_lower or "incomplete chunked read" in error_lower):
-            concise_msg = "Err: FAIL: Claude Connection Closed"
-        elif "gemini" in error_lower and ("499" in error_lower or "cancelled" in error_lower):
-            concise_msg = "Err: FAIL: Gemini Cancelled (499)"
-
-        if concise_msg:
-             # Brief summary to stdout
-             print(concise_msg)
-        else:
-            # Full critical error dump to stderr
-            error_msg = f"\n!!! CRITICAL ERROR in {model_name} ({run_id}) !!!\n{str(e)}\n{traceback.format_exc()}\n"
-            try:
-                os.write(2, error_msg.encode('utf-8', errors='replace'))
-            except OSError:
-                pass
-
-            print(f"Error during execution: {e}", file=sys.stderr)
-        
-        if run_timestamp:
-             log_failure(
-                run_timestamp=run_timestamp,
-                task_id=task_id if task_id else "UNKNOWN",
+            grid_text = response.text
+
+            if execution_mode == "v3":
+                grid_text, v3_details = await run_v3_pipeline_async(
+                    hypothesis_plan=grid_text,
+                    train_examples=train_examples,
+                    all_test_examples=all_test_examples,
+                    client_config=client_config,
+                    model_name=model_name,
+                    context=context,
+                    verbose=verbose,
+                    prefix=prefix,
+                    image_path=image_path,
+                    task_id=task_id,
+                    test_index=test_index,
+                    step_name=step_name,
+                    use_background=use_background,
+                    run_timestamp=run_timestamp,
+                    execution_mode=execution_mode
+                )
+
+            predicted_grid, verification_details, is_correct = await asyncio.to_thread(
+                _extract_and_verify,
+                grid_text, test_example, execution_mode, train_examples, task_id, test_index, verbose, prefix
+            )
+
+            return format_worker_result(
+                model_name=model_name,
+                requested_model=original_model_name,
                 run_id=run_id,
-                error=e,
-                model=model_name,
-                test_index=test_index
+                grid=predicted_grid,
+                is_correct=is_correct,
+                context=context,
+                prompt=prompt,
+                verification_details=verification_details,
+                v3_details=v3_details,
+                detailed_logs=detailed_logs
             )
-            
-        return format_worker_result(
-            model_name=model_name,
-            requested_model=original_model_name,
-            run_id=run_id,
-            grid=None,
-            is_correct=False,
-            context=context, # May be partial
-            prompt=prompt,
-            verification_details=verification_details,
-            v3_details=v3_details,
-            detailed_logs=detailed_logs,
-            error_message=str(e)
-        )
+
+        except Exception as e:
+            return _failure_result(e, model_name, original_model_name, run_id, context, prompt, verification_details, v3_details, detailed_logs, run_timestamp, task_id, test_index)
+        except asyncio.CancelledError:
+            if cancel_token is None or not cancel_token.cancelled:
+                raise
+            # cancel_current_task interrupted the call
+            e = RunCancelledError(f"Run cancelled: {cancel_token.reason}")
+            return _failure_result(e, model_name, original_model_name, run_id, context, prompt, verification_details, v3_details, detailed_logs, run_timestamp, task_id, test_index)
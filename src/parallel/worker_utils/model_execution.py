@@ -1,8 +1,9 @@
 import time
 from typing import List, Dict, Any, Optional
 
-from src.models import call_model, parse_model_arg, calculate_cost
-from src.parallel.worker_utils.tokens import acquire_rate_limit_token
+from src.models import call_model, call_model_async, parse_model_arg, calculate_cost
+from src.parallel.worker_utils.tokens import acquire_rate_limit_token, acquire_rate_limit_token_async
+from src.async_runtime import get_async_openai_client, get_async_anthropic_client
 
 class ExecutionContext:
     def __init__(self):
@@ -12,6 +13,7 @@ class ExecutionContext:
         self.output_tokens = 0
         self.thought_tokens = 0
         self.cached_tokens = 0
+        self.cache_write_tokens = 0
         self.timings = []
         self.full_response = ""
 
@@ -21,6 +23,7 @@ class ExecutionContext:
         self.output_tokens += response.completion_tokens
         self.thought_tokens += response.thought_tokens
         self.cached_tokens += response.cached_tokens
+        self.cache_write_tokens += response.cache_write_tokens
         
         try:
             model_config = parse_model_arg(model_name)
@@ -43,8 +46,8 @@ def execute_model_call(
     run_timestamp: str = None,
     execution_mode: str = "grid"
 ):
-    # Acquire token
-    acquire_rate_limit_token(model_name, verbose, prefix)
+    # Acquire token (in the run-wide priority order)
+    acquire_rate_limit_token(model_name, verbose, prefix, step_name)
 
     start_ts = time.perf_counter()
     
@@ -81,3 +84,43 @@ def execute_model_call(
     context.update_from_response(response, model_name)
     
     return response
+
+async def execute_model_call_async(
+    client_config: Dict[str, Any],
+    prompt: str,
+    model_name: str,
+    context: ExecutionContext,
+    verbose: bool = False,
+    prefix: str = "",
+    image_path: str = None,
+    task_id: str = None,
+    test_index: int = None,
+    step_name: str = None,
+    use_background: bool = False,
+    run_timestamp: str = None,
+    execution_mode: str = "grid"
+):
+    """Coroutine version of execute_model_call. client_config holds the sync clients; their async twins are used."""
+    await acquire_rate_limit_token_async(model_name, verbose, prefix, step_name)
+
+    start_ts = time.perf_counter()
+    response = await call_model_async(
+        openai_client=get_async_openai_client(client_config['openai_client']),
+        anthropic_client=get_async_anthropic_client(client_config['anthropic_client']),
+        google_keys=client_config['google_keys'],
+        prompt=prompt,
+        model_arg=model_name,
+        image_path=image_path,
+        return_strategy=False,
+        verbose=verbose,
+        task_id=task_id,
+        test_index=test_index,
+        step_name=step_name,
+        use_background=use_background,
+        run_timestamp=run_timestamp,
+        timing_tracker=context.timings,
+        enable_code_execution=(execution_mode == "v4")
+    )
+    context.duration += time.perf_counter() - start_ts
+    context.update_from_response(response, model_name)
+    return response
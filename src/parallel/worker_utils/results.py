@@ -39,6 +39,7 @@ def format_worker_result(
             "output_tokens": context.output_tokens + context.thought_tokens,
             "reasoning_tokens": context.thought_tokens,
             "cached_tokens": context.cached_tokens,
+            "cache_write_tokens": context.cache_write_tokens,
             "timing_breakdown": context.timings,
         })
     else:
@@ -49,6 +50,7 @@ def format_worker_result(
             "output_tokens": 0,
             "reasoning_tokens": 0,
             "cached_tokens": 0,
+            "cache_write_tokens": 0,
             "timing_breakdown": [],
         })
 
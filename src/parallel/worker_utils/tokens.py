@@ -1,17 +1,39 @@
 import sys
 from src.models import parse_model_arg
 from src.parallel.limiter import LIMITERS
+from src.llm_transport import is_offline
+from src.parallel.scheduler import run_priority
 
-def acquire_rate_limit_token(model_name: str, verbose: bool = False, prefix: str = ""):
+def _limiter_for(model_name: str):
+    # Replayed and synthetic calls reach no provider, so its rate limit does not apply
+    if is_offline():
+        return None, None
+    model_config = parse_model_arg(model_name)
+    provider = model_config.provider
+    if provider == "gemini": # Map internal name to config key
+        provider = "google"
+    return LIMITERS.get(provider), provider
+
+def _log_rate_limit_wait(waited: float, provider: str, prefix: str):
+    if waited > 0.1:  # Only print if waiting more than 100ms
+        print(f"DEBUG: {prefix} waited {waited:.2f}s for {provider} rate limit token", file=sys.stderr)
+
+def acquire_rate_limit_token(model_name: str, verbose: bool = False, prefix: str = "", step_name: str = None):
+    try:
+        limiter, provider = _limiter_for(model_name)
+        if limiter is not None:
+            if verbose:
+                print(f"{prefix} Waiting for rate limit token ({provider})...")
+            _log_rate_limit_wait(limiter.acquire(run_priority(step_name)), provider, prefix)
+    except Exception as e:
+        print(f"{prefix} Warning: Failed to acquire rate limit token: {e}", file=sys.stderr)
+
+async def acquire_rate_limit_token_async(model_name: str, verbose: bool = False, prefix: str = "", step_name: str = None):
     try:
-        model_config = parse_model_arg(model_name)
-        provider = model_config.provider
-        if provider == "gemini": # Map internal name to config key
-            provider = "google"
-        
-        if provider in LIMITERS:
+        limiter, provider = _limiter_for(model_name)
+        if limiter is not None:
             if verbose:
                 print(f"{prefix} Waiting for rate limit token ({provider})...")
-            LIMITERS[provider].acquire()
+            _log_rate_limit_wait(await limiter.acquire_async(run_priority(step_name)), provider, prefix)
     except Exception as e:
         print(f"{prefix} Warning: Failed to acquire rate limit token: {e}", file=sys.stderr)
@@ -0,0 +1,98 @@
+import sys
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from src.errors import RateLimitProviderError
+from src.retry_policy import retries_exhausted
+
+# Finished calls older than this drop out of the stats
+HEALTH_WINDOW_S = 300.0
+
+class ProviderHealth:
+    """
+    Thread-safe load and health stats of model calls by provider/model key: calls in flight, and
+    for recently finished calls their latency and the rate limits (429s) they hit.
+    Served to all task workers by RateLimitManager and read by the batch's admission controller.
+    """
+    def __init__(self, window_s: float = HEALTH_WINDOW_S):
+        self.window_s = window_s
+        self.in_flight = {}
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def call_started(self, key: str):
+        with self.lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+
+    def call_finished(self, key: str, duration: float, rate_limits: int = 0):
+        with self.lock:
+            self.in_flight[key] = max(0, self.in_flight.get(key, 0) - 1)
+            self.finished.setdefault(key, deque()).append((time.monotonic(), duration, rate_limits))
+
+    def snapshot(self, window_s: float = None) -> dict:
+        """{key: {in_flight, calls, rate_limits, p95_s}} over the calls finished in the last window_s."""
+        window_s = self.window_s if window_s is None else min(window_s, self.window_s)
+        now = time.monotonic()
+        stats = {}
+        with self.lock:
+            for key in set(self.in_flight) | set(self.finished):
+                finished = self.finished.get(key, deque())
+                while finished and now - finished[0][0] > self.window_s:
+                    finished.popleft()
+                recent = [(duration, rate_limits) for end, duration, rate_limits in finished if now - end <= window_s]
+                durations = sorted(duration for duration, _ in recent)
+                stats[key] = {
+                    "in_flight": self.in_flight.get(key, 0),
+                    "calls": len(recent),
+                    "rate_limits": sum(rate_limits for _, rate_limits in recent),
+                    "p95_s": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None,
+                }
+        return stats
+
+# The batch-wide stats in task workers; None when nobody reads them (single process runs)
+_HEALTH = None
+
+def set_provider_health(health):
+    global _HEALTH
+    _HEALTH = health
+
+def get_provider_health():
+    return _HEALTH
+
+# Rate limits hit by the logical call running in this context
+_RATE_LIMITS: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("call_rate_limits", default=None)
+
+@contextmanager
+def track_call(key: str) -> Iterator[None]:
+    """Counts the enclosed logical call (retries included) as in flight for key, then reports its latency and 429s."""
+    health = _HEALTH
+    if health is None:
+        yield
+        return
+    try:
+        health.call_started(key)
+    except Exception as e:
+        print(f"DEBUG: provider health unavailable for {key}: {e}", file=sys.stderr)
+        yield
+        return
+    rate_limits = []
+    token = _RATE_LIMITS.set(rate_limits)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _RATE_LIMITS.reset(token)
+        try:
+            health.call_finished(key, time.perf_counter() - start, len(rate_limits))
+        except Exception as e:
+            print(f"DEBUG: provider health unavailable for {key}: {e}", file=sys.stderr)
+
+def record_attempt_error(error: BaseException):
+    """Counts a failed attempt of the current call if it was a rate limit. Errors an inner retry loop already reported are skipped."""
+    rate_limits = _RATE_LIMITS.get()
+    if rate_limits is not None and isinstance(error, RateLimitProviderError) and not retries_exhausted(error):
+        rate_limits.append(1)
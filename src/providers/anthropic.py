@@ -1,19 +1,104 @@
 import sys
-import base64
-import mimetypes
 from typing import Union, Optional
 
 import httpx
 import anthropic
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 
 from src.types import ModelConfig, ModelResponse
-from src.llm_utils import run_with_retry, orchestrate_two_stage
+from src.llm_utils import run_with_retry, run_with_retry_async, orchestrate_two_stage, orchestrate_two_stage_async
 from src.logging import get_logger
+from src.cancellation import on_cancel, check_cancelled
+from src.providers.image_payloads import anthropic_image_block, anthropic_image_block_async, anthropic_extra_headers
+from src.providers.prompt_caching import anthropic_text_blocks
 from src.errors import RetryableProviderError, NonRetryableProviderError, UnknownProviderError, RateLimitProviderError
 
 logger = get_logger("providers.anthropic")
 
+MODEL_MAX_TOKENS = 64000
+
+def _anthropic_model_name(config: ModelConfig, model_alias: str = None) -> str:
+    model = config.base_model
+    cfg_val = config.config
+    return model_alias if model_alias else (f"{model}-{cfg_val}" if cfg_val else model)
+
+def _base_kwargs(config: ModelConfig) -> dict:
+    cfg_val = config.config
+    kwargs = {
+        "model": config.base_model,
+        "max_tokens": 8192
+    }
+    if isinstance(cfg_val, int) and cfg_val > 0:
+        budget = cfg_val
+        max_tokens = min(budget + 4096, MODEL_MAX_TOKENS)
+        if budget >= max_tokens: budget = max_tokens - 2048
+        kwargs["thinking"] = {"type": "enabled", "budget_tokens": budget}
+        kwargs["max_tokens"] = max_tokens
+    return kwargs
+
+def _map_anthropic_exception(e: Exception, model: str):
+    """Maps Anthropic SDK exceptions to internal provider errors."""
+    # 1. Known SDK Retryables
+    if isinstance(e, anthropic.RateLimitError):
+        raise RateLimitProviderError(f"Anthropic Rate Limit (Model: {model}): {e}") from e
+
+    if isinstance(e, (anthropic.APIConnectionError, anthropic.InternalServerError)):
+        raise RetryableProviderError(f"Anthropic Transient Error (Model: {model}): {e}") from e
+    
+    # 2. Known SDK Non-Retryables
+    if isinstance(e, (anthropic.BadRequestError, anthropic.AuthenticationError, anthropic.PermissionDeniedError)):
+        raise NonRetryableProviderError(f"Anthropic Fatal Error (Model: {model}): {e}") from e
+
+    # 3. String matching
+    err_str = str(e)
+    if (
+        "500" in err_str
+        or "Internal server error" in err_str
+        or "Connection reset" in err_str
+        or "Connection error" in err_str
+        or "Server disconnected" in err_str
+        or "RemoteProtocolError" in err_str
+        or "connection closed" in err_str.lower()
+        or "peer closed connection" in err_str.lower()
+        or "incomplete chunked read" in err_str.lower()
+    ):
+        raise RetryableProviderError(f"Network/Protocol Error (Model: {model}): {e}") from e
+
+    # 4. Loud Retry
+    raise UnknownProviderError(f"Unexpected Anthropic Error (Model: {model}): {e}") from e
+
+def _solve_messages(p: str, image_block: dict = None) -> list:
+    content = anthropic_text_blocks(p)
+    if image_block:
+        # After the cached prefix, so the image (which shows the test input) does not break it
+        content.insert(1 if "cache_control" in content[0] else 0, image_block)
+    return [{"role": "user", "content": content}]
+
+def _explain_messages(prompt: str, p: str, prev_resp: ModelResponse) -> list:
+    blocks = anthropic_text_blocks(prompt)
+    return [
+        {"role": "user", "content": blocks if "cache_control" in blocks[0] else prompt}, # Original Prompt
+        {"role": "assistant", "content": prev_resp._raw_content},
+        {"role": "user", "content": p}
+    ]
+
+def _response_from_message(final) -> ModelResponse:
+    text_parts = []
+    for block in final.content:
+        if getattr(block, "type", None) == "text":
+            text_parts.append(block.text)
+
+    cache_read = getattr(final.usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(final.usage, "cache_creation_input_tokens", 0) or 0
+    return ModelResponse(
+        text="".join(text_parts).strip(),
+        # input_tokens excludes cache reads and writes; prompt_tokens counts all input
+        prompt_tokens=final.usage.input_tokens + cache_read + cache_write,
+        cached_tokens=cache_read,
+        completion_tokens=final.usage.output_tokens,
+        cache_write_tokens=cache_write,
+    )
+
 def call_anthropic(
     client: Anthropic,
     prompt: str,
@@ -27,79 +112,24 @@ def call_anthropic(
     model_alias: str = None,
     timing_tracker: list[dict] = None,
 ) -> ModelResponse:
-    MODEL_MAX_TOKENS = 64000
-    
     model = config.base_model
-    cfg_val = config.config
-    full_model_name = model_alias if model_alias else (f"{model}-{cfg_val}" if cfg_val else model)
-
-    kwargs = {
-        "model": model,
-        "max_tokens": 8192
-    }
-    if isinstance(cfg_val, int) and cfg_val > 0:
-        budget = cfg_val
-        max_tokens = min(budget + 4096, MODEL_MAX_TOKENS)
-        if budget >= max_tokens: budget = max_tokens - 2048
-        kwargs["thinking"] = {"type": "enabled", "budget_tokens": budget}
-        kwargs["max_tokens"] = max_tokens
+    full_model_name = _anthropic_model_name(config, model_alias)
+    kwargs = _base_kwargs(config)
 
     def _safe_stream(**kw):
         try:
-            with client.messages.stream(**kw) as stream:
+            with client.messages.stream(**kw) as stream, on_cancel(stream.close):
                 for _ in stream.text_stream: pass
+                check_cancelled()
                 return stream.get_final_message()
         except Exception as e:
-            # 1. Known SDK Retryables
-            if isinstance(e, anthropic.RateLimitError):
-                raise RateLimitProviderError(f"Anthropic Rate Limit (Model: {model}): {e}") from e
-
-            if isinstance(e, (anthropic.APIConnectionError, anthropic.InternalServerError)):
-                raise RetryableProviderError(f"Anthropic Transient Error (Model: {model}): {e}") from e
-            
-            # 2. Known SDK Non-Retryables
-            if isinstance(e, (anthropic.BadRequestError, anthropic.AuthenticationError, anthropic.PermissionDeniedError)):
-                raise NonRetryableProviderError(f"Anthropic Fatal Error (Model: {model}): {e}") from e
-
-            # 3. String matching
-            err_str = str(e)
-            if (
-                "500" in err_str
-                or "Internal server error" in err_str
-                or "Connection reset" in err_str
-                or "Connection error" in err_str
-                or "Server disconnected" in err_str
-                or "RemoteProtocolError" in err_str
-                or "connection closed" in err_str.lower()
-                or "peer closed connection" in err_str.lower()
-                or "incomplete chunked read" in err_str.lower()
-            ):
-                raise RetryableProviderError(f"Network/Protocol Error (Model: {model}): {e}") from e
-
-            # 4. Loud Retry
-            raise UnknownProviderError(f"Unexpected Anthropic Error (Model: {model}): {e}") from e
+            _map_anthropic_exception(e, model)
 
     def _solve(p: str) -> ModelResponse:
-        content = []
-        if image_path:
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-            mime_type, _ = mimetypes.guess_type(image_path)
-            if mime_type is None:
-                mime_type = 'application/octet-stream'
-            content.append({
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": mime_type,
-                    "data": base64_image,
-                },
-            })
-        content.append({"type": "text", "text": p})
-        
         kw = kwargs.copy()
-        kw["messages"] = [{"role": "user", "content": content}]
-        
+        kw["messages"] = _solve_messages(p, anthropic_image_block(client, image_path) if image_path else None)
+        kw["extra_headers"] = anthropic_extra_headers(kw["messages"])
+
         final = run_with_retry(
             lambda: _safe_stream(**kw),
             task_id=task_id,
@@ -109,28 +139,14 @@ def call_anthropic(
             timing_tracker=timing_tracker
         )
         
-        text_parts = []
-        for block in final.content:
-            if getattr(block, "type", None) == "text":
-                text_parts.append(block.text)
-        
-        resp = ModelResponse(
-            text="".join(text_parts).strip(),
-            prompt_tokens=final.usage.input_tokens,
-            cached_tokens=getattr(final.usage, "cache_read_input_tokens", 0) or 0,
-            completion_tokens=final.usage.output_tokens,
-        )
+        resp = _response_from_message(final)
         resp._raw_content = final.content # Store for context
         return resp
 
     def _explain(p: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
         try:
             kw = kwargs.copy()
-            kw["messages"] = [
-                {"role": "user", "content": prompt}, # Original Prompt
-                {"role": "assistant", "content": prev_resp._raw_content},
-                {"role": "user", "content": p}
-            ]
+            kw["messages"] = _explain_messages(prompt, p, prev_resp)
             
             final = run_with_retry(
                 lambda: _safe_stream(**kw),
@@ -140,20 +156,73 @@ def call_anthropic(
                 model_name=full_model_name,
                 timing_tracker=timing_tracker
             )
-            
-            text_parts = []
-            for block in final.content:
-                if getattr(block, "type", None) == "text":
-                    text_parts.append(block.text)
-
-            return ModelResponse(
-                text="".join(text_parts).strip(),
-                prompt_tokens=final.usage.input_tokens,
-                cached_tokens=getattr(final.usage, "cache_read_input_tokens", 0) or 0,
-                completion_tokens=final.usage.output_tokens,
+            return _response_from_message(final)
+        except Exception as e:
+            logger.error(f"Step 2 strategy extraction failed: {e}")
+            return None
+
+    return orchestrate_two_stage(_solve, _explain, prompt, return_strategy, verbose, image_path)
+
+async def call_anthropic_async(
+    client: AsyncAnthropic,
+    prompt: str,
+    config: ModelConfig,
+    image_path: str = None,
+    return_strategy: bool = False,
+    verbose: bool = False,
+    task_id: str = None,
+    test_index: int = None,
+    run_timestamp: str = None,
+    model_alias: str = None,
+    timing_tracker: list[dict] = None,
+) -> ModelResponse:
+    """Coroutine version of call_anthropic using the AsyncAnthropic client."""
+    model = config.base_model
+    full_model_name = _anthropic_model_name(config, model_alias)
+    kwargs = _base_kwargs(config)
+
+    async def _safe_stream(**kw):
+        try:
+            async with client.messages.stream(**kw) as stream:
+                async for _ in stream.text_stream: pass
+                return await stream.get_final_message()
+        except Exception as e:
+            _map_anthropic_exception(e, model)
+
+    async def _solve(p: str) -> ModelResponse:
+        kw = kwargs.copy()
+        kw["messages"] = _solve_messages(p, await anthropic_image_block_async(client, image_path) if image_path else None)
+        kw["extra_headers"] = anthropic_extra_headers(kw["messages"])
+
+        final = await run_with_retry_async(
+            lambda: _safe_stream(**kw),
+            task_id=task_id,
+            test_index=test_index,
+            run_timestamp=run_timestamp,
+            model_name=full_model_name,
+            timing_tracker=timing_tracker
+        )
+
+        resp = _response_from_message(final)
+        resp._raw_content = final.content # Store for context
+        return resp
+
+    async def _explain(p: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
+        try:
+            kw = kwargs.copy()
+            kw["messages"] = _explain_messages(prompt, p, prev_resp)
+
+            final = await run_with_retry_async(
+                lambda: _safe_stream(**kw),
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_name=full_model_name,
+                timing_tracker=timing_tracker
             )
+            return _response_from_message(final)
         except Exception as e:
             logger.error(f"Step 2 strategy extraction failed: {e}")
             return None
 
-    return orchestrate_two_stage(_solve, _explain, prompt, return_strategy, verbose, image_path)
\ No newline at end of file
+    return await orchestrate_two_stage_async(_solve, _explain, prompt, return_strategy, verbose, image_path)
@@ -1,62 +1,58 @@
 import sys
 import os
 import warnings
-import random
-from typing import Optional
-import PIL.Image
+import threading
+from typing import Awaitable, Callable, Optional
 import httpx
-import concurrent.futures
+import asyncio
 
 from google import genai
 from google.genai import types
+from google.genai import errors as genai_errors
 from google.api_core import exceptions as google_exceptions
 
-from src.config import get_api_keys, get_http_client, KeepAliveTransport
+from src.config import get_http_client, get_async_http_client, KeepAliveTransport, AsyncKeepAliveTransport
 from src.types import ModelConfig, ModelResponse
-from src.llm_utils import run_with_retry, orchestrate_two_stage
+from src.llm_utils import run_with_retry, run_with_retry_async, orchestrate_two_stage, orchestrate_two_stage_async
 from src.logging import get_logger
-from src.errors import RetryableProviderError, NonRetryableProviderError, UnknownProviderError
+from src.cancellation import on_cancel, check_cancelled
+from src.deadline import call_timeout
+from src.providers.image_payloads import gemini_image_part, gemini_image_part_async
+from src.providers.gemini_pool import (
+    GeminiKeyPool, KeyLease, register_fork_reset,
+    FAILURE_RATE_LIMIT, FAILURE_TIMEOUT, FAILURE_AUTH, FAILURE_ERROR,
+)
+from src.errors import RetryableProviderError, NonRetryableProviderError, UnknownProviderError, RateLimitProviderError, RunCancelledError
 
 logger = get_logger("providers.gemini")
 
-def call_gemini(
-    keys: list[str],
-    prompt: str,
-    config: ModelConfig,
-    image_path: str = None,
-    return_strategy: bool = False,
-    verbose: bool = False,
-    task_id: str = None,
-    test_index: int = None,
-    run_timestamp: str = None,
-    model_alias: str = None,
-    timing_tracker: list[dict] = None,
-    enable_code_execution: bool = False,
-) -> ModelResponse:
-    
-    model = config.base_model
-    thinking_level = str(config.config)
-    full_model_name = model_alias if model_alias else f"{model}-{thinking_level}"
-    
-    # Randomly select a key
-    if not keys:
-        raise RuntimeError("No Gemini API keys provided.")
-    selected_key = random.choice(keys)
-    # We can log the key index for debugging
-    key_index = keys.index(selected_key)
-    if verbose:
-        logger.info(f"Using Gemini Key index {key_index}")
-
-    # Instantiate a local client for this call (thread-safe) using shared configuration
+# Hard wall-clock limit per send (slightly larger than the socket timeout)
+GEMINI_HARD_TIMEOUT_S = 3360
+
+def _make_client(api_key: str):
     http_client = get_http_client(
         timeout=3300.0,
         transport=KeepAliveTransport(retries=3),
         limits=httpx.Limits(keepalive_expiry=3300)
     )
-    
-    # Pass the custom client to the Google GenAI SDK
-    client = genai.Client(api_key=selected_key, http_options={'httpx_client': http_client})
+    return genai.Client(api_key=api_key, http_options={'httpx_client': http_client}), http_client
+
+def _make_async_client(api_key: str):
+    http_client = get_async_http_client(
+        timeout=3300.0,
+        transport=AsyncKeepAliveTransport(retries=3),
+        limits=httpx.Limits(keepalive_expiry=3300)
+    )
+    return genai.Client(api_key=api_key, http_options={'httpx_async_client': http_client}), http_client
+
+# One persistent client per GEMINI_API_KEY_n, shared by all calls of this process
+_KEY_POOL = GeminiKeyPool(_make_client, _make_async_client)
+register_fork_reset(_KEY_POOL)
 
+def get_gemini_key_pool() -> GeminiKeyPool:
+    return _KEY_POOL
+
+def _generation_config(thinking_level: str, enable_code_execution: bool) -> types.GenerateContentConfig:
     # Use thinking_level with string literals "LOW" or "HIGH" (case insensitive usually, but standard is upper/lower matching the enum)
     # Typically the SDK accepts "low" / "high" strings for this field if typed as ThinkingLevel
     level_val = "low" if thinking_level == "low" else "high"
@@ -66,7 +62,7 @@ def call_gemini(
     if enable_code_execution:
         tools.append(types.Tool(code_execution=types.ToolCodeExecution()))
 
-    gen_config = types.GenerateContentConfig(
+    return types.GenerateContentConfig(
         temperature=1.0,
         max_output_tokens=65536,
         tools=tools if tools else None,
@@ -76,68 +72,250 @@ def call_gemini(
         )
     )
 
-    # Shared chat object for state within this function call
-    chat = client.chats.create(model=model, config=gen_config)
+def _hard_timeout_error(key_index: int, model: str, timeout_s: float = GEMINI_HARD_TIMEOUT_S) -> RetryableProviderError:
+    # LOUD DEBUG LOGGING
+    err_msg = (
+        f"\n{'!'*50}\n"
+        f"!!! GEMINI HARD TIMEOUT TRIGGERED ({timeout_s:.0f}s) !!!\n"
+        f"!!! Key Index: {key_index} | Model: {model}\n"
+        f"!!! The call hung indefinitely. Killing and retrying.\n"
+        f"{'!'*50}\n"
+    )
+    print(err_msg, file=sys.stderr)
+    sys.stderr.flush()
+    return RetryableProviderError(f"Gemini Hard Wall-Clock Timeout (Key #{key_index}, Model: {model}): Call exceeded {timeout_s:.0f}s")
+
+def _is_rate_limit(e: Exception) -> bool:
+    return (
+        isinstance(e, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests))
+        or (isinstance(e, genai_errors.APIError) and e.code == 429)
+    )
+
+def _key_failure(e: Exception) -> str:
+    """How a failed send reflects on the key that made it (see GeminiKeyPool.release)."""
+    if _is_rate_limit(e):
+        return FAILURE_RATE_LIMIT
+    if isinstance(e, (google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)) or (
+        isinstance(e, genai_errors.APIError) and e.code in (401, 403)
+    ):
+        return FAILURE_AUTH
+    return FAILURE_ERROR
+
+def _map_gemini_exception(e: Exception, key_index: int, model: str):
+    """Maps Gemini SDK exceptions to internal provider errors."""
+    # 0. Rate limits (the key is cooling down; the next attempt goes to another key)
+    if _is_rate_limit(e):
+        raise RateLimitProviderError(f"Gemini Rate Limit (Key #{key_index}, Model: {model}): {e}") from e
+
+    # 1. Known SDK Retryables
+    if isinstance(e, (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError, google_exceptions.TooManyRequests)):
+         raise RetryableProviderError(f"Gemini Transient Error (Key #{key_index}, Model: {model}): {e}") from e
+    
+    # 2. Known SDK Non-Retryables
+    if isinstance(e, (google_exceptions.InvalidArgument, google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)):
+         raise NonRetryableProviderError(f"Gemini Fatal Error (Key #{key_index}, Model: {model}): {e}") from e
+
+    # 3. String matching for other errors
+    err_str = str(e)
+    if (
+        "500" in err_str 
+        or "UNAVAILABLE" in err_str 
+        or "overloaded" in err_str.lower()
+        or "Server disconnected" in err_str
+        or "RemoteProtocolError" in err_str
+        or "connection closed" in err_str.lower()
+        or "peer closed connection" in err_str.lower()
+        or "incomplete chunked read" in err_str.lower()
+    ):
+        raise RetryableProviderError(f"Network/Protocol Error (Key #{key_index}, Model: {model}): {e}") from e
+
+    # 4. Loud Retry
+    raise UnknownProviderError(f"Unexpected Gemini Error (Key #{key_index}, Model: {model}): {e}") from e
+
+def _solve_message(p: str, image_part=None) -> list:
+    # Pass raw string to avoid Pydantic warnings; SDK handles wrapping.
+    # str(): the chat API rejects str subclasses such as CacheablePrompt
+    message = [str(p)]
+    if image_part is not None:
+        message.append(image_part)
+    return message
+
+def _response_from_gemini(response) -> ModelResponse:
+    text_parts = []
+    detailed_logs = []
+    if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
+        for part in response.candidates[0].content.parts:
+            if part.thought:
+                detailed_logs.append({"type": "thought", "content": part.thought})
+            
+            if part.executable_code:
+                detailed_logs.append({
+                    "type": "code", 
+                    "code": part.executable_code.code,
+                    "language": part.executable_code.language
+                })
+            
+            if part.code_execution_result:
+                detailed_logs.append({
+                    "type": "execution_result",
+                    "outcome": part.code_execution_result.outcome,
+                    "output": part.code_execution_result.output
+                })
+
+            if part.function_call:
+                detailed_logs.append({
+                    "type": "function_call",
+                    "name": part.function_call.name,
+                    "args": part.function_call.args
+                })
+
+            if part.text:
+                text_parts.append(part.text)
+                detailed_logs.append({"type": "text", "content": part.text})
+    
+    usage = response.usage_metadata
+    return ModelResponse(
+        text="".join(text_parts).strip(),
+        prompt_tokens=usage.prompt_token_count if usage and usage.prompt_token_count is not None else 0,
+        # Implicit cache hits on repeated prefixes; already included in prompt_token_count
+        cached_tokens=(getattr(usage, "cached_content_token_count", None) or 0) if usage else 0,
+        completion_tokens=usage.candidates_token_count if usage and usage.candidates_token_count is not None else 0,
+        thought_tokens=(getattr(usage, "thoughts_token_count", None) or 0) if usage else 0,
+        detailed_logs=detailed_logs
+    )
+
+def _send_with_deadline(send: Callable[[], object], timeout: float):
+    """
+    Runs send() on a daemon thread and waits at most timeout seconds. On timeout, or when the run
+    is cancelled, control returns to the caller at once; the request is abandoned (a thread cannot
+    be killed) instead of joined.
+    """
+    done = threading.Event()
+    outcome = {}
+
+    def _run():
+        try:
+            outcome["result"] = send()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=_run, name="gemini-send", daemon=True).start()
+    with on_cancel(done.set):
+        finished = done.wait(timeout)
+    check_cancelled()
+    if not finished:
+        raise TimeoutError()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+class _PooledChat:
+    """
+    A chat whose turns each lease a key from the pool. The history is kept here, so a retry after
+    a rate limit can continue on another key; healthy calls stay on the key they started on.
+    """
+    def __init__(self, keys: list[str], model: str, gen_config: types.GenerateContentConfig, verbose: bool):
+        self.keys = keys
+        self.model = model
+        self.gen_config = gen_config
+        self.verbose = verbose
+        self.history = []
+        self.key_index = None
+
+    def _lease(self) -> KeyLease:
+        lease = _KEY_POOL.acquire(self.keys, prefer=self.key_index)
+        if self.verbose:
+            logger.info(f"Using Gemini Key index {lease.index}")
+        return lease
+
+    def _sent(self, lease: KeyLease, chat):
+        _KEY_POOL.release(lease)
+        self.history = chat.get_history(curated=True)
+        self.key_index = lease.index
+
+    def send(self, build_message: Callable[[genai.Client, str], object]):
+        lease = self._lease()
+        client = _KEY_POOL.client(lease)
+        chat = client.chats.create(model=self.model, config=self.gen_config, history=self.history)
 
-    def _safe_send(message):
         def _inner_send():
             # Suppress Pydantic serialization warnings from the SDK
             with warnings.catch_warnings():
                 warnings.filterwarnings("ignore", category=UserWarning, message=".*Pydantic serializer warnings.*")
-                return chat.send_message(message)
+                return chat.send_message(build_message(client, lease.key))
 
+        # Enforce hard wall-clock timeout (slightly larger than socket timeout), within the run's deadline
+        timeout_s = call_timeout(GEMINI_HARD_TIMEOUT_S)
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_inner_send)
-                # Enforce hard wall-clock timeout (slightly larger than socket timeout)
-                return future.result(timeout=3360)
-        except concurrent.futures.TimeoutError as e:
-            # LOUD DEBUG LOGGING
-            err_msg = (
-                f"\n{'!'*50}\n"
-                f"!!! GEMINI HARD TIMEOUT TRIGGERED (3360s) !!!\n"
-                f"!!! Key Index: {key_index} | Model: {model}\n"
-                f"!!! The call hung indefinitely. Killing and retrying.\n"
-                f"{'!'*50}\n"
-            )
-            print(err_msg, file=sys.stderr)
-            sys.stderr.flush()
-            raise RetryableProviderError(f"Gemini Hard Wall-Clock Timeout (Key #{key_index}, Model: {model}): Call exceeded 3360s") from e
+            response = _send_with_deadline(_inner_send, timeout_s)
+        except RunCancelledError:
+            # Abandoned on purpose; not the key's failure
+            _KEY_POOL.release(lease)
+            raise
+        except TimeoutError as e:
+            _KEY_POOL.release(lease, FAILURE_TIMEOUT)
+            raise _hard_timeout_error(lease.index, self.model, timeout_s) from e
         except Exception as e:
-            # 1. Known SDK Retryables
-            if isinstance(e, (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError, google_exceptions.TooManyRequests)):
-                 raise RetryableProviderError(f"Gemini Transient Error (Key #{key_index}, Model: {model}): {e}") from e
-            
-            # 2. Known SDK Non-Retryables
-            if isinstance(e, (google_exceptions.InvalidArgument, google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)):
-                 raise NonRetryableProviderError(f"Gemini Fatal Error (Key #{key_index}, Model: {model}): {e}") from e
-
-            # 3. String matching for other errors
-            err_str = str(e)
-            if (
-                "500" in err_str 
-                or "UNAVAILABLE" in err_str 
-                or "overloaded" in err_str.lower()
-                or "Server disconnected" in err_str
-                or "RemoteProtocolError" in err_str
-                or "connection closed" in err_str.lower()
-                or "peer closed connection" in err_str.lower()
-                or "incomplete chunked read" in err_str.lower()
-            ):
-                raise RetryableProviderError(f"Network/Protocol Error (Key #{key_index}, Model: {model}): {e}") from e
-
-            # 4. Loud Retry
-            raise UnknownProviderError(f"Unexpected Gemini Error (Key #{key_index}, Model: {model}): {e}") from e
+            _KEY_POOL.release(lease, _key_failure(e))
+            _map_gemini_exception(e, lease.index, self.model)
+        self._sent(lease, chat)
+        return response
+
+    async def send_async(self, build_message: Callable[[genai.Client, str], Awaitable[object]]):
+        lease = self._lease()
+        client = _KEY_POOL.async_client(lease, asyncio.get_running_loop())
+        chat = client.aio.chats.create(model=self.model, config=self.gen_config, history=self.history)
+        timeout_s = call_timeout(GEMINI_HARD_TIMEOUT_S)
+        try:
+            message = await build_message(client, lease.key)
+            # Suppress Pydantic serialization warnings from the SDK
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=UserWarning, message=".*Pydantic serializer warnings.*")
+                response = await asyncio.wait_for(chat.send_message(message), timeout=timeout_s)
+        except asyncio.CancelledError:
+            _KEY_POOL.release(lease)
+            raise
+        except asyncio.TimeoutError as e:
+            _KEY_POOL.release(lease, FAILURE_TIMEOUT)
+            raise _hard_timeout_error(lease.index, self.model, timeout_s) from e
+        except Exception as e:
+            _KEY_POOL.release(lease, _key_failure(e))
+            _map_gemini_exception(e, lease.index, self.model)
+        self._sent(lease, chat)
+        return response
+
+def call_gemini(
+    keys: list[str],
+    prompt: str,
+    config: ModelConfig,
+    image_path: str = None,
+    return_strategy: bool = False,
+    verbose: bool = False,
+    task_id: str = None,
+    test_index: int = None,
+    run_timestamp: str = None,
+    model_alias: str = None,
+    timing_tracker: list[dict] = None,
+    enable_code_execution: bool = False,
+) -> ModelResponse:
+    
+    model = config.base_model
+    thinking_level = str(config.config)
+    full_model_name = model_alias if model_alias else f"{model}-{thinking_level}"
+    gen_config = _generation_config(thinking_level, enable_code_execution)
+
+    # Shared chat state for this function call; each send goes through the key pool
+    chat = _PooledChat(keys, model, gen_config, verbose)
 
     def _solve(p: str) -> ModelResponse:
-        # Pass raw string to avoid Pydantic warnings; SDK handles wrapping
-        message = [p]
-        if image_path:
-            img = PIL.Image.open(image_path)
-            message.append(img)
+        # Built per attempt: an uploaded image belongs to the key that uploaded it
+        def _message(client, api_key):
+            return _solve_message(p, gemini_image_part(client, api_key, image_path) if image_path else None)
 
         response = run_with_retry(
-            lambda: _safe_send(message),
+            lambda: chat.send(_message),
             task_id=task_id,
             test_index=test_index,
             run_timestamp=run_timestamp,
@@ -146,106 +324,87 @@ def call_gemini(
         )
         
         try:
-            text_parts = []
-            detailed_logs = []
-            if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if part.thought:
-                        detailed_logs.append({"type": "thought", "content": part.thought})
-                    
-                    if part.executable_code:
-                        detailed_logs.append({
-                            "type": "code", 
-                            "code": part.executable_code.code,
-                            "language": part.executable_code.language
-                        })
-                    
-                    if part.code_execution_result:
-                        detailed_logs.append({
-                            "type": "execution_result",
-                            "outcome": part.code_execution_result.outcome,
-                            "output": part.code_execution_result.output
-                        })
-
-                    if part.function_call:
-                        detailed_logs.append({
-                            "type": "function_call",
-                            "name": part.function_call.name,
-                            "args": part.function_call.args
-                        })
-
-                    if part.text:
-                        text_parts.append(part.text)
-                        detailed_logs.append({"type": "text", "content": part.text})
-            
-            usage = response.usage_metadata
-            return ModelResponse(
-                text="".join(text_parts).strip(),
-                prompt_tokens=usage.prompt_token_count if usage and usage.prompt_token_count is not None else 0,
-                cached_tokens=0,
-                completion_tokens=usage.candidates_token_count if usage and usage.candidates_token_count is not None else 0,
-                thought_tokens=getattr(usage, "thoughts_token_count", 0) if usage else 0,
-                detailed_logs=detailed_logs
-            )
+            return _response_from_gemini(response)
         except Exception as e:
              raise RuntimeError(f"Failed to parse Gemini response: {e} - Raw: {response}")
 
     def _explain(p: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
         try:
             # Chat object maintains history automatically
-            message = p
             response = run_with_retry(
-                lambda: _safe_send(message),
+                lambda: chat.send(lambda client, api_key: p),
                 task_id=task_id,
                 test_index=test_index,
                 run_timestamp=run_timestamp,
                 model_name=full_model_name,
                 timing_tracker=timing_tracker
             )
-            
-            text_parts = []
-            detailed_logs = []
-            if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if part.thought:
-                        detailed_logs.append({"type": "thought", "content": part.thought})
-                    
-                    if part.executable_code:
-                        detailed_logs.append({
-                            "type": "code", 
-                            "code": part.executable_code.code,
-                            "language": part.executable_code.language
-                        })
-                    
-                    if part.code_execution_result:
-                        detailed_logs.append({
-                            "type": "execution_result",
-                            "outcome": part.code_execution_result.outcome,
-                            "output": part.code_execution_result.output
-                        })
-
-                    if part.function_call:
-                        detailed_logs.append({
-                            "type": "function_call",
-                            "name": part.function_call.name,
-                            "args": part.function_call.args
-                        })
-
-                    if part.text:
-                        text_parts.append(part.text)
-                        detailed_logs.append({"type": "text", "content": part.text})
-            
-            usage = response.usage_metadata
-            return ModelResponse(
-                text="".join(text_parts).strip(),
-                prompt_tokens=usage.prompt_token_count if usage and usage.prompt_token_count is not None else 0,
-                cached_tokens=0,
-                completion_tokens=usage.candidates_token_count if usage and usage.candidates_token_count is not None else 0,
-                thought_tokens=getattr(usage, "thoughts_token_count", 0) if usage else 0,
-                detailed_logs=detailed_logs
+            return _response_from_gemini(response)
+        except Exception as e:
+            logger.error(f"Step 2 strategy extraction failed: {e}")
+            return None
+
+    return orchestrate_two_stage(_solve, _explain, prompt, return_strategy, verbose, image_path)
+
+async def call_gemini_async(
+    keys: list[str],
+    prompt: str,
+    config: ModelConfig,
+    image_path: str = None,
+    return_strategy: bool = False,
+    verbose: bool = False,
+    task_id: str = None,
+    test_index: int = None,
+    run_timestamp: str = None,
+    model_alias: str = None,
+    timing_tracker: list[dict] = None,
+    enable_code_execution: bool = False,
+) -> ModelResponse:
+    """
+    Coroutine version of call_gemini using the SDK's aio chat.
+    The hard wall-clock timeout is asyncio.wait_for, which cancels the hung request.
+    """
+    model = config.base_model
+    thinking_level = str(config.config)
+    full_model_name = model_alias if model_alias else f"{model}-{thinking_level}"
+    gen_config = _generation_config(thinking_level, enable_code_execution)
+    chat = _PooledChat(keys, model, gen_config, verbose)
+
+    async def _solve(p: str) -> ModelResponse:
+        async def _message(client, api_key):
+            return _solve_message(p, await gemini_image_part_async(client, api_key, image_path) if image_path else None)
+
+        response = await run_with_retry_async(
+            lambda: chat.send_async(_message),
+            task_id=task_id,
+            test_index=test_index,
+            run_timestamp=run_timestamp,
+            model_name=full_model_name,
+            timing_tracker=timing_tracker
+        )
+
+        try:
+            return _response_from_gemini(response)
+        except Exception as e:
+             raise RuntimeError(f"Failed to parse Gemini response: {e} - Raw: {response}")
+
+    async def _explain(p: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
+        async def _message(client, api_key):
+            return p
+
+        try:
+            # Chat object maintains history automatically
+            response = await run_with_retry_async(
+                lambda: chat.send_async(_message),
+                task_id=task_id,
+                test_index=test_index,
+                run_timestamp=run_timestamp,
+                model_name=full_model_name,
+                timing_tracker=timing_tracker
             )
+            return _response_from_gemini(response)
         except Exception as e:
             logger.error(f"Step 2 strategy extraction failed: {e}")
             return None
 
-    return orchestrate_two_stage(_solve, _explain, prompt, return_strategy, verbose, image_path)
\ No newline at end of file
+    return await orchestrate_two_stage_async(_solve, _explain, prompt, return_strategy, verbose, image_path)
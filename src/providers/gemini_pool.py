@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+import weakref
+from collections import deque
+from typing import Any, Callable, Optional
+
+from src.logging import get_logger
+
+logger = get_logger("providers.gemini")
+
+# A rate-limited (or hung) key sits out COOLDOWN_BASE_S, doubling per consecutive failure
+COOLDOWN_BASE_S = 30.0
+COOLDOWN_MAX_S = 600.0
+# Outcomes older than this no longer count towards a key's error rate
+ERROR_WINDOW_S = 600.0
+
+# Failure kinds reported on release
+FAILURE_RATE_LIMIT = "rate_limit"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_AUTH = "auth"
+FAILURE_ERROR = "error"
+
+class KeyState:
+    """Scheduling state and persistent clients of one API key."""
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.last_acquired = 0.0
+        self.outcomes = deque()  # (monotonic time, ok)
+        self.client = None
+        self.http_client = None
+        self.async_clients = weakref.WeakKeyDictionary()  # event loop -> client
+
+    def error_rate(self, now: float) -> float:
+        while self.outcomes and now - self.outcomes[0][0] > ERROR_WINDOW_S:
+            self.outcomes.popleft()
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+class KeyLease:
+    """One call's hold on a key; hand it back with GeminiKeyPool.release."""
+    def __init__(self, state: KeyState, index: int):
+        self.state = state
+        self.index = index
+
+    @property
+    def key(self) -> str:
+        return self.state.key
+
+class GeminiKeyPool:
+    """
+    Process-wide clients, one per API key, and the scheduler choosing a key per call.
+    A call goes to the healthy key (not cooling down) with the fewest calls in flight,
+    then the lowest recent error rate, then the longest unused.
+    The factories return (genai client, httpx client) for a key.
+    """
+    def __init__(self, client_factory: Callable[[str], Any], async_client_factory: Callable[[str], Any]):
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = KeyState(key)
+        return state
+
+    def acquire(self, keys: list[str], prefer: Optional[int] = None) -> KeyLease:
+        """
+        Leases a key for one request. prefer (a key index) keeps a multi-turn call on the
+        key it started on, as long as that key is healthy.
+        """
+        if not keys:
+            raise RuntimeError("No Gemini API keys provided.")
+        now = time.monotonic()
+        with self._lock:
+            states = [self._state(key) for key in keys]
+            healthy = [s for s in states if s.cooldown_until <= now]
+            preferred = states[prefer] if prefer is not None and 0 <= prefer < len(states) else None
+            if preferred is not None and preferred in healthy and preferred.consecutive_failures == 0:
+                chosen = preferred
+            elif healthy:
+                chosen = min(healthy, key=lambda s: (s.in_flight, s.error_rate(now), s.last_acquired))
+            else:
+                # Every key is cooling down: use the one that recovers first
+                chosen = min(states, key=lambda s: s.cooldown_until)
+            chosen.in_flight += 1
+            chosen.last_acquired = now
+        return KeyLease(chosen, keys.index(chosen.key))
+
+    def release(self, lease: KeyLease, failure: Optional[str] = None):
+        now = time.monotonic()
+        with self._lock:
+            state = lease.state
+            state.in_flight = max(0, state.in_flight - 1)
+            state.outcomes.append((now, failure is None))
+            if failure is None:
+                state.consecutive_failures = 0
+                return
+            state.consecutive_failures += 1
+            if failure == FAILURE_AUTH:
+                cooldown = COOLDOWN_MAX_S
+            elif failure in (FAILURE_RATE_LIMIT, FAILURE_TIMEOUT):
+                cooldown = min(COOLDOWN_MAX_S, COOLDOWN_BASE_S * 2 ** (state.consecutive_failures - 1))
+            else:
+                cooldown = 0.0
+            if cooldown:
+                state.cooldown_until = max(state.cooldown_until, now + cooldown)
+        if cooldown:
+            logger.warning(f"Gemini Key index {lease.index} cooling down for {cooldown:.0f}s after {failure}")
+
+    def client(self, lease: KeyLease):
+        state = lease.state
+        with self._lock:
+            if state.client is None:
+                state.client, state.http_client = self._client_factory(state.key)
+            return state.client
+
+    def async_client(self, lease: KeyLease, loop):
+        """Client for use on loop; async HTTP connections are bound to the loop that opened them."""
+        state = lease.state
+        with self._lock:
+            client = state.async_clients.get(loop)
+            if client is None:
+                client, _ = self._async_client_factory(state.key)
+                state.async_clients[loop] = client
+            return client
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "key_index": i,
+                "in_flight": s.in_flight,
+                "error_rate": round(s.error_rate(now), 3),
+                "cooldown_s": round(max(0.0, s.cooldown_until - now), 1),
+            } for i, s in enumerate(self._states.values())]
+
+    def reset(self):
+        """Closes the sync connections and forgets all key state."""
+        with self._lock:
+            states, self._states = list(self._states.values()), {}
+        for state in states:
+            if state.http_client is not None:
+                state.http_client.close()
+
+    def _reset_after_fork(self):
+        # Parent threads' in-flight calls and connections do not exist in the child
+        self._lock = threading.Lock()
+        self._states = {}
+
+def register_fork_reset(pool: GeminiKeyPool):
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=pool._reset_after_fork)
@@ -0,0 +1,262 @@
+import io
+import os
+import base64
+import asyncio
+import time
+import hashlib
+import mimetypes
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import PIL.Image
+
+from src.logging import get_logger
+
+logger = get_logger("providers.images")
+
+# When enabled, an image is uploaded once per provider account and referenced by file ID,
+# instead of being sent inline (base64) in every request body.
+_IMAGE_UPLOADS_ENABLED = os.getenv("ARC_AGI_IMAGE_UPLOADS", "false").lower() == "true"
+
+# After a failed upload, the image is sent inline for this long before uploading is tried again
+UPLOAD_RETRY_AFTER_S = float(os.getenv("ARC_AGI_IMAGE_UPLOAD_RETRY_S", "300"))
+
+# Anthropic only accepts {"source": {"type": "file"}} blocks with this beta header
+ANTHROPIC_FILES_BETA = "files-api-2025-04-14"
+
+def set_image_uploads_enabled(enabled: bool):
+    global _IMAGE_UPLOADS_ENABLED
+    _IMAGE_UPLOADS_ENABLED = enabled
+
+def get_image_uploads_enabled() -> bool:
+    return _IMAGE_UPLOADS_ENABLED
+
+class ImagePayload:
+    """
+    One image file, read once. Each provider's encoding of it is computed on first use and kept,
+    so the same image sent to several models (and on every retry) is not re-read or re-encoded.
+    """
+    def __init__(self, path: str, data: bytes):
+        self.path = path
+        self.data = data
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        mime_type, _ = mimetypes.guess_type(path)
+        self.mime_type = mime_type or 'application/octet-stream'
+        self._lock = threading.Lock()
+        self._base64 = None
+        self._pil_image = None
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+    @property
+    def anthropic_source(self) -> dict:
+        return {"type": "base64", "media_type": self.mime_type, "data": self.base64}
+
+    @property
+    def pil_image(self) -> PIL.Image.Image:
+        with self._lock:
+            if self._pil_image is None:
+                img = PIL.Image.open(io.BytesIO(self.data))
+                img.load()  # Decode now; the SDKs read the pixels from several threads
+                self._pil_image = img
+            return self._pil_image
+
+# path -> (mtime_ns, size, payload); payloads are shared by content hash
+_PAYLOADS: Dict[str, Tuple[int, int, ImagePayload]] = {}
+_PAYLOADS_BY_HASH: Dict[str, ImagePayload] = {}
+_PAYLOADS_LOCK = threading.Lock()
+
+def get_image_payload(image_path: str) -> ImagePayload:
+    """Returns the cached payload of image_path, re-reading the file only if it changed."""
+    stat = os.stat(image_path)
+    with _PAYLOADS_LOCK:
+        entry = _PAYLOADS.get(image_path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+
+    with open(image_path, "rb") as image_file:
+        payload = ImagePayload(image_path, image_file.read())
+
+    with _PAYLOADS_LOCK:
+        # Same bytes under another path (e.g. another test index) reuse the encoded forms
+        payload = _PAYLOADS_BY_HASH.setdefault(payload.sha256, payload)
+        _PAYLOADS[image_path] = (stat.st_mtime_ns, stat.st_size, payload)
+    return payload
+
+# (provider, account, sha256) -> file ID / URI
+_FILE_IDS: Dict[Tuple[str, ...], str] = {}
+# (provider, account, sha256) -> time.monotonic() of the last failed upload
+_UPLOAD_FAILURES: Dict[Tuple[str, ...], float] = {}
+_UPLOAD_LOCKS: Dict[Tuple[str, ...], threading.Lock] = {}
+_ASYNC_UPLOAD_LOCKS: Dict[Tuple[str, ...], asyncio.Lock] = {}
+_FILE_IDS_LOCK = threading.Lock()
+
+def _cached_upload(key: Tuple[str, ...]) -> Tuple[bool, Optional[str]]:
+    """(True, file ID) once uploaded, (True, None) shortly after a failed upload, else (False, None)."""
+    if key in _FILE_IDS:
+        return True, _FILE_IDS[key]
+    failed_at = _UPLOAD_FAILURES.get(key)
+    if failed_at is not None and time.monotonic() - failed_at < UPLOAD_RETRY_AFTER_S:
+        return True, None
+    return False, None
+
+def _record_upload(key: Tuple[str, ...], file_id: Optional[str], error: Exception = None) -> Optional[str]:
+    with _FILE_IDS_LOCK:
+        if error is not None:
+            logger.warning(f"Image upload to {key[0]} failed, sending it inline instead: {error}")
+            _UPLOAD_FAILURES[key] = time.monotonic()
+        else:
+            _FILE_IDS[key] = file_id
+            _UPLOAD_FAILURES.pop(key, None)
+    return file_id
+
+def _upload_once(key: Tuple[str, ...], upload: Callable[[], str]) -> Optional[str]:
+    with _FILE_IDS_LOCK:
+        cached, file_id = _cached_upload(key)
+        if cached:
+            return file_id
+        lock = _UPLOAD_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        cached, file_id = _cached_upload(key)
+        if cached:
+            return file_id
+        try:
+            return _record_upload(key, upload())
+        except Exception as e:
+            return _record_upload(key, None, e)
+
+async def _upload_once_async(key: Tuple[str, ...], upload: Callable[[], Awaitable[str]]) -> Optional[str]:
+    with _FILE_IDS_LOCK:
+        cached, file_id = _cached_upload(key)
+        if cached:
+            return file_id
+        lock = _ASYNC_UPLOAD_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached, file_id = _cached_upload(key)
+        if cached:
+            return file_id
+        try:
+            return _record_upload(key, await upload())
+        except Exception as e:
+            return _record_upload(key, None, e)
+
+def _reset_after_fork():
+    global _FILE_IDS_LOCK, _PAYLOADS_LOCK
+    # Locks may have been held by a parent thread; async locks belong to the parent's loop
+    _FILE_IDS_LOCK = threading.Lock()
+    _PAYLOADS_LOCK = threading.Lock()
+    _UPLOAD_LOCKS.clear()
+    _ASYNC_UPLOAD_LOCKS.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# --- OpenAI ---
+
+def _openai_key(client, payload: ImagePayload) -> Tuple[str, ...]:
+    return ("openai", client.api_key, str(client.base_url), payload.sha256)
+
+def _openai_part(payload: ImagePayload, file_id: Optional[str]) -> dict:
+    if file_id:
+        return {"type": "input_image", "file_id": file_id}
+    return {"type": "input_image", "image_url": payload.data_url}
+
+def openai_image_content(client, image_path: str) -> dict:
+    payload = get_image_payload(image_path)
+    file_id = None
+    if _IMAGE_UPLOADS_ENABLED:
+        file_id = _upload_once(
+            _openai_key(client, payload),
+            lambda: client.files.create(file=(payload.filename, payload.data, payload.mime_type), purpose="vision").id
+        )
+    return _openai_part(payload, file_id)
+
+async def openai_image_content_async(client, image_path: str) -> dict:
+    payload = get_image_payload(image_path)
+    file_id = None
+    if _IMAGE_UPLOADS_ENABLED:
+        async def _upload():
+            return (await client.files.create(file=(payload.filename, payload.data, payload.mime_type), purpose="vision")).id
+        file_id = await _upload_once_async(_openai_key(client, payload), _upload)
+    return _openai_part(payload, file_id)
+
+# --- Anthropic ---
+
+def _anthropic_key(client, payload: ImagePayload) -> Tuple[str, ...]:
+    return ("anthropic", client.api_key, str(client.base_url), payload.sha256)
+
+def _anthropic_block(payload: ImagePayload, file_id: Optional[str]) -> dict:
+    if file_id:
+        return {"type": "image", "source": {"type": "file", "file_id": file_id}}
+    return {"type": "image", "source": payload.anthropic_source}
+
+def anthropic_image_block(client, image_path: str) -> dict:
+    payload = get_image_payload(image_path)
+    file_id = None
+    if _IMAGE_UPLOADS_ENABLED:
+        file_id = _upload_once(
+            _anthropic_key(client, payload),
+            lambda: client.beta.files.upload(file=(payload.filename, payload.data, payload.mime_type)).id
+        )
+    return _anthropic_block(payload, file_id)
+
+async def anthropic_image_block_async(client, image_path: str) -> dict:
+    payload = get_image_payload(image_path)
+    file_id = None
+    if _IMAGE_UPLOADS_ENABLED:
+        async def _upload():
+            return (await client.beta.files.upload(file=(payload.filename, payload.data, payload.mime_type))).id
+        file_id = await _upload_once_async(_anthropic_key(client, payload), _upload)
+    return _anthropic_block(payload, file_id)
+
+def anthropic_extra_headers(messages: list) -> Optional[dict]:
+    """Beta header needed when any message references an uploaded file."""
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list) and any(
+            isinstance(block, dict) and block.get("source", {}).get("type") == "file" for block in content
+        ):
+            return {"anthropic-beta": ANTHROPIC_FILES_BETA}
+    return None
+
+# --- Gemini ---
+
+def _gemini_key(api_key: str, payload: ImagePayload) -> Tuple[str, ...]:
+    return ("gemini", api_key, payload.sha256)
+
+def _gemini_part(payload: ImagePayload, file_uri: Optional[str]):
+    if file_uri:
+        from google.genai import types
+        return types.Part.from_uri(file_uri=file_uri, mime_type=payload.mime_type)
+    return payload.pil_image
+
+def gemini_image_part(client, api_key: str, image_path: str):
+    payload = get_image_payload(image_path)
+    file_uri = None
+    if _IMAGE_UPLOADS_ENABLED:
+        file_uri = _upload_once(
+            _gemini_key(api_key, payload),
+            lambda: client.files.upload(file=io.BytesIO(payload.data), config={"mime_type": payload.mime_type}).uri
+        )
+    return _gemini_part(payload, file_uri)
+
+async def gemini_image_part_async(client, api_key: str, image_path: str):
+    payload = get_image_payload(image_path)
+    file_uri = None
+    if _IMAGE_UPLOADS_ENABLED:
+        async def _upload():
+            return (await client.aio.files.upload(file=io.BytesIO(payload.data), config={"mime_type": payload.mime_type})).uri
+        file_uri = await _upload_once_async(_gemini_key(api_key, payload), _upload)
+    return _gemini_part(payload, file_uri)
@@ -1,9 +1,13 @@
 import time
+import asyncio
 from typing import Optional, TYPE_CHECKING
 
 from src.types import ModelResponse
 from src.logging import get_logger
-from src.providers.openai_bg.job_manager import submit_job, poll_job
+from src.errors import RunCancelledError
+from src.cancellation import on_cancel
+from src.providers.openai_bg.job_manager import submit_job, poll_job, submit_job_async, poll_job_async, cancel_job, cancel_job_async
+from src.providers.openai_bg.poller import get_background_poller, get_background_poller_enabled
 
 if TYPE_CHECKING:
     from src.providers.openai_runner import OpenAIRequestRunner
@@ -28,8 +32,31 @@ class OpenAIBackgroundSolver:
             if self.verbose:
                 print(f"[BACKGROUND] [{self.runner.model}] Job submitted. ID: {job_id}")
 
-            # 2. Poll for Completion
-            return poll_job(self.runner, job_id, prompt, image_path, start_attempt_ts)
+            # 2. Wait for Completion: the shared poller checks every job of this process
+            try:
+                if get_background_poller_enabled():
+                    poller = get_background_poller()
+                    future = poller.submit(self.runner, job_id, start_attempt_ts)
+                    with on_cancel(lambda: poller.cancel(job_id)):
+                        return future.result()
+                return poll_job(self.runner, job_id, prompt, image_path, start_attempt_ts)
+            except RunCancelledError:
+                # The run no longer needs the job; stop it billing
+                cancel_job(self.runner, job_id)
+                raise
 
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+
+    async def solve_async(self, prompt: str, image_path: Optional[str] = None, enable_code_execution: bool = False) -> ModelResponse:
+        start_attempt_ts = time.perf_counter()
+        job_id = await submit_job_async(self.runner, prompt, image_path, enable_code_execution)
+
+        if self.verbose:
+            print(f"[BACKGROUND] [{self.runner.model}] Job submitted. ID: {job_id}")
+
+        try:
+            return await poll_job_async(self.runner, job_id, prompt, image_path, start_attempt_ts)
+        except (asyncio.CancelledError, RunCancelledError):
+            await cancel_job_async(self.runner, job_id)
+            raise
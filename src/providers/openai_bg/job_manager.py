@@ -1,17 +1,36 @@
 import time
 import random
+import asyncio
 from typing import Optional, TYPE_CHECKING
-from src.llm_utils import run_with_retry
+from src.llm_utils import run_with_retry, run_with_retry_async
 from src.errors import RetryableProviderError, NonRetryableProviderError, UnknownProviderError
+from src.cancellation import cancellable_sleep
+from src.logging import get_logger
 from src.providers.openai_utils import _map_openai_exception
 from src.providers.openai_bg.parsing import parse_job_output
+from src.providers.prompt_caching import openai_cache_kwargs
 
 if TYPE_CHECKING:
     from src.providers.openai_runner import OpenAIRequestRunner
 
-def submit_job(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[str], enable_code_execution: bool) -> str:
-    content = runner._prepare_content(prompt, image_path)
-    
+logger = get_logger("providers.openai")
+
+MAX_WAIT_TIME_S = 3300  # 55 minutes
+POLL_INTERVAL_BASE_S = 2.0
+# Per-request timeout of cancelling a job whose run no longer needs it
+CANCEL_TIMEOUT_S = 30.0
+MAX_POLL_INTERVAL_S = 30.0
+# High-effort jobs run for many minutes; polling them every 2s only burns requests.
+_EFFORT_POLL_SCALE = {"none": 0.5, "minimal": 0.5, "low": 1.0, "medium": 1.5, "high": 2.5, "xhigh": 4.0}
+
+def next_poll_interval(reasoning_effort: str, elapsed: float) -> float:
+    """Seconds until the next status check of a job that has been running for `elapsed` seconds."""
+    base = POLL_INTERVAL_BASE_S * _EFFORT_POLL_SCALE.get(reasoning_effort, 1.0)
+    # Back off as the job ages: a job still running after minutes will not finish in the next 2s
+    interval = min(MAX_POLL_INTERVAL_S, base + elapsed / 20.0)
+    return interval + random.uniform(0, 1.0)
+
+def _submit_kwargs(runner: 'OpenAIRequestRunner', content: list, enable_code_execution: bool) -> dict:
     kwargs = {
         "model": runner.model,
         "input": [{"role": "user", "content": content}],
@@ -20,6 +39,8 @@ def submit_job(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[
         "store": True,
         "max_output_tokens": 120000,
     }
+    # content[0] is the prompt text
+    kwargs.update(openai_cache_kwargs(content[0]["text"]))
     if runner.reasoning_effort != "none":
         kwargs["reasoning"] = {"effort": runner.reasoning_effort}
     
@@ -33,6 +54,10 @@ def submit_job(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[
 
     if runner.last_failed_job_id:
         kwargs["previous_response_id"] = runner.last_failed_job_id
+    return kwargs
+
+def submit_job(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[str], enable_code_execution: bool) -> str:
+    kwargs = _submit_kwargs(runner, runner._prepare_content(prompt, image_path), enable_code_execution)
 
     def _submit():
         try:
@@ -51,21 +76,84 @@ def submit_job(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[
     )
     return job.id
 
+async def submit_job_async(runner: 'OpenAIRequestRunner', prompt: str, image_path: Optional[str], enable_code_execution: bool) -> str:
+    """Coroutine version of submit_job; runner.client is an AsyncOpenAI client."""
+    kwargs = _submit_kwargs(runner, await runner._prepare_content_async(prompt, image_path), enable_code_execution)
+
+    async def _submit():
+        try:
+            return await runner.client.responses.create(**kwargs)
+        except Exception as e:
+            _map_openai_exception(e, runner.full_model_name)
+
+    job = await run_with_retry_async(
+        _submit,
+        task_id=runner.task_id,
+        test_index=runner.test_index,
+        run_timestamp=runner.run_timestamp,
+        model_name=runner.full_model_name,
+        timing_tracker=runner.timing_tracker,
+        log_success=False
+    )
+    return job.id
+
+def cancel_job(runner: 'OpenAIRequestRunner', job_id: str):
+    """Best effort: stops a background job server-side so it stops billing."""
+    try:
+        runner.client.responses.cancel(job_id, timeout=CANCEL_TIMEOUT_S)
+        if runner.verbose:
+            print(f"[BACKGROUND] [{runner.model}] Job {job_id} cancelled.")
+    except Exception as e:
+        logger.warning(f"[BACKGROUND] Cancelling job {job_id} failed: {e}")
+
+async def cancel_job_async(runner: 'OpenAIRequestRunner', job_id: str):
+    try:
+        await runner.client.responses.cancel(job_id, timeout=CANCEL_TIMEOUT_S)
+        if runner.verbose:
+            print(f"[BACKGROUND] [{runner.model}] Job {job_id} cancelled.")
+    except Exception as e:
+        logger.warning(f"[BACKGROUND] Cancelling job {job_id} failed: {e}")
+
+def _check_poll_timeout(runner: 'OpenAIRequestRunner', job_id: str, elapsed: float):
+    if elapsed > MAX_WAIT_TIME_S:
+        if runner.is_downgraded_retry:
+            raise NonRetryableProviderError(f"OpenAI Background Job {job_id} timed out after {MAX_WAIT_TIME_S}s (Downgraded Retry Failed)")
+
+        raise RetryableProviderError(f"OpenAI Background Job {job_id} timed out after {MAX_WAIT_TIME_S}s")
+
+def _finish_job(runner: 'OpenAIRequestRunner', job, job_id: str, start_attempt_ts: float):
+    """Returns the parsed response of a terminal job, or None while it is still running."""
+    if job.status in ("queued", "in_progress"):
+        return None
+    
+    # Terminal States
+    if job.status == "completed":
+        return parse_job_output(job, start_attempt_ts, runner.timing_tracker, runner.full_model_name)
+    
+    elif job.status == "failed":
+        err_msg = f"Code: {job.error.code}, Message: {job.error.message}" if job.error else "Unknown error"
+        raise RetryableProviderError(f"OpenAI Background Job {job_id} FAILED: {err_msg}")
+    
+    elif job.status in ("cancelled", "incomplete"):
+        reason = getattr(job, 'incomplete_details', 'Unknown')
+        reason_str = str(reason)
+        if "max_output_tokens" in reason_str or "token_limit" in reason_str:
+            raise RetryableProviderError(f"OpenAI Background Job {job_id} hit token limit: {reason}")
+        
+        raise NonRetryableProviderError(f"OpenAI Background Job {job_id} ended with status={job.status}, reason={reason}")
+    
+    else:
+        raise UnknownProviderError(f"OpenAI Background Job {job_id} ended in unexpected status={job.status}")
+
 def poll_job(runner: 'OpenAIRequestRunner', job_id: str, prompt: str, image_path: Optional[str], start_attempt_ts: float):
     # Poll until done or timeout
-    max_wait_time = 3300  # 55 minutes
     start_time = time.time()
-    poll_interval_base = 2.0
     last_log_time = time.time()
     
     while True:
         # Check Timeout
         elapsed = time.time() - start_time
-        if elapsed > max_wait_time:
-            if runner.is_downgraded_retry:
-                raise NonRetryableProviderError(f"OpenAI Background Job {job_id} timed out after {max_wait_time}s (Downgraded Retry Failed)")
-
-            raise RetryableProviderError(f"OpenAI Background Job {job_id} timed out after {max_wait_time}s")
+        _check_poll_timeout(runner, job_id, elapsed)
 
         # Logging every ~30s
         if runner.verbose and (time.time() - last_log_time > 30):
@@ -87,29 +175,46 @@ def poll_job(runner: 'OpenAIRequestRunner', job_id: str, prompt: str, image_path
             run_timestamp=runner.run_timestamp, 
             model_name=runner.full_model_name, 
             timing_tracker=runner.timing_tracker, 
-            log_success=False
+            log_success=False,
+            kind="poll"
         )
 
-        if job.status in ("queued", "in_progress"):
-            sleep_time = poll_interval_base + random.uniform(0, 1.0)
-            time.sleep(sleep_time)
-            continue
-        
-        # Terminal States
-        if job.status == "completed":
-            return parse_job_output(job, start_attempt_ts, runner.timing_tracker, runner.full_model_name)
-        
-        elif job.status == "failed":
-            err_msg = f"Code: {job.error.code}, Message: {job.error.message}" if job.error else "Unknown error"
-            raise RetryableProviderError(f"OpenAI Background Job {job_id} FAILED: {err_msg}")
-        
-        elif job.status in ("cancelled", "incomplete"):
-            reason = getattr(job, 'incomplete_details', 'Unknown')
-            reason_str = str(reason)
-            if "max_output_tokens" in reason_str or "token_limit" in reason_str:
-                raise RetryableProviderError(f"OpenAI Background Job {job_id} hit token limit: {reason}")
-            
-            raise NonRetryableProviderError(f"OpenAI Background Job {job_id} ended with status={job.status}, reason={reason}")
-        
-        else:
-            raise UnknownProviderError(f"OpenAI Background Job {job_id} ended in unexpected status={job.status}")
+        result = _finish_job(runner, job, job_id, start_attempt_ts)
+        if result is not None:
+            return result
+        cancellable_sleep(next_poll_interval(runner.reasoning_effort, time.time() - start_time))
+
+async def poll_job_async(runner: 'OpenAIRequestRunner', job_id: str, prompt: str, image_path: Optional[str], start_attempt_ts: float):
+    """Coroutine version of poll_job; waiting between polls does not hold a thread."""
+    start_time = time.time()
+    last_log_time = time.time()
+
+    while True:
+        elapsed = time.time() - start_time
+        _check_poll_timeout(runner, job_id, elapsed)
+
+        if runner.verbose and (time.time() - last_log_time > 30):
+            print(f"[BACKGROUND] [{runner.model}] Job {job_id} still processing... ({int(elapsed)}s elapsed)")
+            last_log_time = time.time()
+
+        async def _retrieve():
+            try:
+                return await runner.client.responses.retrieve(job_id)
+            except Exception as e:
+                _map_openai_exception(e, runner.full_model_name)
+
+        job = await run_with_retry_async(
+            _retrieve,
+            task_id=runner.task_id,
+            test_index=runner.test_index,
+            run_timestamp=runner.run_timestamp,
+            model_name=runner.full_model_name,
+            timing_tracker=runner.timing_tracker,
+            log_success=False,
+            kind="poll"
+        )
+
+        result = _finish_job(runner, job, job_id, start_attempt_ts)
+        if result is not None:
+            return result
+        await asyncio.sleep(next_poll_interval(runner.reasoning_effort, time.time() - start_time))
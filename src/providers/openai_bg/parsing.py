@@ -1,5 +1,6 @@
 from typing import Any, List, Dict, Tuple
 from src.types import ModelResponse
+from src.providers.openai_utils import _openai_cached_tokens
 
 def parse_job_output(job: Any, start_attempt_ts: float, timing_tracker: List[Dict] = None, full_model_name: str = "openai-model") -> ModelResponse:
     text_output = ""
@@ -77,7 +78,7 @@ def parse_job_output(job: Any, start_attempt_ts: float, timing_tracker: List[Dic
     return ModelResponse(
         text=text_output,
         prompt_tokens=getattr(usage, "input_tokens", 0) if usage else 0,
-        cached_tokens=0,
+        cached_tokens=_openai_cached_tokens(usage),
         completion_tokens=getattr(usage, "output_tokens", 0) if usage else 0,
         strategy=None,
         detailed_logs=detailed_logs
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Dict, TYPE_CHECKING
+
+from src.errors import RetryableProviderError, RunCancelledError
+from src.retry_policy import POLL_RETRY, retry_delay
+from src.logging import get_logger
+from src.providers.openai_utils import _map_openai_exception
+from src.providers.openai_bg.job_manager import _check_poll_timeout, _finish_job, next_poll_interval
+
+if TYPE_CHECKING:
+    from src.providers.openai_runner import OpenAIRequestRunner
+
+logger = get_logger("providers.openai")
+
+# When enabled, background jobs are polled by one thread per process instead of one loop per job.
+_POLLER_ENABLED = os.getenv("ARC_AGI_OPENAI_BG_POLLER", "true").lower() == "true"
+
+# Consecutive failed status checks tolerated before the job's caller gets the error.
+MAX_CONSECUTIVE_POLL_ERRORS = POLL_RETRY.max_attempts
+# Per-request timeout of a status check, so one slow call cannot stall every other job.
+RETRIEVE_TIMEOUT_S = 30.0
+
+def set_background_poller_enabled(enabled: bool):
+    global _POLLER_ENABLED
+    _POLLER_ENABLED = enabled
+
+def get_background_poller_enabled() -> bool:
+    return _POLLER_ENABLED
+
+class _PolledJob:
+    __slots__ = ("runner", "job_id", "start_attempt_ts", "start_time", "last_log_time", "next_poll", "poll_errors", "future")
+
+    def __init__(self, runner: 'OpenAIRequestRunner', job_id: str, start_attempt_ts: float):
+        self.runner = runner
+        self.job_id = job_id
+        self.start_attempt_ts = start_attempt_ts
+        self.start_time = time.time()
+        self.last_log_time = self.start_time
+        self.next_poll = time.monotonic() + next_poll_interval(runner.reasoning_effort, 0.0)
+        self.poll_errors = 0
+        self.future = Future()
+
+class BackgroundJobPoller:
+    """
+    Owns every outstanding OpenAI background job of this process.
+    A single daemon thread checks each job when it is due and resolves its future
+    with the parsed response, or with the same errors poll_job would raise.
+    """
+    def __init__(self):
+        self._jobs: Dict[str, _PolledJob] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def submit(self, runner: 'OpenAIRequestRunner', job_id: str, start_attempt_ts: float) -> Future:
+        job = _PolledJob(runner, job_id, start_attempt_ts)
+        with self._lock:
+            self._jobs[job_id] = job
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="openai-bg-poller", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return job.future
+
+    def cancel(self, job_id: str):
+        """Stops polling job_id; its caller gets RunCancelledError (and cancels the job server-side)."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.future.set_exception(RunCancelledError(f"Background job {job_id} cancelled"))
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [job for job in self._jobs.values() if job.next_poll <= now]
+                upcoming = [job.next_poll for job in self._jobs.values() if job.next_poll > now]
+
+            for job in due:
+                self._poll(job)
+
+            if due:
+                continue
+            timeout = min(upcoming) - now if upcoming else None
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _resolve(self, job: _PolledJob, result=None, error: BaseException = None):
+        with self._lock:
+            owned = self._jobs.pop(job.job_id, None) is job
+        if not owned:
+            # Cancelled while its status check was in flight
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def _poll(self, job: _PolledJob):
+        runner = job.runner
+        elapsed = time.time() - job.start_time
+        try:
+            _check_poll_timeout(runner, job.job_id, elapsed)
+        except Exception as e:
+            self._resolve(job, error=e)
+            return
+
+        # Logging every ~30s
+        if runner.verbose and (time.time() - job.last_log_time > 30):
+            print(f"[BACKGROUND] [{runner.model}] Job {job.job_id} still processing... ({int(elapsed)}s elapsed)")
+            job.last_log_time = time.time()
+
+        start_ts = time.perf_counter()
+        try:
+            try:
+                status = runner.client.responses.retrieve(job.job_id, timeout=RETRIEVE_TIMEOUT_S)
+            except Exception as e:
+                _map_openai_exception(e, runner.full_model_name)
+        except RetryableProviderError as e:
+            job.poll_errors += 1
+            if runner.timing_tracker is not None:
+                runner.timing_tracker.append({
+                    "type": "attempt",
+                    "model": runner.full_model_name,
+                    "duration": time.perf_counter() - start_ts,
+                    "status": "failed",
+                    "error": str(e)
+                })
+            if job.poll_errors >= MAX_CONSECUTIVE_POLL_ERRORS:
+                self._resolve(job, error=e)
+                return
+            logger.warning(f"[BACKGROUND] Status check {job.poll_errors}/{MAX_CONSECUTIVE_POLL_ERRORS} for job {job.job_id} failed: {e}")
+            # Short jittered backoff, or the server's Retry-After
+            job.next_poll = time.monotonic() + retry_delay(e, POLL_RETRY, job.poll_errors - 1)
+            return
+        except Exception as e:
+            self._resolve(job, error=e)
+            return
+
+        job.poll_errors = 0
+        try:
+            result = _finish_job(runner, status, job.job_id, job.start_attempt_ts)
+        except Exception as e:
+            self._resolve(job, error=e)
+            return
+
+        if result is not None:
+            self._resolve(job, result=result)
+        else:
+            job.next_poll = time.monotonic() + next_poll_interval(runner.reasoning_effort, time.time() - job.start_time)
+
+    def _reset_after_fork(self):
+        # The poller thread and the parent's jobs do not belong to a forked child
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+_POLLER = BackgroundJobPoller()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_POLLER._reset_after_fork)
+
+def get_background_poller() -> BackgroundJobPoller:
+    return _POLLER
@@ -1,16 +1,19 @@
-import base64
-import mimetypes
 import sys
-from typing import Optional, List, Dict, Any
+import asyncio
+from typing import Optional, List, Dict, Any, Union
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from anthropic import Anthropic
 
 from src.types import ModelConfig, ModelResponse
-from src.llm_utils import run_with_retry, orchestrate_two_stage
+from src.llm_utils import run_with_retry, run_with_retry_async, orchestrate_two_stage, orchestrate_two_stage_async
 from src.logging import get_logger
-from src.providers.openai_utils import _map_openai_exception
+from src.cancellation import on_cancel, check_cancelled
+from src.deadline import call_timeout
+from src.providers.openai_utils import _map_openai_exception, _openai_cached_tokens
 from src.providers.openai_background import OpenAIBackgroundSolver
+from src.providers.image_payloads import openai_image_content, openai_image_content_async
+from src.providers.prompt_caching import openai_cache_kwargs
 
 logger = get_logger("providers.openai")
 
@@ -19,7 +22,7 @@ class OpenAIRequestRunner:
     
     def __init__(
         self,
-        client: OpenAI,
+        client: Union[OpenAI, AsyncOpenAI],
         config: ModelConfig,
         anthropic_client: Optional[Anthropic] = None,
         task_id: Optional[str] = None,
@@ -54,26 +57,24 @@ class OpenAIRequestRunner:
     def _prepare_content(self, prompt: str, image_path: Optional[str] = None) -> List[Dict[str, Any]]:
         content = [{"type": "input_text", "text": prompt}]
         if image_path:
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-            mime_type, _ = mimetypes.guess_type(image_path)
-            if mime_type is None:
-                mime_type = 'application/octet-stream'
-            content.append({
-                "type": "input_image",
-                "image_url": f"data:{mime_type};base64,{base64_image}",
-            })
+            content.append(openai_image_content(self.client, image_path))
         return content
 
-    def solve_stream(self, prompt: str, image_path: Optional[str] = None, enable_code_execution: bool = False) -> ModelResponse:
-        content = self._prepare_content(prompt, image_path)
+    async def _prepare_content_async(self, prompt: str, image_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        content = [{"type": "input_text", "text": prompt}]
+        if image_path:
+            content.append(await openai_image_content_async(self.client, image_path))
+        return content
 
+    def _stream_kwargs(self, content: List[Dict[str, Any]], enable_code_execution: bool = False) -> Dict[str, Any]:
         kwargs = {
             "model": self.model,
             "input": [{"role": "user", "content": content}],
-            "timeout": 3300,
+            "timeout": call_timeout(3300),
             "stream": True,
         }
+        # content[0] is the prompt text
+        kwargs.update(openai_cache_kwargs(content[0]["text"]))
         if self.reasoning_effort != "none":
             kwargs["reasoning"] = {"effort": self.reasoning_effort}
         
@@ -86,96 +87,9 @@ class OpenAIRequestRunner:
             # kwargs["tool_choice"] = "auto"
             # kwargs["max_tool_calls"] = 100
             # kwargs["include"] = ["code_interpreter_call.outputs"]
+        return kwargs
 
-        def _call_and_accumulate():
-            try:
-                stream = self.client.responses.create(**kwargs)
-                collected_content = []
-                usage_data = None
-                response_id = None
-                
-                # Detailed logging accumulators
-                detailed_logs = []
-                current_code_block = ""
-                
-                for chunk in stream:
-                    chunk_type = getattr(chunk, "type", "")
-                    
-                    if chunk_type == "response.created":
-                        if hasattr(chunk, "response") and hasattr(chunk.response, "id"):
-                            response_id = chunk.response.id
-
-                    elif chunk_type == "response.output_text.delta":
-                        if hasattr(chunk, "delta") and chunk.delta:
-                            text_delta = chunk.delta
-                            collected_content.append(text_delta)
-                            # Append to logs. If the last log was text, append to it to keep it clean?
-                            # For simplicity/stream-likeness, we can append chunks or aggregate later.
-                            # Let's aggregate continuously if type matches.
-                            if detailed_logs and detailed_logs[-1]["type"] == "text":
-                                detailed_logs[-1]["content"] += text_delta
-                            else:
-                                detailed_logs.append({"type": "text", "content": text_delta})
-                    
-                    elif chunk_type == "response.reasoning_text.delta":
-                        if hasattr(chunk, "delta") and chunk.delta:
-                            thought_delta = chunk.delta
-                            if detailed_logs and detailed_logs[-1]["type"] == "thought":
-                                detailed_logs[-1]["content"] += thought_delta
-                            else:
-                                detailed_logs.append({"type": "thought", "content": thought_delta})
-                    
-                    elif chunk_type == "response.code_interpreter_call.delta":
-                        # Capturing code generation
-                        if hasattr(chunk, "delta") and hasattr(chunk.delta, "code_interpreter_call") and hasattr(chunk.delta.code_interpreter_call, "input"):
-                            code_delta = chunk.delta.code_interpreter_call.input
-                            if code_delta:
-                                if detailed_logs and detailed_logs[-1]["type"] == "code":
-                                    detailed_logs[-1]["code"] += code_delta
-                                else:
-                                    detailed_logs.append({"type": "code", "code": code_delta, "language": "python"})
-
-                    elif chunk_type == "response.code_interpreter_call.output":
-                         # Capturing execution output
-                         if hasattr(chunk, "output") and hasattr(chunk.output, "content"):
-                             # There might be multiple content parts (logs, images)
-                             for content_item in chunk.output.content:
-                                 if content_item.type == "logs":
-                                     detailed_logs.append({
-                                         "type": "execution_result", 
-                                         "output": content_item.logs, 
-                                         "outcome": "completed"
-                                     })
-                                 elif content_item.type == "image":
-                                     detailed_logs.append({
-                                         "type": "execution_result",
-                                         "output": "<image_data>",
-                                         "outcome": "image_generated"
-                                     })
-
-                    if chunk_type == "response.completed":
-                        if hasattr(chunk, "response") and hasattr(chunk.response, "usage"):
-                            usage_data = chunk.response.usage
-
-                return {
-                    "text": "".join(collected_content),
-                    "usage": usage_data,
-                    "id": response_id,
-                    "detailed_logs": detailed_logs
-                }
-
-            except Exception as e:
-                _map_openai_exception(e, self.full_model_name)
-
-        result = run_with_retry(
-            lambda: _call_and_accumulate(),
-            task_id=self.task_id,
-            test_index=self.test_index,
-            run_timestamp=self.run_timestamp,
-            model_name=self.full_model_name,
-            timing_tracker=self.timing_tracker
-        )
-
+    def _response_from_stream(self, result: Dict[str, Any]) -> ModelResponse:
         text_output = result["text"]
         if not text_output:
             # Fallback: if we have code logs but no text, maybe the model just ran code?
@@ -187,7 +101,7 @@ class OpenAIRequestRunner:
         resp_obj = ModelResponse(
             text=text_output,
             prompt_tokens=getattr(usage, "input_tokens", 0) if usage else 0,
-            cached_tokens=0,
+            cached_tokens=_openai_cached_tokens(usage),
             completion_tokens=getattr(usage, "output_tokens", 0) if usage else 0,
             strategy=None,
             detailed_logs=result.get("detailed_logs")
@@ -200,14 +114,90 @@ class OpenAIRequestRunner:
         resp_obj._raw_response = MockRawResponse(result["id"])
         return resp_obj
 
+    def solve_stream(self, prompt: str, image_path: Optional[str] = None, enable_code_execution: bool = False) -> ModelResponse:
+        kwargs = self._stream_kwargs(self._prepare_content(prompt, image_path), enable_code_execution)
+
+        def _call_and_accumulate():
+            try:
+                stream = self.client.responses.create(**kwargs)
+                accumulator = _StreamAccumulator()
+                # Cancelling the run closes the stream under the loop
+                with on_cancel(stream.close):
+                    for chunk in stream:
+                        accumulator.add(chunk)
+                check_cancelled()
+                return accumulator.result()
+
+            except Exception as e:
+                _map_openai_exception(e, self.full_model_name)
+
+        result = run_with_retry(
+            lambda: _call_and_accumulate(),
+            task_id=self.task_id,
+            test_index=self.test_index,
+            run_timestamp=self.run_timestamp,
+            model_name=self.full_model_name,
+            timing_tracker=self.timing_tracker
+        )
+        return self._response_from_stream(result)
+
+    async def solve_stream_async(self, prompt: str, image_path: Optional[str] = None, enable_code_execution: bool = False) -> ModelResponse:
+        kwargs = self._stream_kwargs(await self._prepare_content_async(prompt, image_path), enable_code_execution)
+
+        async def _call_and_accumulate():
+            try:
+                stream = await self.client.responses.create(**kwargs)
+                accumulator = _StreamAccumulator()
+                try:
+                    async for chunk in stream:
+                        accumulator.add(chunk)
+                except asyncio.CancelledError:
+                    await stream.close()
+                    raise
+                return accumulator.result()
+
+            except Exception as e:
+                _map_openai_exception(e, self.full_model_name)
+
+        result = await run_with_retry_async(
+            _call_and_accumulate,
+            task_id=self.task_id,
+            test_index=self.test_index,
+            run_timestamp=self.run_timestamp,
+            model_name=self.full_model_name,
+            timing_tracker=self.timing_tracker
+        )
+        return self._response_from_stream(result)
+
+    def _explain_kwargs(self, prompt: str, prev_resp: ModelResponse) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "previous_response_id": prev_resp._raw_response.id,
+            "input": [{"role": "user", "content": prompt}],
+            "timeout": call_timeout(3300)
+        }
+
+    @staticmethod
+    def _response_from_explain(response) -> ModelResponse:
+        text_output = ""
+        if hasattr(response, "output"):
+            for item in response.output:
+                if item.type == "message":
+                    for content_part in item.content:
+                        if content_part.type == "output_text":
+                            text_output += content_part.text
+        
+        usage = getattr(response, "usage", None)
+        return ModelResponse(
+            text=text_output,
+            prompt_tokens=getattr(usage, "input_tokens", 0) if usage else 0,
+            cached_tokens=_openai_cached_tokens(usage),
+            completion_tokens=getattr(usage, "output_tokens", 0) if usage else 0,
+        )
+
     def explain(self, prompt: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
         try:
-            kwargs = {
-                "model": self.model,
-                "previous_response_id": prev_resp._raw_response.id,
-                "input": [{"role": "user", "content": prompt}],
-                "timeout": 3300
-            }
+            kwargs = self._explain_kwargs(prompt, prev_resp)
             
             def _create_safe():
                 try:
@@ -223,22 +213,30 @@ class OpenAIRequestRunner:
                 model_name=self.full_model_name,
                 timing_tracker=self.timing_tracker
             )
-            
-            text_output = ""
-            if hasattr(response, "output"):
-                for item in response.output:
-                    if item.type == "message":
-                        for content_part in item.content:
-                            if content_part.type == "output_text":
-                                text_output += content_part.text
-            
-            usage = getattr(response, "usage", None)
-            return ModelResponse(
-                text=text_output,
-                prompt_tokens=getattr(usage, "input_tokens", 0) if usage else 0,
-                cached_tokens=0,
-                completion_tokens=getattr(usage, "output_tokens", 0) if usage else 0,
+            return self._response_from_explain(response)
+        except Exception as e:
+            logger.error(f"Step 2 strategy extraction failed: {e}")
+            return None
+
+    async def explain_async(self, prompt: str, prev_resp: ModelResponse) -> Optional[ModelResponse]:
+        try:
+            kwargs = self._explain_kwargs(prompt, prev_resp)
+
+            async def _create_safe():
+                try:
+                    return await self.client.responses.create(**kwargs)
+                except Exception as e:
+                    _map_openai_exception(e, self.full_model_name)
+
+            response = await run_with_retry_async(
+                _create_safe,
+                task_id=self.task_id,
+                test_index=self.test_index,
+                run_timestamp=self.run_timestamp,
+                model_name=self.full_model_name,
+                timing_tracker=self.timing_tracker
             )
+            return self._response_from_explain(response)
         except Exception as e:
             logger.error(f"Step 2 strategy extraction failed: {e}")
             return None
@@ -263,3 +261,103 @@ class OpenAIRequestRunner:
             self.verbose,
             image_path
         )
+
+    async def run_async(self, prompt: str, image_path: Optional[str] = None, return_strategy: bool = False, use_background: bool = False, enable_code_execution: bool = False) -> ModelResponse:
+        """Coroutine version of run; requires the runner to hold an AsyncOpenAI client."""
+        if use_background:
+            return await run_with_retry_async(
+                lambda: self.background_solver.solve_async(prompt, image_path, enable_code_execution=enable_code_execution),
+                task_id=self.task_id,
+                test_index=self.test_index,
+                run_timestamp=self.run_timestamp,
+                model_name=self.full_model_name,
+                timing_tracker=self.timing_tracker,
+                log_success=False
+            )
+
+        return await orchestrate_two_stage_async(
+            lambda p: self.solve_stream_async(p, image_path, enable_code_execution=enable_code_execution),
+            self.explain_async,
+            prompt,
+            return_strategy,
+            self.verbose,
+            image_path
+        )
+
+class _StreamAccumulator:
+    """Collects text, usage and detailed logs from Responses API stream events."""
+
+    def __init__(self):
+        self.collected_content = []
+        self.usage_data = None
+        self.response_id = None
+        # Detailed logging accumulators
+        self.detailed_logs = []
+
+    def add(self, chunk):
+        detailed_logs = self.detailed_logs
+        chunk_type = getattr(chunk, "type", "")
+        
+        if chunk_type == "response.created":
+            if hasattr(chunk, "response") and hasattr(chunk.response, "id"):
+                self.response_id = chunk.response.id
+
+        elif chunk_type == "response.output_text.delta":
+            if hasattr(chunk, "delta") and chunk.delta:
+                text_delta = chunk.delta
+                self.collected_content.append(text_delta)
+                # Append to logs. If the last log was text, append to it to keep it clean?
+                # For simplicity/stream-likeness, we can append chunks or aggregate later.
+                # Let's aggregate continuously if type matches.
+                if detailed_logs and detailed_logs[-1]["type"] == "text":
+                    detailed_logs[-1]["content"] += text_delta
+                else:
+                    detailed_logs.append({"type": "text", "content": text_delta})
+        
+        elif chunk_type == "response.reasoning_text.delta":
+            if hasattr(chunk, "delta") and chunk.delta:
+                thought_delta = chunk.delta
+                if detailed_logs and detailed_logs[-1]["type"] == "thought":
+                    detailed_logs[-1]["content"] += thought_delta
+                else:
+                    detailed_logs.append({"type": "thought", "content": thought_delta})
+        
+        elif chunk_type == "response.code_interpreter_call.delta":
+            # Capturing code generation
+            if hasattr(chunk, "delta") and hasattr(chunk.delta, "code_interpreter_call") and hasattr(chunk.delta.code_interpreter_call, "input"):
+                code_delta = chunk.delta.code_interpreter_call.input
+                if code_delta:
+                    if detailed_logs and detailed_logs[-1]["type"] == "code":
+                        detailed_logs[-1]["code"] += code_delta
+                    else:
+                        detailed_logs.append({"type": "code", "code": code_delta, "language": "python"})
+
+        elif chunk_type == "response.code_interpreter_call.output":
+             # Capturing execution output
+             if hasattr(chunk, "output") and hasattr(chunk.output, "content"):
+                 # There might be multiple content parts (logs, images)
+                 for content_item in chunk.output.content:
+                     if content_item.type == "logs":
+                         detailed_logs.append({
+                             "type": "execution_result", 
+                             "output": content_item.logs, 
+                             "outcome": "completed"
+                         })
+                     elif content_item.type == "image":
+                         detailed_logs.append({
+                             "type": "execution_result",
+                             "output": "<image_data>",
+                             "outcome": "image_generated"
+                         })
+
+        if chunk_type == "response.completed":
+            if hasattr(chunk, "response") and hasattr(chunk.response, "usage"):
+                self.usage_data = chunk.response.usage
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "text": "".join(self.collected_content),
+            "usage": self.usage_data,
+            "id": self.response_id,
+            "detailed_logs": self.detailed_logs
+        }
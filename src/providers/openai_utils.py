@@ -28,3 +28,8 @@ def _map_openai_exception(e: Exception, model_name: str):
         raise RetryableProviderError(f"Network/Protocol Error (Model: {model_name}): {e}") from e
 
     raise UnknownProviderError(f"Unexpected OpenAI Error (Model: {model_name}): {e}") from e
+
+def _openai_cached_tokens(usage) -> int:
+    """Cached part of a Responses API usage's input_tokens (0 when not reported)."""
+    details = getattr(usage, "input_tokens_details", None) if usage else None
+    return getattr(details, "cached_tokens", 0) or 0
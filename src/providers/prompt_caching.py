@@ -0,0 +1,44 @@
+import os
+import hashlib
+from typing import Optional
+
+from src.types import CacheablePrompt
+
+# When enabled, providers are told which part of a prompt is the task's shared prefix:
+# OpenAI gets a prompt_cache_key, Anthropic a cache_control breakpoint after the prefix.
+# Gemini caches repeated prefixes implicitly; only its cached-token counts are read.
+_PROMPT_CACHING_ENABLED = os.getenv("ARC_AGI_PROMPT_CACHING", "false").lower() == "true"
+
+def set_prompt_caching_enabled(enabled: bool):
+    global _PROMPT_CACHING_ENABLED
+    _PROMPT_CACHING_ENABLED = enabled
+
+def get_prompt_caching_enabled() -> bool:
+    return _PROMPT_CACHING_ENABLED
+
+def _cacheable_prefix(prompt) -> Optional[str]:
+    if not _PROMPT_CACHING_ENABLED or not isinstance(prompt, CacheablePrompt) or not prompt.prefix_len:
+        return None
+    return prompt.prefix
+
+def prompt_cache_key(prompt) -> Optional[str]:
+    """Stable key of the prompt's shared prefix, or None when caching does not apply."""
+    prefix = _cacheable_prefix(prompt)
+    if prefix is None:
+        return None
+    return "arc-" + hashlib.sha256(prefix.encode()).hexdigest()[:32]
+
+def openai_cache_kwargs(prompt) -> dict:
+    """Extra Responses API arguments routing same-prefix requests to the same cache."""
+    key = prompt_cache_key(prompt)
+    return {"prompt_cache_key": key} if key else {}
+
+def anthropic_text_blocks(prompt: str) -> list:
+    """The prompt as text blocks, with a cache breakpoint closing the shared prefix."""
+    prefix = _cacheable_prefix(prompt)
+    if prefix is None:
+        return [{"type": "text", "text": str(prompt)}]
+    blocks = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+    if prompt.suffix:
+        blocks.append({"type": "text", "text": prompt.suffix})
+    return blocks
@@ -1,12 +1,31 @@
+import os
 import time
+import asyncio
+import itertools
 import threading
 
+# Prioritized waiters (see try_acquire): bounds of the suggested wait between polls, how long a
+# waiter that stopped polling keeps its place, and how fast waiting moves a caller up one priority class.
+TICKET_MIN_POLL_S = 0.05
+TICKET_MAX_POLL_S = 5.0
+TICKET_GRACE_S = 2.0
+PRIORITY_AGING_S = 120.0
+
+_TICKETS = itertools.count()
+
+def new_ticket() -> str:
+    """Identifies one waiting caller across all processes sharing a bucket."""
+    return f"{os.getpid()}-{threading.get_ident()}-{next(_TICKETS)}"
+
 class RateLimiter:
     """
     Thread-safe Token Bucket Rate Limiter.
     Ensures that no more than `rate` requests are made within `period` seconds.
     Blocks the calling thread until a token is available.
     """
+    # Whether the bucket lives in another process, so each try_acquire is a blocking round trip
+    is_remote = False
+
     def __init__(self, rate: float, period: float = 60.0):
         self.rate = rate
         self.period = period
@@ -14,6 +33,12 @@ class RateLimiter:
         self.tokens = self.capacity  # Start with full bucket
         self.last_update = time.monotonic()
         self.lock = threading.Lock()
+        # Queue wait accounting (calls that had to wait, total and longest wait in seconds)
+        self.waited_calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # Prioritized callers waiting for a token, by ticket
+        self.waiters = {}
 
     def _refill(self, now: float):
         """Refills tokens based on time elapsed."""
@@ -22,25 +47,120 @@ class RateLimiter:
         self.tokens = min(self.capacity, self.tokens + refill)
         self.last_update = now
 
-    def acquire(self):
+    def try_acquire(self, ticket: str = None, priority: tuple = None) -> float:
         """
-        Acquires a token. Blocks if none are available.
-        Releases the lock while sleeping to avoid blocking other threads.
+        Takes a token if one is available and returns 0.0.
+        Otherwise returns the number of seconds until one should be, without waiting.
+        With a ticket, the caller queues with a priority (lower sorts first): a token is only taken
+        once every waiter ranked ahead could be served too, so free tokens go to the best-ranked waiters.
         """
-        while True:
-            with self.lock:
-                now = time.monotonic()
-                self._refill(now)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            tokens_per_second = self.rate / self.period
 
+            if ticket is None:
                 if self.tokens >= 1:
                     self.tokens -= 1
-                    return  # Token acquired
+                    return 0.0  # Token acquired
 
                 # Calculate wait time
                 needed = 1 - self.tokens
-                tokens_per_second = self.rate / self.period
-                wait_time = needed / tokens_per_second
+                return needed / tokens_per_second
+
+            return self._try_ticket(ticket, tuple(priority or ()), now, tokens_per_second)
+
+    def _rank_key(self, waiter: dict, now: float) -> tuple:
+        # Waiting moves a caller up one class per PRIORITY_AGING_S, so low classes are not starved
+        priority = waiter["priority"] or (0,)
+        aged = priority[0] - (now - waiter["since"]) / PRIORITY_AGING_S
+        return (aged, *priority[1:], waiter["since"])
+
+    def _try_ticket(self, ticket: str, priority: tuple, now: float, tokens_per_second: float) -> float:
+        # Waiters that stopped polling (finished elsewhere, or their process died) lose their place
+        for stale in [t for t, w in self.waiters.items() if t != ticket and now > w["due"] + TICKET_GRACE_S]:
+            del self.waiters[stale]
+
+        waiter = self.waiters.setdefault(ticket, {"since": now})
+        waiter["priority"] = priority
+        key = self._rank_key(waiter, now)
+        ahead = sum(1 for t, w in self.waiters.items() if t != ticket and self._rank_key(w, now) < key)
+
+        if self.tokens >= ahead + 1:
+            self.tokens -= 1
+            del self.waiters[ticket]
+            return 0.0  # Token acquired
+
+        # Roughly when enough tokens for this waiter and everyone ahead of it have accrued
+        needed = ahead + 1 - self.tokens
+        wait = min(TICKET_MAX_POLL_S, max(TICKET_MIN_POLL_S, needed / tokens_per_second))
+        waiter["due"] = now + wait
+        return wait
+
+    def queued(self) -> int:
+        """Prioritized callers currently waiting for a token."""
+        with self.lock:
+            return len(self.waiters)
 
+    def record_wait(self, seconds: float):
+        """Adds one call's queue wait to the stats."""
+        if seconds <= 0:
+            return
+        with self.lock:
+            self.waited_calls += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def level(self) -> float:
+        """Fraction of the bucket currently available (0.0 empty .. 1.0 full)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            return max(0.0, self.tokens) / self.capacity
+
+    def wait_stats(self) -> dict:
+        with self.lock:
+            return {"waited_calls": self.waited_calls, "total_wait": self.total_wait, "max_wait": self.max_wait}
+
+    def acquire(self, priority: tuple = None) -> float:
+        """
+        Acquires a token. Blocks if none are available.
+        Releases the lock while sleeping to avoid blocking other threads.
+        With a priority, the caller queues behind better-ranked waiters (see try_acquire).
+        Returns the number of seconds spent waiting.
+        """
+        ticket = new_ticket() if priority is not None else None
+        wait_time = self.try_acquire(ticket, priority)
+        if wait_time == 0.0:
+            return 0.0  # Token acquired
+
+        start = time.monotonic()
+        while wait_time > 0.0:
             # Sleep outside the lock
-            if wait_time > 0:
-                time.sleep(wait_time)
+            time.sleep(wait_time)
+            wait_time = self.try_acquire(ticket, priority)
+
+        waited = time.monotonic() - start
+        self.record_wait(waited)
+        return waited
+
+    async def _off_loop(self, func, *args):
+        # A remote bucket's round trip would stall every coroutine on the loop
+        if self.is_remote:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def acquire_async(self, priority: tuple = None) -> float:
+        """Like acquire, but waits with asyncio.sleep so the event loop keeps running."""
+        ticket = new_ticket() if priority is not None else None
+        wait_time = await self._off_loop(self.try_acquire, ticket, priority)
+        if wait_time == 0.0:
+            return 0.0
+
+        start = time.monotonic()
+        while wait_time > 0.0:
+            await asyncio.sleep(wait_time)
+            wait_time = await self._off_loop(self.try_acquire, ticket, priority)
+
+        waited = time.monotonic() - start
+        await self._off_loop(self.record_wait, waited)
+        return waited
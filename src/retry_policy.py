@@ -0,0 +1,122 @@
+import os
+import time
+import random
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+
+from src.errors import RateLimitProviderError, UnknownProviderError, RetryableProviderError
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Backoff of one error class: base_delay_s doubling per retry up to max_delay_s, with +/- jitter."""
+    base_delay_s: float
+    max_delay_s: float
+    max_attempts: int
+    jitter: float = 0.2
+
+    def delay(self, retry_index: int) -> float:
+        delay = min(self.max_delay_s, self.base_delay_s * (2 ** retry_index))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+RATE_LIMIT_RETRY = RetryPolicy(base_delay_s=30.0, max_delay_s=300.0, max_attempts=10)
+TRANSIENT_RETRY = RetryPolicy(base_delay_s=30.0, max_delay_s=300.0, max_attempts=2)
+UNKNOWN_RETRY = RetryPolicy(base_delay_s=60.0, max_delay_s=300.0, max_attempts=2)
+# Status checks of a running job: cheap and idempotent, so retried soon and often
+POLL_RETRY = RetryPolicy(base_delay_s=1.0, max_delay_s=15.0, max_attempts=5, jitter=0.5)
+
+# Retries and total retry sleep one logical model call may spend across all nested retry loops
+RETRY_BUDGET_RETRIES = int(os.getenv("ARC_AGI_RETRY_BUDGET_RETRIES", "10"))
+RETRY_BUDGET_S = float(os.getenv("ARC_AGI_RETRY_BUDGET_S", "1800"))
+
+def error_class(e: Exception) -> str:
+    if isinstance(e, RateLimitProviderError):
+        return "rate_limit"
+    if isinstance(e, UnknownProviderError):
+        return "unknown"
+    if isinstance(e, RetryableProviderError):
+        return "transient"
+    return "fatal"
+
+def policy_for(e: Exception, kind: str = "call") -> RetryPolicy:
+    """kind="poll" marks status checks, which get short retries for everything but rate limits."""
+    cls = error_class(e)
+    if cls == "rate_limit":
+        return RATE_LIMIT_RETRY
+    if kind == "poll":
+        return POLL_RETRY
+    return UNKNOWN_RETRY if cls == "unknown" else TRANSIENT_RETRY
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Retry-After (or retry-after-ms) of the HTTP response behind e or its causes, if any."""
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                if headers.get("retry-after-ms"):
+                    return max(0.0, float(headers["retry-after-ms"]) / 1000)
+                value = headers.get("retry-after")
+                if value:
+                    try:
+                        return max(0.0, float(value))
+                    except ValueError:
+                        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        e = e.__cause__ or e.__context__
+    return None
+
+def retry_delay(e: Exception, policy: RetryPolicy, retry_index: int) -> float:
+    """The server's Retry-After when it sent one (plus a little jitter), else the policy's backoff."""
+    retry_after = retry_after_seconds(e)
+    if retry_after is not None:
+        return retry_after * random.uniform(1.0, 1.1)
+    return policy.delay(retry_index)
+
+class RetryBudget:
+    """Retries and retry sleep left to one logical call; nested retry loops draw from the same budget."""
+    def __init__(self, max_retries: int = None, max_sleep_s: float = None):
+        self.max_retries = RETRY_BUDGET_RETRIES if max_retries is None else max_retries
+        self.max_sleep_s = RETRY_BUDGET_S if max_sleep_s is None else max_sleep_s
+        self.retries = 0
+        self.slept_s = 0.0
+
+    @property
+    def remaining_s(self) -> float:
+        return max(0.0, self.max_sleep_s - self.slept_s)
+
+    def allows(self, delay: float, counted: bool = True) -> bool:
+        return (not counted or self.retries < self.max_retries) and delay <= self.remaining_s
+
+    def spend(self, delay: float, counted: bool = True):
+        # Status-check retries of a long job only cost time, not one of the call's retries
+        if counted:
+            self.retries += 1
+        self.slept_s += delay
+
+_BUDGET: contextvars.ContextVar[Optional[RetryBudget]] = contextvars.ContextVar("retry_budget", default=None)
+
+@contextmanager
+def retry_budget() -> Iterator[RetryBudget]:
+    """The budget of the enclosing logical call, or a new one when this is the outermost retry loop."""
+    budget = _BUDGET.get()
+    if budget is not None:
+        yield budget
+        return
+    budget = RetryBudget()
+    token = _BUDGET.set(budget)
+    try:
+        yield budget
+    finally:
+        _BUDGET.reset(token)
+
+def mark_retries_exhausted(e: BaseException):
+    """An inner retry loop gave up on e; enclosing loops re-raise it instead of retrying again."""
+    e.retries_exhausted = True
+
+def retries_exhausted(e: BaseException) -> bool:
+    return getattr(e, "retries_exhausted", False)
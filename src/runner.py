@@ -12,8 +12,31 @@ from src.execution import execute_task
 from src.submission import generate_submission
 from src.batch_processing import run_batch_execution
 from src.llm_utils import set_retries_enabled
+from src.solver.checkpoint import load_finished_predictions
 
+# Model lineups of --solver (default) and --solver-testing when none are given
+SOLVER_STEP1_MODELS = "claude-opus-4.5-thinking-60000,claude-opus-4.5-thinking-60000,claude-opus-4.5-thinking-60000,gemini-3-high,gemini-3-high,gemini-3-high,gemini-3-high,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh"
+TESTING_STEP1_MODELS = "gpt-5.2-low,claude-opus-4.5-thinking-4000"
+SOLVER_CODEGEN_PARAMS = "gemini-3-high=v4,gpt-5.2-xhigh=v1b"
+TESTING_CODEGEN_PARAMS = "gpt-5.2-low=v1b,gpt-5.2-low=v4,gemini-3-low=v4"
+SOLVER_JUDGE_MODEL = "gpt-5.2-xhigh"
+TESTING_JUDGE_MODEL = "gpt-5.1-low"
 
+def _split_finished(args, tasks_to_run, run_timestamp):
+    """When resuming, takes the units finalized before the interruption out of tasks_to_run. Returns (remaining, their results)."""
+    if not args.resume:
+        return tasks_to_run, []
+    remaining, finished = [], []
+    for item in tasks_to_run:
+        task_id = item[0] if len(item) == 3 else Path(item[0]).stem
+        test_idx = item[1]
+        predictions = load_finished_predictions(args.logs_directory, run_timestamp, task_id, test_idx)
+        if predictions is None:
+            remaining.append(item)
+        else:
+            finished.append((task_id, test_idx, predictions))
+    print(f"Resume: {len(finished)} task:test units already finished, {len(remaining)} to run.")
+    return remaining, finished
 
 def run_app(
     task=None,
@@ -38,6 +61,9 @@ def run_app(
     image=False,
     codegen_params=None,
     disable_retries=False,
+    parallel_verification=False,
+    async_providers=False,
+    prompt_caching=False,
     disable_step_1_standard_models=False,
     trigger_deep_thinking=False,
     generate_hint=False,
@@ -53,19 +79,17 @@ def run_app(
     enable_step_3_and_4=False,
     judge_consistency_enable=False,
     judge_duo_pick=True,
+    llm_transport="live",
+    replay_dir="llm_recordings/",
+    replay_speed=0.0,
+    resume=None,
 ):
     # Set default values based on mode if not provided
     if step1_models is None:
-        if solver_testing:
-            step1_models = "gpt-5.2-low,claude-opus-4.5-thinking-4000"
-        else:
-            step1_models = "claude-opus-4.5-thinking-60000,claude-opus-4.5-thinking-60000,claude-opus-4.5-thinking-60000,gemini-3-high,gemini-3-high,gemini-3-high,gemini-3-high,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh,gpt-5.2-xhigh"
+        step1_models = TESTING_STEP1_MODELS if solver_testing else SOLVER_STEP1_MODELS
 
     if codegen_params is None:
-        if solver_testing:
-            codegen_params = "gpt-5.2-low=v1b,gpt-5.2-low=v4,gemini-3-low=v4"
-        else:
-            codegen_params = "gemini-3-high=v4,gpt-5.2-xhigh=v1b"
+        codegen_params = TESTING_CODEGEN_PARAMS if solver_testing else SOLVER_CODEGEN_PARAMS
 
     # Construct args namespace to pass around internally as many legacy functions expect it
     args = SimpleNamespace(
@@ -89,6 +113,9 @@ def run_app(
         image=image,
         codegen_params=codegen_params,
         disable_retries=disable_retries,
+        parallel_verification=parallel_verification,
+        async_providers=async_providers,
+        prompt_caching=prompt_caching,
         disable_step_1_standard_models=disable_step_1_standard_models,
         trigger_deep_thinking=trigger_deep_thinking,
         generate_hint=generate_hint,
@@ -103,7 +130,11 @@ def run_app(
         openai_background=openai_background,
         enable_step_3_and_4=enable_step_3_and_4,
         judge_consistency_enable=judge_consistency_enable,
-        judge_duo_pick=judge_duo_pick
+        judge_duo_pick=judge_duo_pick,
+        llm_transport=llm_transport,
+        replay_dir=replay_dir,
+        replay_speed=replay_speed,
+        resume=resume
     )
     print("THIS IS THE OLD VERSION, USE THE V7 BRANCH")
     return
@@ -115,14 +146,16 @@ def run_app(
     if os.getenv("ARC_AGI_INSECURE_SSL", "").lower() == "true":
         print("WARNING: SSL verification disabled (ARC_AGI_INSECURE_SSL=true)")
         
-    run_timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    # Resuming reuses the interrupted run's timestamp, so its logs and checkpoints are picked up
+    if args.resume:
+        run_timestamp = args.resume
+        print(f"Resuming run {run_timestamp}.")
+    else:
+        run_timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
     # Set default judge model if not specified
     if args.judge_model is None:
-        if args.solver_testing:
-            args.judge_model = "gpt-5.1-low"
-        else:
-            args.judge_model = "gpt-5.2-xhigh"
+        args.judge_model = TESTING_JUDGE_MODEL if args.solver_testing else SOLVER_JUDGE_MODEL
     
     # If no specific solver mode is chosen, default to --solver
     if not args.solver and not args.solver_testing:
@@ -214,7 +247,8 @@ def run_app(
         
         rate_limit_scale = 1.0 / max(1, args.task_workers)
         
-        final_results = run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, answers_dir, startup_delay=startup_delay)
+        tasks_to_run, finished_results = _split_finished(args, tasks_to_run, run_timestamp)
+        final_results = finished_results + run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, answers_dir, startup_delay=startup_delay)
                         
         generate_submission(final_results, args.submissions_directory, run_timestamp)
 
@@ -294,7 +328,8 @@ def run_app(
         
         rate_limit_scale = 1.0 / max(1, args.task_workers)
         
-        final_results = run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, answers_dir, startup_delay=startup_delay)
+        tasks_to_run, finished_results = _split_finished(args, tasks_to_run, run_timestamp)
+        final_results = finished_results + run_batch_execution(args, tasks_to_run, run_timestamp, rate_limit_scale, answers_dir, startup_delay=startup_delay)
                         
         # Generate Submission File
         generate_submission(final_results, args.submissions_directory, run_timestamp)
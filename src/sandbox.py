@@ -1,17 +1,25 @@
 import os
 import sys
 import json
+import atexit
+import select
 import signal
 import subprocess
 import tempfile
+import threading
 import time
 import traceback
 import numpy as np
-from typing import Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, List, Optional, Tuple
 
 # This driver script runs INSIDE the subprocess
 _SANDBOX_DRIVER = r"""
+import io
 import json
+import os
+import select
+import signal
 import sys
 import traceback
 import math
@@ -112,6 +120,57 @@ def secure_runtime():
     if hasattr(sys, 'addaudithook'):
         sys.addaudithook(audit_hook)
 
+def build_scope():
+    return {
+        "np": np,
+        "cv2": cv2,
+        "scipy": scipy,
+        "Counter": Counter,
+        "deque": deque,
+        "defaultdict": defaultdict,
+        "List": List,
+        "Optional": Optional,
+        "Tuple": Tuple,
+        "Any": Any,
+        "Dict": Dict,
+        "Set": Set,
+        "copy": copy.copy,
+        "deepcopy": copy.deepcopy,
+        "gcd": math.gcd,
+        "math": math,
+        "itertools": itertools,
+        "Grid": List[List[int]]
+    }
+
+class SolverTimeout(BaseException):
+    # BaseException so a solver's own "except Exception" cannot swallow it
+    pass
+
+def raise_solver_timeout(signum, frame):
+    raise SolverTimeout()
+
+def load_solver(code):
+    # Build execution scope
+    local_scope = build_scope()
+
+    # Execute the definition
+    exec(code, local_scope)
+    
+    if "solver" not in local_scope:
+        raise RuntimeError("No 'solver' function defined in code.")
+
+    solver = local_scope["solver"]
+    if not callable(solver):
+        raise RuntimeError("'solver' is not callable.")
+    return solver
+
+def run_solver(code, inp_raw):
+    # Convert input list to numpy array if available
+    inp = convert_to_numpy(inp_raw)
+
+    # Run the solver and serialize output
+    return sanitize_output(load_solver(code)(inp))
+
 def main():
     try:
         # Secure the runtime environment immediately
@@ -123,49 +182,7 @@ def main():
             raise ValueError("No input received on stdin")
             
         payload = json.loads(input_data)
-        code = payload["code"]
-        inp_raw = payload["input"]
-        
-        # Convert input list to numpy array if available
-        inp = convert_to_numpy(inp_raw)
-
-        # Build execution scope
-        local_scope = {
-            "np": np,
-            "cv2": cv2,
-            "scipy": scipy,
-            "Counter": Counter,
-            "deque": deque,
-            "defaultdict": defaultdict,
-            "List": List,
-            "Optional": Optional,
-            "Tuple": Tuple,
-            "Any": Any,
-            "Dict": Dict,
-            "Set": Set,
-            "copy": copy.copy,
-            "deepcopy": copy.deepcopy,
-            "gcd": math.gcd,
-            "math": math,
-            "itertools": itertools,
-            "Grid": List[List[int]]
-        }
-
-        # Execute the definition
-        exec(code, local_scope)
-        
-        if "solver" not in local_scope:
-            raise RuntimeError("No 'solver' function defined in code.")
-
-        solver = local_scope["solver"]
-        if not callable(solver):
-            raise RuntimeError("'solver' is not callable.")
-
-        # Run the solver
-        raw_out = solver(inp)
-        
-        # Serialize output
-        out = sanitize_output(raw_out)
+        out = run_solver(payload["code"], payload["input"])
 
         json.dump({"ok": True, "output": out}, sys.stdout)
         
@@ -183,8 +200,178 @@ def main():
         print(f"Sandbox Error: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
 
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+def run_forked_job(job, result_fd):
+    # Runs inside the per-job child and never returns to the serve loop.
+    # The code is exec'd once and the solver is applied to every input in turn, streaming
+    # one JSON line per input followed by {"done": true}.
+    exit_code = 0
+    try:
+        # Solver prints must not reach the protocol pipe; keep them as per-input logs instead.
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(devnull, 1)
+        captured = io.StringIO()
+        sys.stdout = captured
+        sys.stderr = captured
+        signal.signal(signal.SIGALRM, raise_solver_timeout)
+
+        expected = job.get("expected")
+        fail_fast = job.get("fail_fast", False)
+        solver = None
+        load_error = None
+
+        for i, inp_raw in enumerate(job["inputs"]):
+            result = {"index": i}
+            try:
+                # Per-input budget; the first input also pays for exec'ing the code
+                signal.setitimer(signal.ITIMER_REAL, job["timeout_s"])
+                try:
+                    if load_error is not None:
+                        raise load_error
+                    if solver is None:
+                        try:
+                            solver = load_solver(job["code"])
+                        except Exception as e:
+                            load_error = e
+                            raise
+                    out = sanitize_output(solver(convert_to_numpy(inp_raw)))
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+                result.update(ok=True, output=out)
+            except SolverTimeout:
+                result.update(ok=False, timeout=True)
+            except Exception as e:
+                result.update(
+                    ok=False,
+                    error=f"{type(e).__name__}: {str(e)}",
+                    traceback=traceback.format_exc()
+                )
+            result["logs"] = captured.getvalue()
+            captured.seek(0)
+            captured.truncate()
+
+            try:
+                data = json.dumps(result)
+            except (TypeError, ValueError) as e:
+                result = {"index": i, "ok": False, "error": f"{type(e).__name__}: {str(e)}", "logs": result["logs"]}
+                data = json.dumps(result)
+            write_all(result_fd, data.encode("utf-8") + b"\n")
+
+            # A timed-out solver may have left its globals half-updated; let the host
+            # resume the remaining inputs in a fresh fork instead.
+            if result.get("timeout"):
+                break
+            if fail_fast:
+                if not result["ok"]:
+                    break
+                # Compare the JSON round-tripped value, exactly as the host will see it
+                if expected is not None and expected[i] is not None and json.loads(data)["output"] != expected[i]:
+                    break
+
+        write_all(result_fd, b'{"done": true}\n')
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+def pop_line(buffer):
+    newline = buffer.find(b"\n")
+    if newline == -1:
+        return None
+    line = bytes(buffer[:newline])
+    del buffer[:newline + 1]
+    return line
+
+def serve():
+    # Warm worker: imports and hardening happen once, then every job runs in a
+    # fresh fork of this pristine process so jobs cannot leak state into each other.
+    secure_runtime()
+
+    proto_in = os.dup(0)
+    proto_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    write_all(proto_out, b'{"ready": true}\n')
+
+    pending = bytearray()
+    host_alive = True
+    while host_alive:
+        line = pop_line(pending)
+        if line is None:
+            chunk = os.read(proto_in, 65536)
+            if not chunk:
+                break
+            pending.extend(chunk)
+            continue
+        job = json.loads(line)
+        if job.get("cancel"):
+            # Late cancel for a job that already finished
+            continue
+
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            os.close(proto_out)
+            os.close(proto_in)
+            run_forked_job(job, w)
+        os.close(w)
+
+        # Relay result lines as they arrive so the host can enforce per-input deadlines,
+        # while listening for a cancel request from the host.
+        # A cancel may already be buffered if it arrived in the same read as the job.
+        check_pending = True
+        at_line_start = True
+        watched = [r, proto_in]
+        while True:
+            if check_pending:
+                check_pending = False
+                while True:
+                    request = pop_line(pending)
+                    if request is None:
+                        break
+                    if json.loads(request).get("cancel"):
+                        os.kill(pid, signal.SIGKILL)
+            readable, _, _ = select.select(watched, [], [])
+            if proto_in in readable:
+                chunk = os.read(proto_in, 65536)
+                if not chunk:
+                    host_alive = False
+                    watched = [r]
+                    os.kill(pid, signal.SIGKILL)
+                else:
+                    pending.extend(chunk)
+                    check_pending = True
+            if r in readable:
+                chunk = os.read(r, 65536)
+                if not chunk:
+                    break
+                write_all(proto_out, chunk)
+                at_line_start = chunk.endswith(b"\n")
+        os.close(r)
+        _, status = os.waitpid(pid, 0)
+
+        end = json.dumps({"end": True, "exit_code": os.waitstatus_to_exitcode(status)}).encode("utf-8")
+        try:
+            write_all(proto_out, (b"" if at_line_start else b"\n") + end + b"\n")
+        except BrokenPipeError:
+            break
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve()
+    else:
+        main()
 """
 
 def _preexec_new_pgrp():
@@ -194,9 +381,375 @@ def _preexec_new_pgrp():
     """
     os.setsid()
 
+# --- Warm worker pool ---
+
+# Recycle a worker after this many jobs even if nothing went wrong.
+MAX_JOBS_PER_WORKER = 200
+# Budget for a new worker to import numpy/scipy/cv2 and report ready.
+WORKER_STARTUP_TIMEOUT_S = 60.0
+# Extra host-side wait on top of the in-sandbox per-input timer before the worker is killed.
+WORKER_TIMEOUT_GRACE_S = 2.0
+# How often a waiting host thread checks whether its job was cancelled.
+CANCEL_POLL_INTERVAL_S = 0.05
+# Warm workers kept per process (every task process has its own pool) and how long one may sit
+# idle before it is reaped, so a burst of verifications does not pin its workers for the whole run.
+MAX_IDLE_WORKERS = int(os.getenv("ARC_AGI_SANDBOX_MAX_IDLE", "2"))
+IDLE_TTL_S = float(os.getenv("ARC_AGI_SANDBOX_IDLE_TTL_S", "60"))
+
+_POOL_ENABLED = os.getenv("ARC_AGI_SANDBOX_POOL", "true").lower() == "true" and hasattr(os, "fork")
+
+def set_sandbox_pool_enabled(enabled: bool):
+    global _POOL_ENABLED
+    _POOL_ENABLED = enabled and hasattr(os, "fork")
+
+def get_sandbox_pool_enabled() -> bool:
+    return _POOL_ENABLED
+
+class _WorkerDied(Exception):
+    """The worker process exited or closed its pipe mid-job."""
+
+def _worker_env() -> dict:
+    env = dict(os.environ)
+    # Jobs are forked from the warm worker; keep BLAS single-threaded so forking is safe.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        env.setdefault(var, "1")
+    return env
+
+def is_batch_failure(result: Tuple[bool, Any, str], expected: Optional[List[Any]], index: int) -> bool:
+    success, output, _ = result
+    if not success:
+        return True
+    return expected is not None and expected[index] is not None and output != expected[index]
+
+class _SandboxWorker:
+    """
+    A pre-warmed, hardened driver process in its own process group.
+    Each job is executed in a fork of the worker, so the worker itself never runs untrusted code.
+    """
+    def __init__(self, driver_path: str):
+        self.jobs_run = 0
+        self.idle_since = 0.0
+        self._buffer = bytearray()
+        self._cancel_sent = False
+        self.proc = subprocess.Popen(
+            [sys.executable, "-u", driver_path, "--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            env=_worker_env(),
+            preexec_fn=_preexec_new_pgrp, # Unix only, crucial for killpg
+        )
+        try:
+            ready = json.loads(self._read_line(time.monotonic() + WORKER_STARTUP_TIMEOUT_S))
+        except Exception:
+            self.kill()
+            raise
+        if not ready.get("ready"):
+            self.kill()
+            raise _WorkerDied("Sandbox worker failed to start")
+
+    def _read_line(self, deadline: float, cancel_event: threading.Event = None) -> bytes:
+        fd = self.proc.stdout.fileno()
+        while True:
+            newline = self._buffer.find(b"\n")
+            if newline != -1:
+                line = bytes(self._buffer[:newline])
+                del self._buffer[:newline + 1]
+                return line
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.proc.args, 0)
+            if cancel_event is not None:
+                if cancel_event.is_set():
+                    self.cancel()
+                remaining = min(remaining, CANCEL_POLL_INTERVAL_S)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise _WorkerDied("Sandbox worker closed its output pipe")
+            self._buffer.extend(chunk)
+
+    def submit(self, payload: dict):
+        try:
+            self.proc.stdin.write(json.dumps(payload).encode("utf-8") + b"\n")
+        except (BrokenPipeError, OSError) as e:
+            raise _WorkerDied(f"Sandbox worker not accepting jobs: {e}") from e
+        self.jobs_run += 1
+        self._cancel_sent = False
+
+    def cancel(self):
+        """Asks the worker to kill the running job; its end message still follows."""
+        if self._cancel_sent:
+            return
+        self._cancel_sent = True
+        try:
+            self.proc.stdin.write(b'{"cancel": true}\n')
+        except (BrokenPipeError, OSError):
+            pass
+
+    def read_message(self, deadline: float, cancel_event: threading.Event = None) -> dict:
+        return json.loads(self._read_line(deadline, cancel_event))
+
+    def kill(self):
+        # Kill the process group so a forked job dies with its worker
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+class SandboxPool:
+    """
+    Thread-safe pool of warm sandbox workers.
+    Jobs always run in a fork of the worker, so a worker survives solver exceptions, timeouts
+    and crashes. It is discarded only when it stops responding (host-side timeout),
+    after a sandbox violation, or after MAX_JOBS_PER_WORKER jobs.
+    At most max_idle workers stay warm; those idle for idle_ttl_s are reaped in the background.
+    """
+    def __init__(self, max_idle: int = None, max_jobs_per_worker: int = MAX_JOBS_PER_WORKER, idle_ttl_s: float = None):
+        self.max_idle = max_idle if max_idle is not None else MAX_IDLE_WORKERS
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.idle_ttl_s = idle_ttl_s if idle_ttl_s is not None else IDLE_TTL_S
+        self._idle = []
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._reaper = None
+
+    def _get_driver_path(self) -> str:
+        with self._lock:
+            if self._driver_path is None or not os.path.exists(self._driver_path):
+                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as driver_file:
+                    driver_file.write(_SANDBOX_DRIVER)
+                    self._driver_path = driver_file.name
+            return self._driver_path
+
+    def _acquire(self) -> _SandboxWorker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.proc.poll() is None:
+                    return worker
+                worker.kill()
+        return _SandboxWorker(self._get_driver_path())
+
+    def _release(self, worker: _SandboxWorker, reusable: bool):
+        if reusable and worker.jobs_run < self.max_jobs_per_worker:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    worker.idle_since = time.monotonic()
+                    self._idle.append(worker)
+                    if self._reaper is None:
+                        self._reaper = threading.Thread(target=self._reap_idle, name="sandbox-reaper", daemon=True)
+                        self._reaper.start()
+                    return
+        worker.kill()
+
+    def _reap_idle(self):
+        # Runs while workers are idle; _acquire takes from the end, so the oldest sit at the front
+        while True:
+            time.sleep(max(0.05, self.idle_ttl_s / 2))
+            with self._lock:
+                cutoff = time.monotonic() - self.idle_ttl_s
+                expired = [worker for worker in self._idle if worker.idle_since <= cutoff]
+                self._idle = [worker for worker in self._idle if worker.idle_since > cutoff]
+                done = not self._idle
+                if done:
+                    self._reaper = None
+            for worker in expired:
+                worker.kill()
+            if done:
+                return
+
+    def run(self, code: str, input_data: Any, timeout_s: float = 10.0) -> Tuple[bool, Any, str]:
+        return self.run_batch(code, [input_data], timeout_s=timeout_s)[0]
+
+    def run_batch(self, code: str, inputs: List[Any], expected: Optional[List[Any]] = None,
+                  timeout_s: float = 10.0, fail_fast: bool = False,
+                  cancel_event: threading.Event = None) -> List[Tuple[bool, Any, str]]:
+        """
+        Runs the batch on one worker. If cancel_event is set, the running job is killed and the
+        results collected so far are returned; entries from a cancelled job are not meaningful.
+        """
+        results = []
+        while len(results) < len(inputs):
+            if fail_fast and results and is_batch_failure(results[-1], expected, len(results) - 1):
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            # Resume after a timeout or crash: remaining inputs go to a fresh fork
+            start = len(results)
+            payload = {
+                "code": code,
+                "inputs": inputs[start:],
+                "expected": expected[start:] if expected is not None else None,
+                "timeout_s": timeout_s,
+                "fail_fast": fail_fast,
+            }
+            worker = self._acquire()
+            reusable = False
+            try:
+                worker.submit(payload)
+                reusable = self._collect_batch(worker, len(inputs), timeout_s, results, cancel_event)
+            except _WorkerDied as e:
+                results.append((False, "Subprocess crashed (Worker exited)", str(e)))
+            finally:
+                self._release(worker, reusable)
+        return results
+
+    def _collect_batch(self, worker: _SandboxWorker, total: int, timeout_s: float,
+                       results: List[Tuple[bool, Any, str]], cancel_event: threading.Event = None) -> bool:
+        """Appends streamed per-input results. Returns whether the worker may be reused."""
+        done = False
+        violation = False
+        while True:
+            # The child enforces timeout_s itself; this is the backstop for solvers stuck in C code
+            deadline = time.monotonic() + timeout_s + WORKER_TIMEOUT_GRACE_S
+            try:
+                msg = worker.read_message(deadline, cancel_event)
+            except subprocess.TimeoutExpired:
+                results.append((False, "TIMEOUT_EXPIRED", f"Execution timed out after {timeout_s}s"))
+                return False
+            except json.JSONDecodeError:
+                results.append((False, "Invalid JSON output from subprocess", ""))
+                return False
+
+            if msg.get("end"):
+                if not done and len(results) < total:
+                    # The forked job died mid-input; the worker itself answered and stays warm
+                    exit_code = msg.get("exit_code")
+                    if exit_code == 0:
+                        results.append((False, "Empty output from subprocess", ""))
+                    else:
+                        results.append((False, f"Subprocess crashed (Exit Code: {exit_code})", ""))
+                # Never reuse a worker after its job tried to escape the sandbox
+                return not violation
+            if msg.get("done"):
+                done = True
+                continue
+
+            logs = msg.get("logs", "")
+            if msg.get("ok"):
+                results.append((True, msg["output"], logs))
+            elif msg.get("timeout"):
+                results.append((False, "TIMEOUT_EXPIRED", f"Execution timed out after {timeout_s}s"))
+            else:
+                error = msg.get("error", "Unknown error")
+                violation = violation or "Sandbox Violation" in error or "Sandbox Violation" in logs
+                results.append((False, error, msg.get("traceback", logs)))
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            driver_path, self._driver_path = self._driver_path, None
+        for worker in idle:
+            worker.kill()
+        if driver_path and os.path.exists(driver_path):
+            try:
+                os.remove(driver_path)
+            except OSError:
+                pass
+
+    def _reset_after_fork(self):
+        # Workers and their pipes belong to the parent process; never touch them here.
+        self._idle = []
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._reaper = None
+
+_POOL = SandboxPool()
+atexit.register(_POOL.shutdown)
+
+# --- Parallel batch mode ---
+
+# When enabled, batch inputs are dispatched concurrently (one sandbox job per input) to a
+# process-wide thread pool sized to the machine's cores, instead of running back to back.
+_PARALLEL_BATCH_ENABLED = os.getenv("ARC_AGI_PARALLEL_VERIFICATION", "false").lower() == "true"
+
+_PARALLEL_EXECUTOR = None
+_PARALLEL_EXECUTOR_LOCK = threading.Lock()
+
+def set_parallel_batch_enabled(enabled: bool):
+    global _PARALLEL_BATCH_ENABLED
+    _PARALLEL_BATCH_ENABLED = enabled
+
+def get_parallel_batch_enabled() -> bool:
+    return _PARALLEL_BATCH_ENABLED
+
+def _get_parallel_executor() -> ThreadPoolExecutor:
+    global _PARALLEL_EXECUTOR
+    with _PARALLEL_EXECUTOR_LOCK:
+        if _PARALLEL_EXECUTOR is None:
+            # Shared by every caller in the process so total sandbox concurrency stays at core count
+            _PARALLEL_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="sandbox")
+        return _PARALLEL_EXECUTOR
+
+def _reset_parallel_executor_after_fork():
+    global _PARALLEL_EXECUTOR, _PARALLEL_EXECUTOR_LOCK
+    # Executor threads do not survive a fork
+    _PARALLEL_EXECUTOR = None
+    _PARALLEL_EXECUTOR_LOCK = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_POOL._reset_after_fork)
+    os.register_at_fork(after_in_child=_reset_parallel_executor_after_fork)
+
+def get_sandbox_pool() -> SandboxPool:
+    return _POOL
+
+def _run_batch_parallel(code: str, inputs: List[Any], expected: Optional[List[Any]],
+                        timeout_s: float, fail_fast: bool) -> List[Tuple[bool, Any, str]]:
+    """
+    Runs every input as its own sandbox job concurrently.
+    With fail_fast, jobs after the earliest failure seen so far are cancelled; jobs before it
+    always finish, so the returned prefix is exactly what the sequential path would return.
+    """
+    executor = _get_parallel_executor()
+    cancel_events = [threading.Event() for _ in inputs]
+    futures = {}
+    for i, input_data in enumerate(inputs):
+        future = executor.submit(
+            _POOL.run_batch,
+            code,
+            [input_data],
+            [expected[i]] if expected is not None else None,
+            timeout_s,
+            False,
+            cancel_events[i]
+        )
+        futures[future] = i
+
+    results = [None] * len(inputs)
+    first_fail = len(inputs)
+    for future in as_completed(futures):
+        i = futures[future]
+        if future.cancelled() or i > first_fail:
+            continue
+        batch = future.result()
+        results[i] = batch[0]
+        if fail_fast and i < first_fail and is_batch_failure(results[i], expected, i):
+            first_fail = i
+            for other, j in futures.items():
+                if j > i:
+                    other.cancel()
+                    cancel_events[j].set()
+
+    return results[:first_fail + 1]
+
 def run_untrusted_code(code: str, input_data: Any, timeout_s: float = 10.0) -> Tuple[bool, Any, str]:
     """
-    Runs untrusted code in a separate subprocess.
+    Runs untrusted code in an isolated subprocess, reusing a pre-warmed worker when possible.
     Returns: (success, result_or_error, logs)
     
     success: bool
@@ -207,7 +760,57 @@ def run_untrusted_code(code: str, input_data: Any, timeout_s: float = 10.0) -> T
     # Convert numpy inputs to list for JSON serialization
     if isinstance(input_data, np.ndarray):
         input_data = input_data.tolist()
-        
+
+    if not _POOL_ENABLED:
+        return _run_untrusted_code_cold(code, input_data, timeout_s)
+
+    try:
+        return _POOL.run(code, input_data, timeout_s)
+    except Exception as e:
+        return False, f"System Error in Sandbox: {e}", str(e)
+
+def run_untrusted_code_batch(code: str, inputs: List[Any], expected: Optional[List[Any]] = None,
+                             timeout_s: float = 10.0, fail_fast: bool = False) -> List[Tuple[bool, Any, str]]:
+    """
+    Runs one solver over several inputs, exec'ing the code once per sandbox job.
+    Each input gets its own timeout_s budget. Returns one (success, result_or_error, logs)
+    tuple per executed input, in order.
+
+    expected: optional list aligned with inputs; None entries (e.g. the test input) are never compared.
+    fail_fast: stop after the first input that errors or whose output differs from expected,
+               so the returned list may be shorter than inputs.
+
+    In parallel mode (set_parallel_batch_enabled) each input runs as its own concurrent job
+    and the results are identical for solvers that do not carry state between calls.
+    """
+    inputs = [x.tolist() if isinstance(x, np.ndarray) else x for x in inputs]
+    if expected is not None:
+        expected = [x.tolist() if isinstance(x, np.ndarray) else x for x in expected]
+
+    if _POOL_ENABLED and _PARALLEL_BATCH_ENABLED and len(inputs) > 1:
+        try:
+            return _run_batch_parallel(code, inputs, expected, timeout_s, fail_fast)
+        except Exception as e:
+            return [(False, f"System Error in Sandbox: {e}", str(e))]
+
+    if not _POOL_ENABLED:
+        results = []
+        for i, input_data in enumerate(inputs):
+            results.append(_run_untrusted_code_cold(code, input_data, timeout_s))
+            if fail_fast and is_batch_failure(results[-1], expected, i):
+                break
+        return results
+
+    try:
+        return _POOL.run_batch(code, inputs, expected=expected, timeout_s=timeout_s, fail_fast=fail_fast)
+    except Exception as e:
+        return [(False, f"System Error in Sandbox: {e}", str(e))]
+
+def _run_untrusted_code_cold(code: str, input_data: Any, timeout_s: float = 10.0) -> Tuple[bool, Any, str]:
+    """
+    Runs untrusted code in a freshly started subprocess (no worker reuse).
+    Used when the warm pool is disabled or unavailable on this platform.
+    """
     payload = {"code": code, "input": input_data}
     
     # Create a temporary file for the driver
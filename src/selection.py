@@ -25,4 +25,18 @@ def is_solved(candidates_object) -> bool:
         if group['count'] != 1:
             return False
             
-    return True
\ No newline at end of file
+    return True
+
+def consensus_decided(candidates_object, remaining_runs: int) -> bool:
+    """
+    Whether is_solved holds however the step's remaining runs turn out: it holds now, the top group
+    stays above 25% if none of them joins it, and none of them can lift another group to 2.
+    A remaining run can match a singleton and two can agree on a new grid, so the last part only
+    holds with no runs left, or one left and no group besides the top one.
+    """
+    if not is_solved(candidates_object):
+        return False
+    if remaining_runs == 0:
+        return True
+    counts = [group['count'] for group in candidates_object.values()]
+    return remaining_runs == 1 and len(counts) == 1 and counts[0] / (counts[0] + 1) > 0.25
@@ -1,9 +1,11 @@
 import sys
+import contextvars
 from concurrent.futures import ThreadPoolExecutor
 from src.audit_prompts import build_logic_prompt, build_consistency_prompt, build_duo_pick_prompt
 from src.judges import run_judge, run_duo_pick_judge
+from src.grid import FrozenGrid
 
-def pick_solution_v2(candidates_object, reasoning_store, task, test_index, openai_client, anthropic_client, google_keys, judge_model="gpt-5.2-xhigh", verbose: int = 0, openai_background: bool = False, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, total_attempts: int = 0):
+def pick_solution_v2(candidates_object, reasoning_store, task, test_index, openai_client, anthropic_client, google_keys, judge_model="gpt-5.2-xhigh", verbose: int = 0, openai_background: bool = False, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, total_attempts: int = 0, base_prompt: str = None):
     """
     Advanced solution picker using LLM Judges.
     - If judge_duo_pick_enable: Runs a "Council of 3 Duo Judges" to pick top solutions.
@@ -18,7 +20,12 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
     
     # Flatten candidates for easy indexing
     candidates_list = []
-    for idx, (grid_tuple, val) in enumerate(candidates_object.items()):
+    # FrozenGrid key <-> candidate id, so judge picks resolve with a dict lookup
+    key_by_id = {}
+    id_by_key = {}
+    for idx, (grid_key, val) in enumerate(candidates_object.items()):
+        key_by_id[idx] = grid_key
+        id_by_key[grid_key if isinstance(grid_key, FrozenGrid) else FrozenGrid(val.get("grid"))] = idx
         candidates_list.append({
             "id": idx,
             "grid": val.get("grid"),
@@ -49,7 +56,7 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
 
     # 2. Council of Duo Judges
     if judge_duo_pick_enable:
-        duo_prompt = build_duo_pick_prompt(train_examples, test_input, candidates_list, reasoning_store, total_attempts)
+        duo_prompt = build_duo_pick_prompt(train_examples, test_input, candidates_list, reasoning_store, total_attempts, base_prompt=base_prompt)
         
         council_results = []
         for i in range(3):
@@ -59,7 +66,9 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = []
             for i in range(3):
+                # In the caller's context, so its cancellation and deadline reach the judges
                 futures.append(executor.submit(
+                    contextvars.copy_context().run,
                     run_duo_pick_judge, 
                     duo_prompt, 
                     judge_model, 
@@ -76,7 +85,7 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
         selection_metadata["judges"]["duo_pick_council"] = council_results
 
         # Scoring System
-        scoreboard = {} # grid_tuple -> {points, grid, origin, source_runs}
+        scoreboard = {} # FrozenGrid -> {points, grid, origin, source_runs}
 
         for run in council_results:
             grids = run.get("picked_grids")
@@ -86,17 +95,13 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
             # Points: 1st choice = 2 pts, 2nd choice = 1 pt
             for i, res_grid in enumerate(grids):
                 points = 2 if i == 0 else 1
-                res_tuple = tuple(tuple(row) for row in res_grid)
+                res_key = FrozenGrid(res_grid)
                 
-                if res_tuple not in scoreboard:
+                if res_key not in scoreboard:
                     # Check if it matches an existing candidate
-                    match_id = None
-                    for cand in candidates_list:
-                        if tuple(tuple(row) for row in cand['grid']) == res_tuple:
-                            match_id = cand['id']
-                            break
+                    match_id = id_by_key.get(res_key)
                     
-                    scoreboard[res_tuple] = {
+                    scoreboard[res_key] = {
                         "points": 0,
                         "grid": res_grid,
                         "origin": "Existing Candidate" if match_id is not None else "Synthesized (New Grid)",
@@ -104,8 +109,8 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
                         "voted_by_judges": []
                     }
                 
-                scoreboard[res_tuple]["points"] += points
-                scoreboard[res_tuple]["voted_by_judges"].append(run["run_index"])
+                scoreboard[res_key]["points"] += points
+                scoreboard[res_key]["voted_by_judges"].append(run["run_index"])
 
         # Sort scoreboard by points descending
         sorted_scoreboard = sorted(scoreboard.items(), key=lambda x: x[1]["points"], reverse=True)
@@ -124,11 +129,11 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
         # Select Top 2 from Judges
         final_selection_groups = []
         for i in range(min(2, len(sorted_scoreboard))):
-            grid_tuple, entry = sorted_scoreboard[i]
+            grid_key, entry = sorted_scoreboard[i]
             
             if entry["matched_original_candidate_id"] is not None:
                 # Use existing candidate metadata
-                group = candidates_object[grid_tuple]
+                group = candidates_object[key_by_id[entry["matched_original_candidate_id"]]]
                 
                 feedback = f"\n\n--- COUNCIL OF JUDGES CHOICE (Score: {entry['points']}, Origin: {entry['origin']}) ---"
                 # Add a bit of reasoning from the first run that voted for it
@@ -157,20 +162,16 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
             # Sort candidates by consensus count
             voted_candidates = sorted(candidates_list, key=lambda c: c['count'], reverse=True)
             
+            selected_keys = {FrozenGrid(existing['grid']) for existing in final_selection_groups}
             for cand in voted_candidates:
                 if len(final_selection_groups) >= 2:
                     break
                 
-                cand_tuple = tuple(tuple(row) for row in cand['grid'])
+                cand_key = key_by_id[cand['id']]
                 # Avoid duplicates
-                is_duplicate = False
-                for existing in final_selection_groups:
-                    if tuple(tuple(row) for row in existing['grid']) == cand_tuple:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate:
-                    group = candidates_object[cand_tuple]
+                if cand_key not in selected_keys:
+                    selected_keys.add(cand_key)
+                    group = candidates_object[cand_key]
                     group["reasoning_summary"] = group.get("reasoning_summary", "") + "\n\n--- FALLBACK SELECTION (Consensus) ---"
                     final_selection_groups.append(group)
 
@@ -199,10 +200,10 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
     cons_data = { "prompt": full_prompt_cons, "response": None, "parsed": None }
 
     with ThreadPoolExecutor(max_workers=20) as executor:
-        future_logic = executor.submit(run_judge, "Logic", full_prompt_logic, judge_model, openai_client, anthropic_client, google_keys, logic_data, verbose, openai_background)
+        future_logic = executor.submit(contextvars.copy_context().run, run_judge, "Logic", full_prompt_logic, judge_model, openai_client, anthropic_client, google_keys, logic_data, verbose, openai_background)
         future_cons = None
         if judge_consistency_enable:
-            future_cons = executor.submit(run_judge, "Consistency", full_prompt_cons, judge_model, openai_client, anthropic_client, google_keys, cons_data, verbose, openai_background)
+            future_cons = executor.submit(contextvars.copy_context().run, run_judge, "Consistency", full_prompt_cons, judge_model, openai_client, anthropic_client, google_keys, cons_data, verbose, openai_background)
         logic_res = future_logic.result()
         cons_res = future_cons.result() if future_cons else None
 
@@ -249,8 +250,7 @@ def pick_solution_v2(candidates_object, reasoning_store, task, test_index, opena
     # Construct Return Output
     top_groups = []
     for cand in final_selection:
-        grid_tuple = tuple(tuple(row) for row in cand['grid'])
-        group = candidates_object[grid_tuple]
+        group = candidates_object[key_by_id[cand['id']]]
         
         final_summary_parts = []
         if cand['id'] in judge_feedback_map:
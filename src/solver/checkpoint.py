@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+# When enabled, each task:test unit keeps a checkpoint next to its step logs so --resume can continue it
+_CHECKPOINTS_ENABLED = os.getenv("ARC_AGI_CHECKPOINTS", "true").lower() == "true"
+
+CHECKPOINT_VERSION = 1
+
+def set_checkpoints_enabled(enabled: bool):
+    global _CHECKPOINTS_ENABLED
+    _CHECKPOINTS_ENABLED = enabled
+
+def get_checkpoints_enabled() -> bool:
+    return _CHECKPOINTS_ENABLED
+
+def checkpoint_path(logs_directory: str, run_timestamp: str, task_id: str, test_index: int) -> Path:
+    return Path(logs_directory) / f"{run_timestamp}_{task_id}_{test_index}_checkpoint.json"
+
+def _json_default(o):
+    # numpy scalars/arrays in grids; anything else is not needed to resume
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    return str(o)
+
+class SolverCheckpoint:
+    """
+    Checkpoint of one task:test unit, rewritten atomically as it progresses:
+    - state: SolverState totals (candidates, reasoning, run id counts, usage) as of the last finished step
+    - runs: results of the model runs finished since then, by (step name, model)
+    - result: the unit's predictions once finalized
+    On resume, finished steps are skipped and the runs of the interrupted step are handed out
+    again (take_run) instead of calling the model.
+    """
+    def __init__(self, path: Path, data: dict = None):
+        self.path = Path(path)
+        self.data = data or {"version": CHECKPOINT_VERSION, "completed_steps": [], "state": None, "runs": {}, "result": None}
+        # Runs of the interrupted step not yet handed back to the orchestrator
+        self.restorable = {key: list(runs) for key, runs in self.data["runs"].items()}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Path, resume: bool) -> "SolverCheckpoint":
+        """Loads the unit's checkpoint when resuming (a missing or unreadable one starts fresh)."""
+        if resume and Path(path).exists():
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == CHECKPOINT_VERSION:
+                    return cls(path, data)
+                print(f"DEBUG: ignoring checkpoint {path} of version {data.get('version')}", file=sys.stderr)
+            except (OSError, ValueError) as e:
+                print(f"DEBUG: ignoring unreadable checkpoint {path}: {e}", file=sys.stderr)
+        return cls(path)
+
+    @property
+    def state(self) -> Optional[dict]:
+        return self.data["state"]
+
+    @property
+    def result(self):
+        """The finalized (picked_solutions, usage_stats), or None."""
+        result = self.data["result"]
+        return tuple(result) if result is not None else None
+
+    def step_completed(self, step_name: str) -> bool:
+        return step_name in self.data["completed_steps"]
+
+    @staticmethod
+    def _run_key(step_name: str, model_name: str) -> str:
+        return f"{step_name}|{model_name}"
+
+    def take_run(self, step_name: str, model_name: str) -> Optional[dict]:
+        """A finished result of model_name in step_name from before the interruption, if one is left."""
+        with self.lock:
+            runs = self.restorable.get(self._run_key(step_name, model_name))
+            return runs.pop(0) if runs else None
+
+    def record_run(self, step_name: str, model_name: str, result: dict):
+        # The prompt is rebuilt on resume; it is most of a result's size
+        compact = {k: v for k, v in result.items() if k != "prompt"}
+        with self.lock:
+            self.data["runs"].setdefault(self._run_key(step_name, model_name), []).append(compact)
+            self._write()
+
+    def complete_step(self, step_name: str, state: dict):
+        with self.lock:
+            if step_name not in self.data["completed_steps"]:
+                self.data["completed_steps"].append(step_name)
+            self.data["state"] = state
+            self.data["runs"] = {}
+            self.restorable = {}
+            self._write()
+
+    def finish(self, picked_solutions, usage_stats: dict):
+        with self.lock:
+            self.data["result"] = [picked_solutions, usage_stats]
+            self.data["runs"] = {}
+            self._write()
+
+    def _write(self):
+        try:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, default=_json_default)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            # A failed checkpoint only costs the ability to resume
+            print(f"DEBUG: could not write checkpoint {self.path}: {e}", file=sys.stderr)
+
+def load_finished_predictions(logs_directory: str, run_timestamp: str, task_id: str, test_index: int):
+    """The predictions of a unit that was finalized in run_timestamp, or None."""
+    path = checkpoint_path(logs_directory, run_timestamp, task_id, test_index)
+    if not path.exists():
+        return None
+    return SolverCheckpoint.open(path, resume=True).result
@@ -0,0 +1,44 @@
+import os
+import threading
+
+from src.grid import FrozenGrid
+from src.selection import consensus_decided
+from src.cancellation import CancellationToken
+
+# When enabled, a step cancels its remaining model runs (background jobs, streams, Gemini sends)
+# as soon as the results so far decide its consensus.
+_EARLY_STOP_ENABLED = os.getenv("ARC_AGI_EARLY_STOP", "true").lower() == "true"
+
+def set_early_stop_enabled(enabled: bool):
+    global _EARLY_STOP_ENABLED
+    _EARLY_STOP_ENABLED = enabled
+
+def get_early_stop_enabled() -> bool:
+    return _EARLY_STOP_ENABLED
+
+class ConsensusMonitor:
+    """
+    Counts a step's results as they arrive, on top of the candidates of earlier steps, and cancels
+    the step's token once consensus_decided holds for the runs still outstanding.
+    Pass token and on_result to every run_models_in_parallel of the step.
+    """
+    def __init__(self, candidates_object: dict, expected_runs: int, enabled: bool = True):
+        self.token = CancellationToken()
+        self.counts = {key: {"count": group["count"]} for key, group in candidates_object.items()}
+        self.remaining = expected_runs
+        self.enabled = enabled and _EARLY_STOP_ENABLED
+        self.lock = threading.Lock()
+
+    def on_result(self, res):
+        with self.lock:
+            self.remaining = max(0, self.remaining - 1)
+            if res and res.get("grid") is not None:
+                self.counts.setdefault(FrozenGrid(res["grid"]), {"count": 0})["count"] += 1
+            decided = (
+                self.enabled and self.remaining > 0 and not self.token.cancelled
+                and consensus_decided(self.counts, self.remaining)
+            )
+            remaining = self.remaining
+        if decided:
+            print(f"Consensus reached, cancelling {remaining} remaining runs")
+            self.token.cancel("consensus reached")
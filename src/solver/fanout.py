@@ -0,0 +1,145 @@
+import os
+import math
+
+from src.types import SUPPORTED_MODELS
+
+# When enabled, step 5 launches fewer runs for tasks the earlier steps nearly agreed on.
+# Tasks without usable candidates (e.g. --step-5-only) always get the full fleet.
+_ADAPTIVE_STEP_5_ENABLED = os.getenv("ARC_AGI_ADAPTIVE_STEP_5", "true").lower() == "true"
+
+# Difficulty (0 = settled, 1 = hopeless) below which a task gets the confirmation batch,
+# and below which it gets the standard one
+CONFIRM_BELOW = 0.3
+STANDARD_BELOW = 0.55
+
+# A runner-up group with at least this share of the top group's votes puts the task in the full tier
+CLOSE_SECOND_RATIO = 0.5
+
+# Share of each step 5 model list launched per tier (at least one run per distinct model)
+TIER_SHARES = {"confirm": 0.25, "standard": 0.5, "full": 1.0}
+
+# Tiers whose runs go one reasoning level down (where the lower level is a supported model)
+STEP_DOWN_TIERS = {"confirm"}
+_STEP_DOWN = {"-xhigh": "-high", "-high": "-medium", "-thinking-60000": "-thinking-16000"}
+
+def set_adaptive_step_5_enabled(enabled: bool):
+    global _ADAPTIVE_STEP_5_ENABLED
+    _ADAPTIVE_STEP_5_ENABLED = enabled
+
+def get_adaptive_step_5_enabled() -> bool:
+    return _ADAPTIVE_STEP_5_ENABLED
+
+def difficulty_signals(candidates_object: dict, attempts: int, codegen_verifications: dict = None) -> dict:
+    """What the earlier steps' runs say about the task: agreement, spread of answers and code quality."""
+    votes = sorted((group["count"] for group in candidates_object.values()), reverse=True)
+    total_votes = sum(votes)
+    attempts = max(attempts, total_votes)
+    # Entropy of the votes relative to every vote being a different grid
+    entropy = 0.0
+    if total_votes > 1:
+        entropy = -sum(v / total_votes * math.log(v / total_votes) for v in votes) / math.log(total_votes)
+    shapes = {(len(g["grid"]), len(g["grid"][0]) if g["grid"] else 0) for g in candidates_object.values()}
+    verified = codegen_verifications or {}
+
+    return {
+        "attempts": attempts,
+        "votes": total_votes,
+        "groups": len(votes),
+        # Runs without a grid count against the top group
+        "top_share": round(votes[0] / attempts, 3) if votes else 0.0,
+        # Runner-up votes over top votes: 1.0 is a tie, 0.0 a single group
+        "runner_up_ratio": round(votes[1] / votes[0], 3) if len(votes) > 1 else 0.0,
+        "vote_entropy": round(entropy, 3),
+        "grid_shapes": len(shapes),
+        "codegen_pass_rate": round(verified["passed"] / verified["total"], 3) if verified.get("total") else None,
+    }
+
+def estimate_difficulty(signals: dict) -> float:
+    if not signals["votes"]:
+        return 1.0
+    shape_spread = min(1.0, (signals["grid_shapes"] - 1) / 2)
+    pass_rate = signals["codegen_pass_rate"]
+    code_failures = 1.0 - pass_rate if pass_rate is not None else 0.5
+    difficulty = (
+        0.4 * (1.0 - signals["top_share"])
+        + 0.15 * signals["vote_entropy"]
+        + 0.15 * signals["runner_up_ratio"]
+        + 0.15 * shape_spread
+        + 0.15 * code_failures
+    )
+    return round(min(1.0, max(0.0, difficulty)), 3)
+
+def difficulty_tier(difficulty: float, signals: dict = None) -> str:
+    # A split vote is what more samples are for, however settled the rest looks
+    if signals is not None and signals["runner_up_ratio"] >= CLOSE_SECOND_RATIO:
+        return "full"
+    if difficulty < CONFIRM_BELOW:
+        return "confirm"
+    if difficulty < STANDARD_BELOW:
+        return "standard"
+    return "full"
+
+def _take(items: list, share: float) -> list:
+    """About share of items, round-robin over the distinct entries; every distinct entry keeps at least one."""
+    if not items:
+        return []
+    count = max(len(set(items)), round(len(items) * share))
+    if count >= len(items):
+        return list(items)
+    queues = {}
+    for item in items:
+        queues.setdefault(item, []).append(item)
+    taken = []
+    while len(taken) < count:
+        for queue in queues.values():
+            if queue and len(taken) < count:
+                taken.append(queue.pop())
+    return taken
+
+def step_down(model_name: str) -> str:
+    """model_name one reasoning level down, or unchanged if that is not a supported model."""
+    for suffix, lower in _STEP_DOWN.items():
+        if model_name.endswith(suffix):
+            lowered = model_name[: -len(suffix)] + lower
+            return lowered if lowered in SUPPORTED_MODELS else model_name
+    return model_name
+
+def _step_down_codegen(item: str) -> str:
+    model, _, version = item.partition("=")
+    return f"{step_down(model.strip())}={version}" if version else step_down(item)
+
+def plan_step_5(candidates_object: dict, attempts: int, codegen_verifications: dict,
+                deep_models: list, image_models: list, codegen_params: str, adaptive: bool = True) -> dict:
+    """
+    The step 5 fleet for this task: the configured lists scaled to the difficulty tier.
+    adaptive=False (e.g. --force-step-5) always plans the full fleet.
+    Returns the decision (logged in the step 5 log) with the deep_models, image_models and codegen_params to run.
+    """
+    adaptive = adaptive and _ADAPTIVE_STEP_5_ENABLED
+    signals = difficulty_signals(candidates_object, attempts, codegen_verifications)
+    difficulty = estimate_difficulty(signals)
+    tier = difficulty_tier(difficulty, signals) if adaptive else "full"
+    share = TIER_SHARES[tier]
+    codegen_items = [item.strip() for item in (codegen_params or "").split(",") if item.strip()]
+
+    deep = _take(deep_models, share)
+    image = _take(image_models, share)
+    codegen = _take(codegen_items, share)
+    if tier in STEP_DOWN_TIERS:
+        deep = [step_down(m) for m in deep]
+        image = [step_down(m) for m in image]
+        codegen = [_step_down_codegen(item) for item in codegen]
+    return {
+        "adaptive": adaptive,
+        "tier": tier,
+        "difficulty": difficulty,
+        "signals": signals,
+        "runs": {
+            "deep": f"{len(deep)}/{len(deep_models)}",
+            "image": f"{len(image)}/{len(image_models)}",
+            "codegen": f"{len(codegen)}/{len(codegen_items)}",
+        },
+        "deep_models": deep,
+        "image_models": image,
+        "codegen_params": ",".join(codegen),
+    }
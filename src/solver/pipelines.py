@@ -65,6 +65,6 @@ def run_objects_pipeline_variant(state, generator_model_extract, generator_model
     pipeline_log["solution_prompt"] = prompt_C
     
     # We return the log data to be merged by the caller
-    results_C = run_models_in_parallel(solver_models, state.run_id_counts, f"step_5_{variant_name}_sol", prompt_C, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_task_complete, use_background=use_background)
+    results_C = run_models_in_parallel(solver_models, state.run_id_counts, f"step_5_{variant_name}_sol", prompt_C, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_task_complete, use_background=use_background, checkpoint=state.checkpoint, deadline=state.search_deadline)
     
     return f"objects_pipeline_{variant_name}", results_C, pipeline_log
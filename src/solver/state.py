@@ -1,18 +1,32 @@
+import os
 import time
 from pathlib import Path
 from openai import OpenAI
 from anthropic import Anthropic
 
 from src.config import get_api_keys, get_http_client
-from src.tasks import load_task
+from src.tasks import load_task, build_prompt
+from src.tasks.prompt_cache import task_content_hash, get_prompt_cache, flags_key
 from src.run_utils import find_task_path
 from src.selection import pick_solution_v2, pick_solution
+from src.grid import FrozenGrid
 from src.reporting import print_solver_summary
 from src.logging import setup_logging, write_step_log, PrefixedStdout
 from src.models import parse_model_arg, PRICING_PER_1M_TOKENS, GEMINI_3_BASE
+from src.llm_transport import is_offline
+from src.solver.checkpoint import SolverCheckpoint, checkpoint_path, get_checkpoints_enabled
+from src.cancellation import cancel_scope
+from src.deadline import Deadline, cancel_at, deadline_scope
+
+# Time kept back from a unit's deadline for finalize, i.e. the judges
+JUDGE_RESERVE_S = 1800
+# With less time than this left, finalize picks by vote only
+JUDGE_MIN_TIME_S = 600
+# A search step is not started with less search time than this left
+MIN_STEP_TIME_S = 300
 
 class SolverState:
-    def __init__(self, task_id: str, test_index: int, verbose: int, is_testing: bool, run_timestamp: str, task_path: Path = None, answer_path: Path = None, judge_model: str = "gpt-5.2-xhigh", old_pick_solution: bool = False, task_status=None, openai_background: bool = True, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, codegen_prompt: str = "v1b", logs_directory: str = "logs/", task_data: dict = None):
+    def __init__(self, task_id: str, test_index: int, verbose: int, is_testing: bool, run_timestamp: str, task_path: Path = None, answer_path: Path = None, judge_model: str = "gpt-5.2-xhigh", old_pick_solution: bool = False, task_status=None, openai_background: bool = True, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, codegen_prompt: str = "v1b", logs_directory: str = "logs/", task_data: dict = None, resume: bool = False, deadline: Deadline = None):
         self.task_id = task_id
         self.test_index = test_index
         self.verbose = verbose
@@ -27,6 +41,9 @@ class SolverState:
         self.judge_duo_pick_enable = judge_duo_pick_enable
         self.codegen_prompt = codegen_prompt
         self.logs_directory = logs_directory
+        # The unit's deadline; search steps stop JUDGE_RESERVE_S before it so finalize can still run
+        self.deadline = deadline if deadline is not None else Deadline()
+        self.search_deadline = self.deadline.reserve(JUDGE_RESERVE_S)
         self.task_status.setdefault('step', '0')
         self.task_status.setdefault('phase', 'Init')
         self.task_status.setdefault('start_time', time.time())
@@ -38,11 +55,14 @@ class SolverState:
         self.run_id_counts = {}
         self.candidates_object = {}
         self.reasoning_store = {}
+        # Code-mode runs whose solver passed every train example, of those that were verified
+        self.codegen_verifications = {"passed": 0, "total": 0}
         
         self.usage_stats = {
             "prompt_tokens": 0,
             "completion_tokens": 0,
             "total_tokens": 0,
+            "cached_tokens": 0,
             "reasoning_tokens": 0,
             "accepted_prediction_tokens": 0,
             "rejected_prediction_tokens": 0,
@@ -58,7 +78,11 @@ class SolverState:
         self.task_path = task_path
         
         # Initialize Clients
-        openai_key, claude_key, google_keys = get_api_keys()
+        if is_offline() and not os.getenv("OPENAI_API_KEY"):
+            # Replayed and synthetic runs need no keys; calls never reach the clients
+            openai_key, claude_key, google_keys = None, None, []
+        else:
+            openai_key, claude_key, google_keys = get_api_keys()
         self.http_client = get_http_client(timeout=3300.0)
         self.openai_client = OpenAI(api_key=openai_key, http_client=self.http_client) if openai_key else None
         self.anthropic_client = Anthropic(api_key=claude_key, http_client=self.http_client) if claude_key else None
@@ -74,6 +98,61 @@ class SolverState:
             raise ValueError(f"Test index {test_index} is out of range.")
         self.test_example = self.task.test[test_idx]
 
+        # Prompts are built once per task content and shared across steps, models and test indices
+        self.task_hash = task_content_hash(self.task)
+        self.prompt_cache = get_prompt_cache()
+
+        # Checkpoint after each step and model run; when resuming, continue from the last one
+        self.checkpoint = None
+        if get_checkpoints_enabled():
+            path = checkpoint_path(logs_directory, run_timestamp, task_id, test_index)
+            self.checkpoint = SolverCheckpoint.open(path, resume)
+            if self.checkpoint.state:
+                self._restore(self.checkpoint.state)
+
+    def build_prompt(self, **flags) -> str:
+        """
+        Cached build_prompt(task.train, test_example, **flags) for this test index.
+        Only for prompts that recur (steps, judges); one-off prompts carrying model output are built directly.
+        """
+        return self.prompt_cache.get_or_build(
+            self.task_hash,
+            ("standard", self.test_index, flags_key(flags)),
+            lambda: build_prompt(self.task.train, self.test_example, **flags)
+        )
+
+    def _restore(self, saved: dict):
+        self.total_cost = saved["total_cost"]
+        self.usage_stats.update(saved["usage_stats"])
+        self.run_id_counts = dict(saved["run_id_counts"])
+        self.reasoning_store = dict(saved["reasoning_store"])
+        self.candidates_object = {FrozenGrid(c["grid"]): c for c in saved["candidates"]}
+        self.codegen_verifications.update(saved.get("codegen_verifications", {}))
+        self.start_time = time.time() - saved.get("elapsed_s", 0.0)
+        if self.verbose >= 1:
+            print(f"Resumed after {', '.join(self.checkpoint.data['completed_steps'])} with {len(self.candidates_object)} candidates.")
+
+    def step_completed(self, step_name: str) -> bool:
+        """Whether a resumed run already finished step_name (it is then skipped)."""
+        return self.checkpoint is not None and self.checkpoint.step_completed(step_name)
+
+    def out_of_search_time(self) -> bool:
+        """Whether too little time is left before the deadline to start another search step."""
+        return self.search_deadline.remaining() < MIN_STEP_TIME_S
+
+    def checkpoint_step(self, step_name: str):
+        if self.checkpoint is None:
+            return
+        self.checkpoint.complete_step(step_name, {
+            "total_cost": self.total_cost,
+            "usage_stats": self.usage_stats,
+            "run_id_counts": self.run_id_counts,
+            "reasoning_store": self.reasoning_store,
+            "candidates": list(self.candidates_object.values()),
+            "codegen_verifications": self.codegen_verifications,
+            "elapsed_s": time.time() - self.start_time,
+        })
+
     def set_status(self, step=None, phase=None):
         if step is not None:
             self.task_status['step'] = str(step)
@@ -92,12 +171,15 @@ class SolverState:
                 # Usage Stats Aggregation
                 input_tokens = res.get("input_tokens") or 0
                 cached_tokens = res.get("cached_tokens") or 0
+                cache_write_tokens = res.get("cache_write_tokens") or 0
                 output_tokens = res.get("output_tokens") or 0
                 reasoning_tokens = res.get("reasoning_tokens") or 0
                 
-                self.usage_stats["prompt_tokens"] += (input_tokens + cached_tokens)
+                # input_tokens already includes the cached ones
+                self.usage_stats["prompt_tokens"] += input_tokens
+                self.usage_stats["cached_tokens"] += cached_tokens
                 self.usage_stats["completion_tokens"] += output_tokens
-                self.usage_stats["total_tokens"] += (input_tokens + cached_tokens + output_tokens)
+                self.usage_stats["total_tokens"] += (input_tokens + output_tokens)
                 self.usage_stats["reasoning_tokens"] += reasoning_tokens
                 self.usage_stats["accepted_prediction_tokens"] += (output_tokens - reasoning_tokens)
                 
@@ -112,14 +194,15 @@ class SolverState:
                         )
                         
                         # Special Gemini logic
-                        if base_model == GEMINI_3_BASE and (input_tokens + cached_tokens) > 200000:
+                        if base_model == GEMINI_3_BASE and input_tokens > 200000:
                             pricing = {"input": 4.00, "cached_input": 0.40, "output": 18.00}
                             
                         total_prompt_tokens = input_tokens 
-                        non_cached_val = max(0, total_prompt_tokens - cached_tokens)
+                        non_cached_val = max(0, total_prompt_tokens - cached_tokens - cache_write_tokens)
                         
                         p_cost = (non_cached_val / 1_000_000 * pricing["input"]) + \
-                                 (cached_tokens / 1_000_000 * pricing.get("cached_input", 0))
+                                 (cached_tokens / 1_000_000 * pricing.get("cached_input", 0)) + \
+                                 (cache_write_tokens / 1_000_000 * pricing.get("cache_write_input", pricing["input"]))
                         
                         c_cost = (output_tokens / 1_000_000 * pricing["output"])
                         
@@ -152,13 +235,19 @@ class SolverState:
                 
                 # Store reasoning for the Judge
                 self.reasoning_store[res["run_id"]] = res["full_response"]
+
+                verification = res.get("verification_details")
+                if verification and "status" in verification:
+                    self.codegen_verifications["total"] += 1
+                    if verification.get("status") == "PASS":
+                        self.codegen_verifications["passed"] += 1
                 
                 if res["grid"] is not None:
-                    grid_tuple = tuple(tuple(row) for row in res["grid"])
-                    if grid_tuple not in self.candidates_object:
-                        self.candidates_object[grid_tuple] = {"grid": res["grid"], "count": 0, "models": [], "is_correct": res["is_correct"]}
-                    self.candidates_object[grid_tuple]["count"] += 1
-                    self.candidates_object[grid_tuple]["models"].append(res["run_id"])
+                    grid_key = FrozenGrid(res["grid"])
+                    if grid_key not in self.candidates_object:
+                        self.candidates_object[grid_key] = {"grid": res["grid"], "count": 0, "models": [], "is_correct": res["is_correct"]}
+                    self.candidates_object[grid_key]["count"] += 1
+                    self.candidates_object[grid_key]["models"].append(res["run_id"])
         
         new_solutions = len(self.candidates_object) - initial_solutions
         if self.verbose >= 1:
@@ -179,23 +268,30 @@ class SolverState:
             if self.verbose >= 1:
                 print("\n[finalize] Using old pick_solution logic.")
             picked_solutions, result, selection_metadata = pick_solution(self.candidates_object, self.verbose)
+        elif self.deadline.remaining() < JUDGE_MIN_TIME_S:
+            print(f"Deadline near ({self.deadline.remaining():.0f}s left), picking by vote")
+            picked_solutions, result, selection_metadata = pick_solution(self.candidates_object, self.verbose)
+            selection_metadata = {"selection_process": {"type": "Vote (deadline)"}}
         else:
             total_attempts = sum(self.run_id_counts.values())
-            picked_solutions, result, selection_metadata = pick_solution_v2(
-                self.candidates_object, 
-                self.reasoning_store, 
-                self.task, 
-                self.test_index,
-                            self.openai_client,
-                            self.anthropic_client,
-                            self.google_keys,
-                            self.judge_model,
-                            self.verbose,
-                            openai_background=self.openai_background,
-                            judge_consistency_enable=self.judge_consistency_enable,
-                            judge_duo_pick_enable=self.judge_duo_pick_enable,
-                            total_attempts=total_attempts
-                        )        
+            # Judges still running at the deadline are cancelled; their slots fall back to the vote
+            with cancel_at(None, self.deadline) as token, cancel_scope(token), deadline_scope(self.deadline):
+                picked_solutions, result, selection_metadata = pick_solution_v2(
+                    self.candidates_object,
+                    self.reasoning_store,
+                    self.task,
+                    self.test_index,
+                    self.openai_client,
+                    self.anthropic_client,
+                    self.google_keys,
+                    self.judge_model,
+                    self.verbose,
+                    openai_background=self.openai_background,
+                    judge_consistency_enable=self.judge_consistency_enable,
+                    judge_duo_pick_enable=self.judge_duo_pick_enable,
+                    total_attempts=total_attempts,
+                    base_prompt=self.build_prompt()
+                )
         if not has_ground_truth:
             outcome = "SUBMITTED"
         else:
@@ -214,6 +310,9 @@ class SolverState:
         self.print_summary(outcome)
         
         self.usage_stats["total_duration"] = time.time() - self.start_time
+
+        if self.checkpoint is not None:
+            self.checkpoint.finish(picked_solutions, self.usage_stats)
         
         self.close()
         return picked_solutions, self.usage_stats
@@ -1,16 +1,55 @@
 import sys
+import asyncio
+import traceback
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 from src.logging import PrefixedStdout
-from src.tasks import build_prompt, build_prompt_codegen
+from src.tasks import build_prompt
 from src.image_generation import generate_and_save_image
 from src.hint_generation import generate_hint
-from src.parallel import run_models_in_parallel
+from src.parallel import run_models_in_parallel, run_models_in_parallel_async
+from src.async_runtime import get_async_providers_enabled, run_coroutine
 from src.selection import is_solved
 from src.solver.pipelines import run_objects_pipeline_variant
+from src.solver.consensus import ConsensusMonitor
+from src.solver.fanout import plan_step_5
 
-def run_step_1(state, standard_models, codegen_params):
+def _run_substeps(searches, others=(), max_workers=5):
+    """
+    Runs a step's substeps concurrently: each search is (step_name, extra_log, args, kwargs) of a
+    run_models_in_parallel call, each of others a callable returning (step_name, results, extra_log).
+    Returns a (step_name, results, extra_log) or the raised exception per substep, searches first.
+    With async providers the searches are coroutines gathered on the shared loop, so the step holds
+    no thread per search; the others (hints, objects pipeline) still get one each.
+    """
+    if get_async_providers_enabled():
+        async def _search(step_name, extra_log, args, kwargs):
+            return step_name, await run_models_in_parallel_async(*args, **kwargs), extra_log
+
+        async def _gather():
+            return await asyncio.gather(
+                *(_search(*search) for search in searches),
+                *(asyncio.to_thread(other) for other in others),
+                return_exceptions=True
+            )
+        return run_coroutine(_gather())
+
+    def _search(step_name, extra_log, args, kwargs):
+        return step_name, run_models_in_parallel(*args, **kwargs), extra_log
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_search, *search) for search in searches]
+        futures += [executor.submit(other) for other in others]
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    return outcomes
+
+def run_step_1(state, standard_models, codegen_params, early_stop=True):
     state.set_status(step=1, phase="Shallow search")
     
     n_std = len(standard_models)
@@ -60,50 +99,58 @@ def run_step_1(state, standard_models, codegen_params):
     if state.verbose >= 1:
         print(f"Running {total_models} models...")
     
-    prompt_step1 = build_prompt(state.task.train, state.test_example)
+    prompt_step1 = state.build_prompt()
+    # Runs still outstanding once the results so far decide the consensus are cancelled
+    consensus = ConsensusMonitor(state.candidates_object, total_models, enabled=early_stop)
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = []
-        
-        # 1. Standard Search
-        if standard_models:
-            f_std = executor.submit(run_models_in_parallel, standard_models, state.run_id_counts, "step_1", prompt_step1, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, completion_message="Search std", use_background=state.openai_background)
-            futures.append(f_std)
+    searches = []
 
-        # 2. Codegen Jobs
-        for i, job in enumerate(codegen_jobs):
-            prompt_codegen = build_prompt_codegen(state.task.train, test_examples=state.task.test, version=job["version"])
-            job_name = f"step_1_codegen_{job['version']}_{i}"
-            
-            f_code = executor.submit(
-                run_models_in_parallel, 
-                job["models"], 
-                state.run_id_counts, 
-                job_name, 
-                prompt_codegen, 
-                state.test_example, 
-                state.openai_client, 
-                state.anthropic_client, 
-                state.google_keys, 
-                state.verbose, 
-                run_timestamp=state.run_timestamp, 
-                task_id=state.task_id, 
-                test_index=state.test_index, 
-                completion_message=f"Search {job['version']}", 
-                use_background=state.openai_background, 
-                execution_mode=job["exec_mode"], 
-                train_examples=state.task.train, 
-                all_test_examples=state.task.test, 
-                codegen_version=job["version"]
-            )
-            futures.append(f_code)
-        
-        all_results = []
-        for f in futures:
-            all_results.extend(f.result())
+    # 1. Standard Search
+    if standard_models:
+        searches.append(("step_1", None, (standard_models, state.run_id_counts, "step_1", prompt_step1, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose), dict(run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, completion_message="Search std", use_background=state.openai_background, checkpoint=state.checkpoint, cancel_token=consensus.token, on_result=consensus.on_result, deadline=state.search_deadline)))
+
+    # 2. Codegen Jobs
+    for i, job in enumerate(codegen_jobs):
+        # The orchestrator takes each model's prompt from the state's prompt cache
+        prompt_codegen = None
+        job_name = f"step_1_codegen_{job['version']}_{i}"
+
+        searches.append((job_name, None, (
+            job["models"], 
+            state.run_id_counts, 
+            job_name, 
+            prompt_codegen, 
+            state.test_example, 
+            state.openai_client, 
+            state.anthropic_client, 
+            state.google_keys, 
+            state.verbose
+        ), dict(
+            run_timestamp=state.run_timestamp, 
+            task_id=state.task_id, 
+            test_index=state.test_index, 
+            completion_message=f"Search {job['version']}", 
+            use_background=state.openai_background, 
+            execution_mode=job["exec_mode"], 
+            train_examples=state.task.train, 
+            all_test_examples=state.task.test, 
+            codegen_version=job["version"],
+            prompt_key=state.task_hash,
+            checkpoint=state.checkpoint,
+            cancel_token=consensus.token,
+            on_result=consensus.on_result,
+            deadline=state.search_deadline
+        )))
+
+    all_results = []
+    for outcome in _run_substeps(searches, max_workers=5):
+        if isinstance(outcome, BaseException):
+            raise outcome
+        all_results.extend(outcome[1])
     
     state.process_results(all_results, step_1_log)
     state.log_step("step_1", step_1_log)
+    state.checkpoint_step("step_1")
 
 def run_step_3(state, models):
     state.set_status(step=3, phase="Extended search")
@@ -111,10 +158,11 @@ def run_step_3(state, models):
     step_3_log = {}
     if state.verbose >= 1:
         print(f"Running {len(models)} models...")
-    prompt_step3 = build_prompt(state.task.train, state.test_example)
-    results_step3 = run_models_in_parallel(models, state.run_id_counts, "step_3", prompt_step3, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, completion_message="Narrow search", use_background=state.openai_background)
+    prompt_step3 = state.build_prompt()
+    results_step3 = run_models_in_parallel(models, state.run_id_counts, "step_3", prompt_step3, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, completion_message="Narrow search", use_background=state.openai_background, checkpoint=state.checkpoint, deadline=state.search_deadline)
     state.process_results(results_step3, step_3_log)
     state.log_step("step_3", step_3_log)
+    state.checkpoint_step("step_3")
 
 def check_is_solved(state, step_name, force_finish=False, continue_if_solved=False):
     state.set_status(phase="Eval")
@@ -137,8 +185,14 @@ def check_is_solved(state, step_name, force_finish=False, continue_if_solved=Fal
     print("No solution, continuing")
     return False, False
 
-def run_step_5(state, deep_models, image_models, codegen_params, hint_model, enable_hints=False, enable_objects=False, objects_only=False):
+def run_step_5(state, deep_models, image_models, codegen_params, hint_model, enable_hints=False, enable_objects=False, objects_only=False, early_stop=True):
     state.set_status(step=5, phase="Full search")
+
+    # Scale the fleet to how close the earlier steps came to agreeing; with --force-step-5 (no early stop) it runs in full
+    allocation = plan_step_5(state.candidates_object, sum(state.run_id_counts.values()), state.codegen_verifications, deep_models, image_models, codegen_params, adaptive=early_stop)
+    deep_models, image_models, codegen_params = allocation["deep_models"], allocation["image_models"], allocation["codegen_params"]
+    runs = allocation["runs"]
+    print(f"Step 5 fleet: {allocation['tier']} (difficulty {allocation['difficulty']:.2f}), {runs['deep']} deep, {runs['image']} image, {runs['codegen']} codegen")
     
     # Calculate tries
     if state.is_testing:
@@ -201,6 +255,9 @@ def run_step_5(state, deep_models, image_models, codegen_params, hint_model, ena
         counters = {k: 0 for k in counters}
         counters['objects'] = (n_objects_models + 2) * 1
         enable_objects = True # Force enable
+
+    # Objects pipeline results never reach the monitor, so they stay outstanding (it errs towards running)
+    consensus = ConsensusMonitor(state.candidates_object, sum(counters.values()), enabled=early_stop)
         
     lock = threading.Lock()
     
@@ -224,28 +281,16 @@ def run_step_5(state, deep_models, image_models, codegen_params, hint_model, ena
     o = counters['objects']
     print(f"Going DEEP: {d}/{i}/{c}/{h}/{o} left")
 
-    step_5_log = {"trigger-deep-thinking": {}, "image": {}, "codegen": {}, "generate-hint": {}, "objects_pipeline": {}}
+    step_5_log = {"trigger-deep-thinking": {}, "image": {}, "codegen": {}, "generate-hint": {}, "objects_pipeline": {}, "allocation": allocation}
 
     # Generate image once for both visual and hint steps to avoid matplotlib race conditions
     common_image_path = f"logs/{state.run_timestamp}_{state.task_id}_{state.test_index}_step_5_common.png"
     if n_image > 0 or (enable_hints and n_hint > 0):
         generate_and_save_image(state.task, common_image_path)
 
-    def run_deep_thinking_step(on_complete=None):
-        if not deep_models: return "trigger-deep-thinking", [], None
-        if state.verbose >= 1:
-            print(f"Running {len(deep_models)} models with deep thinking...")
-        prompt_deep = build_prompt(state.task.train, state.test_example, trigger_deep_thinking=True)
-        results_deep = run_models_in_parallel(deep_models, state.run_id_counts, "step_5_deep_thinking", prompt_deep, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_complete, use_background=state.openai_background)
-        return "trigger-deep-thinking", results_deep, None
-
-    def run_image_step(img_path, on_complete=None):
-        if not image_models: return "image", [], None
-        if state.verbose >= 1:
-            print(f"Running {len(image_models)} models with image...")
-        prompt_image = build_prompt(state.task.train, state.test_example, image_path=img_path)
-        results_image = run_models_in_parallel(image_models, state.run_id_counts, "step_5_image", prompt_image, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, image_path=img_path, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_complete, use_background=state.openai_background)
-        return "image", results_image, None
+    def search(step_name, extra_log, models, run_name, prompt, on_complete, **kwargs):
+        # One run_models_in_parallel of the step, run by _run_substeps
+        searches.append((step_name, extra_log, (models, state.run_id_counts, run_name, prompt, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose), dict(run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_complete, use_background=state.openai_background, checkpoint=state.checkpoint, cancel_token=consensus.token, on_result=consensus.on_result, deadline=state.search_deadline, **kwargs)))
 
     def run_hint_step(img_path, on_complete=None):
         # Use deep_models for hints if enabled
@@ -272,7 +317,7 @@ def run_step_5(state, deep_models, image_models, codegen_params, hint_model, ena
                 "cached_tokens": hint_data.get("cached_tokens", 0),
             }
             prompt_hint = build_prompt(state.task.train, state.test_example, strategy=hint_data["hint"])
-            results_hint = run_models_in_parallel(models_for_hint, state.run_id_counts, "step_5_generate_hint", prompt_hint, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_complete, use_background=state.openai_background)
+            results_hint = run_models_in_parallel(models_for_hint, state.run_id_counts, "step_5_generate_hint", prompt_hint, state.test_example, state.openai_client, state.anthropic_client, state.google_keys, state.verbose, run_timestamp=state.run_timestamp, task_id=state.task_id, test_index=state.test_index, on_task_complete=on_complete, use_background=state.openai_background, checkpoint=state.checkpoint, cancel_token=consensus.token, on_result=consensus.on_result, deadline=state.search_deadline)
             return "generate-hint", results_hint, extra_log
         
         # If no hint generated, manually drain counter
@@ -281,90 +326,77 @@ def run_step_5(state, deep_models, image_models, codegen_params, hint_model, ena
                 on_complete()
         return "generate-hint", [], extra_log
 
-    with ThreadPoolExecutor(max_workers=30) as executor:
-        futures = []
-        
-        if objects_only:
-             futures.append(executor.submit(run_objects_pipeline_variant, state, gen_object_extraction, gen_transformation, "gpt_gen", unique_solvers, lambda: update_progress('objects'), use_background=state.openai_background))
-        else:
-            # 1. Deep Thinking
-            if deep_models:
-                futures.append(executor.submit(run_deep_thinking_step, lambda: update_progress('deep')))
-            
-            # 2. Image
-            if image_models:
-                futures.append(executor.submit(run_image_step, common_image_path, lambda: update_progress('image')))
+    searches = []
+    others = []
+
+    if objects_only:
+        others.append(lambda: run_objects_pipeline_variant(state, gen_object_extraction, gen_transformation, "gpt_gen", unique_solvers, lambda: update_progress('objects'), use_background=state.openai_background))
+    else:
+        # 1. Deep Thinking
+        if deep_models:
+            if state.verbose >= 1:
+                print(f"Running {len(deep_models)} models with deep thinking...")
+            search("trigger-deep-thinking", None, deep_models, "step_5_deep_thinking", state.build_prompt(trigger_deep_thinking=True), lambda: update_progress('deep'))
+
+        # 2. Image
+        if image_models:
+            if state.verbose >= 1:
+                print(f"Running {len(image_models)} models with image...")
+            search("image", None, image_models, "step_5_image", state.build_prompt(image_path=common_image_path), lambda: update_progress('image'), image_path=common_image_path)
+
+        # 3. Hints
+        if enable_hints:
+            others.append(lambda: run_hint_step(common_image_path, lambda: update_progress('hint')))
+
+        # 4. Objects
+        if enable_objects:
+            others.append(lambda: run_objects_pipeline_variant(state, gen_object_extraction, gen_transformation, "gpt_gen", unique_solvers, lambda: update_progress('objects'), use_background=state.openai_background))
+
+        # 5. Codegen
+        for i, job in enumerate(codegen_jobs):
+            # The orchestrator takes each model's prompt from the state's prompt cache
+            job_name = f"step_5_codegen_{job['version']}_{i}"
+            search(
+                "codegen",
+                {"version": job["version"]},
+                job["models"],
+                job_name,
+                None,
+                lambda: update_progress('codegen'),
+                completion_message=f"S5 codegen {job['version']}",
+                execution_mode=job["exec_mode"],
+                train_examples=state.task.train,
+                all_test_examples=state.task.test,
+                codegen_version=job["version"],
+                prompt_key=state.task_hash
+            )
+
+    for outcome in _run_substeps(searches, others, max_workers=30):
+        if isinstance(outcome, BaseException):
+            print(f"ERROR: A Step 5 parallel substep failed: {outcome}", file=sys.stderr)
+            traceback.print_exception(outcome)
+            continue
+        try:
+            step_name, results, extra_log = outcome
             
-            # 3. Hints
-            if enable_hints:
-                futures.append(executor.submit(run_hint_step, common_image_path, lambda: update_progress('hint')))
-                
-            # 4. Objects
-            if enable_objects:
-                futures.append(executor.submit(run_objects_pipeline_variant, state, gen_object_extraction, gen_transformation, "gpt_gen", unique_solvers, lambda: update_progress('objects'), use_background=state.openai_background))
-
-            # 5. Codegen
-            for i, job in enumerate(codegen_jobs):
-                prompt_codegen = build_prompt_codegen(state.task.train, test_examples=state.task.test, version=job["version"])
-                job_name = f"step_5_codegen_{job['version']}_{i}"
+            # Handle logging
+            if step_name.startswith("objects_pipeline_"):
+                state.process_results(results, step_5_log["objects_pipeline"])
+                step_5_log["objects_pipeline"][step_name.replace("objects_pipeline_", "")] = extra_log
+            elif step_name == "codegen":
+                # For codegen, we might run multiple jobs, so we just append/merge to step_5_log["codegen"]
+                # Actually process_results handles the results list.
+                # extra_log contains version info if needed.
+                state.process_results(results, step_5_log["codegen"])
+            else:
+                if step_name in step_5_log:
+                    state.process_results(results, step_5_log[step_name])
                 
-                # We need a wrapper to return the standard (name, results, log) format expected by the loop
-                def run_codegen_wrapper(j_models, j_name, j_prompt, j_mode, j_ver, on_comp):
-                    res = run_models_in_parallel(
-                        j_models, 
-                        state.run_id_counts, 
-                        j_name, 
-                        j_prompt, 
-                        state.test_example, 
-                        state.openai_client, 
-                        state.anthropic_client, 
-                        state.google_keys, 
-                        state.verbose, 
-                        run_timestamp=state.run_timestamp, 
-                        task_id=state.task_id, 
-                        test_index=state.test_index, 
-                        completion_message=f"S5 codegen {j_ver}", 
-                        use_background=state.openai_background, 
-                        execution_mode=j_mode, 
-                        train_examples=state.task.train, 
-                        all_test_examples=state.task.test, 
-                        codegen_version=j_ver,
-                        on_task_complete=on_comp
-                    )
-                    return "codegen", res, {"version": j_ver}
-
-                futures.append(executor.submit(
-                    run_codegen_wrapper,
-                    job["models"],
-                    job_name,
-                    prompt_codegen,
-                    job["exec_mode"],
-                    job["version"],
-                    lambda: update_progress('codegen')
-                ))
-
-        for future in as_completed(futures):
-            try:
-                step_name, results, extra_log = future.result()
-                
-                # Handle logging
-                if step_name.startswith("objects_pipeline_"):
-                    state.process_results(results, step_5_log["objects_pipeline"])
-                    step_5_log["objects_pipeline"][step_name.replace("objects_pipeline_", "")] = extra_log
-                elif step_name == "codegen":
-                    # For codegen, we might run multiple jobs, so we just append/merge to step_5_log["codegen"]
-                    # Actually process_results handles the results list.
-                    # extra_log contains version info if needed.
-                    state.process_results(results, step_5_log["codegen"])
-                else:
-                    if step_name in step_5_log:
-                        state.process_results(results, step_5_log[step_name])
-                    
-                    if step_name == "generate-hint" and extra_log:
-                         step_5_log["generate-hint"]["hint_generation"] = extra_log
-            except Exception as e:
-                import traceback
-                print(f"ERROR: A Step 5 parallel substep failed: {e}", file=sys.stderr)
-                traceback.print_exc()
+                if step_name == "generate-hint" and extra_log:
+                     step_5_log["generate-hint"]["hint_generation"] = extra_log
+        except Exception as e:
+            print(f"ERROR: A Step 5 parallel substep failed: {e}", file=sys.stderr)
+            traceback.print_exc()
 
     state.log_step("step_5", step_5_log)
+    state.checkpoint_step("step_5")
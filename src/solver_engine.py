@@ -4,19 +4,34 @@ from pathlib import Path
 from src.logging import log_failure, set_log_dir
 from src.solver.state import SolverState
 from src.solver.steps import run_step_1, run_step_3, run_step_5, check_is_solved
+from src.deadline import Deadline
+
+def _skip_for_deadline(state, step_name: str) -> bool:
+    # Past this point the unit only finalizes, so its candidates so far still make the submission
+    if not state.out_of_search_time():
+        return False
+    print(f"Deadline near, skipping {step_name}")
+    return True
 
 # Re-export run_solver_mode for backward compatibility if imported elsewhere
-def run_solver_mode(task_id: str, test_index: int, verbose: int, is_testing: bool = False, run_timestamp: str = None, task_path: Path = None, answer_path: Path = None, step_5_only: bool = False, objects_only: bool = False, force_step_5: bool = False, force_step_2: bool = False, judge_model: str = "gpt-5.2-xhigh", old_pick_solution: bool = False, task_status=None,     openai_background: bool = True, enable_step_3_and_4: bool = False, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, codegen_params: str = "gpt-5.2-low=v1b,gpt-5.2-low=v4,gemini-3-low=v4", step1_models: str = "gpt-5.2-none,claude-opus-4.5-no-thinking", disable_step_1_standard_models: bool = False, logs_directory: str = "logs/", task_data: dict = None):
+def run_solver_mode(task_id: str, test_index: int, verbose: int, is_testing: bool = False, run_timestamp: str = None, task_path: Path = None, answer_path: Path = None, step_5_only: bool = False, objects_only: bool = False, force_step_5: bool = False, force_step_2: bool = False, judge_model: str = "gpt-5.2-xhigh", old_pick_solution: bool = False, task_status=None,     openai_background: bool = True, enable_step_3_and_4: bool = False, judge_consistency_enable: bool = False, judge_duo_pick_enable: bool = True, codegen_params: str = "gpt-5.2-low=v1b,gpt-5.2-low=v4,gemini-3-low=v4", step1_models: str = "gpt-5.2-none,claude-opus-4.5-no-thinking", disable_step_1_standard_models: bool = False, logs_directory: str = "logs/", task_data: dict = None, resume: bool = False, deadline: Deadline = None):
     
     set_log_dir(logs_directory)
 
     # Initialize State
     try:
-        state = SolverState(task_id, test_index, verbose, is_testing, run_timestamp, task_path, answer_path, judge_model, old_pick_solution=old_pick_solution, task_status=task_status, openai_background=openai_background, judge_consistency_enable=judge_consistency_enable, judge_duo_pick_enable=judge_duo_pick_enable, codegen_prompt=None, logs_directory=logs_directory, task_data=task_data)
+        state = SolverState(task_id, test_index, verbose, is_testing, run_timestamp, task_path, answer_path, judge_model, old_pick_solution=old_pick_solution, task_status=task_status, openai_background=openai_background, judge_consistency_enable=judge_consistency_enable, judge_duo_pick_enable=judge_duo_pick_enable, codegen_prompt=None, logs_directory=logs_directory, task_data=task_data, resume=resume, deadline=deadline)
     except Exception as e:
         print(f"Error initializing solver state: {e}", file=sys.stderr)
         raise e
 
+    # A resumed unit that was already finalized keeps its predictions
+    if state.checkpoint is not None and state.checkpoint.result is not None:
+        print("Already finished (checkpoint)")
+        state.set_status(phase="Finished")
+        state.close()
+        return state.checkpoint.result
+
     try:
         # Determine Step 1 standard models
         if disable_step_1_standard_models:
@@ -62,7 +77,9 @@ def run_solver_mode(task_id: str, test_index: int, verbose: int, is_testing: boo
 
         if should_run_early_steps:
             # STEP 1
-            run_step_1(state, models_step1_standard, codegen_params)
+            if not state.step_completed("step_1") and not _skip_for_deadline(state, "step_1"):
+                # With --force-step-5 a decided consensus does not end the run, so step 1 runs in full
+                run_step_1(state, models_step1_standard, codegen_params, early_stop=not force_step_5)
 
             # STEP 2
             state.set_status(step=2)
@@ -72,7 +89,8 @@ def run_solver_mode(task_id: str, test_index: int, verbose: int, is_testing: boo
 
             if enable_step_3_and_4:
                 # STEP 3
-                run_step_3(state, models_step3)
+                if not state.step_completed("step_3") and not _skip_for_deadline(state, "step_3"):
+                    run_step_3(state, models_step3)
 
                 # STEP 4
                 state.set_status(step=4)
@@ -86,7 +104,8 @@ def run_solver_mode(task_id: str, test_index: int, verbose: int, is_testing: boo
              print("\nSkipping Steps 1-4 (Deep Search Only Mode)")
 
         # STEP 5
-        run_step_5(state, models_step5_deep, models_step5_image, params_step5_codegen, hint_generation_model, enable_hints=False, enable_objects=False, objects_only=objects_only)
+        if not state.step_completed("step_5") and not _skip_for_deadline(state, "step_5"):
+            run_step_5(state, models_step5_deep, models_step5_image, params_step5_codegen, hint_generation_model, enable_hints=False, enable_objects=False, objects_only=objects_only, early_stop=not force_step_5)
 
         # STEP FINISH
         return state.finalize("step_finish")
@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+from src.types import Task
+
+# Tasks whose prompts are kept; a worker process only handles a few tasks at a time
+MAX_CACHED_TASKS = 32
+
+def task_content_hash(task: Task) -> str:
+    """Hash of the grids a prompt can contain (train pairs and test inputs)."""
+    payload = json.dumps({
+        "train": [[ex.input, ex.output] for ex in task.train],
+        "test": [ex.input for ex in task.test],
+    }, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class PromptCache:
+    """
+    Built prompt strings per task content hash, keyed by (builder, version, model, flags).
+    Every caller gets the same string object, so a prompt sent to N models is held once.
+    """
+    def __init__(self, max_tasks: int = MAX_CACHED_TASKS):
+        self.max_tasks = max_tasks
+        self._tasks: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, task_hash: str, key: Tuple[Hashable, ...], build: Callable[[], str]) -> str:
+        with self._lock:
+            prompts = self._tasks.get(task_hash)
+            if prompts is not None:
+                self._tasks.move_to_end(task_hash)
+                if key in prompts:
+                    self.hits += 1
+                    return prompts[key]
+
+        prompt = build()
+
+        with self._lock:
+            prompts = self._tasks.setdefault(task_hash, {})
+            self._tasks.move_to_end(task_hash)
+            while len(self._tasks) > self.max_tasks:
+                self._tasks.popitem(last=False)
+            # A concurrent build of the same key may have won; share its string
+            if key in prompts:
+                self.hits += 1
+                return prompts[key]
+            self.misses += 1
+            prompts[key] = prompt
+            return prompt
+
+    def clear(self):
+        with self._lock:
+            self._tasks.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+
+_PROMPT_CACHE = PromptCache()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_PROMPT_CACHE._reset_after_fork)
+
+def get_prompt_cache() -> PromptCache:
+    return _PROMPT_CACHE
+
+def flags_key(flags: dict) -> Tuple[Tuple[str, Hashable], ...]:
+    """Order-independent key of builder keyword arguments; unset (None/False) flags are dropped."""
+    return tuple(sorted((k, v) for k, v in flags.items() if v not in (None, False)))
+
+def cached_prompt_codegen(task_hash: str, train_examples, test_examples, version: str, model_name: str = None) -> str:
+    from src.tasks.prompts_codegen import build_prompt_codegen
+    return _PROMPT_CACHE.get_or_build(
+        task_hash,
+        ("codegen", version, model_name),
+        lambda: build_prompt_codegen(train_examples, test_examples=test_examples, version=version, model_name=model_name)
+    )
@@ -1,5 +1,5 @@
 from typing import List
-from src.types import Example
+from src.types import Example, CacheablePrompt
 
 # Import implementation from submodules to maintain backward compatibility
 from src.tasks.codegen_prompts.v1 import build_prompt_codegen_v1, build_prompt_codegen_v1b
@@ -7,7 +7,7 @@ from src.tasks.codegen_prompts.v2 import build_prompt_codegen_v2, build_prompt_c
 from src.tasks.codegen_prompts.v3 import build_prompt_codegen_v3_stage1, build_prompt_codegen_v3_stage2
 from src.tasks.codegen_prompts.v4 import build_prompt_codegen_v4
 
-def build_prompt_codegen(train_examples: List[Example], test_examples: List[Example] = None, version: str = "v2", model_name: str = None) -> str:
+def _build_prompt_codegen(train_examples: List[Example], test_examples: List[Example] = None, version: str = "v2", model_name: str = None) -> str:
     if version == "v1":
         return build_prompt_codegen_v1(train_examples)
     elif version == "v1b":
@@ -26,4 +26,9 @@ def build_prompt_codegen(train_examples: List[Example], test_examples: List[Exam
         if test_examples is None:
              raise ValueError("V3 prompt requires test_examples")
         return build_prompt_codegen_v3_stage1(train_examples, test_examples)
-    return build_prompt_codegen_v2(train_examples)
\ No newline at end of file
+    return build_prompt_codegen_v2(train_examples)
+
+def build_prompt_codegen(train_examples: List[Example], test_examples: List[Example] = None, version: str = "v2", model_name: str = None) -> str:
+    # A codegen prompt covers the whole task, so every run of this version/model shares all of it
+    prompt = _build_prompt_codegen(train_examples, test_examples=test_examples, version=version, model_name=model_name)
+    return CacheablePrompt(prompt, len(prompt))
@@ -1,7 +1,8 @@
 import random
+import hashlib
 from typing import List
 from src.grid import format_grid
-from src.types import Example
+from src.types import Example, CacheablePrompt
 
 def build_objects_extraction_prompt(
     train_examples: List[Example],
@@ -20,7 +21,9 @@ def build_objects_extraction_prompt(
         if ex.output:
             all_grids.append(ex.output)
     all_grids.append(test_example.input)
-    random.shuffle(all_grids)
+    # Seeded by the grids so the same task always yields the same prompt (cacheable, reproducible)
+    seed = hashlib.sha256(repr(all_grids).encode()).hexdigest()
+    random.Random(seed).shuffle(all_grids)
     
     for grid in all_grids:
         lines.append(format_grid(grid))
@@ -85,6 +88,8 @@ def build_prompt(
         lines.append("output:")
         lines.append(format_grid(ex.output))
         lines.append("")
+    # Everything above is shared by every prompt of this task with the same instruction (all steps and test indices)
+    prefix_len = len("\n".join(lines)) + 1
     lines.append("Test input:")
     lines.append(format_grid(test_example.input))
     lines.append("")
@@ -125,4 +130,4 @@ def build_prompt(
     else:
         lines.append("Respond with an explanation of your thinking that is detailed enough that someone can reconstruct your solution. Afterwards, you MUST also respond with the completed output grid.")
 
-    return "\n".join(lines)
+    return CacheablePrompt("\n".join(lines), prefix_len)
@@ -29,11 +29,13 @@ PRICING_PER_1M_TOKENS = {
     CLAUDE_SONNET_BASE: {
         "input": 3.00,
         "cached_input": 0.30,
+        "cache_write_input": 3.75,
         "output": 15.00,
     },
     CLAUDE_OPUS_BASE: {
         "input": 5.00,
         "cached_input": 0.50,
+        "cache_write_input": 6.25,
         "output": 25.00,
     },
     GEMINI_3_BASE: {
@@ -86,9 +88,31 @@ class TaskResult:
     strategy: Optional[str] = None
     verified: Optional[bool] = None
 
+class CacheablePrompt(str):
+    """
+    A prompt whose first prefix_len characters (instructions and train grids) are shared by the
+    other prompts of the same task, so providers can cache that prefix. Behaves as a plain str.
+    """
+    def __new__(cls, text: str, prefix_len: int):
+        obj = super().__new__(cls, text)
+        obj.prefix_len = max(0, min(prefix_len, len(text)))
+        return obj
+
+    def __reduce__(self):
+        return (CacheablePrompt, (str(self), self.prefix_len))
+
+    @property
+    def prefix(self) -> str:
+        return str.__getitem__(self, slice(0, self.prefix_len))
+
+    @property
+    def suffix(self) -> str:
+        return str.__getitem__(self, slice(self.prefix_len, None))
+
 @dataclass
 class ModelResponse:
     text: str
+    # Total input tokens, including the cached ones (cached_tokens is a subset)
     prompt_tokens: int
     cached_tokens: int
     completion_tokens: int
@@ -97,6 +121,8 @@ class ModelResponse:
     model_name: Optional[str] = None
     timing_breakdown: Optional[list[dict]] = None
     detailed_logs: Optional[List[dict]] = None
+    # Input tokens written to the prompt cache (a subset of prompt_tokens), billed at cache_write_input
+    cache_write_tokens: int = 0
 
 @dataclass
 class ModelConfig:
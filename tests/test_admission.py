@@ -0,0 +1,96 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.provider_health as provider_health
+import src.parallel.admission as admission
+from src.parallel.admission import AdmissionController, ADMISSION_TICK_S, ADMISSION_COOLDOWN_S
+from src.provider_health import ProviderHealth, track_call
+from src.rate_limiter import RateLimiter
+from src.llm_utils import run_with_retry
+from src.errors import RateLimitProviderError
+
+class _Health:
+    def __init__(self):
+        self.stats = {}
+
+    def snapshot(self, window_s=None):
+        return self.stats
+
+def _stats(calls=10, rate_limits=0, p95_s=30.0, in_flight=4):
+    return {"openai:gpt-5.2": {"in_flight": in_flight, "calls": calls, "rate_limits": rate_limits, "p95_s": p95_s}}
+
+def test_calls_report_in_flight_latency_and_rate_limits(monkeypatch):
+    health = ProviderHealth()
+    monkeypatch.setattr(provider_health, "_HEALTH", health)
+    monkeypatch.setattr(llm_utils.time, "sleep", lambda s: None)
+    errors = [RateLimitProviderError("429"), RateLimitProviderError("429")]
+
+    def func():
+        assert health.snapshot()["openai:gpt-5.2"]["in_flight"] == 1
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    with track_call("openai:gpt-5.2"):
+        # Nested retry loops report each 429 once
+        assert run_with_retry(lambda: run_with_retry(func)) == "ok"
+    stats = health.snapshot()["openai:gpt-5.2"]
+    assert (stats["in_flight"], stats["calls"], stats["rate_limits"]) == (0, 1, 2)
+    assert stats["p95_s"] >= 0
+
+def test_target_grows_with_headroom_and_halves_on_congestion():
+    health = _Health()
+    controller = AdmissionController(20, health, initial=4)
+    now = 0.0
+
+    # Grows one step per tick while the target is what holds units back
+    health.stats = _stats()
+    for _ in range(3):
+        controller.update(controller.target, now)
+        now += ADMISSION_TICK_S
+    assert controller.target == 10
+    # Not when fewer units than the target are running
+    assert controller.update(3, now) == 10
+
+    # 429s on more than 5% of recent calls halve it, once per cooldown
+    now += ADMISSION_TICK_S
+    health.stats = _stats(rate_limits=3)
+    assert controller.update(10, now) == 5
+    assert controller.update(5, now + ADMISSION_TICK_S) == 5
+
+    # After the cooldown a healthy provider lets it grow again
+    health.stats = _stats()
+    assert controller.update(5, now + ADMISSION_COOLDOWN_S) == 7
+    assert controller.backoffs == 1 and controller.peak_target == 10
+
+def test_latency_and_token_levels_are_signals():
+    health = _Health()
+    limiter = RateLimiter(rate=10)
+    controller = AdmissionController(20, health, {"openai": limiter}, initial=4)
+
+    health.stats = _stats(p95_s=30.0)
+    assert controller.update(4, 0.0) == 6
+    # An empty token bucket holds the target
+    for _ in range(9):
+        limiter.try_acquire()
+    assert controller.update(6, ADMISSION_TICK_S) == 6
+    # p95 latency past twice the best seen halves it
+    health.stats = _stats(p95_s=90.0)
+    assert controller.update(6, 2 * ADMISSION_TICK_S) == 3
+
+def test_open_circuit_backs_off(monkeypatch):
+    class _Breakers:
+        def snapshot(self):
+            return {"anthropic:claude-opus-4.5": {"state": "open", "recent_failures": 5, "trips": 1}}
+
+    monkeypatch.setattr(admission, "ADMISSION_INITIAL", 8)
+    controller = AdmissionController(60, _Health(), breakers=_Breakers())
+    assert controller.update(8, 0.0) == 4
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
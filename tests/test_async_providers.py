@@ -0,0 +1,181 @@
+import sys
+import json
+import asyncio
+import threading
+import pytest
+import httpx
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic, AsyncAnthropic
+
+import src.providers.gemini as gemini
+import src.providers.openai_bg.job_manager as job_manager
+import src.parallel.orchestrator as orchestrator
+import src.solver.steps as steps
+from src.models import parse_model_arg
+from src.providers.openai import call_openai_internal, call_openai_internal_async
+from src.providers.anthropic import call_anthropic, call_anthropic_async
+from src.rate_limiter import RateLimiter
+from src.async_runtime import set_async_providers_enabled
+
+def _sse(events):
+    return "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events).encode()
+
+def _sse_response(events):
+    return httpx.Response(200, content=_sse(events), headers={"content-type": "text/event-stream"})
+
+_RESPONSE = {"id": "resp_1", "object": "response", "created_at": 0, "model": "m", "output": [], "parallel_tool_calls": False, "tool_choice": "auto", "tools": []}
+_USAGE = {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15, "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}}
+
+def openai_stream(request):
+    return _sse_response([
+        {"type": "response.created", "sequence_number": 0, "response": dict(_RESPONSE, status="in_progress")},
+        {"type": "response.output_text.delta", "sequence_number": 1, "item_id": "i", "output_index": 0, "content_index": 0, "delta": "1,2\n", "logprobs": []},
+        {"type": "response.output_text.delta", "sequence_number": 2, "item_id": "i", "output_index": 0, "content_index": 0, "delta": "3,4", "logprobs": []},
+        {"type": "response.completed", "sequence_number": 3, "response": dict(_RESPONSE, status="completed", usage=_USAGE)},
+    ])
+
+def anthropic_stream(request):
+    return _sse_response([
+        {"type": "message_start", "message": {"id": "m1", "type": "message", "role": "assistant", "model": "c", "content": [], "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 7, "output_tokens": 1}}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "5,6"}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 3}},
+        {"type": "message_stop"},
+    ])
+
+def gemini_reply(request):
+    return httpx.Response(200, json={"candidates": [{"content": {"role": "model", "parts": [{"text": "8,9"}]}}], "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 2}})
+
+def test_openai_stream_sync_and_async_agree():
+    sync_client = OpenAI(api_key="x", http_client=httpx.Client(transport=httpx.MockTransport(openai_stream)))
+    sync = call_openai_internal(sync_client, "p", parse_model_arg("gpt-5.1-low"))
+
+    async def _call():
+        client = AsyncOpenAI(api_key="x", http_client=httpx.AsyncClient(transport=httpx.MockTransport(openai_stream)))
+        return await call_openai_internal_async(client, "p", parse_model_arg("gpt-5.1-low"))
+
+    result = asyncio.run(_call())
+    for resp in (sync, result):
+        assert resp.text == "1,2\n3,4"
+        assert (resp.prompt_tokens, resp.completion_tokens) == (10, 5)
+        assert resp.detailed_logs == [{"type": "text", "content": "1,2\n3,4"}]
+        assert resp._raw_response.id == "resp_1"
+
+def test_openai_background_async_polls_until_completed(monkeypatch):
+    monkeypatch.setattr(job_manager, "POLL_INTERVAL_BASE_S", 0.0)
+    monkeypatch.setattr(job_manager.random, "uniform", lambda a, b: 0.0)
+    polls = []
+
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(200, json=dict(_RESPONSE, status="queued"))
+        polls.append(request.url.path)
+        if len(polls) < 3:
+            return httpx.Response(200, json=dict(_RESPONSE, status="in_progress"))
+        output = [{"type": "message", "id": "o", "role": "assistant", "status": "completed", "content": [{"type": "output_text", "text": "7", "annotations": []}]}]
+        return httpx.Response(200, json=dict(_RESPONSE, status="completed", output=output, usage=_USAGE))
+
+    async def _call():
+        client = AsyncOpenAI(api_key="x", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        return await call_openai_internal_async(client, "p", parse_model_arg("gpt-5.1-low"), use_background=True)
+
+    resp = asyncio.run(_call())
+    assert resp.text == "7"
+    assert polls == ["/v1/responses/resp_1"] * 3
+
+def test_anthropic_stream_sync_and_async_agree():
+    config = parse_model_arg("claude-opus-4.5-no-thinking")
+    sync_client = Anthropic(api_key="x", http_client=httpx.Client(transport=httpx.MockTransport(anthropic_stream)))
+    sync = call_anthropic(sync_client, "p", config)
+
+    async def _call():
+        client = AsyncAnthropic(api_key="x", http_client=httpx.AsyncClient(transport=httpx.MockTransport(anthropic_stream)))
+        return await call_anthropic_async(client, "p", config)
+
+    result = asyncio.run(_call())
+    for resp in (sync, result):
+        assert resp.text == "5,6"
+        assert (resp.prompt_tokens, resp.completion_tokens) == (7, 3)
+
+def test_gemini_sync_and_async_agree(monkeypatch):
+    monkeypatch.setattr(gemini, "get_http_client", lambda **kw: httpx.Client(transport=httpx.MockTransport(gemini_reply)))
+    monkeypatch.setattr(gemini, "get_async_http_client", lambda **kw: httpx.AsyncClient(transport=httpx.MockTransport(gemini_reply)))
+    gemini.get_gemini_key_pool().reset()
+    config = parse_model_arg("gemini-3-low")
+    sync = gemini.call_gemini(["k"], "p", config)
+    result = asyncio.run(gemini.call_gemini_async(["k"], "p", config))
+    for resp in (sync, result):
+        assert resp.text == "8,9"
+        assert (resp.prompt_tokens, resp.completion_tokens) == (4, 2)
+
+def test_async_run_models_in_parallel_runs_on_one_loop_thread(monkeypatch):
+    seen_threads = set()
+
+    async def fake_run_single_model_async(model_name, run_id, *args, cancel_token=None, deadline=None):
+        seen_threads.add(threading.current_thread().name)
+        await asyncio.sleep(0.05)
+        if model_name == "bad":
+            raise RuntimeError("boom")
+        return {"run_id": run_id}
+
+    monkeypatch.setattr(orchestrator, "run_single_model_async", fake_run_single_model_async)
+    set_async_providers_enabled(True)
+    try:
+        completed = []
+        counts = {}
+        threads_before = threading.active_count()
+        results = orchestrator.run_models_in_parallel(
+            ["m"] * 30 + ["bad"], counts, "step_1", "prompt", None, None, None, [], False,
+            on_task_complete=lambda: completed.append(1)
+        )
+    finally:
+        set_async_providers_enabled(False)
+
+    assert sorted(r["run_id"] for r in results) == sorted(f"m_{i}_step_1" for i in range(1, 31))
+    assert counts == {"m": 30, "bad": 1}
+    assert len(completed) == 30
+    assert seen_threads == {"async-providers"}
+    # One loop thread at most, not a pool of MAX_PARALLEL_MODELS threads
+    assert threading.active_count() <= threads_before + 1
+
+def test_async_step_searches_share_the_loop_thread(monkeypatch):
+    seen_threads = set()
+
+    async def fake_run_models_in_parallel_async(models, run_id_counts, step_name, *args, **kwargs):
+        seen_threads.add(threading.current_thread().name)
+        await asyncio.sleep(0.05)
+        if step_name == "bad":
+            raise RuntimeError("boom")
+        return [f"{step_name}:{m}" for m in models]
+
+    monkeypatch.setattr(steps, "run_models_in_parallel_async", fake_run_models_in_parallel_async)
+    searches = [(name, {"v": name}, (["m"], {}, name), {}) for name in ("a", "bad", "c")]
+    set_async_providers_enabled(True)
+    try:
+        threads_before = threading.active_count()
+        outcomes = steps._run_substeps(searches, [lambda: ("other", ["x"], None)], max_workers=30)
+        # No thread per search, only the loop's (and to_thread's worker for the other substep)
+        assert threading.active_count() <= threads_before + 2
+    finally:
+        set_async_providers_enabled(False)
+
+    assert seen_threads == {"async-providers"}
+    assert outcomes[0] == ("a", ["a:m"], {"v": "a"}) and outcomes[2] == ("c", ["c:m"], {"v": "c"})
+    assert isinstance(outcomes[1], RuntimeError) and outcomes[3] == ("other", ["x"], None)
+
+def test_rate_limiter_try_acquire_does_not_block():
+    limiter = RateLimiter(rate=2, period=60)
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() == 0.0
+    wait = limiter.try_acquire()
+    assert 0 < wait <= 30.0
+    assert limiter.tokens < 1
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,67 @@
+import sys
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.parallel.codegen as codegen
+
+from src.augmentation import (
+    get_augmented_pairs,
+    rotate_grid_90,
+    rotate_grid_180,
+    rotate_grid_270,
+    flip_grid_horizontal,
+    flip_grid_vertical,
+    flip_grid_both,
+    shift_grid_colors,
+)
+
+GRID = [[1, 2, 3],
+        [4, 5, 6]]
+
+def test_rotations_and_flips():
+    assert rotate_grid_90(GRID) == [[4, 1], [5, 2], [6, 3]]
+    assert rotate_grid_180(GRID) == [[6, 5, 4], [3, 2, 1]]
+    assert rotate_grid_270(GRID) == [[3, 6], [2, 5], [1, 4]]
+    assert flip_grid_horizontal(GRID) == [[3, 2, 1], [6, 5, 4]]
+    assert flip_grid_vertical(GRID) == [[4, 5, 6], [1, 2, 3]]
+    assert flip_grid_both(GRID) == rotate_grid_180(GRID)
+
+def test_shift_grid_colors_wraps_like_modulo():
+    assert shift_grid_colors([[0, 8, 9]], 3) == [[3, 1, 2]]
+    # Out-of-palette values behave exactly like (cell + shift) % 10
+    assert shift_grid_colors([[-1, 12]], 1) == [[0, 3]]
+
+def test_augmented_pairs_order_and_plain_lists():
+    pairs = get_augmented_pairs(GRID, [[7]])
+    assert [p["type"] for p in pairs] == [
+        "rotation_90", "rotation_180", "rotation_270",
+        "reflection_h", "reflection_v", "reflection_both",
+        "color_shift_1", "color_shift_2", "color_shift_3",
+    ]
+    assert pairs[6]["output"] == [[8]]
+    assert type(pairs[0]["input"][0][0]) is int
+
+@pytest.mark.parametrize("fn", [rotate_grid_90, flip_grid_both, lambda g: shift_grid_colors(g, 1)])
+def test_empty_grid(fn):
+    assert fn([]) == []
+
+def test_color_shifts_are_scored_apart(monkeypatch):
+    # A color-specific rule: recolor 1 to 2; it survives every geometric variant and no color shift
+    def _recolor(grid):
+        return [[2 if c == 1 else c for c in row] for row in grid]
+
+    def fake_batch(code, inputs, expected=None, **kwargs):
+        return [(True, _recolor(x), "") for x in inputs], {"hits": 0, "misses": len(inputs)}
+
+    monkeypatch.setattr(codegen, "run_cached_batch", fake_batch)
+    log = {}
+    codegen.run_augmentation_check("code", [SimpleNamespace(input=[[1, 0]], output=[[2, 0]])], log)
+    assert log["augmentation_score"] == 1.0 and log["color_shift_score"] == 0.0
+    assert log["augmentation_results"]["color_shift_1"] == {"passed": 0, "total": 1}
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
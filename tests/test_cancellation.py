@@ -0,0 +1,140 @@
+import sys
+import time
+import threading
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from openai import OpenAI
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.async_runtime as async_runtime
+from src.cancellation import CancellationToken, cancel_scope
+from src.errors import RunCancelledError, RetryableProviderError
+from src.grid import FrozenGrid
+from src.llm_utils import run_with_retry
+from src.mock_llm_server import MockLLMServer
+from src.models import call_model
+from src.parallel import run_models_in_parallel
+from src.parallel.worker import run_single_model
+from src.selection import consensus_decided
+from src.solver.consensus import ConsensusMonitor
+
+def _candidates(*counts) -> dict:
+    return {FrozenGrid([[i]]): {"grid": [[i]], "count": count} for i, count in enumerate(counts)}
+
+def test_consensus_decided():
+    assert consensus_decided(_candidates(11, 1, 1), 0)
+    # A remaining run could match a singleton, giving it 2
+    assert not consensus_decided(_candidates(11, 1, 1), 1)
+    assert not consensus_decided(_candidates(11, 1, 1), 9)
+    # Alone, the top group survives one more run but two could agree on a new grid
+    assert consensus_decided(_candidates(11), 1)
+    assert not consensus_decided(_candidates(11), 2)
+    # is_solved does not hold yet
+    assert not consensus_decided(_candidates(10), 0)
+    assert not consensus_decided(_candidates(11, 2), 0)
+
+def test_monitor_cancels_the_step_once_decided():
+    monitor = ConsensusMonitor(_candidates(10), expected_runs=3)
+    monitor.on_result({"grid": [[0]]})
+    assert not monitor.token.cancelled
+    monitor.on_result({"grid": [[0]]})
+    assert monitor.token.cancelled and monitor.remaining == 1
+
+    disabled = ConsensusMonitor(_candidates(10), expected_runs=4, enabled=False)
+    disabled.on_result({"grid": [[0]]})
+    assert not disabled.token.cancelled
+
+def test_cancelled_run_is_not_retried():
+    token = CancellationToken()
+    calls = []
+
+    def _fail():
+        calls.append(1)
+        token.cancel("test")
+        raise RetryableProviderError("stream closed")
+
+    with cancel_scope(token), pytest.raises(RunCancelledError):
+        run_with_retry(_fail)
+    assert len(calls) == 1
+
+# Gemini clients are cached per key with the base URL of their first use, so each test uses its own key
+@pytest.fixture
+def slow_server(monkeypatch):
+    server = MockLLMServer(median_s=60.0, sigma=0.01).start()
+    for name, value in server.environment().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(llm_utils, "_RETRIES_ENABLED", False)
+    yield server
+    server.stop()
+
+def _cancel_when(server, counter: str, call) -> tuple:
+    """Runs call() under a token, cancels it once the server counted `counter`; returns (error, seconds to stop)."""
+    token = CancellationToken()
+    outcome = {}
+
+    def _run():
+        with cancel_scope(token):
+            try:
+                call()
+            except Exception as e:
+                outcome["error"] = e
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.stats()["counters"].get(counter) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    start = time.monotonic()
+    token.cancel("test")
+    thread.join(10)
+    return outcome.get("error"), time.monotonic() - start
+
+def test_background_job_is_cancelled(slow_server):
+    error, stopped_s = _cancel_when(slow_server, "openai.background", lambda: call_model(
+        OpenAI(api_key="mock"), None, [], "solve", "gpt-5.2-low", use_background=True
+    ))
+    assert isinstance(error, RunCancelledError) and stopped_s < 5
+    stats = slow_server.stats()
+    assert stats["counters"]["openai.cancel"] == 1 and stats["in_flight"] == 0
+
+def test_gemini_send_is_abandoned(slow_server):
+    error, stopped_s = _cancel_when(slow_server, "gemini.generate", lambda: call_model(
+        None, None, ["mock-gemini-key-abandon"], "solve", "gemini-3-low"
+    ))
+    assert isinstance(error, RunCancelledError) and stopped_s < 5
+
+def test_queued_run_never_starts(slow_server):
+    token = CancellationToken()
+    token.cancel("consensus reached")
+    res = run_single_model(
+        "gpt-5.2-low", "gpt-5.2-low_1_step_1", "solve", SimpleNamespace(input=[[0]], output=None),
+        OpenAI(api_key="mock"), None, [], False, cancel_token=token
+    )
+    assert res["grid"] is None and "consensus reached" in res["full_response"]
+    assert slow_server.stats()["counters"] == {}
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_step_runs_stop_on_cancel(slow_server, monkeypatch, use_async):
+    monkeypatch.setattr(async_runtime, "_ASYNC_PROVIDERS_ENABLED", use_async)
+    token = CancellationToken()
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(run_models_in_parallel(
+        ["gpt-5.2-low", "gemini-3-low"], {}, "step_1", "solve", SimpleNamespace(input=[[0]], output=None),
+        OpenAI(api_key="mock"), None, [f"mock-gemini-key-{use_async}"], False, use_background=True, cancel_token=token
+    )), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while slow_server.stats()["in_flight"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    token.cancel("consensus reached")
+    thread.join(10)
+    assert not thread.is_alive()
+    assert len(results) == 2 and all(r["grid"] is None for r in results)
+    assert slow_server.stats()["counters"]["openai.cancel"] == 1
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
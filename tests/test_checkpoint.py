@@ -0,0 +1,84 @@
+import sys
+import json
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.parallel.orchestrator as orchestrator
+from src.solver.checkpoint import SolverCheckpoint, checkpoint_path, load_finished_predictions
+from src.solver.state import SolverState
+from src.grid import FrozenGrid
+
+_TASK_DATA = {
+    "train": [{"input": [[1, 0], [0, 1]], "output": [[0, 1], [1, 0]]}],
+    "test": [{"input": [[3, 0], [0, 3]]}],
+}
+
+def _result(model_name, run_id, grid=None):
+    return {
+        "run_id": run_id, "model": model_name, "cost": 0.5, "prompt": "p", "full_response": f"reasoning of {run_id}",
+        "grid": grid, "is_correct": None, "input_tokens": 10, "cached_tokens": 0, "output_tokens": 2, "reasoning_tokens": 0,
+    }
+
+def _fake_runs(monkeypatch, failing=()):
+    calls = []
+
+    def fake_run_single_model(model_name, run_id, *args, cancel_token=None, deadline=None):
+        calls.append(run_id)
+        if run_id in failing:
+            raise RuntimeError("worker killed")
+        return _result(model_name, run_id, [[1]])
+
+    monkeypatch.setattr(orchestrator, "run_single_model", fake_run_single_model)
+    return calls
+
+def test_resumed_step_only_runs_the_missing_models(monkeypatch, tmp_path):
+    path = tmp_path / "cp.json"
+    _fake_runs(monkeypatch, failing={"a_2_step_1"})
+    checkpoint = SolverCheckpoint.open(path, resume=False)
+    orchestrator.run_models_in_parallel(["a", "b", "a"], {}, "step_1", "prompt", None, None, None, [], False, checkpoint=checkpoint)
+    assert sorted(json.loads(path.read_text())["runs"]) == ["step_1|a", "step_1|b"]
+
+    calls = _fake_runs(monkeypatch)
+    completed = []
+    resumed = SolverCheckpoint.open(path, resume=True)
+    results = orchestrator.run_models_in_parallel(
+        ["a", "b", "a"], {}, "step_1", "prompt", None, None, None, [], False,
+        on_task_complete=lambda: completed.append(1), checkpoint=resumed
+    )
+    assert calls == ["a_2_step_1"]
+    assert sorted(r["run_id"] for r in results) == ["a_1_step_1", "a_2_step_1", "b_1_step_1"]
+    # Restored results get the rebuilt prompt back (the checkpoint leaves it out)
+    assert all(r["prompt"] == "prompt" for r in results if r["run_id"] != "a_2_step_1")
+    assert len(completed) == 3
+
+def test_state_resumes_after_the_last_finished_step(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    state = SolverState("t", 1, 0, False, "ts", task_data=_TASK_DATA, logs_directory=str(tmp_path))
+    state.run_id_counts = {"a": 2}
+    state.process_results([_result("a", "a_1_step_1", [[1, 2]]), _result("a", "a_2_step_1", [[1, 2]])], {})
+    state.checkpoint_step("step_1")
+    state.close()
+
+    resumed = SolverState("t", 1, 0, False, "ts", task_data=_TASK_DATA, logs_directory=str(tmp_path), resume=True)
+    assert resumed.step_completed("step_1") and not resumed.step_completed("step_5")
+    assert resumed.candidates_object[FrozenGrid([[1, 2]])]["count"] == 2
+    assert resumed.reasoning_store["a_2_step_1"] == "reasoning of a_2_step_1"
+    assert (resumed.run_id_counts, resumed.total_cost) == ({"a": 2}, 1.0)
+
+    assert load_finished_predictions(str(tmp_path), "ts", "t", 1) is None
+    resumed.checkpoint.finish([{"grid": [[1, 2]]}], resumed.usage_stats)
+    resumed.close()
+    picked, usage = load_finished_predictions(str(tmp_path), "ts", "t", 1)
+    assert picked == [{"grid": [[1, 2]]}] and usage["total_tokens"] == 24
+
+    # Without --resume the same timestamp starts over
+    fresh = SolverState("t", 1, 0, False, "ts", task_data=_TASK_DATA, logs_directory=str(tmp_path))
+    assert fresh.candidates_object == {} and not fresh.step_completed("step_1")
+    fresh.close()
+    assert checkpoint_path(str(tmp_path), "ts", "t", 1).exists()
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
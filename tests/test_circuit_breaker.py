@@ -0,0 +1,118 @@
+import sys
+import time
+import threading
+import pytest
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.circuit_breaker as circuit_breaker
+from src.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, circuit_scope, PROBE_POLL_S
+from src.parallel.limiter import RateLimitManager, start_shared_circuit_breakers
+from src.llm_utils import run_with_retry
+from src.errors import RetryableProviderError, NonRetryableProviderError, CircuitOpenError, RunCancelledError
+from src.cancellation import CancellationToken, cancel_scope
+from src.deadline import Deadline, deadline_scope
+
+def _fail(registry, n):
+    for _ in range(n):
+        registry.record_failure("openai:gpt-5.2")
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = CircuitBreakerRegistry(failure_threshold=2, open_s=0.05)
+    monkeypatch.setattr(circuit_breaker, "_REGISTRY", registry)
+    monkeypatch.setattr(llm_utils, "_RETRIES_ENABLED", False)
+    return registry
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, window_s=60, open_s=0.05)
+    breaker.record_failure()
+    assert breaker.before_call() == 0.0
+    breaker.record_failure()
+    assert 0 < breaker.before_call() <= 0.05
+
+    time.sleep(0.06)
+    assert breaker.before_call() == 0.0  # The probe
+    assert breaker.before_call() == PROBE_POLL_S  # Everyone else waits for it
+    breaker.record_failure()
+    assert breaker.snapshot() == {"state": "open", "recent_failures": 2, "trips": 2}
+    assert breaker.open_s == 0.1  # Failed probe doubles the open time
+
+    time.sleep(0.11)
+    assert breaker.before_call() == 0.0
+    breaker.record_success()
+    assert breaker.snapshot()["state"] == "closed" and breaker.open_s == 0.05
+
+def test_circuit_is_shared_across_processes():
+    manager = RateLimitManager()
+    manager.start()
+    try:
+        proxy = start_shared_circuit_breakers(manager)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            # 3 failures per process; the threshold of 5 is only reached together
+            list(executor.map(_fail, [proxy] * 2, [3] * 2))
+        assert proxy.snapshot()["openai:gpt-5.2"]["state"] == "open"
+        assert proxy.before_call("openai:gpt-5.2") > 0
+    finally:
+        manager.shutdown()
+
+def test_open_circuit_waits_or_fails_fast(registry, monkeypatch):
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RetryableProviderError("server_error")
+
+    with circuit_scope("openai:gpt-5.2"):
+        for _ in range(2):
+            with pytest.raises(RetryableProviderError):
+                run_with_retry(failing)
+        assert registry.snapshot()["openai:gpt-5.2"]["state"] == "open"
+
+        # Fail fast: the call never reaches the provider
+        monkeypatch.setattr(circuit_breaker, "MAX_CIRCUIT_WAIT_S", 0.0)
+        with pytest.raises(CircuitOpenError):
+            run_with_retry(failing)
+        assert len(calls) == 2
+
+        # Waiting: the call is held until the probe slot, and a provider answer closes the circuit
+        monkeypatch.setattr(circuit_breaker, "MAX_CIRCUIT_WAIT_S", 10.0)
+        timings = []
+        assert run_with_retry(lambda: run_with_retry(lambda: "ok"), timing_tracker=timings) == "ok"
+        assert timings[0]["reason"] == "circuit_open"
+        assert registry.snapshot()["openai:gpt-5.2"]["state"] == "closed"
+
+def test_open_circuit_wait_stops_at_cancel_and_deadline(monkeypatch):
+    registry = CircuitBreakerRegistry(failure_threshold=1, open_s=30)
+    monkeypatch.setattr(circuit_breaker, "_REGISTRY", registry)
+    registry.record_failure("openai:gpt-5.2")
+
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel, args=("test",)).start()
+    start = time.monotonic()
+    with circuit_scope("openai:gpt-5.2"), cancel_scope(token), pytest.raises(RunCancelledError):
+        run_with_retry(lambda: "ok")
+    assert time.monotonic() - start < 5
+
+    # The circuit stays open past the deadline: give up without waiting
+    start = time.monotonic()
+    with circuit_scope("openai:gpt-5.2"), deadline_scope(Deadline.after(10)), pytest.raises(CircuitOpenError):
+        run_with_retry(lambda: "ok")
+    assert time.monotonic() - start < 1
+
+def test_only_server_failures_count(registry):
+    def bad_request():
+        raise NonRetryableProviderError("400")
+
+    with circuit_scope("anthropic:claude-opus-4.5"):
+        for _ in range(3):
+            with pytest.raises(NonRetryableProviderError):
+                run_with_retry(bad_request)
+    assert registry.snapshot()["anthropic:claude-opus-4.5"]["state"] == "closed"
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
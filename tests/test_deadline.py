@@ -0,0 +1,134 @@
+import sys
+import time
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from openai import OpenAI
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.logging as logging_module
+import src.async_runtime as async_runtime
+import src.solver.state as state_module
+import src.solver_engine as solver_engine
+from src.cancellation import CancellationToken, current_cancel_token
+from src.deadline import Deadline, cancel_at, deadline_scope, call_timeout, MIN_CALL_TIMEOUT_S
+from src.mock_llm_server import MockLLMServer
+from src.parallel import run_models_in_parallel
+from src.solver.state import SolverState
+
+_TASK_DATA = {
+    "train": [{"input": [[1, 0], [0, 1]], "output": [[0, 1], [1, 0]]}],
+    "test": [{"input": [[3, 0], [0, 3]]}],
+}
+
+def test_deadline_arithmetic():
+    unlimited = Deadline()
+    assert not unlimited.expired() and unlimited.remaining() == float("inf")
+    assert unlimited.reserve(100) is unlimited and unlimited.cap(3300) == 3300
+
+    run = Deadline.after(100)
+    task = Deadline.after(28800, within=run)
+    assert task.at == run.at
+    assert 1790 < Deadline.after(3600).reserve(1800).remaining() <= 1800
+    assert run.cap(3300) <= 100
+    assert Deadline(time.time() - 1).expired() and Deadline(time.time() - 1).cap(3300) == MIN_CALL_TIMEOUT_S
+
+def test_call_timeout_follows_the_run_deadline():
+    assert call_timeout(3300) == 3300
+    with deadline_scope(Deadline.after(60)):
+        assert 55 < call_timeout(3300) <= 60
+        # None keeps the enclosing deadline
+        with deadline_scope(None):
+            assert call_timeout(3300) <= 60
+    assert call_timeout(3300) == 3300
+
+def test_cancel_at_cancels_when_the_deadline_passes():
+    token = CancellationToken()
+    with cancel_at(token, Deadline.after(0.1)) as scoped:
+        assert scoped is token
+        assert token.wait(5) and token.reason == "deadline reached"
+
+    # An unlimited deadline needs no token, a bounded one makes its own
+    with cancel_at(None, Deadline()) as scoped:
+        assert scoped is None
+    with cancel_at(None, Deadline.after(60)) as scoped:
+        assert isinstance(scoped, CancellationToken) and not scoped.cancelled
+
+    # Left in time, the timer never fires
+    token = CancellationToken()
+    with cancel_at(token, Deadline.after(0.2)):
+        pass
+    time.sleep(0.4)
+    assert not token.cancelled
+
+@pytest.fixture
+def slow_server(monkeypatch):
+    server = MockLLMServer(median_s=60.0, sigma=0.01).start()
+    for name, value in server.environment().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(llm_utils, "_RETRIES_ENABLED", False)
+    yield server
+    server.stop()
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_runs_stop_at_the_deadline(slow_server, monkeypatch, use_async):
+    monkeypatch.setattr(async_runtime, "_ASYNC_PROVIDERS_ENABLED", use_async)
+    start = time.monotonic()
+    results = run_models_in_parallel(
+        ["gpt-5.2-low"], {}, "step_1", "solve", SimpleNamespace(input=[[0]], output=None),
+        OpenAI(api_key="mock"), None, [], False, use_background=True, deadline=Deadline.after(1.0)
+    )
+    assert time.monotonic() - start < 6
+    assert len(results) == 1 and results[0]["grid"] is None
+    assert slow_server.stats()["counters"]["openai.cancel"] == 1
+
+def _state(monkeypatch, tmp_path, deadline) -> SolverState:
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(logging_module, "_CURRENT_LOG_DIR", str(tmp_path))
+    state = SolverState("t", 1, 0, False, "ts", task_data=_TASK_DATA, logs_directory=str(tmp_path), deadline=deadline)
+    for i, grid in enumerate([[[1]], [[1]], [[2]]]):
+        state.process_results([{"run_id": f"a_{i}_step_1", "prompt": "p", "full_response": "r", "grid": grid, "is_correct": None}], {})
+    return state
+
+def test_finalize_votes_when_no_time_is_left_for_judges(monkeypatch, tmp_path):
+    def _judges(*args, **kwargs):
+        raise AssertionError("judges ran past the deadline")
+
+    monkeypatch.setattr(state_module, "pick_solution_v2", _judges)
+    state = _state(monkeypatch, tmp_path, Deadline.after(60))
+    assert state.out_of_search_time()
+    picked, _ = state.finalize()
+    assert [group["grid"] for group in picked] == [[[1]], [[2]]]
+
+def test_judges_are_cancelled_at_the_deadline(monkeypatch, tmp_path):
+    seen = {}
+
+    def _judges(candidates_object, *args, **kwargs):
+        token = current_cancel_token()
+        seen["cancelled"] = token.wait(5)
+        return [candidates_object[key] for key in list(candidates_object)[:2]], False, {}
+
+    monkeypatch.setattr(state_module, "pick_solution_v2", _judges)
+    monkeypatch.setattr(state_module, "JUDGE_MIN_TIME_S", 0)
+    state = _state(monkeypatch, tmp_path, Deadline.after(0.5))
+    picked, _ = state.finalize()
+    assert seen["cancelled"] and len(picked) == 2
+
+def test_solver_skips_steps_near_the_deadline(monkeypatch, tmp_path):
+    def _step(*args, **kwargs):
+        raise AssertionError("step started past the deadline")
+
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    monkeypatch.setattr(logging_module, "_CURRENT_LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(solver_engine, "run_step_1", _step)
+    monkeypatch.setattr(solver_engine, "run_step_5", _step)
+    picked, _ = solver_engine.run_solver_mode(
+        "t", 1, 0, run_timestamp="ts", task_data=_TASK_DATA, logs_directory=str(tmp_path), deadline=Deadline.after(60)
+    )
+    assert picked == []
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,82 @@
+import sys
+import time
+import pytest
+import httpx
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.providers.gemini as gemini
+from src.providers.gemini_pool import GeminiKeyPool, FAILURE_RATE_LIMIT, FAILURE_ERROR
+from src.models import parse_model_arg
+from src.errors import RateLimitProviderError, RetryableProviderError
+
+def _reply(request):
+    return httpx.Response(200, json={"candidates": [{"content": {"role": "model", "parts": [{"text": "1"}]}}], "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 2}})
+
+def _rate_limited(request):
+    return httpx.Response(429, json={"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+
+@pytest.fixture
+def pool(monkeypatch):
+    """The process pool with clients whose transport answers per key (x-goog-api-key header)."""
+    handlers = {}
+    created = []
+
+    def transport(request):
+        return handlers[request.headers["x-goog-api-key"]](request)
+
+    def make_client(**kw):
+        created.append(1)
+        return httpx.Client(transport=httpx.MockTransport(transport))
+
+    monkeypatch.setattr(gemini, "get_http_client", make_client)
+    monkeypatch.setattr(llm_utils, "_RETRIES_ENABLED", False)
+    gemini.get_gemini_key_pool().reset()
+    yield handlers, created
+    gemini.get_gemini_key_pool().reset()
+
+def test_least_loaded_healthy_key_is_chosen():
+    pool = GeminiKeyPool(lambda key: (key, None), lambda key: (key, None))
+    keys = ["a", "b", "c"]
+    leases = [pool.acquire(keys) for _ in range(3)]
+    assert sorted(l.index for l in leases) == [0, 1, 2]
+
+    pool.release(leases[1], FAILURE_RATE_LIMIT)
+    pool.release(leases[2], FAILURE_ERROR)
+    # b is cooling down, so idle c is chosen despite its error; then a (tied load, no errors)
+    assert pool.acquire(keys).key == "c"
+    assert pool.acquire(keys).key == "a"
+
+    # A preferred healthy key is kept even when busier
+    assert pool.acquire(keys, prefer=0).key == "a"
+    assert pool.acquire(keys, prefer=1).key != "b"
+    stats = {s["key_index"]: s for s in pool.stats()}
+    assert stats[1]["cooldown_s"] > 0 and stats[1]["in_flight"] == 0
+
+def test_rate_limited_key_cools_down_and_clients_are_reused(pool):
+    handlers, created = pool
+    handlers.update({"bad": _rate_limited, "good": _reply})
+    config = parse_model_arg("gemini-3-low")
+
+    with pytest.raises(RateLimitProviderError):
+        gemini.call_gemini(["bad", "good"], "p", config)
+
+    for _ in range(3):
+        assert gemini.call_gemini(["bad", "good"], "p", config).text == "1"
+    assert len(created) == 2  # One persistent client per key
+
+def test_hard_timeout_returns_control(pool, monkeypatch):
+    handlers, _ = pool
+    handlers["slow"] = lambda request: time.sleep(2) or _reply(request)
+    monkeypatch.setattr(gemini, "GEMINI_HARD_TIMEOUT_S", 0.2)
+
+    start = time.monotonic()
+    with pytest.raises(RetryableProviderError, match="Hard Wall-Clock Timeout"):
+        gemini.call_gemini(["slow"], "p", parse_model_arg("gemini-3-low"))
+    assert time.monotonic() - start < 1.5
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,35 @@
+import sys
+import pickle
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.grid import FrozenGrid
+
+def test_frozen_grid_matches_tuple_semantics():
+    grid = [[1, 2], [3, 4]]
+    key = FrozenGrid(grid)
+    assert key == FrozenGrid([[1, 2], [3, 4]])
+    assert key == FrozenGrid([[1.0, 2], [3, 4]])
+    assert key != FrozenGrid([[1, 2, 3, 4]])
+    assert key != FrozenGrid([[1, 2], [3, 5]])
+    # Logs key candidates by str(key); it must read exactly like the old tuple keys
+    assert str(key) == str(tuple(tuple(row) for row in grid))
+    assert key.to_list() == grid
+
+@pytest.mark.parametrize("grid", [[], [[]], [[1], [2, 3]], [[300, -1]]])
+def test_frozen_grid_fallback_keys(grid):
+    key = FrozenGrid(grid)
+    assert key == FrozenGrid(grid)
+    assert {key: 1}[FrozenGrid(grid)] == 1
+    assert str(key) == str(tuple(tuple(row) for row in grid))
+    assert key.to_list() == grid
+
+def test_frozen_grid_pickles():
+    key = FrozenGrid([[0, 9], [9, 0]])
+    assert pickle.loads(pickle.dumps(key)) == key
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -53,6 +53,15 @@ def test_parsing_all_cases(case_file):
     except ValueError as e:
         pytest.fail(f"Failed to parse case {case_file.name}: {e}")
 
+@pytest.mark.parametrize("case_file", get_test_cases())
+def test_extract_all_grids_shares_parser(case_file):
+    """The judge extractor and the answer parser must agree on the final block."""
+    from src.judges import extract_all_grids
+    text = case_file.read_text()
+    blocks = extract_all_grids(text)
+    assert blocks
+    assert blocks[-1] == parse_grid_from_text(text)
+
 
 if __name__ == "__main__":
     sys.exit(pytest.main([__file__]))
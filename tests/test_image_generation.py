@@ -0,0 +1,55 @@
+import sys
+import pytest
+import numpy as np
+from pathlib import Path
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.image_generation as image_generation
+from src.image_generation import rasterize_grid, generate_and_save_image, task_image_key, PALETTE, CELL_PIXELS
+from src.types import Task, Example
+
+def _task(seed=0):
+    rng = np.random.default_rng(seed)
+    train = [Example(rng.integers(0, 10, (5, 4)).tolist(), rng.integers(0, 10, (3, 6)).tolist()) for _ in range(2)]
+    return Task(train=train, test=[])
+
+def test_rasterize_grid_colors_and_borders():
+    grid = np.array([[1, 1], [1, 2]])
+    img = rasterize_grid(grid)
+    c = CELL_PIXELS
+    assert img.shape == (2 * c, 2 * c, 3)
+    # Cell centers carry the palette color
+    assert (img[c // 2, c // 2] == PALETTE[1]).all()
+    assert (img[c + c // 2, c + c // 2] == PALETTE[2]).all()
+    # Outer frame is drawn, and so is the 1|2 boundary, but not the 1|1 one
+    assert (img[0, c // 2] == 0).all()
+    assert (img[c + c // 2, c] == 0).all()
+    assert (img[c // 2, c] == PALETTE[1]).all()
+
+def test_generate_and_save_image_renders_each_task_once(tmp_path, monkeypatch):
+    renders = []
+    real_render = image_generation.render_task_image
+    monkeypatch.setattr(image_generation, "render_task_image", lambda task: renders.append(1) or real_render(task))
+    monkeypatch.setattr(image_generation, "_IMAGE_CACHE", type(image_generation._IMAGE_CACHE)())
+
+    task = _task()
+    first = generate_and_save_image(task, str(tmp_path / "run_1_step_5_common.png"))
+    second = generate_and_save_image(_task(), str(tmp_path / "run_2_step_5_common.png"))
+    assert len(renders) == 1
+    assert Path(first).read_bytes() == Path(second).read_bytes()
+    assert Image.open(first).size[0] > 10 * CELL_PIXELS
+
+    # A fresh process only has the on-disk cache
+    image_generation._IMAGE_CACHE.clear()
+    generate_and_save_image(task, str(tmp_path / "run_3_step_5_common.png"))
+    assert len(renders) == 1
+
+    generate_and_save_image(_task(seed=1), str(tmp_path / "other.png"))
+    assert len(renders) == 2
+    assert task_image_key(task) != task_image_key(_task(seed=1))
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,131 @@
+import sys
+import json
+import asyncio
+import pytest
+import httpx
+from pathlib import Path
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from openai import OpenAI, AsyncOpenAI
+from anthropic import Anthropic
+
+import src.providers.image_payloads as image_payloads
+import src.providers.openai_bg.job_manager as job_manager
+from src.providers.image_payloads import get_image_payload, anthropic_image_block, anthropic_extra_headers, ANTHROPIC_FILES_BETA
+from src.models import parse_model_arg
+from src.providers.openai import call_openai_internal, call_openai_internal_async
+
+_RESPONSE = {"id": "resp_1", "object": "response", "created_at": 0, "model": "m", "output": [], "parallel_tool_calls": False, "tool_choice": "auto", "tools": []}
+_USAGE = {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2, "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}}
+
+class FakeFilesAPI:
+    """Stub of the files and responses endpoints; records uploads and the image parts of each request."""
+
+    def __init__(self, fail_uploads: bool = False):
+        self.uploads = 0
+        self.image_parts = []
+        self.fail_uploads = fail_uploads
+
+    def __call__(self, request):
+        path = request.url.path
+        if path.endswith("/files"):
+            self.uploads += 1
+            if self.fail_uploads:
+                return httpx.Response(500, json={"error": {"message": "boom"}})
+            return httpx.Response(200, json={
+                "id": f"file_{self.uploads}", "object": "file", "bytes": 1, "created_at": 0,
+                "filename": "x.png", "purpose": "vision", "status": "processed",
+                "type": "file", "mime_type": "image/png", "size_bytes": 1,
+            })
+        if request.method == "POST":
+            body = json.loads(request.content)
+            self.image_parts.extend(p for p in body["input"][0]["content"] if p["type"] == "input_image")
+        output = [{"type": "message", "id": "o", "role": "assistant", "status": "completed", "content": [{"type": "output_text", "text": "ok", "annotations": []}]}]
+        return httpx.Response(200, json=dict(_RESPONSE, status="completed", output=output, usage=_USAGE))
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(job_manager, "POLL_INTERVAL_BASE_S", 0.01)
+    monkeypatch.setattr(job_manager.random, "uniform", lambda a, b: 0.0)
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path / "task.png"
+    Image.new("RGB", (4, 4), (255, 0, 0)).save(path)
+    return path
+
+@pytest.fixture
+def uploads(monkeypatch):
+    monkeypatch.setattr(image_payloads, "_IMAGE_UPLOADS_ENABLED", True)
+    monkeypatch.setattr(image_payloads, "_FILE_IDS", {})
+    monkeypatch.setattr(image_payloads, "_UPLOAD_FAILURES", {})
+
+def _openai(api):
+    return OpenAI(api_key="x", max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(api)))
+
+def test_payload_is_read_and_encoded_once(image_file, tmp_path):
+    payload = get_image_payload(str(image_file))
+    assert get_image_payload(str(image_file)) is payload
+    assert payload.data_url.startswith("data:image/png;base64,")
+    assert payload.anthropic_source == {"type": "base64", "media_type": "image/png", "data": payload.base64}
+    assert payload.pil_image.size == (4, 4)
+
+    # Identical bytes under another path (another test index) share the payload
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(image_file.read_bytes())
+    assert get_image_payload(str(copy)) is payload
+
+    # A rewritten file is read again
+    Image.new("RGB", (2, 2), (0, 0, 255)).save(image_file)
+    assert get_image_payload(str(image_file)).pil_image.size == (2, 2)
+
+def test_inline_mode_sends_data_url(image_file):
+    api = FakeFilesAPI()
+    call_openai_internal(_openai(api), "p", parse_model_arg("gpt-5.1-low"), image_path=str(image_file), use_background=True)
+    assert api.uploads == 0
+    assert api.image_parts[0]["image_url"] == get_image_payload(str(image_file)).data_url
+
+def test_upload_mode_uploads_once_and_references_file_id(image_file, uploads):
+    api = FakeFilesAPI()
+    client = _openai(api)
+    for _ in range(3):
+        call_openai_internal(client, "p", parse_model_arg("gpt-5.1-low"), image_path=str(image_file), use_background=True)
+
+    async def _call():
+        async_client = AsyncOpenAI(api_key="x", max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(api)))
+        return await call_openai_internal_async(async_client, "p", parse_model_arg("gpt-5.1-low"), image_path=str(image_file), use_background=True)
+    asyncio.run(_call())
+
+    assert api.uploads == 1
+    assert api.image_parts == [{"type": "input_image", "file_id": "file_1"}] * 4
+
+def test_failed_upload_falls_back_to_inline(image_file, uploads, monkeypatch):
+    api = FakeFilesAPI(fail_uploads=True)
+    client = _openai(api)
+    for _ in range(3):
+        call_openai_internal(client, "p", parse_model_arg("gpt-5.1-low"), image_path=str(image_file), use_background=True)
+    assert all("image_url" in part for part in api.image_parts)
+    # The failure is remembered: later calls go straight to inline
+    assert api.uploads == 1
+
+    # Once UPLOAD_RETRY_AFTER_S has passed, uploading is tried again
+    monkeypatch.setattr(image_payloads, "UPLOAD_RETRY_AFTER_S", 0.0)
+    api.fail_uploads = False
+    call_openai_internal(client, "p", parse_model_arg("gpt-5.1-low"), image_path=str(image_file), use_background=True)
+    assert api.uploads == 2 and api.image_parts[-1] == {"type": "input_image", "file_id": "file_2"}
+
+def test_anthropic_upload_block_needs_files_beta(image_file, uploads):
+    api = FakeFilesAPI()
+    client = Anthropic(api_key="x", max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(api)))
+    block = anthropic_image_block(client, str(image_file))
+    assert block == {"type": "image", "source": {"type": "file", "file_id": "file_1"}}
+    assert anthropic_image_block(client, str(image_file)) == block
+    assert api.uploads == 1
+    assert anthropic_extra_headers([{"role": "user", "content": [block]}]) == {"anthropic-beta": ANTHROPIC_FILES_BETA}
+    assert anthropic_extra_headers([{"role": "user", "content": "text"}]) is None
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,69 @@
+import sys
+import json
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.models as models
+import src.llm_transport as llm_transport
+from src.llm_transport import set_llm_transport, seed_from_step_logs
+from src.models import call_model
+from src.types import ModelResponse
+from src.errors import NonRetryableProviderError
+from src.parallel.worker_utils.tokens import _limiter_for
+
+LOGS_DIR = Path(__file__).parent / "codegen_test_logs"
+
+@pytest.fixture
+def transport(monkeypatch, tmp_path):
+    slept = []
+    monkeypatch.setattr(llm_transport.time, "sleep", slept.append)
+    yield tmp_path, slept
+    set_llm_transport("live", "llm_recordings/", 0.0, 0)
+
+def test_record_then_replay(transport, monkeypatch):
+    tmp_path, _ = transport
+    answers = iter(["first", "second"])
+    monkeypatch.setattr(models, "call_openai_internal", lambda *a, **kw: ModelResponse(next(answers), 10, 2, 5, thought_tokens=3))
+
+    set_llm_transport("record", str(tmp_path))
+    assert [call_model(None, None, [], "p", "gpt-5.1-low").text for _ in range(2)] == ["first", "second"]
+    assert len(list(tmp_path.glob("*.jsonl"))) == 1
+
+    set_llm_transport("replay", str(tmp_path))
+    monkeypatch.setattr(models, "call_openai_internal", None)  # Never called offline
+    replayed = [call_model(None, None, [], "p", "gpt-5.1-low") for _ in range(3)]
+    assert [r.text for r in replayed] == ["first", "second", "first"]
+    assert (replayed[0].prompt_tokens, replayed[0].thought_tokens) == (10, 3)
+    assert replayed[0].timing_breakdown[0]["transport"] == "replay"
+    assert _limiter_for("gpt-5.1-low") == (None, None)
+
+    with pytest.raises(NonRetryableProviderError, match="No recording"):
+        call_model(None, None, [], "other prompt", "gpt-5.1-low")
+
+def test_replay_seeded_from_step_logs_at_speed(transport):
+    tmp_path, slept = transport
+    log_path = LOGS_DIR / "2025-12-27_11-59-17_4e34c42c_1_step_1.json"
+    run = json.loads(log_path.read_text())["gemini-3-high_2_step_1_codegen_1766857499.367441"]
+    assert seed_from_step_logs([log_path], tmp_path / "seeded.jsonl") == 5
+
+    set_llm_transport("replay", str(tmp_path), speed=100.0)
+    response = call_model(None, None, [], run["Full raw LLM call"], "gemini-3-high")
+    assert response.text == run["Full raw LLM response"]
+    assert response.completion_tokens + response.thought_tokens == run["output_tokens"]
+    assert slept == [pytest.approx(run["timing_breakdown"][0]["duration"] / 100)]
+
+def test_synthetic_latency_is_seeded(transport):
+    tmp_path, slept = transport
+    set_llm_transport("synthetic", str(tmp_path), speed=1.0, seed=7)
+    for _ in range(2):
+        call_model(None, None, [], "p", "claude-opus-4.5-no-thinking")
+    set_llm_transport("synthetic", str(tmp_path), speed=1.0, seed=7)
+    response = call_model(None, None, [], "p", "claude-opus-4.5-no-thinking")
+    assert response.text == llm_transport.SYNTHETIC_TEXT
+    assert slept[2] == slept[0] != slept[1]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
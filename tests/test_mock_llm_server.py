@@ -0,0 +1,51 @@
+import sys
+import pytest
+from pathlib import Path
+from openai import OpenAI
+from anthropic import Anthropic
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.providers.openai_bg.job_manager as job_manager
+from src.mock_llm_server import MockLLMServer
+from src.llm_transport import SYNTHETIC_TEXT
+from src.models import call_model
+from src.errors import RateLimitProviderError
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockLLMServer(median_s=0.01, sigma=0.1).start()
+    for name, value in server.environment().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(llm_utils, "_RETRIES_ENABLED", False)
+    yield server
+    server.stop()
+
+def test_provider_clients_reach_the_mock(server, monkeypatch):
+    monkeypatch.setattr(job_manager, "POLL_INTERVAL_BASE_S", 0.0)
+    openai_client = OpenAI(api_key="mock")
+    anthropic_client = Anthropic(api_key="mock")
+
+    responses = [
+        call_model(openai_client, None, [], "solve", "gpt-5.2-low"),
+        call_model(openai_client, None, [], "solve", "gpt-5.2-low", use_background=True),
+        call_model(None, anthropic_client, [], "solve", "claude-opus-4.5-thinking-4000"),
+        call_model(None, None, ["mock-gemini-key"], "solve", "gemini-3-low"),
+    ]
+    assert all(r.text == SYNTHETIC_TEXT.strip() for r in responses)
+    assert all(r.prompt_tokens > 0 and r.completion_tokens > 0 for r in responses)
+
+    counters = server.stats()["counters"]
+    assert counters["openai.stream"] == 1 and counters["openai.background"] == 1 and counters["openai.retrieve"] >= 1
+    assert counters["anthropic.stream"] == 1 and counters["gemini.generate"] == 1
+
+def test_injected_rate_limits(server):
+    server.rate_limit_rate = 1.0
+    with pytest.raises(RateLimitProviderError):
+        call_model(OpenAI(api_key="mock", max_retries=0), None, [], "solve", "gpt-5.2-low")
+    assert server.stats()["counters"]["openai.429"] == 1
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
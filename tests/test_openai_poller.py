@@ -0,0 +1,97 @@
+import sys
+import threading
+import pytest
+import httpx
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from openai import OpenAI
+
+import src.providers.openai_bg.job_manager as job_manager
+from src.models import parse_model_arg
+from src.providers.openai import call_openai_internal
+from src.providers.openai_bg.job_manager import next_poll_interval
+from src.providers.openai_bg.poller import get_background_poller
+from src.errors import NonRetryableProviderError
+
+_RESPONSE = {"object": "response", "created_at": 0, "model": "m", "output": [], "parallel_tool_calls": False, "tool_choice": "auto", "tools": []}
+_USAGE = {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2, "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}}
+
+class FakeBackgroundAPI:
+    """Responses API stand-in: job i completes after i status checks."""
+
+    def __init__(self, transient_errors: int = 0, final_status: str = "completed"):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.polling_threads = set()
+        self.transient_errors = transient_errors
+        self.final_status = final_status
+
+    def __call__(self, request):
+        with self.lock:
+            if request.method == "POST":
+                job_id = f"resp_{len(self.jobs) + 1}"
+                self.jobs[job_id] = 0
+                return httpx.Response(200, json=dict(_RESPONSE, id=job_id, status="queued"))
+
+            self.polling_threads.add(threading.current_thread().name)
+            if self.transient_errors:
+                self.transient_errors -= 1
+                return httpx.Response(503, json={"error": {"message": "overloaded"}})
+            job_id = request.url.path.rsplit("/", 1)[-1]
+            self.jobs[job_id] += 1
+            if self.jobs[job_id] < int(job_id.split("_")[1]):
+                return httpx.Response(200, json=dict(_RESPONSE, id=job_id, status="in_progress"))
+            if self.final_status != "completed":
+                return httpx.Response(200, json=dict(_RESPONSE, id=job_id, status=self.final_status, incomplete_details={"reason": "content_filter"}))
+            output = [{"type": "message", "id": "o", "role": "assistant", "status": "completed", "content": [{"type": "output_text", "text": job_id, "annotations": []}]}]
+            return httpx.Response(200, json=dict(_RESPONSE, id=job_id, status="completed", output=output, usage=_USAGE))
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(job_manager, "POLL_INTERVAL_BASE_S", 0.01)
+    monkeypatch.setattr(job_manager, "_EFFORT_POLL_SCALE", {})
+    monkeypatch.setattr(job_manager.random, "uniform", lambda a, b: 0.0)
+
+def _client(api):
+    return OpenAI(api_key="x", max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(api)))
+
+def test_poller_resolves_concurrent_jobs_from_one_thread(fast_polling):
+    api = FakeBackgroundAPI()
+    client = _client(api)
+
+    def solve(_):
+        return call_openai_internal(client, "p", parse_model_arg("gpt-5.1-low"), use_background=True).text
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        texts = sorted(executor.map(solve, range(4)))
+
+    assert texts == ["resp_1", "resp_2", "resp_3", "resp_4"]
+    assert api.polling_threads == {"openai-bg-poller"}
+    assert get_background_poller().pending_count() == 0
+
+def test_poller_retries_transient_status_errors(fast_polling):
+    api = FakeBackgroundAPI(transient_errors=2)
+    timings = []
+    resp = call_openai_internal(_client(api), "p", parse_model_arg("gpt-5.1-low"), use_background=True, timing_tracker=timings)
+    assert resp.text == "resp_1"
+    assert [t["status"] for t in timings if t["type"] == "attempt"][:2] == ["failed", "failed"]
+
+def test_poller_propagates_terminal_job_errors(fast_polling):
+    api = FakeBackgroundAPI(final_status="incomplete")
+    with pytest.raises(NonRetryableProviderError, match="ended with status=incomplete"):
+        call_openai_internal(_client(api), "p", parse_model_arg("gpt-5.1-low"), use_background=True)
+    assert get_background_poller().pending_count() == 0
+
+def test_poll_interval_backs_off_with_age_and_effort(monkeypatch):
+    monkeypatch.setattr(job_manager.random, "uniform", lambda a, b: 0.0)
+    assert next_poll_interval("low", 0) == 2.0
+    assert next_poll_interval("xhigh", 0) > next_poll_interval("low", 0)
+    assert next_poll_interval("low", 600) > next_poll_interval("low", 60)
+    assert next_poll_interval("xhigh", 3000) == job_manager.MAX_POLL_INTERVAL_S
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,72 @@
+import sys
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.tasks.prompts_codegen as prompts_codegen
+from src.types import Task, Example
+from src.tasks import build_prompt, build_prompt_codegen
+from src.tasks.prompt_cache import PromptCache, task_content_hash, get_prompt_cache, flags_key
+from src.parallel.orchestrator import _build_run_list
+from src.audit_prompts import build_duo_pick_prompt
+
+def _task(color=1):
+    return Task(
+        train=[Example([[color, 0], [0, color]], [[0, color], [color, 0]])],
+        test=[Example([[color, color], [0, 0]], None), Example([[0, 0], [color, color]], None)],
+    )
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    get_prompt_cache().clear()
+    yield
+    get_prompt_cache().clear()
+
+def test_codegen_prompt_built_once_per_model_and_shared(monkeypatch):
+    task = _task()
+    calls = []
+    real_build = prompts_codegen.build_prompt_codegen
+    monkeypatch.setattr(prompts_codegen, "build_prompt_codegen", lambda *a, **kw: calls.append(kw["model_name"]) or real_build(*a, **kw))
+
+    models = ["gpt-5.2-xhigh"] * 6 + ["gemini-3-high"]
+    runs = _build_run_list(models, {}, "step_5", None, task.train, task.test, "v1b", prompt_key=task_content_hash(task))
+
+    assert calls == ["gpt-5.2-xhigh", "gemini-3-high"]
+    gpt_prompts = [r["prompt"] for r in runs if r["name"] == "gpt-5.2-xhigh"]
+    assert all(p is gpt_prompts[0] for p in gpt_prompts)
+    assert gpt_prompts[0] == build_prompt_codegen(task.train, test_examples=task.test, version="v1b", model_name="gpt-5.2-xhigh")
+    assert runs[-1]["prompt"] == build_prompt_codegen(task.train, test_examples=task.test, version="v1b", model_name="gemini-3-high")
+    assert [r["run_id"] for r in runs][:2] == ["gpt-5.2-xhigh_1_step_5", "gpt-5.2-xhigh_2_step_5"]
+
+    # Another test index of the same task (same content hash) reuses the prompts
+    _build_run_list(models, {}, "step_1", None, _task().train, _task().test, "v1b", prompt_key=task_content_hash(_task()))
+    assert len(calls) == 2
+
+def test_cache_keys_on_task_content_and_flags():
+    cache = PromptCache(max_tasks=2)
+    a, b, c = (task_content_hash(_task(color)) for color in (1, 2, 3))
+    assert a == task_content_hash(_task(1)) and a != b
+
+    assert cache.get_or_build(a, ("standard", 1, flags_key({})), lambda: "plain") == "plain"
+    assert cache.get_or_build(a, ("standard", 1, flags_key({"trigger_deep_thinking": False})), lambda: "rebuilt") == "plain"
+    assert cache.get_or_build(a, ("standard", 1, flags_key({"trigger_deep_thinking": True})), lambda: "deep") == "deep"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Least recently used task is evicted
+    cache.get_or_build(b, ("standard", 1, ()), lambda: "b")
+    cache.get_or_build(c, ("standard", 1, ()), lambda: "c")
+    assert cache.get_or_build(a, ("standard", 1, ()), lambda: "again") == "again"
+
+def test_duo_pick_prompt_accepts_prebuilt_base_prompt():
+    task = _task()
+    test_input = task.test[0].input
+    candidates = [{"grid": [[1]], "models": ["m_1"]}]
+    expected = build_duo_pick_prompt(task.train, test_input, candidates, {"m_1": "r"}, 3)
+    base = build_prompt(task.train, SimpleNamespace(input=test_input))
+    assert build_duo_pick_prompt(task.train, test_input, candidates, {"m_1": "r"}, 3, base_prompt=base) == expected
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
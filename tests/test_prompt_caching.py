@@ -0,0 +1,115 @@
+import sys
+import json
+import pickle
+import pytest
+import httpx
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from openai import OpenAI
+
+import src.providers.prompt_caching as prompt_caching
+import src.providers.openai_bg.job_manager as job_manager
+from src.types import Task, Example, CacheablePrompt
+from src.tasks import build_prompt, build_prompt_codegen, build_objects_extraction_prompt
+from src.models import parse_model_arg, calculate_cost
+from src.providers.openai import call_openai_internal
+from src.providers.anthropic import _solve_messages, _explain_messages, _response_from_message
+from src.providers.gemini import _response_from_gemini
+from src.solver.state import SolverState
+
+_TASK = Task(
+    train=[Example([[1, 0], [0, 1]], [[0, 1], [1, 0]]), Example([[2, 2], [0, 0]], [[0, 0], [2, 2]])],
+    test=[Example([[3, 0], [0, 3]], None), Example([[0, 4], [4, 0]], None)],
+)
+
+@pytest.fixture
+def caching(monkeypatch):
+    monkeypatch.setattr(prompt_caching, "_PROMPT_CACHING_ENABLED", True)
+
+def test_standard_prompt_prefix_is_shared_across_test_indices_and_flags():
+    p1 = build_prompt(_TASK.train, _TASK.test[0])
+    p2 = build_prompt(_TASK.train, _TASK.test[1], trigger_deep_thinking=True)
+    assert isinstance(p1, CacheablePrompt) and p1.prefix + p1.suffix == p1
+    assert p1.prefix == p2.prefix and "Example 2:" in p1.prefix
+    assert p1.suffix.startswith("Test input:")
+    assert pickle.loads(pickle.dumps(p1)).prefix_len == p1.prefix_len
+
+    codegen = build_prompt_codegen(_TASK.train, test_examples=_TASK.test, version="v1b")
+    assert codegen.prefix == codegen
+
+def test_objects_extraction_prompt_is_deterministic():
+    prompts = {build_objects_extraction_prompt(_TASK.train, _TASK.test[0]) for _ in range(5)}
+    assert len(prompts) == 1
+
+def test_openai_request_carries_prefix_cache_key_and_reads_cached_tokens(caching, monkeypatch):
+    monkeypatch.setattr(job_manager, "POLL_INTERVAL_BASE_S", 0.01)
+    monkeypatch.setattr(job_manager.random, "uniform", lambda a, b: 0.0)
+    bodies = []
+
+    def api(request):
+        if request.method == "POST":
+            bodies.append(json.loads(request.content))
+        usage = {"input_tokens": 100, "output_tokens": 5, "total_tokens": 105, "input_tokens_details": {"cached_tokens": 80}, "output_tokens_details": {"reasoning_tokens": 0}}
+        output = [{"type": "message", "id": "o", "role": "assistant", "status": "completed", "content": [{"type": "output_text", "text": "ok", "annotations": []}]}]
+        return httpx.Response(200, json={"id": "resp_1", "object": "response", "created_at": 0, "model": "m", "status": "completed", "output": output, "usage": usage, "parallel_tool_calls": False, "tool_choice": "auto", "tools": []})
+
+    client = OpenAI(api_key="x", max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(api)))
+    config = parse_model_arg("gpt-5.1-low")
+    responses = [
+        call_openai_internal(client, build_prompt(_TASK.train, test), config, use_background=True)
+        for test in _TASK.test
+    ]
+
+    keys = [body.get("prompt_cache_key") for body in bodies]
+    assert keys[0] and keys[0] == keys[1]
+    assert (responses[0].prompt_tokens, responses[0].cached_tokens) == (100, 80)
+
+    monkeypatch.setattr(prompt_caching, "_PROMPT_CACHING_ENABLED", False)
+    call_openai_internal(client, build_prompt(_TASK.train, _TASK.test[0]), config, use_background=True)
+    assert "prompt_cache_key" not in bodies[-1]
+
+def test_anthropic_blocks_mark_prefix_and_usage_counts_cache(caching):
+    prompt = build_prompt(_TASK.train, _TASK.test[0])
+    image = {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": ""}}
+    content = _solve_messages(prompt, image)[0]["content"]
+    assert content[0] == {"type": "text", "text": prompt.prefix, "cache_control": {"type": "ephemeral"}}
+    assert content[1] is image and content[2]["text"] == prompt.suffix
+
+    prev = SimpleNamespace(_raw_content=[{"type": "text", "text": "answer"}])
+    assert _explain_messages(prompt, "explain", prev)[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert _solve_messages("plain text")[0]["content"] == [{"type": "text", "text": "plain text"}]
+
+    usage = SimpleNamespace(input_tokens=10, output_tokens=3, cache_read_input_tokens=70, cache_creation_input_tokens=20)
+    resp = _response_from_message(SimpleNamespace(content=[], usage=usage))
+    assert (resp.prompt_tokens, resp.cached_tokens, resp.cache_write_tokens) == (100, 70, 20)
+
+    # Cache writes cost 1.25x the base input price, reads 0.1x
+    usage = SimpleNamespace(input_tokens=1_000_000, output_tokens=0, cache_read_input_tokens=1_000_000, cache_creation_input_tokens=1_000_000)
+    resp = _response_from_message(SimpleNamespace(content=[], usage=usage))
+    assert calculate_cost(parse_model_arg("claude-sonnet-4.5-no-thinking"), resp) == pytest.approx(3.00 + 0.30 + 3.75)
+
+def test_gemini_reads_implicit_cache_hits():
+    usage = SimpleNamespace(prompt_token_count=100, cached_content_token_count=60, candidates_token_count=5, thoughts_token_count=0)
+    resp = _response_from_gemini(SimpleNamespace(candidates=[], usage_metadata=usage))
+    assert (resp.prompt_tokens, resp.cached_tokens) == (100, 60)
+
+def test_usage_stats_count_cached_tokens_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    task_data = {"train": [{"input": ex.input, "output": ex.output} for ex in _TASK.train], "test": [{"input": _TASK.test[0].input}]}
+    state = SolverState("t", 1, 0, False, "ts", task_data=task_data, logs_directory=str(tmp_path))
+    res = {
+        "run_id": "gpt-5.1-low_1_step_1", "model": "gpt-5.1-low", "cost": 0.0, "prompt": "p", "full_response": "r",
+        "grid": None, "is_correct": None, "input_tokens": 100, "cached_tokens": 80, "output_tokens": 5, "reasoning_tokens": 0,
+    }
+    state.process_results([res], {})
+    assert state.usage_stats["prompt_tokens"] == 100
+    assert state.usage_stats["cached_tokens"] == 80
+    assert state.usage_stats["total_tokens"] == 105
+    state.close()
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
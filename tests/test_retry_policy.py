@@ -0,0 +1,91 @@
+import sys
+import pytest
+import httpx
+import openai
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.llm_utils as llm_utils
+import src.retry_policy as retry_policy
+from src.llm_utils import run_with_retry
+from src.providers.openai_utils import _map_openai_exception
+from src.retry_policy import policy_for, retry_after_seconds, POLL_RETRY, TRANSIENT_RETRY
+from src.errors import RetryableProviderError, RateLimitProviderError
+
+def _rate_limit(headers):
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+    try:
+        _map_openai_exception(openai.RateLimitError("slow down", response=response, body=None), "m")
+    except RateLimitProviderError as e:
+        return e
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(llm_utils.time, "sleep", slept.append)
+    monkeypatch.setattr(retry_policy.random, "uniform", lambda a, b: a)
+    return slept
+
+def _failing(errors, result="ok"):
+    calls = []
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return func, calls
+
+def test_retry_after_header_sets_the_delay(sleeps):
+    timings = []
+    func, _ = _failing([_rate_limit({"retry-after": "7"}), _rate_limit({"retry-after-ms": "1500"})])
+    assert run_with_retry(func, timing_tracker=timings) == "ok"
+    assert sleeps == [7.0, 1.5]
+    waits = [t for t in timings if t["type"] == "wait"]
+    assert [(w["error_class"], w["retry_after"]) for w in waits] == [("rate_limit", 7.0), ("rate_limit", 1.5)]
+
+    assert retry_after_seconds(_rate_limit({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(RetryableProviderError("no response")) is None
+
+def test_backoff_follows_the_error_class(sleeps):
+    func, _ = _failing([_rate_limit({})] * 3)
+    run_with_retry(func)
+    assert sleeps == [30.0 * 0.8, 60.0 * 0.8, 120.0 * 0.8]
+
+    transient = RetryableProviderError("503")
+    assert policy_for(transient) is TRANSIENT_RETRY
+    assert policy_for(transient, kind="poll") is POLL_RETRY
+    assert POLL_RETRY.delay(10) <= POLL_RETRY.max_delay_s * (1 + POLL_RETRY.jitter)
+
+def test_nested_retry_loops_do_not_stack(sleeps):
+    inner_func, inner_calls = _failing([RetryableProviderError("blip")] * 10)
+    outer_calls = []
+
+    def outer():
+        outer_calls.append(1)
+        return run_with_retry(inner_func)
+
+    with pytest.raises(RetryableProviderError):
+        run_with_retry(outer)
+    # The inner loop used its 2 attempts; the outer loop does not start another round of them
+    assert (len(outer_calls), len(inner_calls), len(sleeps)) == (1, 2, 1)
+
+def test_retry_budget_caps_a_logical_call(sleeps, monkeypatch):
+    monkeypatch.setattr(retry_policy, "RETRY_BUDGET_RETRIES", 3)
+    timings = []
+    func, calls = _failing([_rate_limit({"retry-after": "1"})] * 10)
+    with pytest.raises(RateLimitProviderError):
+        run_with_retry(func, timing_tracker=timings)
+    assert len(calls) == 4
+    assert timings[-1]["type"] == "retry_budget_exhausted"
+
+    monkeypatch.setattr(retry_policy, "RETRY_BUDGET_RETRIES", 10)
+    monkeypatch.setattr(retry_policy, "RETRY_BUDGET_S", 100)
+    func, calls = _failing([_rate_limit({"retry-after": "60"})] * 10)
+    with pytest.raises(RateLimitProviderError):
+        run_with_retry(func)
+    assert len(calls) == 2  # The second 60s wait would overrun the 100s sleep budget
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
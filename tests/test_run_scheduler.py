@@ -0,0 +1,85 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.rate_limiter as rate_limiter
+import src.parallel.scheduler as scheduler
+from src.rate_limiter import RateLimiter, PRIORITY_AGING_S, TICKET_GRACE_S, TICKET_MAX_POLL_S
+from src.parallel.limiter import RateLimitManager, SharedRateLimiter
+from src.parallel.scheduler import run_priority, runs_queued, run_finished, JUDGE_STEP, PRIORITY_STEP_1, PRIORITY_STEP_5, PRIORITY_JUDGE
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+def _drained(clock) -> RateLimiter:
+    limiter = RateLimiter(rate=1, period=1.0)
+    assert limiter.try_acquire() == 0.0
+    return limiter
+
+def test_free_token_goes_to_best_ranked_waiter(clock):
+    limiter = _drained(clock)
+    assert limiter.try_acquire("judge", (PRIORITY_JUDGE, 0)) > 0
+    assert limiter.try_acquire("step5-busy", (PRIORITY_STEP_5, 12)) > 0
+    assert limiter.try_acquire("step5-nearly-done", (PRIORITY_STEP_5, 1)) > 0
+    assert limiter.try_acquire("step1", (PRIORITY_STEP_1, 30)) > 0
+
+    served = []
+    for _ in range(4):
+        clock[0] += 1.0  # One token per second
+        for ticket, priority in [("judge", (PRIORITY_JUDGE, 0)), ("step5-busy", (PRIORITY_STEP_5, 12)),
+                                 ("step5-nearly-done", (PRIORITY_STEP_5, 1)), ("step1", (PRIORITY_STEP_1, 30))]:
+            if ticket not in served and limiter.try_acquire(ticket, priority) == 0.0:
+                served.append(ticket)
+    assert served == ["step1", "step5-nearly-done", "step5-busy", "judge"]
+    assert limiter.queued() == 0
+
+def test_waiting_ages_and_stale_waiters_lose_their_place(clock):
+    limiter = RateLimiter(rate=1, period=3600.0)
+    limiter.tokens = 0.0
+    # The judge keeps polling while it waits
+    for _ in range(int(4 * PRIORITY_AGING_S)):
+        assert limiter.try_acquire("judge", (PRIORITY_JUDGE, 0)) > 0
+        clock[0] += 1.0
+    # ... and now goes before a fresh step 1 call
+    assert limiter.try_acquire("step1", (PRIORITY_STEP_1, 0)) > 0
+    limiter.tokens = 1.0
+    assert limiter.try_acquire("step1", (PRIORITY_STEP_1, 0)) > 0
+    assert limiter.try_acquire("judge", (PRIORITY_JUDGE, 0)) == 0.0
+
+    # A waiter that stops polling does not hold the queue
+    limiter.tokens = 0.0
+    assert limiter.try_acquire("gone", (PRIORITY_STEP_1, 0)) > 0
+    limiter.tokens = 1.0
+    clock[0] += TICKET_MAX_POLL_S + TICKET_GRACE_S + 1.0
+    assert limiter.try_acquire("late", (PRIORITY_STEP_1, 0)) == 0.0
+    assert limiter.queued() == 0
+
+def test_run_priority(monkeypatch):
+    monkeypatch.setattr(scheduler, "_OUTSTANDING_RUNS", 0)
+    runs_queued(3)
+    run_finished()
+    assert run_priority("step_1_codegen_v4_0") == (PRIORITY_STEP_1, 2)
+    assert run_priority("step_5_deep_thinking") == (PRIORITY_STEP_5, 2)
+    assert run_priority(JUDGE_STEP)[0] == PRIORITY_JUDGE
+    monkeypatch.setattr(scheduler, "_RUN_SCHEDULER_ENABLED", False)
+    assert run_priority("step_1") is None
+
+def test_shared_bucket_queues_across_processes():
+    manager = RateLimitManager()
+    manager.start()
+    try:
+        limiter = SharedRateLimiter(manager.RateLimiter(rate=1, period=60.0))
+        assert limiter.acquire((PRIORITY_STEP_1, 0)) == 0.0
+        assert limiter.try_acquire("other-worker", (PRIORITY_JUDGE, 0)) > 0
+        assert limiter.queued() == 1
+    finally:
+        manager.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,186 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import json
+import time
+from src.sandbox import run_untrusted_code, run_untrusted_code_batch, get_sandbox_pool, set_sandbox_pool_enabled, set_parallel_batch_enabled, SandboxPool
+
+DOUBLE_SOLVER = "def solver(grid):\n    print('debug output')\n    return (grid * 2).tolist()\n"
+QUIET_DOUBLE_SOLVER = DOUBLE_SOLVER.replace("print('debug output')", "pass")
+
+@pytest.fixture(params=[True, False], ids=["pool", "cold"])
+def pool_mode(request):
+    set_sandbox_pool_enabled(request.param)
+    yield request.param
+    set_sandbox_pool_enabled(True)
+
+def test_success_returns_sanitized_output(pool_mode):
+    success, result, _ = run_untrusted_code(QUIET_DOUBLE_SOLVER, [[1, 2], [3, 4]])
+    assert success
+    assert result == [[2, 4], [6, 8]]
+
+def test_exception_is_reported(pool_mode):
+    success, result, logs = run_untrusted_code("def solver(grid):\n    raise ValueError('boom')\n", [[1]])
+    assert not success
+    assert result == "ValueError: boom"
+    assert "Traceback" in logs
+
+def test_timeout_is_enforced(pool_mode):
+    success, result, _ = run_untrusted_code("def solver(grid):\n    while True:\n        pass\n", [[1]], timeout_s=1.0)
+    assert not success
+    assert result == "TIMEOUT_EXPIRED"
+
+def test_pool_reuses_worker_and_captures_prints():
+    pool = get_sandbox_pool()
+    pool.shutdown()
+    for _ in range(3):
+        success, result, logs = run_untrusted_code(DOUBLE_SOLVER, [[1]])
+        assert success and result == [[2]]
+        assert "debug output" in logs
+    assert len(pool._idle) == 1
+    assert pool._idle[0].jobs_run == 3
+
+def test_pool_discards_worker_after_crash():
+    pool = get_sandbox_pool()
+    pool.shutdown()
+    run_untrusted_code(DOUBLE_SOLVER, [[1]])
+    first_worker = pool._idle[0]
+
+    success, result, _ = run_untrusted_code("import os\ndef solver(grid):\n    os._exit(3)\n", [[1]])
+    assert not success
+    assert result == "Subprocess crashed (Exit Code: 3)"
+
+    # Forked job died, but the warm worker itself is healthy
+    assert pool._idle == [first_worker]
+
+    # Timeouts are enforced inside the fork, so the worker survives those too
+    success, result, _ = run_untrusted_code("def solver(grid):\n    while True:\n        pass\n", [[1]], timeout_s=0.5)
+    assert result == "TIMEOUT_EXPIRED"
+    assert pool._idle == [first_worker]
+
+    # A job that disables the in-sandbox timer hits the host-side backstop and takes the worker down
+    stubborn = "import signal\nsignal.signal(signal.SIGALRM, signal.SIG_IGN)\ndef solver(grid):\n    while True:\n        pass\n"
+    success, result, _ = run_untrusted_code(stubborn, [[1]], timeout_s=0.5)
+    assert result == "TIMEOUT_EXPIRED"
+    assert pool._idle == []
+    assert first_worker.proc.poll() is not None
+
+def test_pool_caps_and_reaps_idle_workers():
+    pool = SandboxPool(max_idle=1, idle_ttl_s=0.3)
+    try:
+        workers = [pool._acquire(), pool._acquire()]
+        for worker in workers:
+            pool._release(worker, reusable=True)
+        assert pool._idle == [workers[0]]
+        assert workers[1].proc.poll() is not None
+
+        deadline = time.monotonic() + 5
+        while pool._idle and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool._idle == [] and pool._reaper is None
+        assert workers[0].proc.wait(timeout=5) is not None
+
+        # A worker going idle again restarts the reaper
+        assert pool.run(QUIET_DOUBLE_SOLVER, [[1]])[1] == [[2]]
+        assert len(pool._idle) == 1 and pool._reaper is not None
+    finally:
+        pool.shutdown()
+
+def test_jobs_do_not_share_state():
+    pool = get_sandbox_pool()
+    pool.shutdown()
+    leak = "import numpy\ndef solver(grid):\n    numpy.LEAKED = True\n    return grid\n"
+    probe = "import numpy\ndef solver(grid):\n    return [[int(hasattr(numpy, 'LEAKED'))]]\n"
+    assert run_untrusted_code(leak, [[1]])[0]
+    assert run_untrusted_code(probe, [[1]])[1] == [[0]]
+
+def test_batch_execs_code_once():
+    pool = get_sandbox_pool()
+    pool.shutdown()
+    code = "CALLS = []\ndef solver(grid):\n    CALLS.append(1)\n    return [[len(CALLS)]]\n"
+    results = run_untrusted_code_batch(code, [[[0]], [[0]], [[0]]])
+    assert [r[1] for r in results] == [[[1]], [[2]], [[3]]]
+    assert pool._idle[0].jobs_run == 1
+
+def test_batch_fail_fast_stops_at_first_mismatch(pool_mode):
+    inputs = [[[1]], [[2]], [[3]]]
+    results = run_untrusted_code_batch(QUIET_DOUBLE_SOLVER, inputs, expected=[[[2]], [[5]], [[6]]], fail_fast=True)
+    assert [r[1] for r in results] == [[[2]], [[4]]]
+
+    # None expectations (e.g. the test input) are never compared
+    results = run_untrusted_code_batch(QUIET_DOUBLE_SOLVER, inputs, expected=[[[2]], None, None], fail_fast=True)
+    assert len(results) == 3
+
+def test_batch_timeout_is_per_input_and_resumes(pool_mode):
+    code = "def solver(grid):\n    while grid[0][0] == 2:\n        pass\n    return grid.tolist()\n"
+    results = run_untrusted_code_batch(code, [[[1]], [[2]], [[3]]], timeout_s=1.0)
+    assert results[0] == (True, [[1]], "")
+    assert results[1][:2] == (False, "TIMEOUT_EXPIRED")
+    assert results[2][:2] == (True, [[3]])
+
+def test_batch_crash_is_reported_per_input(pool_mode):
+    code = "import os\ndef solver(grid):\n    if grid[0][0] == 2:\n        os._exit(3)\n    return grid.tolist()\n"
+    results = run_untrusted_code_batch(code, [[[1]], [[2]], [[3]]])
+    assert [r[:2] for r in results] == [(True, [[1]]), (False, "Subprocess crashed (Exit Code: 3)"), (True, [[3]])]
+
+@pytest.fixture
+def parallel_batches():
+    set_parallel_batch_enabled(True)
+    yield
+    set_parallel_batch_enabled(False)
+
+def test_parallel_batch_matches_sequential(parallel_batches):
+    code = "def solver(grid):\n    v = grid[0][0]\n    if v == 3:\n        raise ValueError('three')\n    return (grid * 2).tolist()\n"
+    inputs = [[[1]], [[2]], [[3]], [[4]]]
+    expected = [[[2]], [[4]], [[6]], [[8]]]
+    parallel = run_untrusted_code_batch(code, inputs, expected=expected, fail_fast=True)
+    set_parallel_batch_enabled(False)
+    sequential = run_untrusted_code_batch(code, inputs, expected=expected, fail_fast=True)
+    assert [r[:2] for r in parallel] == [r[:2] for r in sequential] == [(True, [[2]]), (True, [[4]]), (False, "ValueError: three")]
+
+def test_parallel_batch_cancels_jobs_after_first_failure(parallel_batches):
+    # Input 0 fails fast; the slow inputs after it must be cancelled rather than waited for
+    code = "import time\ndef solver(grid):\n    if grid[0][0] == 0:\n        return [[-1]]\n    time.sleep(60)\n    return grid.tolist()\n"
+    start = time.monotonic()
+    results = run_untrusted_code_batch(code, [[[0]], [[1]], [[2]]], expected=[[[0]], [[1]], [[2]]], timeout_s=120.0, fail_fast=True)
+    assert time.monotonic() - start < 30
+    assert results == [(True, [[-1]], "")]
+
+def test_cancel_sent_with_job_kills_it():
+    # Job and cancel arriving in one read must still kill the job
+    pool = get_sandbox_pool()
+    worker = pool._acquire()
+    job = {"code": "import time\ndef solver(grid):\n    time.sleep(60)\n", "inputs": [[[1]]], "timeout_s": 120.0}
+    start = time.monotonic()
+    worker.proc.stdin.write(json.dumps(job).encode("utf-8") + b"\n" + b'{"cancel": true}\n')
+    while not worker.read_message(time.monotonic() + 30).get("end"):
+        pass
+    assert time.monotonic() - start < 30
+    pool._release(worker, True)
+
+def test_exec_cache_skips_repeated_and_reformatted_code(tmp_path):
+    from src.exec_cache import run_cached_batch
+    inputs = [[[1]], [[2]]]
+    results, stats = run_cached_batch(QUIET_DOUBLE_SOLVER, inputs, log_dir=str(tmp_path))
+    assert stats == {"hits": 0, "misses": 2}
+
+    reformatted = "def solver(grid):  # same solver\n\n    pass\n    return (grid*2).tolist()\n"
+    cached, stats = run_cached_batch(reformatted, inputs + [[[3]]], log_dir=str(tmp_path))
+    assert stats == {"hits": 2, "misses": 1}
+    assert cached[:2] == results
+    assert cached[2] == (True, [[6]], "")
+
+def test_exec_cache_does_not_store_timeouts(tmp_path):
+    from src.exec_cache import run_cached_batch
+    code = "def solver(grid):\n    while True:\n        pass\n"
+    for _ in range(2):
+        results, stats = run_cached_batch(code, [[[1]]], timeout_s=0.5, log_dir=str(tmp_path))
+        assert results[0][1] == "TIMEOUT_EXPIRED"
+        assert stats == {"hits": 0, "misses": 1}
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,76 @@
+import sys
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.parallel.limiter as limiter
+from src.parallel.limiter import RateLimitManager, SharedRateLimiter, set_shared_rate_limiters, get_rate_limit_wait_stats
+
+def _take_tokens(proxy, n):
+    local = SharedRateLimiter(proxy)
+    return sum(1 for _ in range(n) if local.try_acquire() == 0.0)
+
+@pytest.fixture
+def manager():
+    manager = RateLimitManager()
+    manager.start()
+    yield manager
+    manager.shutdown()
+
+def test_bucket_is_shared_across_processes(manager):
+    proxy = manager.RateLimiter(rate=4, period=3600)
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        granted = list(executor.map(_take_tokens, [proxy] * 3, [3] * 3))
+    # 9 attempts against a bucket of 4, whichever processes got them
+    assert sum(granted) == 4
+    assert proxy.try_acquire() > 0
+
+def test_shared_limiter_waits_locally_and_reports_waits(manager, monkeypatch):
+    proxy = manager.RateLimiter(rate=1, period=0.2)
+    monkeypatch.setattr(limiter, "LIMITERS", dict(limiter.LIMITERS))
+    monkeypatch.setattr(limiter, "_SCALED", False)
+    set_shared_rate_limiters({"openai": proxy})
+
+    assert limiter.LIMITERS["openai"].acquire() == 0.0
+    waited = limiter.LIMITERS["openai"].acquire()
+    assert waited > 0
+
+    stats = get_rate_limit_wait_stats()["openai"]
+    assert stats["waited_calls"] == 1
+    assert stats["max_wait"] == pytest.approx(waited)
+    # Scaling is a no-op once the buckets are shared
+    limiter.set_rate_limit_scaling(0.5)
+    assert isinstance(limiter.LIMITERS["openai"], SharedRateLimiter)
+
+def test_async_acquire_keeps_round_trips_off_the_loop(manager):
+    proxy = manager.RateLimiter(rate=1, period=0.5)
+    threads = []
+
+    class _Recording:
+        def try_acquire(self, ticket=None, priority=None):
+            threads.append(threading.current_thread())
+            return proxy.try_acquire(ticket, priority)
+
+        def record_wait(self, seconds):
+            threads.append(threading.current_thread())
+            proxy.record_wait(seconds)
+
+    local = SharedRateLimiter(_Recording())
+
+    async def _acquire_twice():
+        loop_thread = threading.current_thread()
+        await local.acquire_async()
+        await local.acquire_async()
+        return loop_thread
+
+    loop_thread = asyncio.run(_acquire_twice())
+    # The second acquire had to wait, so it made several round trips and recorded its wait
+    assert len(threads) >= 3 and loop_thread not in threads
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
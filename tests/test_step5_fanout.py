@@ -0,0 +1,75 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.solver.fanout as fanout
+from src.grid import FrozenGrid
+from src.solver.fanout import plan_step_5, difficulty_signals, estimate_difficulty, step_down
+
+DEEP = ["gpt-5.2-xhigh"] * 3
+IMAGE = ["gpt-5.2-xhigh"] * 3 + ["gemini-3-high"]
+CODEGEN = ",".join(["gemini-3-high=v4"] + ["gpt-5.2-xhigh=v1b"] * 6)
+
+def _candidates(*groups) -> dict:
+    """groups: (count, rows, cols) per distinct grid."""
+    candidates = {}
+    for i, (count, rows, cols) in enumerate(groups):
+        grid = [[i] * cols for _ in range(rows)]
+        candidates[FrozenGrid(grid)] = {"grid": grid, "count": count, "models": [], "is_correct": None}
+    return candidates
+
+def _plan(candidates, attempts, passed=0, total=0, adaptive=True):
+    return plan_step_5(candidates, attempts, {"passed": passed, "total": total}, DEEP, IMAGE, CODEGEN, adaptive=adaptive)
+
+def test_near_solved_task_gets_a_confirmation_batch():
+    plan = _plan(_candidates((9, 3, 3), (1, 3, 3), (1, 3, 3)), attempts=15, passed=2, total=2)
+    assert plan["tier"] == "confirm"
+    assert plan["runs"] == {"deep": "1/3", "image": "2/4", "codegen": "2/7"}
+    # Every model keeps a run, one reasoning level down where that level exists
+    assert plan["deep_models"] == ["gpt-5.2-high"]
+    assert set(plan["image_models"]) == {"gpt-5.2-high", "gemini-3-high"}
+    assert set(plan["codegen_params"].split(",")) == {"gemini-3-high=v4", "gpt-5.2-high=v1b"}
+
+def test_step_down():
+    assert step_down("gpt-5.2-xhigh") == "gpt-5.2-high"
+    assert step_down("claude-opus-4.5-thinking-60000") == "claude-opus-4.5-thinking-16000"
+    # No medium Gemini level
+    assert step_down("gemini-3-high") == "gemini-3-high"
+    assert step_down("gpt-5.2-low") == "gpt-5.2-low"
+
+def test_split_and_empty_tasks_get_more_runs():
+    leaning = _plan(_candidates((6, 3, 3), (2, 3, 3), (1, 3, 3)), attempts=15, passed=1, total=2)
+    assert leaning["tier"] == "standard" and leaning["runs"]["image"] == "2/4"
+    assert set(leaning["image_models"]) == {"gpt-5.2-xhigh", "gemini-3-high"}
+
+    # A close second group needs the full fleet, even with passing code
+    tied = _plan(_candidates((5, 3, 3), (5, 3, 3)), attempts=10, passed=2, total=2)
+    assert tied["tier"] == "full"
+    assert _plan(_candidates((5, 3, 3), (4, 3, 3), (1, 3, 3)), attempts=15, passed=1, total=2)["tier"] == "full"
+
+    scattered = _plan(_candidates(*[(1, 2 + i % 3, 3) for i in range(8)]), attempts=15, passed=0, total=2)
+    assert scattered["tier"] == "full"
+    assert scattered["deep_models"] == DEEP and scattered["image_models"] == IMAGE and scattered["codegen_params"] == CODEGEN
+
+    # Nothing to go on (e.g. --step-5-only)
+    assert _plan({}, attempts=0)["tier"] == "full"
+
+def test_failed_runs_count_against_agreement():
+    agreed = difficulty_signals(_candidates((4, 3, 3)), attempts=4)
+    mostly_failed = difficulty_signals(_candidates((4, 3, 3)), attempts=15)
+    assert estimate_difficulty(mostly_failed) > estimate_difficulty(agreed)
+
+def test_disabled_policy_runs_the_full_fleet(monkeypatch):
+    monkeypatch.setattr(fanout, "_ADAPTIVE_STEP_5_ENABLED", False)
+    plan = _plan(_candidates((9, 3, 3), (1, 3, 3)), attempts=15, passed=2, total=2)
+    assert plan["tier"] == "full" and plan["runs"]["codegen"] == "7/7"
+
+def test_forced_step_5_runs_the_full_fleet():
+    plan = _plan(_candidates((9, 3, 3), (1, 3, 3)), attempts=15, passed=2, total=2, adaptive=False)
+    assert plan["tier"] == "full" and plan["deep_models"] == DEEP and plan["codegen_params"] == CODEGEN
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,131 @@
+import re
+import sys
+import glob
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.grid_parsing import iter_grid_blocks
+
+CASES_GLOB = "tests/grid_parsing_cases/cases/*.txt"
+
+def legacy_extract_all_grids(text):
+    """Previous line-by-line tokenizer (src/judges.py before the shared parser). Reference only."""
+    if not text:
+        return []
+    text = text.strip()
+    lines = text.splitlines()
+    candidate_rows = []
+    hard_separators = []
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            candidate_rows.append(None)
+            hard_separators.append(i)
+            continue
+        if not stripped:
+            candidate_rows.append(None)
+            continue
+        if re.match(r'^Row\s+\d+:?$', stripped, re.IGNORECASE):
+            candidate_rows.append(None)
+            continue
+        if stripped.startswith(("-", "*", "+")):
+            candidate_rows.append(None)
+            continue
+        row = None
+        try:
+            clean_line = stripped.replace("`", " ").replace("[", " ").replace("]", " ").strip()
+            numbered_list_match = re.match(r'^\d+[\.\)]\s+', clean_line)
+            if numbered_list_match:
+                clean_line = clean_line[numbered_list_match.end():]
+            tokens = clean_line.split(",")
+            if len(tokens) > 0 and all(t.strip().isdigit() for t in tokens):
+                row = [int(t.strip()) for t in tokens]
+            else:
+                if ":" in clean_line:
+                    clean_line = clean_line.split(":")[-1].strip()
+                match = re.search(r'\d', clean_line)
+                if match:
+                    last_digit_idx = -1
+                    for idx, char in enumerate(clean_line):
+                        if char.isdigit():
+                            last_digit_idx = idx
+                    if last_digit_idx != -1 and last_digit_idx >= match.start():
+                        candidate_sub = clean_line[match.start() : last_digit_idx + 1]
+                        sub_tokens = candidate_sub.split(",")
+                        if len(sub_tokens) > 1 and all(t.strip().isdigit() for t in sub_tokens):
+                            remainder = clean_line[last_digit_idx + 1:].strip()
+                            if not any(c.isalpha() for c in remainder):
+                                row = [int(t.strip()) for t in sub_tokens]
+        except ValueError:
+            pass
+        candidate_rows.append(row)
+
+    blocks = []
+    current_block = []
+    last_row_index = -1
+    for i, row in enumerate(candidate_rows):
+        if row is not None:
+            if not current_block:
+                current_block = [row]
+                last_row_index = i
+            else:
+                has_hard_sep = any(last_row_index < sep_idx < i for sep_idx in hard_separators)
+                gap_size = i - last_row_index - 1
+                width_match = abs(len(row) - len(current_block[0])) <= 5
+                if has_hard_sep or gap_size > 2 or not width_match:
+                    blocks.append(current_block)
+                    current_block = [row]
+                    last_row_index = i
+                else:
+                    current_block.append(row)
+                    last_row_index = i
+    if current_block:
+        blocks.append(current_block)
+    return blocks
+
+def shared_extract_all_grids(text):
+    if not text:
+        return []
+    return list(iter_grid_blocks(text))
+
+def synthetic_judge_prompt(n_grids=60, size=30, seed=0):
+    """Duo-judge style prompt: long reasoning prose interleaved with many echoed grids."""
+    rng = random.Random(seed)
+    parts = []
+    for g in range(n_grids):
+        parts.append(f"Candidate {g}: the model reasons about objects at rows 3-7, colors 2 and 8, and symmetry.\n" * 8)
+        parts.append("```")
+        for _ in range(size):
+            parts.append(",".join(str(rng.randint(0, 9)) for _ in range(size)))
+        parts.append("```")
+    return "\n".join(parts)
+
+def bench(fn, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the shared grid parser against the legacy tokenizer.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported).")
+    args = parser.parse_args()
+
+    corpora = {"cases": [Path(f).read_text() for f in sorted(glob.glob(CASES_GLOB))]}
+    corpora["judge_prompt"] = [synthetic_judge_prompt()]
+
+    for name, texts in corpora.items():
+        mismatches = sum(1 for t in texts if legacy_extract_all_grids(t) != shared_extract_all_grids(t))
+        size_kb = sum(len(t) for t in texts) / 1024
+        legacy = bench(legacy_extract_all_grids, texts, args.repeat)
+        shared = bench(shared_extract_all_grids, texts, args.repeat)
+        print(f"{name:>12}: {len(texts)} texts, {size_kb:.0f}KB | legacy {legacy * 1000:.1f}ms | shared {shared * 1000:.1f}ms | speedup {legacy / shared:.2f}x | mismatches {mismatches}")
+
+if __name__ == "__main__":
+    main()
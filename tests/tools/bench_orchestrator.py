@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import time
+import random
+import inspect
+import tempfile
+import argparse
+import threading
+import statistics
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from src.mock_llm_server import add_server_arguments, server_from_args
+from src.batch_processing import run_batch_execution
+from src.runner import (
+    run_app, SOLVER_STEP1_MODELS, TESTING_STEP1_MODELS, SOLVER_CODEGEN_PARAMS,
+    TESTING_CODEGEN_PARAMS, SOLVER_JUDGE_MODEL, TESTING_JUDGE_MODEL,
+)
+
+# Runs a batch against the mock provider server (src/mock_llm_server.py) and reports orchestration
+# throughput, thread counts and memory of the worker processes, and the load the providers saw.
+# Rate limiter queue waits and admission decisions are printed by the batch itself.
+
+def synthetic_tasks(count: int, seed: int) -> dict:
+    """ARC-shaped tasks with random grids (3 train pairs, 1 test input)."""
+    rng = random.Random(seed)
+
+    def grid():
+        rows, cols = rng.randint(3, 12), rng.randint(3, 12)
+        return [[rng.randint(0, 9) for _ in range(cols)] for _ in range(rows)]
+
+    return {
+        f"bench{i:04d}": {
+            "train": [{"input": grid(), "output": grid()} for _ in range(3)],
+            "test": [{"input": grid()}],
+        }
+        for i in range(count)
+    }
+
+def batch_args(**overrides) -> SimpleNamespace:
+    """run_app's settings (its defaults, plus overrides) as the namespace run_batch_execution expects."""
+    params = {name: p.default for name, p in inspect.signature(run_app).parameters.items()}
+    params.update(overrides)
+    testing = params["solver_testing"]
+    params["solver"] = not testing
+    params["step1_models"] = params["step1_models"] or (TESTING_STEP1_MODELS if testing else SOLVER_STEP1_MODELS)
+    params["codegen_params"] = params["codegen_params"] or (TESTING_CODEGEN_PARAMS if testing else SOLVER_CODEGEN_PARAMS)
+    params["judge_model"] = params["judge_model"] or (TESTING_JUDGE_MODEL if testing else SOLVER_JUDGE_MODEL)
+    return SimpleNamespace(**params)
+
+def _proc_children() -> dict:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name is in parentheses and may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+def _descendants(pid: int) -> list[int]:
+    children = _proc_children()
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def _proc_status(pid: int):
+    """(threads, rss_mb) of a process, or None once it has exited."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            status = f.read()
+    except OSError:
+        return None
+    threads = re.search(r"^Threads:\s+(\d+)", status, re.M)
+    rss = re.search(r"^VmRSS:\s+(\d+) kB", status, re.M)
+    return int(threads.group(1)) if threads else 0, int(rss.group(1)) / 1024 if rss else 0.0
+
+class ProcessSampler:
+    """Samples thread counts and RSS of this process and all its descendants (Linux /proc)."""
+    def __init__(self, server, interval_s: float):
+        self.server = server
+        self.interval_s = interval_s
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.peak_processes = 0
+        self.peak_threads = 0
+        self.peak_threads_per_process = 0
+        self.peak_main_threads = 0
+        self.child_rss_mb = []
+        self.in_flight = []
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval_s):
+            self.sample()
+
+    def sample(self):
+        main = _proc_status(os.getpid())
+        if main:
+            self.peak_main_threads = max(self.peak_main_threads, main[0])
+        statuses = [s for s in (_proc_status(pid) for pid in _descendants(os.getpid())) if s]
+        self.peak_processes = max(self.peak_processes, len(statuses))
+        self.peak_threads = max(self.peak_threads, sum(t for t, _ in statuses) + (main[0] if main else 0))
+        if statuses:
+            self.peak_threads_per_process = max(self.peak_threads_per_process, max(t for t, _ in statuses))
+            self.child_rss_mb.extend(rss for _, rss in statuses)
+        self.in_flight.append(self.server.stats()["in_flight"])
+
+    def start(self):
+        if Path("/proc").exists():
+            self.thread.start()
+        else:
+            print("No /proc: thread and memory stats unavailable.", file=sys.stderr)
+
+    def stop(self):
+        self.stop_event.set()
+
+def report(units: int, results: list, elapsed: float, server_stats: dict, sampler: ProcessSampler):
+    counters = server_stats["counters"]
+    model_calls = sum(n for name, n in counters.items() if name.rsplit(".", 1)[-1] in ("stream", "create", "background", "generate"))
+    finished = sum(1 for r in results if r and r[2])
+    print()
+    print("=== Orchestrator benchmark ===")
+    print(f"Units:            {finished}/{units} with predictions in {elapsed:.1f}s ({units / elapsed * 60:.1f} units/min)")
+    print(f"Model calls:      {model_calls} ({model_calls / elapsed:.2f}/s), peak {server_stats['peak_in_flight']} in flight"
+          + (f", mean {statistics.mean(sampler.in_flight):.1f}" if sampler.in_flight else ""))
+    print(f"Injected faults:  {sum(n for k, n in counters.items() if k.endswith('.429'))} x 429, {sum(n for k, n in counters.items() if k.endswith('.500'))} x 500")
+    print(f"Requests:         {', '.join(f'{k}={n}' for k, n in counters.items())}")
+    print(f"Processes:        peak {sampler.peak_processes} children")
+    print(f"Threads:          peak {sampler.peak_threads} total, {sampler.peak_threads_per_process} in one child, {sampler.peak_main_threads} in the parent")
+    if sampler.child_rss_mb:
+        rss = sorted(sampler.child_rss_mb)
+        print(f"RSS per child:    median {statistics.median(rss):.0f} MB, p95 {rss[int(len(rss) * 0.95)]:.0f} MB, max {rss[-1]:.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batch orchestrator against the mock provider server.")
+    parser.add_argument("--units", type=int, default=20, help="Synthetic task:test units to run.")
+    parser.add_argument("--task-workers", type=int, default=8)
+    parser.add_argument("--startup-delay", type=float, default=0.0)
+    parser.add_argument("--solver-testing", action="store_true", help="Use the --solver-testing model lineup (default: the full --solver lineup).")
+    parser.add_argument("--step1-models", default=None)
+    parser.add_argument("--codegen-params", default=None)
+    parser.add_argument("--work-dir", default=None, help="Directory the batch runs in; logs go to its logs/ (default: a temporary directory).")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between process samples.")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args).start()
+    # Workers are forked from here, so they inherit the base URLs; never send real keys to the mock
+    os.environ.update(server.environment())
+    for name in [n for n in os.environ if re.fullmatch(r"GEMINI_API_KEY_\d+|CLAUDE_API_KEY", n)]:
+        del os.environ[name]
+    os.environ.update({"OPENAI_API_KEY": "mock", "ANTHROPIC_API_KEY": "mock", "GEMINI_API_KEY": "mock"})
+    print(f"Mock providers at {server.url}", file=sys.stderr)
+
+    # Some artifacts (step 5 images, the sandbox cache) go to ./logs whatever logs_directory says
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="bench_orchestrator_")).resolve()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.chdir(work_dir)
+    run_args = batch_args(
+        task_workers=args.task_workers,
+        solver_testing=args.solver_testing,
+        step1_models=args.step1_models,
+        codegen_params=args.codegen_params,
+        logs_directory="logs/",
+        llm_transport="live",
+    )
+    tasks = synthetic_tasks(args.units, args.seed)
+    tasks_to_run = [(task_id, 1, task) for task_id, task in tasks.items()]
+    run_timestamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+
+    sampler = ProcessSampler(server, args.sample_interval)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        results = run_batch_execution(run_args, tasks_to_run, run_timestamp, 1.0 / max(1, args.task_workers), startup_delay=args.startup_delay)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        server_stats = server.stats()
+        server.stop()
+
+    report(len(tasks_to_run), results, elapsed, server_stats, sampler)
+    print(f"Step logs: {work_dir / 'logs'}")
@@ -0,0 +1,22 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.llm_transport import seed_from_step_logs
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Turn step logs into a recording for --llm-transport replay/synthetic.")
+    parser.add_argument("log_files", nargs="+", help="Path(s) to step log JSON files (e.g. tests/codegen_test_logs/*.json).")
+    parser.add_argument("--output", default="llm_recordings/seeded_from_logs.jsonl", help="Recording file to write.")
+
+    args = parser.parse_args()
+
+    log_files = [f for f in args.log_files if os.path.exists(f)]
+    for missing in sorted(set(args.log_files) - set(log_files)):
+        print(f"Skipping missing file: {missing}")
+
+    count = seed_from_step_logs(log_files, args.output)
+    print(f"Wrote {count} recorded responses to {args.output}")